@@ -1,218 +1,244 @@
 import os
 import json
+import copy
 import base64
 import re
-from flask import Flask, render_template, request, jsonify
+import time
+import shutil
+import tempfile
+import threading
+from functools import partial
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from dotenv import load_dotenv
-import google.generativeai as genai
-from PIL import Image, ImageEnhance, ImageFilter
-import io
+
+from ocr_cache import OcrCache, buat_kunci, versi_prompt
+from image_store import ImageStore
+from gemini_exec import GeminiExecutor, RegistriModel
+from quota import KuotaGemini, KuotaHabis, zona_waktu
+from image_proc import (
+    PreprocessPool, AnggaranMemori, potong_sel, varian_lindung, mime_gambar,
+    MAX_WIDTH, KONTRAS, KETAJAMAN, VERSI_KLIEN,
+)
+from prompts import ambil_prompt, prompt_sel
+from koreksi import cari_koreksi
+from riwayat import RiwayatDO
+from sesi_validasi import SesiValidasi, SesiTidakAda, VersiBentrok
+from json_stream import PenguraiKelompok
+from indeks_mirip import IndeksMirip
+from respons import pasang as pasang_respons
+from validasi_vektor import TOLERANSI
+from bersama import buat_bersama, BersamaGagal
+from metrics import (
+    metrik, tahap, catat_tahap, catat_payload, catat_error, catat_token, pasang as pasang_metrik,
+)
 
 load_dotenv()
 
 app = Flask(__name__)
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+pasang_metrik(app)   # Server-Timing per request + GET /metrics (Prometheus)
+
+# Respons: JSON lewat orjson (jika terpasang) + kompresi gzip/brotli sesuai
+# Accept-Encoding. Setelah pasang_metrik → ukuran payload tercatat = byte terkirim.
+pasang_respons(
+    app,
+    json_cepat = os.getenv('RESPONS_JSON', 'orjson') == 'orjson',
+    kompresi   = os.getenv('RESPONS_KOMPRESI', '1') != '0',
+    min_bytes  = int(os.getenv('RESPONS_KOMPRESI_MIN_BYTE', 1024)),
+    level_gzip = int(os.getenv('RESPONS_GZIP_LEVEL', 6)),
+    level_br   = int(os.getenv('RESPONS_BROTLI_LEVEL', 5)),
+    catat      = lambda encoding: metrik.inc('respons_kompresi_total', encoding=encoding),
+)
+# Default "ringkas" untuk /api/validate & /patch jika body tidak menyebutkan
+RESPONS_RINGKAS = os.getenv('RESPONS_RINGKAS', '0') == '1'
+
+# Batch: banyak foto dalam satu request → batas ukuran total lebih besar
+BATCH_MAX_FILE           = int(os.getenv('BATCH_MAX_FILE', 50))
+BATCH_MAX_CONTENT_LENGTH = int(os.getenv('BATCH_MAX_CONTENT_MB', 256)) * 1024 * 1024
+BATCH_MAX_PARALEL        = int(os.getenv('BATCH_MAX_PARALEL', 4))
+EKSTENSI_DIDUKUNG        = {'jpg', 'jpeg', 'png', 'webp'}
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
 
-# ══════════════════════════════════════════════════════════════════
-# PROMPT — Hanya OCR, tidak menghitung apapun
-# ══════════════════════════════════════════════════════════════════
-EXTRACTION_PROMPT = """
-Kamu adalah sistem OCR khusus untuk dokumen Delivery Order (DO) ternak milik DMC.
-TUGASMU HANYA MEMBACA & MENGAMBIL ANGKA PERSIS SEPERTI TERTULIS. JANGAN hitung apapun.
-
-════════════════════════════════════════
-STRUKTUR DOKUMEN DO
-════════════════════════════════════════
-
-BAGIAN ATAS DOKUMEN (ringkasan global):
-  - Kolom "Ekor"     → total ekor realisasi keseluruhan (baca persis)
-  - Kolom "Kg"       → total kg realisasi keseluruhan (baca persis)
-  - Kolom "Rata-rata"→ nilai rata-rata (baca persis, bisa desimal seperti 2.17 atau 2,17)
-
-TABEL RINCIAN:
-  Terdapat beberapa KELOMPOK kolom (biasanya 2: PESANAN di kiri, REALISASI di kanan).
-  Masing-masing kelompok punya sub-kolom: "Ekor" dan "Kg".
-  Setiap baris bernomor (1, 2, 3, ...) berisi angka ekor dan berat per kandang/pengiriman.
-
-BARIS RINGKASAN DI BAWAH TABEL (baca persis, JANGAN hitung):
-  Baris yang perlu dibaca per kelompok:
-  - "Ekor"  → total ekor tertulis
-  - "Bruto" → berat kotor tertulis (jika ada angka; jika kosong/tidak ada → null)
-  - "Terra" → tara/potongan tertulis (jika ada angka; jika kosong/tidak ada → null)
-  - "Netto" → berat bersih tertulis
-
-════════════════════════════════════════
-PANDUAN KHUSUS: MEMBACA ANGKA TULISAN TANGAN
-════════════════════════════════════════
-
-Tulisan tangan manusia sering menimbulkan ambiguitas. Perhatikan petunjuk berikut:
-
-ANGKA 4 vs 9:
-  → Angka 4: bagian atas TERBUKA atau berbentuk huruf V terbalik, bagian bawah LURUS ke bawah tanpa lengkungan.
-  → Angka 9: bagian atas berbentuk LINGKARAN/oval tertutup, bagian bawah ada ekor yang MELENGKUNG atau menggantung.
-  → Jika ragu antara 4 dan 9 → lihat konteks nilainya:
-      Kolom Ekor per baris biasanya antara 10–50 ekor.
-      Kolom Kg per baris biasanya antara 50–100 kg.
-      Nilai Netto/Total biasanya kelipatan logis dari baris-baris di atasnya.
-
-ANGKA 6 vs 0:
-  → Angka 6: ada ekor melengkung di bagian atas, lingkaran di bawah.
-  → Angka 0: oval penuh, tidak ada ekor.
-
-ANGKA 1 vs 7:
-  → Angka 7: ada garis serong di bagian atas.
-  → Angka 1: lurus ke bawah, tidak ada garis serong.
-
-ANGKA 3 vs 8:
-  → Angka 8: dua lingkaran tertutup bertumpuk.
-  → Angka 3: sisi kiri TERBUKA (tidak ada garis menutup ke kiri).
-
-ANGKA 5 vs 6:
-  → Angka 5: bagian atas lurus dengan sudut ke kiri.
-  → Angka 6: ekor melengkung di atas tanpa sudut tajam.
-
-ATURAN RAGU:
-  Jika setelah menerapkan semua panduan di atas kamu MASIH TIDAK YAKIN pada satu angka
-  di suatu baris, tambahkan field "ragu": true pada baris tersebut.
-  Contoh: {"no": 3, "ekor": 30, "kg": 64.9, "ragu": true}
-  Jika yakin → JANGAN tambahkan field "ragu" (atau isi false).
-
-════════════════════════════════════════
-FORMAT JSON YANG HARUS DIKEMBALIKAN
-════════════════════════════════════════
-
-Kembalikan HANYA JSON murni (tanpa markdown, tanpa ```, tanpa penjelasan apapun):
-
-{
-  "kelompok": [
-    {
-      "nama": "PESANAN",
-      "posisi": "kiri",
-      "baris": [
-        {"no": 1, "ekor": 30, "kg": 81.0},
-        {"no": 2, "ekor": 30, "kg": 80.5, "ragu": true}
-      ],
-      "tertulis_total_ekor": 300,
-      "tertulis_bruto_kg": 809.5,
-      "tertulis_terra_kg": 170.0,
-      "tertulis_netto_kg": 639.5
+# Model & koneksi Gemini dibuat sekali per worker lalu dipakai ulang
+OCR_MODEL      = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash')
+GEMINI_TIMEOUT = float(os.getenv('GEMINI_TIMEOUT_DETIK', 50))
+registri_model = RegistriModel(
+    api_key           = GEMINI_API_KEY,
+    nama_model        = OCR_MODEL,
+    timeout           = GEMINI_TIMEOUT,
+    transport         = os.getenv('GEMINI_TRANSPORT') or None,
+    timeout_pemanasan = float(os.getenv('GEMINI_PEMANASAN_TIMEOUT_DETIK', 10)),
+)
+
+# Prompt OCR (lihat prompts.py): instruksi statis = system instruction model,
+# per request hanya gambar + teks tugas pendek
+PROMPT_OCR = ambil_prompt(os.getenv('PROMPT_VERSI'))
+
+
+def model_ocr():
+    return registri_model.model(system_instruction=PROMPT_OCR.sistem)
+
+
+# Preprocess gambar (CPU-bound) di process pool agar worker gevent tetap responsif.
+# Anggaran memori global: upload berlebih menunggu, bukan membuat container OOM.
+UPLOAD_TMP_DIR  = os.getenv('UPLOAD_TMP_DIR') or None
+# Foto ulang DO yang sama (indeks_mirip.py): 'tandai' = hanya ditandai, 'pakai' =
+# pakai ulang hasil OCR lama jika isi sel tabel cocok (opt-in: foto ulang di
+# bench_mirip sampai 0.10 = batas MIRIP_SEL_MAKS), 'mati'
+MIRIP_MODE      = os.getenv('MIRIP_MODE', 'tandai')
+preprocess_pool = PreprocessPool(
+    max_proses  = int(os.getenv('PREPROCESS_PROSES', 2)),
+    max_antrian = int(os.getenv('PREPROCESS_MAX_ANTRIAN', 0)) or None,
+    anggaran    = AnggaranMemori(int(os.getenv('UPLOAD_ANGGARAN_MEMORI_MB', 192)) * 1024 * 1024),
+    # Kirim hanya area tabel + ringkasan ke Gemini; gambar utuh jika deteksi ragu
+    potong_tabel  = os.getenv('PREPROCESS_POTONG_TABEL', '1') != '0',
+    min_keyakinan = float(os.getenv('PREPROCESS_POTONG_MIN_KEYAKINAN', 0.6)),
+    # Encode: grayscale / WebP / quality & resolusi turun sampai muat anggaran byte
+    encode = {
+        'format':       os.getenv('PREPROCESS_FORMAT', 'jpeg'),
+        'abu':          os.getenv('PREPROCESS_ABU', '0') == '1',
+        'kualitas':     int(os.getenv('PREPROCESS_KUALITAS', 80)),
+        'target_bytes': int(float(os.getenv('PREPROCESS_TARGET_KB', 0)) * 1024) or None,
+        'min_kualitas': int(os.getenv('PREPROCESS_MIN_KUALITAS', 40)),
+        'min_lebar':    int(os.getenv('PREPROCESS_MIN_LEBAR', 800)),
     },
-    {
-      "nama": "REALISASI",
-      "posisi": "kanan",
-      "baris": [
-        {"no": 1, "ekor": 30, "kg": 80.0}
-      ],
-      "tertulis_total_ekor": 175,
-      "tertulis_bruto_kg": 471.0,
-      "tertulis_terra_kg": 102.0,
-      "tertulis_netto_kg": 369.0
-    }
-  ],
-  "ringkasan_atas": {
-    "tertulis_realisasi_ekor": 475,
-    "tertulis_realisasi_kg": 1008.5,
-    "tertulis_rata_rata": 2.12
-  }
-}
-
-════════════════════════════════════════
-ATURAN WAJIB
-════════════════════════════════════════
-1. "baris" hanya diisi baris yang ADA ANGKANYA (ada nilai di Ekor atau Kg). Baris kosong → ABAIKAN.
-2. Jika kolom ekor/kg suatu baris hanya terisi salah satu → yang kosong = 0.
-3. "tertulis_bruto_kg" dan "tertulis_terra_kg":
-   - Jika di dokumen ADA ANGKA di baris Bruto/Terra → isi dengan angkanya
-   - Jika di dokumen TIDAK ADA angka (kosong/tidak ada baris itu) → isi dengan null
-4. "tertulis_netto_kg" → SELALU baca dari baris Netto yang tertulis di dokumen.
-5. "tertulis_total_ekor" → baca dari baris Ekor di bawah tabel.
-6. Semua nilai "tertulis_*" diambil PERSIS dari tulisan di dokumen, bukan hasil hitungan.
-7. Jika ada lebih dari 2 kelompok di tabel, masukkan semuanya.
-8. Nilai desimal dengan koma (misal 2,17) → ubah ke titik (2.17) dalam JSON.
-9. Setelah selesai membaca, tinjau kembali setiap angka yang mengandung digit 4 atau 9.
-   Pastikan sudah sesuai dengan panduan di atas sebelum mengembalikan JSON.
-"""
-
-
-# ══════════════════════════════════════════════════════════════════
-# PROMPT RETRY — digunakan saat pass pertama gagal validasi
-# ══════════════════════════════════════════════════════════════════
-def buat_retry_prompt(checks_gagal: list, raw_data_lama: dict) -> str:
-    """
-    Buat prompt retry yang memberi tahu Gemini di mana tepatnya kemungkinan
-    kesalahan baca terjadi, berdasarkan hasil validasi pass pertama.
-    """
-    info_gagal = []
-    for c in checks_gagal:
-        info_gagal.append(
-            f"  - {c['label']}: hasil hitungan = {c['hitung']} {c['satuan']}, "
-            f"tertulis di dokumen = {c['tertulis']} {c['satuan']}, "
-            f"selisih = {c['selisih']:+.3g} {c['satuan']}"
-        )
-    gagal_str = '\n'.join(info_gagal)
-
-    return f"""
-Kamu adalah sistem OCR khusus untuk dokumen Delivery Order (DO) ternak milik DMC.
-
-PERHATIAN: Ini adalah PEMBACAAN ULANG karena ada ketidaksesuaian pada pembacaan sebelumnya.
-
-Pada pembacaan sebelumnya ditemukan perbedaan berikut:
-{gagal_str}
-
-Perbedaan ini kemungkinan besar disebabkan oleh kesalahan baca satu atau beberapa digit,
-terutama pasangan yang sering mirip dalam tulisan tangan:
-  → 4 vs 9  (paling sering salah!)
-  → 6 vs 0
-  → 1 vs 7
-  → 3 vs 8
-
-Cara membedakan 4 vs 9:
-  → 4: bagian atas TERBUKA, bawah LURUS (tidak ada ekor melengkung).
-  → 9: bagian atas LINGKARAN TERTUTUP, bawah ada EKOR yang menggantung.
-
-TUGASMU: Baca ulang dokumen ini dengan sangat teliti.
-Fokus khusus pada digit yang ada di baris-baris tabel rincian.
-Tandai baris yang kamu RAGU dengan menambahkan "ragu": true.
-
-Kembalikan HANYA JSON murni dengan format yang SAMA persis seperti sebelumnya:
-{EXTRACTION_PROMPT.split('FORMAT JSON')[1].split('ATURAN WAJIB')[0].strip()}
-"""
-
-
-# ══════════════════════════════════════════════════════════════════
-# PREPROCESSING GAMBAR — tingkatkan kualitas sebelum dikirim ke Gemini
-# ══════════════════════════════════════════════════════════════════
-def preprocess_image(image_bytes: bytes) -> bytes:
-    """
-    Preprocess gambar untuk Gemini.
-    Railway-safe: hanya DOWNSCALE (tidak upscale), JPEG quality rendah,
-    agar payload kecil dan pemrosesan cepat.
-    """
-    img = Image.open(io.BytesIO(image_bytes))
-
-    # Konversi ke RGB
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-
-    # Downscale saja jika lebih besar dari 1600px — JANGAN upscale
-    # (upscale hanya memperbesar file tanpa menambah informasi)
-    MAX_WIDTH = 1600
-    w, h = img.size
-    if w > MAX_WIDTH:
-        scale = MAX_WIDTH / w
-        img = img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
-
-    # Enhance ringan — hindari operasi berat
-    img = ImageEnhance.Contrast(img).enhance(1.5)
-    img = ImageEnhance.Sharpness(img).enhance(1.8)
-
-    # Quality 80 — cukup untuk OCR, jauh lebih kecil dari 95
-    buf = io.BytesIO()
-    img.save(buf, format='JPEG', quality=80, optimize=True)
-    return buf.getvalue()
+    sidik = MIRIP_MODE != 'mati',
+)
+# Foto dikecilkan, di-enhance & di-encode di browser (Web Worker) sebelum upload;
+# upload bertanda VERSI_KLIEN tidak di-resize / di-enhance ulang (lihat image_proc)
+PRAPROSES_KLIEN = os.getenv('PRAPROSES_KLIEN', '1') != '0'
+
+# State bersama antar worker gunicorn (bersama.py): kuota Gemini, cache OCR,
+# sesi gambar & sesi validasi. Kosong = per worker (hanya benar dengan --workers 1)
+bersama = buat_bersama(
+    os.getenv('STATE_BERSAMA', ''),
+    prefiks = os.getenv('STATE_BERSAMA_PREFIKS', 'do-checker:'),
+)
+
+# Semua panggilan Gemini lewat penjadwal kuota (15 rpm / 1500 per hari)
+kuota_gemini = KuotaGemini(
+    rpm        = int(os.getenv('GEMINI_RPM', 15)),
+    rpd        = int(os.getenv('GEMINI_RPD', 1500)),
+    path       = os.getenv('KUOTA_PATH', '.cache/kuota.sqlite3') or None,
+    tz         = os.getenv('KUOTA_TZ', 'America/Los_Angeles'),
+    max_tunggu = float(os.getenv('KUOTA_MAX_TUNGGU_DETIK', 90)),
+    bersama    = bersama,
+)
+
+# Panggilan Gemini dijalankan di thread pool native agar tidak memblokir worker gevent
+gemini_executor = GeminiExecutor(
+    max_paralel = int(os.getenv('GEMINI_MAX_PARALEL', 4)),
+    kuota       = kuota_gemini,
+    catat       = catat_tahap,
+)
+
+# Hedging OCR (opt-in): panggilan yang belum menjawab setelah persentil ke-p
+# latensi terbaru → kirim permintaan cadangan; jawaban pertama yang lolos
+# validasi menang. Cadangan hanya dikirim jika kuota per menit masih longgar.
+OCR_LINDUNG                = os.getenv('OCR_LINDUNG', '0') == '1'
+OCR_LINDUNG_PERSENTIL      = float(os.getenv('OCR_LINDUNG_PERSENTIL', 90))
+OCR_LINDUNG_TUNDA          = float(os.getenv('OCR_LINDUNG_TUNDA_DETIK', 10))   # sebelum sampel latensi cukup
+OCR_LINDUNG_TUNDA_MIN      = float(os.getenv('OCR_LINDUNG_TUNDA_MIN_DETIK', 2))
+OCR_LINDUNG_VARIAN         = os.getenv('OCR_LINDUNG_VARIAN', 'sama')          # 'sama' | 'kontras'
+OCR_LINDUNG_CADANGAN_TOKEN = float(os.getenv('OCR_LINDUNG_CADANGAN_TOKEN', 1))
+
+# Gauge dibaca saat /metrics di-scrape: cache, sesi gambar, kuota, antrian
+metrik.daftar('ocr_cache', 'gauge', 'Statistik cache OCR')
+metrik.daftar('image_store', 'gauge', 'Statistik sesi gambar')
+metrik.daftar('kuota', 'gauge', 'Status kuota Gemini')
+metrik.daftar('gemini_executor', 'gauge', 'Panggilan Gemini aktif / menunggu')
+metrik.daftar('anggaran_memori', 'gauge', 'Anggaran memori preprocess')
+metrik.daftar('potong_tabel_total', 'counter', 'Hasil deteksi area tabel (dipotong / utuh)')
+metrik.daftar('gemini_pemanasan_detik', 'gauge', 'Durasi pemanasan koneksi Gemini saat worker start')
+metrik.daftar('koreksi_lokal_total', 'counter', 'Validasi gagal: ada / tidak ada saran koreksi digit lokal')
+metrik.daftar('ocr_lindung_total', 'counter', 'OCR dengan hedging: cadangan terkirim / ditahan kuota / gagal disiapkan, pemenang')
+metrik.daftar('ocr_lindung_tunda_detik', 'gauge', 'Tunda sebelum permintaan cadangan dikirim')
+metrik.daftar('riwayat', 'gauge', 'Riwayat DO: tersimpan / antrian / dibuang / gagal tulis')
+metrik.daftar('mirip_total', 'counter', 'Cache miss: foto baru / sama (dipakai ulang atau tidak)')
+metrik.daftar('indeks_mirip', 'gauge', 'Jumlah entri indeks foto mirip')
+metrik.daftar('sesi_validasi', 'gauge', 'Jumlah sesi validasi (patch koreksi manual) aktif')
+metrik.daftar('praproses_klien_total', 'counter', 'Upload praproses browser: utuh / dienkode ulang / ditolak')
+metrik.daftar('respons_kompresi_total', 'counter', 'Respons yang dikompresi, per encoding (br / gzip)')
+metrik.daftar('state_bersama', 'gauge', 'Operasi state bersama di worker ini: total / konflik (diulang) / gagal')
+
+
+@metrik.kolektor
+def _kumpulkan_gauge(reg):
+    for k, v in ocr_cache.stats().items():
+        reg.set('ocr_cache', v, statistik=k)
+    for k, v in image_store.stats().items():
+        reg.set('image_store', v, statistik=k)
+    try:
+        # State bersama mati → gauge kuota dilewati, sisanya (termasuk state_bersama gagal) tetap ada
+        for k, v in kuota_gemini.status().items():
+            if isinstance(v, (int, float)):
+                reg.set('kuota', v, statistik=k)
+    except BersamaGagal:
+        pass
+    for k, v in gemini_executor.stats().items():
+        reg.set('gemini_executor', v, statistik=k)
+    for k, v in preprocess_pool.anggaran.stats().items():
+        reg.set('anggaran_memori', v, statistik=k)
+    if OCR_LINDUNG:
+        reg.set('ocr_lindung_tunda_detik', tunda_lindung())
+    if riwayat is not None:
+        for k, v in riwayat.stats().items():
+            reg.set('riwayat', v, statistik=k)
+    if indeks_mirip is not None:
+        for k, v in indeks_mirip.stats().items():
+            reg.set('indeks_mirip', v, statistik=k)
+    for k, v in sesi_validasi.stats().items():
+        reg.set('sesi_validasi', v, statistik=k)
+    if bersama is not None:
+        for k, v in bersama.stats().items():
+            reg.set('state_bersama', v, statistik=k, backend=bersama.nama)
+    pemanasan = registri_model.stats()['pemanasan']
+    if pemanasan:
+        reg.set('gemini_pemanasan_detik', pemanasan['detik'], ok=int(pemanasan['ok']))
+
+
+# Cache hasil OCR: upload ulang foto yang sama tidak memakan kuota Gemini
+OCR_CACHE_VERSI = versi_prompt(OCR_MODEL, f'{PROMPT_OCR.sistem}\0{PROMPT_OCR.tugas}')
+ocr_cache = OcrCache(
+    path     = os.getenv('OCR_CACHE_PATH', '.cache/ocr_cache.sqlite3') or None,
+    max_mem  = int(os.getenv('OCR_CACHE_MAX_MEMORI', 256)),
+    max_disk = int(os.getenv('OCR_CACHE_MAX_DISK', 5000)),
+    ttl      = float(os.getenv('OCR_CACHE_TTL_DETIK', 7 * 24 * 3600)),
+    bersama  = bersama,
+)
+
+# Cache OCR hanya kena untuk byte identik; foto ulang (sudut/cahaya beda) dicari
+# lewat phash + sidik sel tabel, hasilnya menunjuk ke kunci ocr_cache lama
+indeks_mirip = IndeksMirip(
+    path          = os.getenv('MIRIP_PATH', '.cache/mirip.sqlite3') or None,
+    maks_sel      = float(os.getenv('MIRIP_SEL_MAKS', 0.1)),
+    maks_kandidat = int(os.getenv('MIRIP_MAKS_KANDIDAT', 2000)),
+    max_entri     = int(os.getenv('MIRIP_MAX_ENTRI', 500000)),
+) if MIRIP_MODE != 'mati' else None
+
+# Sesi gambar: /api/retry cukup menerima token, bukan base64 gambar
+image_store = ImageStore(
+    disk_dir       = os.getenv('IMAGE_STORE_DIR', '.cache/images') or None,
+    ttl            = float(os.getenv('IMAGE_STORE_TTL_DETIK', 30 * 60)),
+    max_mem_bytes  = int(os.getenv('IMAGE_STORE_MAX_MEMORI_MB', 64)) * 1024 * 1024,
+    max_disk_bytes = int(os.getenv('IMAGE_STORE_MAX_DISK_MB', 512)) * 1024 * 1024,
+    bersama        = bersama,
+)
+
+
+# Riwayat DO tervalidasi (SQLite WAL, tulis di-batch di luar jalur request);
+# kosongkan RIWAYAT_PATH untuk mematikan
+RIWAYAT_PATH = os.getenv('RIWAYAT_PATH', '.cache/riwayat.sqlite3')
+RIWAYAT_TZ   = zona_waktu(os.getenv('RIWAYAT_TZ', 'Asia/Jakarta'))
+riwayat = RiwayatDO(
+    path         = RIWAYAT_PATH,
+    ukuran_batch = int(os.getenv('RIWAYAT_BATCH', 100)),
+    interval     = float(os.getenv('RIWAYAT_INTERVAL_DETIK', 1)),
+    max_antrian  = int(os.getenv('RIWAYAT_MAX_ANTRIAN', 10000)),
+) if RIWAYAT_PATH else None
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -236,35 +262,22 @@ def fmt(n) -> str:
     return f'{f:g}'
 
 
+# Koreksi digit lokal (koreksi.py) saat validasi gagal — tanpa panggilan Gemini
+KOREKSI_LOKAL      = os.getenv('KOREKSI_LOKAL', '1') != '0'
+KOREKSI_MAKS_UBAH  = int(os.getenv('KOREKSI_MAKS_UBAH', 3))
+KOREKSI_MAKS_SARAN = int(os.getenv('KOREKSI_MAKS_SARAN', 3))
+
+
 def buat_check(id_check: str, label: str, kategori: str,
                nilai_list: list, formula_extra: str,
                hitung: float, tertulis: float, satuan: str) -> dict:
     """
-    Buat satu objek check lengkap.
+    Buat satu objek check (tanpa teks penjelasan — lihat rinci_check).
     formula_extra: string tambahan untuk menjelaskan langkah turunan (misal Netto = Bruto - Terra)
     """
-    TOLERANSI = 0.15
     selisih   = round(hitung - tertulis, 4)
     ok        = abs(selisih) < TOLERANSI
 
-    # Bangun rincian penjumlahan
-    if nilai_list:
-        str_addend = ' + '.join(fmt(v) for v in nilai_list)
-        rincian_sum = f'{str_addend} = {fmt(hitung)} {satuan}'
-    else:
-        rincian_sum = ''
-
-    # Gabung formula_extra (misal "= Bruto - Terra = 809.5 - 170 = 639.5 kg")
-    rincian_full = rincian_sum
-    if formula_extra:
-        rincian_full = formula_extra if not rincian_sum else rincian_sum + '\n' + formula_extra
-
-    kesimpulan = (
-        f'Hasil hitungan {fmt(hitung)} {satuan} '
-        f'{"SAMA" if ok else "TIDAK SAMA"} dengan yang tertulis {fmt(tertulis)} {satuan}.'
-        + ('' if ok else f' Selisih: {selisih:+.3g} {satuan}.')
-    )
-
     return {
         'id': id_check,
         'label': label,
@@ -276,11 +289,61 @@ def buat_check(id_check: str, label: str, kategori: str,
         'selisih': float(selisih),
         'ok': ok,
         'satuan': satuan,
-        'rincian': rincian_full,
-        'kesimpulan': kesimpulan,
     }
 
 
+def rinci_check(c: dict) -> dict:
+    """
+    Check + teks 'rincian' & 'kesimpulan'. Dibangun hanya saat dibutuhkan
+    (respons lengkap / /api/validate/rincian) — koreksi digit, retry, sesi
+    validasi & riwayat cukup memakai angkanya.
+    """
+    hitung, tertulis, satuan = c['hitung'], c['tertulis'], c['satuan']
+
+    # Bangun rincian penjumlahan
+    if c['nilai_list']:
+        str_addend = ' + '.join(fmt(v) for v in c['nilai_list'])
+        rincian_sum = f'{str_addend} = {fmt(hitung)} {satuan}'
+    else:
+        rincian_sum = ''
+
+    # Gabung formula_extra (misal "= Bruto - Terra = 809.5 - 170 = 639.5 kg")
+    rincian_full = rincian_sum
+    if c['formula_extra']:
+        rincian_full = c['formula_extra'] if not rincian_sum else rincian_sum + '\n' + c['formula_extra']
+
+    kesimpulan = (
+        f'Hasil hitungan {fmt(hitung)} {satuan} '
+        f'{"SAMA" if c["ok"] else "TIDAK SAMA"} dengan yang tertulis {fmt(tertulis)} {satuan}.'
+        + ('' if c['ok'] else f' Selisih: {c["selisih"]:+.3g} {satuan}.')
+    )
+    return {**c, 'rincian': rincian_full, 'kesimpulan': kesimpulan}
+
+
+# Mode respons ringkas: check tanpa nilai_list / formula_extra / rincian /
+# kesimpulan (diambil per check lewat /api/validate/rincian saat kartunya dibuka)
+FIELD_CHECK_RINGKAS = ('id', 'label', 'kategori', 'hitung', 'tertulis', 'selisih', 'ok', 'satuan')
+
+
+def ringkas_check(c: dict) -> dict:
+    return {k: c[k] for k in FIELD_CHECK_RINGKAS}
+
+
+def bentuk_checks(checks: list, ringkas: bool) -> list:
+    return [ringkas_check(c) if ringkas else rinci_check(c) for c in checks]
+
+
+def bentuk_hasil(result: dict, ringkas: bool) -> dict:
+    """
+    Hasil validate_do untuk dikirim ke klien. Ringkas: check ringkas & tanpa
+    gema kelompok / ringkasan_atas (klien sudah memegang raw_data yang dikirimnya).
+    """
+    hasil = {**result, 'checks': bentuk_checks(result['checks'], ringkas)}
+    if ringkas:
+        del hasil['kelompok'], hasil['ringkasan_atas']
+    return hasil
+
+
 # ══════════════════════════════════════════════════════════════════
 # HELPER SAFE — semua operasi None-safe
 # ══════════════════════════════════════════════════════════════════
@@ -319,164 +382,114 @@ def grp_pakai_bruto_terra(grp: dict) -> bool:
 # ══════════════════════════════════════════════════════════════════
 # VALIDASI UTAMA
 # ══════════════════════════════════════════════════════════════════
-def validate_do(data: dict, bandul: float | None = None) -> dict:
-    """
-    Validasi semua nilai total di dokumen DO.
-
-    ═══════════════════════════════════════════════════════════════
-    LOGIKA PER KELOMPOK (PESANAN, REALISASI, dst):
-
-    Deteksi mode per-kelompok:
-      → Jika tertulis_bruto_kg DAN tertulis_terra_kg keduanya
-        memiliki nilai angka nyata (bukan null/0) → MODE BRUTO/TERRA
-      → Jika tidak → MODE LANGSUNG (Σ kg = Netto)
-
-    [1] Baris EKOR
-        hitung  = Σ kolom Ekor semua baris rincian
-        cek vs  tertulis_total_ekor
-
-    MODE LANGSUNG:
-    [2] Baris NETTO
-        hitung  = Σ kolom Kg semua baris rincian
-        cek vs  tertulis_netto_kg
-
-    MODE BRUTO/TERRA:
-    [2] Baris BRUTO
-        hitung  = Σ kolom Kg semua baris rincian
-        cek vs  tertulis_bruto_kg
-
-    [3] Baris TERRA
-        hitung  = nilai_bandul × jumlah_baris_terisi
-        cek vs  tertulis_terra_kg
-
-    [4] Baris NETTO
-        hitung  = hitung_bruto − hitung_terra
-        cek vs  tertulis_netto_kg
-
-    ═══════════════════════════════════════════════════════════════
-    SETELAH SEMUA KELOMPOK:
+def checks_grup(grp: dict, bandul: float | None = None) -> list:
+    """Check [1]–[4] untuk SATU kelompok (lihat validate_do)."""
+    checks = []
+    nama   = grp.get('nama', 'KELOMPOK')
+    posisi = grp.get('posisi', '')
+    baris  = grp.get('baris', [])
+
+    # Hanya baris yang ada isinya (safe: handle key tidak ada)
+    baris_terisi = [
+        r for r in baris
+        if safe_float(r.get('ekor')) != 0 or safe_float(r.get('kg')) != 0
+    ]
+    ekor_list = [safe_float(r.get('ekor')) for r in baris_terisi]
+    kg_list   = [safe_float(r.get('kg'))   for r in baris_terisi]
+    n_baris   = len(baris_terisi)
+
+    hitung_ekor  = sum(ekor_list)
+    hitung_bruto = round(sum(kg_list), 2)
+
+    # Semua tertulis di-safe_float agar tidak ada None di operasi
+    tertulis_ekor  = safe_float(grp.get('tertulis_total_ekor'))
+    tertulis_bruto = safe_float(grp.get('tertulis_bruto_kg'))
+    tertulis_terra = safe_float(grp.get('tertulis_terra_kg'))
+    tertulis_netto = safe_float(grp.get('tertulis_netto_kg'))
+
+    # Deteksi mode untuk kelompok ini
+    mode_bt = grp_pakai_bruto_terra(grp)
+
+    # ── [1] CEK EKOR ──────────────────────────────────────────
+    checks.append(buat_check(
+        id_check      = f'ekor_{nama.lower()}',
+        label         = f'Baris EKOR — {nama} ({posisi})',
+        kategori      = 'Baris Ekor',
+        nilai_list    = ekor_list,
+        formula_extra = '',
+        hitung        = hitung_ekor,
+        tertulis      = tertulis_ekor,
+        satuan        = 'ekor',
+    ))
 
-    [5] Realisasi EKOR (ringkasan atas)
-        hitung  = Σ tertulis_total_ekor dari semua kelompok
-        cek vs  ringkasan_atas.tertulis_realisasi_ekor
+    if not mode_bt:
+        # ── [2] MODE LANGSUNG: Σ Kg = Netto ───────────────────
+        checks.append(buat_check(
+            id_check      = f'netto_{nama.lower()}',
+            label         = f'Baris NETTO — {nama} ({posisi})',
+            kategori      = 'Baris Netto',
+            nilai_list    = kg_list,
+            formula_extra = '',
+            hitung        = hitung_bruto,
+            tertulis      = tertulis_netto,
+            satuan        = 'kg',
+        ))
 
-    [6] Realisasi KG (ringkasan atas)
-        hitung  = Σ tertulis_netto_kg dari semua kelompok
-        cek vs  ringkasan_atas.tertulis_realisasi_kg
+    else:
+        # ── MODE BRUTO/TERRA ───────────────────────────────────
+        bandul_val   = safe_float(bandul)
+        hitung_terra = round(bandul_val * n_baris, 2)
+        hitung_netto = round(hitung_bruto - hitung_terra, 2)
 
-    [7] RATA-RATA
-        hitung  = tertulis_realisasi_kg ÷ tertulis_realisasi_ekor
-        cek vs  ringkasan_atas.tertulis_rata_rata
-    ═══════════════════════════════════════════════════════════════
-    """
-    kelompok_list  = data['kelompok']
-    ringkasan_atas = data.get('ringkasan_atas', {})
-    checks         = []
+        # ── [2] CEK BRUTO ──
+        checks.append(buat_check(
+            id_check      = f'bruto_{nama.lower()}',
+            label         = f'Baris BRUTO — {nama} ({posisi})',
+            kategori      = 'Baris Bruto',
+            nilai_list    = kg_list,
+            formula_extra = '',
+            hitung        = hitung_bruto,
+            tertulis      = tertulis_bruto,
+            satuan        = 'kg',
+        ))
 
-    # Flag global: apakah ADA kelompok yang pakai Bruto/Terra
-    ada_bruto_terra_global = any(grp_pakai_bruto_terra(g) for g in kelompok_list)
+        # ── [3] CEK TERRA ──
+        terra_formula = (
+            f'Terra = Nilai Bandul × Jumlah Baris Terisi\n'
+            f'Terra = {fmt(bandul_val)} × {n_baris} = {fmt(hitung_terra)} kg'
+        )
+        checks.append(buat_check(
+            id_check      = f'terra_{nama.lower()}',
+            label         = f'Baris TERRA — {nama} ({posisi})',
+            kategori      = 'Baris Terra',
+            nilai_list    = [],
+            formula_extra = terra_formula,
+            hitung        = hitung_terra,
+            tertulis      = tertulis_terra,
+            satuan        = 'kg',
+        ))
 
-    # ── Per kelompok ──────────────────────────────────────────────
-    for grp in kelompok_list:
-        nama   = grp.get('nama', 'KELOMPOK')
-        posisi = grp.get('posisi', '')
-        baris  = grp.get('baris', [])
-
-        # Hanya baris yang ada isinya (safe: handle key tidak ada)
-        baris_terisi = [
-            r for r in baris
-            if safe_float(r.get('ekor')) != 0 or safe_float(r.get('kg')) != 0
-        ]
-        ekor_list = [safe_float(r.get('ekor')) for r in baris_terisi]
-        kg_list   = [safe_float(r.get('kg'))   for r in baris_terisi]
-        n_baris   = len(baris_terisi)
-
-        hitung_ekor  = sum(ekor_list)
-        hitung_bruto = round(sum(kg_list), 2)
-
-        # Semua tertulis di-safe_float agar tidak ada None di operasi
-        tertulis_ekor  = safe_float(grp.get('tertulis_total_ekor'))
-        tertulis_bruto = safe_float(grp.get('tertulis_bruto_kg'))
-        tertulis_terra = safe_float(grp.get('tertulis_terra_kg'))
-        tertulis_netto = safe_float(grp.get('tertulis_netto_kg'))
-
-        # Deteksi mode untuk kelompok ini
-        mode_bt = grp_pakai_bruto_terra(grp)
-
-        # ── [1] CEK EKOR ──────────────────────────────────────────
+        # ── [4] CEK NETTO = Bruto − Terra ──
+        netto_formula = (
+            f'Netto = Bruto − Terra\n'
+            f'Netto = {fmt(hitung_bruto)} − {fmt(hitung_terra)} = {fmt(hitung_netto)} kg'
+        )
         checks.append(buat_check(
-            id_check      = f'ekor_{nama.lower()}',
-            label         = f'Baris EKOR — {nama} ({posisi})',
-            kategori      = 'Baris Ekor',
-            nilai_list    = ekor_list,
-            formula_extra = '',
-            hitung        = hitung_ekor,
-            tertulis      = tertulis_ekor,
-            satuan        = 'ekor',
+            id_check      = f'netto_{nama.lower()}',
+            label         = f'Baris NETTO — {nama} ({posisi})',
+            kategori      = 'Baris Netto',
+            nilai_list    = [],
+            formula_extra = netto_formula,
+            hitung        = hitung_netto,
+            tertulis      = tertulis_netto,
+            satuan        = 'kg',
         ))
+    return checks
 
-        if not mode_bt:
-            # ── [2] MODE LANGSUNG: Σ Kg = Netto ───────────────────
-            checks.append(buat_check(
-                id_check      = f'netto_{nama.lower()}',
-                label         = f'Baris NETTO — {nama} ({posisi})',
-                kategori      = 'Baris Netto',
-                nilai_list    = kg_list,
-                formula_extra = '',
-                hitung        = hitung_bruto,
-                tertulis      = tertulis_netto,
-                satuan        = 'kg',
-            ))
 
-        else:
-            # ── MODE BRUTO/TERRA ───────────────────────────────────
-            bandul_val   = safe_float(bandul)
-            hitung_terra = round(bandul_val * n_baris, 2)
-            hitung_netto = round(hitung_bruto - hitung_terra, 2)
-
-            # ── [2] CEK BRUTO ──
-            checks.append(buat_check(
-                id_check      = f'bruto_{nama.lower()}',
-                label         = f'Baris BRUTO — {nama} ({posisi})',
-                kategori      = 'Baris Bruto',
-                nilai_list    = kg_list,
-                formula_extra = '',
-                hitung        = hitung_bruto,
-                tertulis      = tertulis_bruto,
-                satuan        = 'kg',
-            ))
-
-            # ── [3] CEK TERRA ──
-            terra_formula = (
-                f'Terra = Nilai Bandul × Jumlah Baris Terisi\n'
-                f'Terra = {fmt(bandul_val)} × {n_baris} = {fmt(hitung_terra)} kg'
-            )
-            checks.append(buat_check(
-                id_check      = f'terra_{nama.lower()}',
-                label         = f'Baris TERRA — {nama} ({posisi})',
-                kategori      = 'Baris Terra',
-                nilai_list    = [],
-                formula_extra = terra_formula,
-                hitung        = hitung_terra,
-                tertulis      = tertulis_terra,
-                satuan        = 'kg',
-            ))
-
-            # ── [4] CEK NETTO = Bruto − Terra ──
-            netto_formula = (
-                f'Netto = Bruto − Terra\n'
-                f'Netto = {fmt(hitung_bruto)} − {fmt(hitung_terra)} = {fmt(hitung_netto)} kg'
-            )
-            checks.append(buat_check(
-                id_check      = f'netto_{nama.lower()}',
-                label         = f'Baris NETTO — {nama} ({posisi})',
-                kategori      = 'Baris Netto',
-                nilai_list    = [],
-                formula_extra = netto_formula,
-                hitung        = hitung_netto,
-                tertulis      = tertulis_netto,
-                satuan        = 'kg',
-            ))
+def checks_ringkasan(kelompok_list: list, ringkasan_atas: dict) -> list:
+    """Check [5]–[7] ringkasan atas; hanya membaca nilai tertulis tiap kelompok (lihat validate_do)."""
+    checks = []
 
     # ── [5] Realisasi EKOR ────────────────────────────────────────
     semua_ekor         = [safe_float(grp.get('tertulis_total_ekor')) for grp in kelompok_list]
@@ -532,6 +545,70 @@ def validate_do(data: dict, bandul: float | None = None) -> dict:
         tertulis      = tertulis_rata,
         satuan        = 'kg/ekor',
     ))
+    return checks
+
+
+def validate_do(data: dict, bandul: float | None = None, rinci: bool = True) -> dict:
+    """
+    Validasi semua nilai total di dokumen DO.
+    rinci=False → check tanpa teks rincian/kesimpulan (lihat rinci_check).
+
+    ═══════════════════════════════════════════════════════════════
+    LOGIKA PER KELOMPOK (PESANAN, REALISASI, dst):
+
+    Deteksi mode per-kelompok:
+      → Jika tertulis_bruto_kg DAN tertulis_terra_kg keduanya
+        memiliki nilai angka nyata (bukan null/0) → MODE BRUTO/TERRA
+      → Jika tidak → MODE LANGSUNG (Σ kg = Netto)
+
+    [1] Baris EKOR
+        hitung  = Σ kolom Ekor semua baris rincian
+        cek vs  tertulis_total_ekor
+
+    MODE LANGSUNG:
+    [2] Baris NETTO
+        hitung  = Σ kolom Kg semua baris rincian
+        cek vs  tertulis_netto_kg
+
+    MODE BRUTO/TERRA:
+    [2] Baris BRUTO
+        hitung  = Σ kolom Kg semua baris rincian
+        cek vs  tertulis_bruto_kg
+
+    [3] Baris TERRA
+        hitung  = nilai_bandul × jumlah_baris_terisi
+        cek vs  tertulis_terra_kg
+
+    [4] Baris NETTO
+        hitung  = hitung_bruto − hitung_terra
+        cek vs  tertulis_netto_kg
+
+    ═══════════════════════════════════════════════════════════════
+    SETELAH SEMUA KELOMPOK:
+
+    [5] Realisasi EKOR (ringkasan atas)
+        hitung  = Σ tertulis_total_ekor dari semua kelompok
+        cek vs  ringkasan_atas.tertulis_realisasi_ekor
+
+    [6] Realisasi KG (ringkasan atas)
+        hitung  = Σ tertulis_netto_kg dari semua kelompok
+        cek vs  ringkasan_atas.tertulis_realisasi_kg
+
+    [7] RATA-RATA
+        hitung  = tertulis_realisasi_kg ÷ tertulis_realisasi_ekor
+        cek vs  ringkasan_atas.tertulis_rata_rata
+    ═══════════════════════════════════════════════════════════════
+    """
+    kelompok_list  = data['kelompok']
+    ringkasan_atas = data.get('ringkasan_atas', {})
+
+    # Flag global: apakah ADA kelompok yang pakai Bruto/Terra
+    ada_bruto_terra_global = any(grp_pakai_bruto_terra(g) for g in kelompok_list)
+
+    checks = [c for grp in kelompok_list for c in checks_grup(grp, bandul)]
+    checks += checks_ringkasan(kelompok_list, ringkasan_atas)
+    if rinci:
+        checks = [rinci_check(c) for c in checks]
 
     semua_benar  = all(c['ok'] for c in checks)
     jumlah_salah = sum(1 for c in checks if not c['ok'])
@@ -547,12 +624,499 @@ def validate_do(data: dict, bandul: float | None = None) -> dict:
     }
 
 
+# Sesi validasi: koreksi manual berikutnya dikirim sebagai patch, hanya kelompok
+# yang tersentuh + ringkasan atas yang dihitung ulang (lihat sesi_validasi.py)
+sesi_validasi = SesiValidasi(
+    checks_grup, checks_ringkasan, grp_pakai_bruto_terra,
+    ttl      = float(os.getenv('SESI_VALIDASI_TTL_DETIK', 30 * 60)),
+    max_sesi = int(os.getenv('SESI_VALIDASI_MAX', 1000)),
+    bersama  = bersama,
+)
+
+
+# ══════════════════════════════════════════════════════════════════
+# OCR — dipakai bersama oleh /api/extract dan /api/extract_batch
+# ══════════════════════════════════════════════════════════════════
+def cari_baris_ragu(raw_data: dict) -> list:
+    """Daftar baris yang ditandai "ragu": true oleh Gemini."""
+    return [
+        {'kelompok': grp.get('nama',''), 'posisi': grp.get('posisi',''),
+         'no': r.get('no'), 'ekor': r.get('ekor'), 'kg': r.get('kg')}
+        for grp in raw_data.get('kelompok', [])
+        for r   in grp.get('baris', [])
+        if r.get('ragu')
+    ]
+
+
+def cari_duplikat(sidik: dict | None) -> tuple[dict | None, dict | None]:
+    """
+    Cari foto lama yang mirip (indeks_mirip) untuk gambar yang tidak kena cache.
+    Return: (raw_data lama jika boleh dipakai ulang, info duplikat untuk respons)
+    """
+    if indeks_mirip is None or sidik is None:
+        return None, None
+    with tahap('mirip'):
+        cocok = indeks_mirip.cari(sidik)
+    if cocok is None:
+        metrik.inc('mirip_total', hasil='baru', dipakai='0')
+        return None, None
+
+    raw_data = None
+    if cocok['status'] == 'sama' and MIRIP_MODE == 'pakai':
+        raw_data = ocr_cache.get(cocok['kunci'])   # None jika sudah kedaluwarsa
+    metrik.inc('mirip_total', hasil=cocok['status'], dipakai=str(int(raw_data is not None)))
+    return raw_data, {
+        'status':        cocok['status'],
+        'jarak':         cocok['jarak'],
+        'jarak_sel':     None if cocok['jarak_sel'] is None else round(cocok['jarak_sel'], 3),
+        'waktu':         datetime.fromtimestamp(cocok['waktu'], RIWAYAT_TZ).isoformat(timespec='seconds'),
+        'dipakai_ulang': raw_data is not None,
+    }
+
+
+def ocr_gambar(processed_bytes: bytes, sidik: dict | None = None) -> tuple[dict, bool, dict | None]:
+    """
+    OCR satu gambar hasil preprocess_image.
+    Foto yang sama (setelah preprocess) → pakai hasil OCR sebelumnya dari cache.
+    Foto ulang DO yang sama (sidik cocok, lihat cari_duplikat) → hasil lama
+    dipakai ulang (MIRIP_MODE=pakai) atau hanya ditandai.
+    Return: (raw_data, cache_hit, duplikat)
+    """
+    kunci_cache = buat_kunci(processed_bytes, OCR_CACHE_VERSI)
+    raw_data    = ocr_cache.get(kunci_cache)
+    if raw_data is not None:
+        return raw_data, True, None
+    raw_data, duplikat = cari_duplikat(sidik)
+    if raw_data is not None:
+        return raw_data, True, duplikat
+
+    model    = model_ocr()
+    img_b64  = base64.b64encode(processed_bytes).decode()
+    img_part = {'inline_data': {'mime_type': mime_gambar(processed_bytes), 'data': img_b64}}
+
+    if OCR_LINDUNG:
+        with tahap('gemini'):
+            response, raw_data, info = gemini_executor.generate_lindung(
+                model, [img_part, PROMPT_OCR.tugas], terima=terima_ocr, timeout=GEMINI_TIMEOUT,
+                tunda=tunda_lindung(), konten_lindung=lambda: konten_lindung(processed_bytes),
+                cadangan_token=OCR_LINDUNG_CADANGAN_TOKEN,
+            )
+        metrik.inc('ocr_lindung_total', lindung=info['lindung'], pemenang=info['pemenang'])
+        catat_token('ekstrak', PROMPT_OCR.versi, response)
+    else:
+        with tahap('gemini'):
+            response = gemini_executor.generate(
+                model, [img_part, PROMPT_OCR.tugas], timeout=GEMINI_TIMEOUT,
+            )
+        catat_token('ekstrak', PROMPT_OCR.versi, response)
+        with tahap('parse'):
+            raw_data = extract_json(response.text)
+    ocr_cache.put(kunci_cache, raw_data)
+    if indeks_mirip is not None and sidik is not None:
+        indeks_mirip.tambah(sidik, kunci_cache)
+    return raw_data, False, duplikat
+
+
+def ocr_gambar_stream(processed_bytes: bytes, sidik: dict | None = None):
+    """
+    Versi streaming ocr_gambar: generator event
+      ('kelompok', indeks, grp)     — setiap kelompok SEGERA setelah lengkap
+      ('selesai', raw_data, cache_hit, duplikat)
+    Respons Gemini diurai bertahap (json_stream.PenguraiKelompok); dokumen utuh
+    tetap diurai ulang di akhir dengan extract_json, dan itu yang di-cache.
+    """
+    kunci_cache = buat_kunci(processed_bytes, OCR_CACHE_VERSI)
+    raw_data    = ocr_cache.get(kunci_cache)
+    duplikat    = None
+    if raw_data is None:
+        raw_data, duplikat = cari_duplikat(sidik)
+    if raw_data is not None:
+        for i, grp in enumerate(raw_data.get('kelompok', [])):
+            yield 'kelompok', i, grp
+        yield 'selesai', raw_data, True, duplikat
+        return
+
+    img_b64  = base64.b64encode(processed_bytes).decode()
+    img_part = {'inline_data': {'mime_type': mime_gambar(processed_bytes), 'data': img_b64}}
+    urai     = PenguraiKelompok()
+
+    t0 = time.perf_counter()
+    response, potongan = gemini_executor.generate_stream(
+        model_ocr(), [img_part, PROMPT_OCR.tugas], timeout=GEMINI_TIMEOUT,
+    )
+    for teks in potongan:
+        for i, grp in urai.tambah(teks):
+            if i == 0:
+                catat_tahap('kelompok_pertama', time.perf_counter() - t0)
+            yield 'kelompok', i, grp
+    catat_tahap('gemini', time.perf_counter() - t0)
+    catat_token('ekstrak', PROMPT_OCR.versi, response)
+
+    with tahap('parse'):
+        raw_data = extract_json(urai.teks)
+    # Elemen yang gagal diurai di tengah jalan (jarang) atau belum lengkap saat stream
+    # berakhir dikirim setelah dokumen utuh valid — masing-masing tepat di indeksnya
+    kelompok = raw_data.get('kelompok', [])
+    for i in urai.terlewat + list(range(urai.jumlah, len(kelompok))):
+        if i < len(kelompok):
+            yield 'kelompok', i, kelompok[i]
+    ocr_cache.put(kunci_cache, raw_data)
+    if indeks_mirip is not None and sidik is not None:
+        indeks_mirip.tambah(sidik, kunci_cache)
+    yield 'selesai', raw_data, False, duplikat
+
+
+def checks_kelompok(grp: dict) -> list:
+    """
+    Check milik SATU kelompok (Ekor, Netto / Bruto), bisa dihitung sebelum
+    kelompok lain dan ringkasan atas selesai dibaca. Terra & Netto kelompok
+    Bruto/Terra dilewati karena butuh bandul.
+    """
+    bt = grp_pakai_bruto_terra(grp)
+    return [rinci_check(c) for c in checks_grup(grp)
+            if not (bt and c['id'].split('_', 1)[0] in ('terra', 'netto'))]
+
+
+def lolos_tanpa_bandul(raw_data: dict) -> bool:
+    """
+    validate_do sebelum nilai bandul diketahui: check Terra & Netto kelompok
+    Bruto/Terra diabaikan (keduanya butuh bandul), check lain harus lolos.
+    """
+    abaikan = {
+        f'{jenis}_{grp.get("nama", "KELOMPOK").lower()}'
+        for grp in raw_data.get('kelompok', []) if grp_pakai_bruto_terra(grp)
+        for jenis in ('terra', 'netto')
+    }
+    return all(c['ok'] for c in validate_do(raw_data, rinci=False)['checks'] if c['id'] not in abaikan)
+
+
+def terima_ocr(response) -> tuple[dict, bool]:
+    """Penilai jawaban untuk hedging: (raw_data, lolos validasi). Raise jika tidak terbaca."""
+    with tahap('parse'):
+        raw_data = extract_json(response.text)
+    return raw_data, lolos_tanpa_bandul(raw_data)
+
+
+def tunda_lindung() -> float:
+    """Persentil latensi Gemini terbaru (default OCR_LINDUNG_TUNDA jika sampel belum cukup)."""
+    tunda = gemini_executor.latensi.persentil(OCR_LINDUNG_PERSENTIL) or OCR_LINDUNG_TUNDA
+    return min(max(tunda, OCR_LINDUNG_TUNDA_MIN), GEMINI_TIMEOUT)
+
+
+def konten_lindung(processed_bytes: bytes) -> list:
+    """Isi permintaan cadangan: gambar yang sama, atau varian kontras (OCR_LINDUNG_VARIAN)."""
+    if OCR_LINDUNG_VARIAN == 'kontras':
+        processed_bytes = preprocess_pool.jalankan(varian_lindung, processed_bytes)
+    img_b64 = base64.b64encode(processed_bytes).decode()
+    return [{'inline_data': {'mime_type': mime_gambar(processed_bytes), 'data': img_b64}}, PROMPT_OCR.tugas]
+
+
+def preprocess_upload(path_upload: str, klien: bool = False) -> tuple[bytes, dict | None]:
+    """
+    Preprocess file upload di process pool, lalu hapus file sementaranya.
+    Durasi decode/deteksi/resize/enhance/encode + waktu antri pool ikut dicatat.
+    klien = True → upload sudah dinormalisasi browser (lihat upload_klien).
+    Return: (processed_bytes, sidik gambar untuk indeks_mirip atau None)
+    """
+    try:
+        catat_payload('upload', os.path.getsize(path_upload))
+        t0 = time.perf_counter()
+        processed_bytes, waktu, info = preprocess_pool.preprocess_terukur(path_upload, klien)
+        total = time.perf_counter() - t0
+    finally:
+        hapus_upload_sementara(path_upload)
+
+    catat_tahap('antri_preprocess', max(0.0, total - sum(waktu.values())))
+    for nama, detik in waktu.items():
+        catat_tahap(nama, detik)
+    if preprocess_pool.potong_tabel:
+        metrik.inc('potong_tabel_total', hasil='dipotong' if info['dipotong'] else 'utuh')
+    if info.get('klien'):
+        metrik.inc('praproses_klien_total', hasil=info['klien'])
+    catat_payload('preprocess', len(processed_bytes))
+    return processed_bytes, info.get('sidik')
+
+
+def upload_klien() -> bool:
+    """Form `praproses` = VERSI_KLIEN → foto sudah dikecilkan & di-encode di browser."""
+    return PRAPROSES_KLIEN and request.form.get('praproses') == VERSI_KLIEN
+
+
+def simpan_upload_sementara(file) -> str:
+    """
+    Spool file upload ke file sementara di disk (per potongan 1 MB),
+    supaya bytes mentah s/d 16 MB tidak pernah dipegang utuh di memori.
+    Pemanggil wajib menghapus file-nya (hapus_upload_sementara).
+    """
+    ext = file.filename.rsplit('.', 1)[-1].lower()
+    fd, path = tempfile.mkstemp(prefix='do_upload_', suffix=f'.{ext}', dir=UPLOAD_TMP_DIR)
+    with os.fdopen(fd, 'wb') as out:
+        shutil.copyfileobj(file.stream, out, 1024 * 1024)
+    return path
+
+
+def hapus_upload_sementara(path: str | None):
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def proses_dokumen_batch(index: int, filename: str, path_upload: str, klien: bool = False) -> dict:
+    """
+    Pipeline lengkap satu dokumen di mode batch:
+    preprocess → OCR → (Format A) validasi otomatis.
+    Format B (Bruto/Terra) butuh nilai bandul → hanya dikembalikan raw_data-nya.
+    File upload sementara dihapus setelah preprocess.
+    """
+    t0 = time.perf_counter()
+    try:
+        processed_bytes, sidik        = preprocess_upload(path_upload, klien)
+        img_token                     = image_store.simpan(processed_bytes)
+        raw_data, cache_hit, duplikat = ocr_gambar(processed_bytes, sidik)
+        ada_bt                        = any(grp_pakai_bruto_terra(g) for g in raw_data.get('kelompok', []))
+
+        hasil = {
+            'index':           index,
+            'filename':        filename,
+            'success':         True,
+            'raw_data':        raw_data,
+            'ada_bruto_terra': ada_bt,
+            'baris_ragu':      cari_baris_ragu(raw_data),
+            'cache_hit':       cache_hit,
+            'duplikat':        duplikat,
+            'img_token':       img_token,
+            'result':          None,
+        }
+        if not ada_bt:
+            with tahap('validate'):
+                hasil['result'] = validate_do(raw_data)
+            if riwayat is not None:
+                riwayat.simpan(raw_data, hasil['result'], sesi=img_token)
+    except KuotaHabis as e:
+        catat_error(e)
+        hasil = {'index': index, 'filename': filename, 'success': False, 'error': str(e)}
+    except BersamaGagal as e:
+        catat_error(e)
+        hasil = {'index': index, 'filename': filename, 'success': False,
+                 'error': f'State bersama tidak bisa dihubungi: {e}'}
+    except json.JSONDecodeError as e:
+        catat_error(e)
+        hasil = {'index': index, 'filename': filename, 'success': False,
+                 'error': f'Gagal parsing respons Gemini: {str(e)}'}
+    except Exception as e:
+        catat_error(e)
+        hasil = {'index': index, 'filename': filename, 'success': False,
+                 'error': f'Terjadi kesalahan: {str(e)}'}
+
+    hasil['durasi_detik'] = round(time.perf_counter() - t0, 3)
+    return hasil
+
+
+# ══════════════════════════════════════════════════════════════════
+# RETRY TERARAH — baca ulang hanya sel yang terlibat check gagal / ragu,
+# dari potongan gambar (header + kolom No + sel terkait), bukan seluruh dokumen
+# ══════════════════════════════════════════════════════════════════
+RETRY_MODE        = os.getenv('RETRY_MODE', 'terarah')     # 'terarah' | 'penuh'
+RETRY_MAX_SEL     = int(os.getenv('RETRY_MAX_SEL', 40))
+N_BARIS_RINGKASAN = 4   # Ekor, Bruto, Terra, Netto di bawah tabel
+
+LABEL_SEL = {
+    'ekor':                    'kolom Ekor',
+    'kg':                      'kolom Kg',
+    'tertulis_total_ekor':     'baris Ekor di bawah tabel',
+    'tertulis_bruto_kg':       'baris Bruto di bawah tabel',
+    'tertulis_terra_kg':       'baris Terra di bawah tabel',
+    'tertulis_netto_kg':       'baris Netto di bawah tabel',
+    'tertulis_realisasi_ekor': 'ringkasan atas, kolom Ekor',
+    'tertulis_realisasi_kg':   'ringkasan atas, kolom Kg',
+    'tertulis_rata_rata':      'ringkasan atas, kolom Rata-rata',
+}
+BOLEH_NULL = {'tertulis_bruto_kg', 'tertulis_terra_kg'}
+
+
+def sel_retry(raw_data: dict, checks_gagal: list) -> list:
+    """
+    Sel yang perlu dibaca ulang, dari id check yang gagal + baris "ragu".
+    Satu sel: {'id', 'deskripsi', 'kelompok' (indeks, None = ringkasan atas),
+    'no' (None = baris tertulis di bawah tabel), 'field'}.
+    """
+    kelompok = raw_data.get('kelompok', [])
+    sel      = {}
+
+    def tambah(gi, no, field):
+        if gi is None:
+            id_sel, lokasi = f'atas.{field}', ''
+        else:
+            grp    = kelompok[gi]
+            lokasi = f'{grp.get("nama", "")} ({grp.get("posisi", "")}), '
+            id_sel = f'k{gi}.b{no}.{field}' if no is not None else f'k{gi}.{field}'
+            if no is not None:
+                lokasi += f'baris no {no}, '
+        sel.setdefault(id_sel, {'id': id_sel, 'deskripsi': lokasi + LABEL_SEL[field],
+                                'kelompok': gi, 'no': no, 'field': field})
+
+    def kolom_baris(gi, field):
+        for r in kelompok[gi].get('baris', []):
+            if safe_float(r.get('ekor')) != 0 or safe_float(r.get('kg')) != 0:
+                tambah(gi, r.get('no'), field)
+
+    # id check per kelompok → indeks kelompok (lihat validate_do)
+    per_id = {}
+    for gi, grp in enumerate(kelompok):
+        for jenis in ('ekor', 'netto', 'bruto', 'terra'):
+            per_id.setdefault(f'{jenis}_{grp.get("nama", "KELOMPOK").lower()}', (gi, jenis))
+
+    for c in checks_gagal:
+        cid = c.get('id', '')
+        if cid == 'realisasi_ekor':
+            tambah(None, None, 'tertulis_realisasi_ekor')
+            for gi in range(len(kelompok)):
+                tambah(gi, None, 'tertulis_total_ekor')
+        elif cid == 'realisasi_kg':
+            tambah(None, None, 'tertulis_realisasi_kg')
+            for gi in range(len(kelompok)):
+                tambah(gi, None, 'tertulis_netto_kg')
+        elif cid == 'rata_rata':
+            for field in ('tertulis_rata_rata', 'tertulis_realisasi_ekor', 'tertulis_realisasi_kg'):
+                tambah(None, None, field)
+        elif cid in per_id:
+            gi, jenis = per_id[cid]
+            if jenis == 'ekor':
+                kolom_baris(gi, 'ekor')
+                tambah(gi, None, 'tertulis_total_ekor')
+            elif jenis == 'terra':
+                tambah(gi, None, 'tertulis_terra_kg')
+            elif jenis == 'netto' and grp_pakai_bruto_terra(kelompok[gi]):
+                tambah(gi, None, 'tertulis_netto_kg')   # Σ Kg sudah dicek di baris Bruto
+            else:
+                kolom_baris(gi, 'kg')
+                tambah(gi, None, f'tertulis_{jenis}_kg')
+
+    for gi, grp in enumerate(kelompok):
+        for r in grp.get('baris', []):
+            if r.get('ragu'):
+                tambah(gi, r.get('no'), 'ekor')
+                tambah(gi, r.get('no'), 'kg')
+    return list(sel.values())
+
+
+def potongan_retry(sel: list, n_kelompok: int) -> tuple:
+    """
+    Argumen potong_sel untuk sel-sel ini. Asumsi tata letak: kolom No, lalu
+    Ekor & Kg per kelompok berurutan kiri → kanan; pita baris ke-n = baris no n;
+    baris ringkasan (Ekor/Bruto/Terra/Netto) = pita paling bawah.
+    """
+    baris, kolom, atas = set(), {0}, False
+    for s in sel:
+        if s['kelompok'] is None:
+            atas = True
+            continue
+        kolom |= {1 + 2 * s['kelompok'], 2 + 2 * s['kelompok']}
+        baris.add(0)
+        if s['no'] is None:
+            baris |= set(range(-N_BARIS_RINGKASAN, 0))
+        elif isinstance(s['no'], int) and s['no'] > 0:
+            baris.add(s['no'])
+        else:
+            return None, None, atas, None   # nomor baris tidak jelas → semua baris
+    return sorted(baris), sorted(kolom), atas, 1 + 2 * n_kelompok
+
+
+def gabung_sel(raw_data: dict, sel: list, jawaban: dict) -> tuple[dict, list]:
+    """Tulis nilai hasil baca ulang ke salinan raw_data. Return (raw_data_baru, daftar perubahan)."""
+    baru   = copy.deepcopy(raw_data)
+    per_id = {s['id']: s for s in sel}
+    diubah = []
+    ragu   = {}
+
+    for j in jawaban.get('sel', []):
+        s = per_id.get(j.get('id')) if isinstance(j, dict) else None
+        if s is None:
+            continue
+        nilai = j.get('nilai')
+        if nilai is None and s['field'] not in BOLEH_NULL:
+            continue
+        if nilai is not None and (isinstance(nilai, bool) or not isinstance(nilai, (int, float))):
+            continue
+
+        if s['kelompok'] is None:
+            target = baru.setdefault('ringkasan_atas', {})
+        elif s['no'] is None:
+            target = baru['kelompok'][s['kelompok']]
+        else:
+            target = next((r for r in baru['kelompok'][s['kelompok']].get('baris', [])
+                           if r.get('no') == s['no']), None)
+            key = (s['kelompok'], s['no'])
+            ragu[key] = ragu.get(key, False) or bool(j.get('ragu'))
+        if target is None:
+            continue
+        if target.get(s['field']) != nilai:
+            diubah.append({'id': s['id'], 'deskripsi': s['deskripsi'],
+                           'dari': target.get(s['field']), 'ke': nilai})
+            target[s['field']] = nilai
+
+    for (gi, no), masih_ragu in ragu.items():
+        for r in baru['kelompok'][gi].get('baris', []):
+            if r.get('no') == no:
+                if masih_ragu:
+                    r['ragu'] = True
+                else:
+                    r.pop('ragu', None)
+    return baru, diubah
+
+
+def retry_terarah(processed_bytes: bytes, raw_data: dict, bandul) -> dict | None:
+    """
+    Satu panggilan Gemini untuk sel-sel yang terlibat saja.
+    Return None jika tidak ada sel / terlalu banyak sel (→ retry penuh).
+    """
+    bandul_float = float(bandul) if bandul is not None else None
+    checks_gagal = [c for c in validate_do(raw_data, bandul=bandul_float, rinci=False)['checks'] if not c['ok']]
+    sel = sel_retry(raw_data, checks_gagal)
+    if not sel or len(sel) > RETRY_MAX_SEL:
+        return None
+
+    with tahap('potong_sel'):
+        gambar = preprocess_pool.jalankan(
+            potong_sel, processed_bytes, *potongan_retry(sel, len(raw_data.get('kelompok', []))),
+        )
+    dipotong = gambar is not None and len(gambar) < len(processed_bytes)
+    gambar   = gambar if dipotong else processed_bytes
+    catat_payload('retry_gambar', len(gambar))
+
+    img_part = {'inline_data': {'mime_type': mime_gambar(gambar), 'data': base64.b64encode(gambar).decode()}}
+    with tahap('gemini'):
+        response = gemini_executor.generate(
+            model_ocr(), [img_part, prompt_sel(sel, checks_gagal)], timeout=GEMINI_TIMEOUT,
+        )
+    catat_token('retry_terarah', PROMPT_OCR.versi, response)
+    with tahap('parse'):
+        jawaban = extract_json(response.text)
+    raw_baru, diubah = gabung_sel(raw_data, sel, jawaban)
+    return {'raw_data': raw_baru, 'sel_dibaca': len(sel), 'sel_diubah': diubah, 'dipotong': dipotong}
+
+
 # ══════════════════════════════════════════════════════════════════
 # ROUTES
 # ══════════════════════════════════════════════════════════════════
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_template('index.html', praproses_klien={
+        'aktif':     PRAPROSES_KLIEN,
+        'versi':     VERSI_KLIEN,
+        'lebar':     MAX_WIDTH,
+        'format':    preprocess_pool.encode['format'],
+        'kualitas':  preprocess_pool.encode['kualitas'],
+        'kontras':   KONTRAS,
+        'ketajaman': KETAJAMAN,
+    }, ekstrak_stream=not OCR_LINDUNG)   # stream belum dilindungi (hedging) → /api/extract jika OCR_LINDUNG
+
+
+def bersama_gagal(e: BersamaGagal, **extra):
+    """State bersama (kuota / sesi) tidak bisa dihubungi → JSON 503."""
+    return jsonify({'error': f'State bersama tidak bisa dihubungi: {e}', **extra}), 503
 
 
 @app.route('/api/extract', methods=['POST'])
@@ -561,8 +1125,9 @@ def api_extract():
     Step 1: Kirim gambar ke Gemini → ekstrak data mentah.
     SATU request = SATU Gemini call (tidak ada retry otomatis di sini).
     Retry manual tersedia di /api/retry dan dipanggil oleh frontend jika diperlukan.
-    img_b64 dari gambar yang sudah dipreprocess ikut dikembalikan agar
-    /api/retry tidak perlu menerima file ulang.
+    Gambar yang sudah dipreprocess disimpan di server; hanya img_token yang
+    dikembalikan agar /api/retry tidak perlu menerima file/base64 ulang.
+    Jika gambar yang sama pernah dibaca, hasil diambil dari cache (0 Gemini call).
     """
     if 'file' not in request.files:
         return jsonify({'error': 'Tidak ada file yang dikirim'}), 400
@@ -572,31 +1137,18 @@ def api_extract():
         return jsonify({'error': 'File tidak dipilih'}), 400
 
     ext = file.filename.rsplit('.', 1)[-1].lower()
-    if ext not in {'jpg', 'jpeg', 'png', 'webp'}:
+    if ext not in EKSTENSI_DIDUKUNG:
         return jsonify({'error': f'Format .{ext} tidak didukung'}), 400
 
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-
-        raw_bytes       = file.read()
-        processed_bytes = preprocess_image(raw_bytes)
-        img_b64         = base64.b64encode(processed_bytes).decode()
-        img_part        = {'inline_data': {'mime_type': 'image/jpeg', 'data': img_b64}}
+        path_upload            = simpan_upload_sementara(file)
+        processed_bytes, sidik = preprocess_upload(path_upload, upload_klien())
+        img_token              = image_store.simpan(processed_bytes)
 
-        response = model.generate_content(
-            [img_part, EXTRACTION_PROMPT],
-            request_options={'timeout': 50},
-        )
-        raw_data = extract_json(response.text)
+        raw_data, cache_hit, duplikat = ocr_gambar(processed_bytes, sidik)
 
-        baris_ragu = [
-            {'kelompok': grp.get('nama',''), 'posisi': grp.get('posisi',''),
-             'no': r.get('no'), 'ekor': r.get('ekor'), 'kg': r.get('kg')}
-            for grp in raw_data.get('kelompok', [])
-            for r   in grp.get('baris', [])
-            if r.get('ragu')
-        ]
-        ada_bt = any(grp_pakai_bruto_terra(g) for g in raw_data.get('kelompok', []))
+        baris_ragu = cari_baris_ragu(raw_data)
+        ada_bt     = any(grp_pakai_bruto_terra(g) for g in raw_data.get('kelompok', []))
 
         return jsonify({
             'success':         True,
@@ -604,15 +1156,172 @@ def api_extract():
             'ada_bruto_terra': ada_bt,
             'baris_ragu':      baris_ragu,
             'retry_dilakukan': False,
-            'img_b64':         img_b64,   # disimpan di frontend untuk /api/retry
+            'cache_hit':       cache_hit,
+            'duplikat':        duplikat,    # foto ulang DO yang pernah dibaca (lihat cari_duplikat)
+            'img_token':       img_token,   # disimpan di frontend untuk /api/retry
         })
 
+    except KuotaHabis as e:
+        catat_error(e)
+        return jsonify({'error': str(e), 'kuota': kuota_gemini.status()}), 429
+    except BersamaGagal as e:
+        catat_error(e)
+        return bersama_gagal(e)
     except json.JSONDecodeError as e:
+        catat_error(e)
         return jsonify({'error': f'Gagal parsing respons Gemini: {str(e)}'}), 500
     except Exception as e:
+        catat_error(e)
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
 
 
+@app.route('/api/extract_stream', methods=['POST'])
+def api_extract_stream():
+    """
+    Step 1 versi streaming: sama seperti /api/extract, tetapi respons Gemini
+    di-stream dan setiap kelompok dikirim ke frontend SEGERA setelah lengkap,
+    beserta check kelompok itu — user melihat hasil PESANAN selagi REALISASI
+    masih ditulis model.
+
+    Respons NDJSON (satu objek per baris):
+      {"jenis": "mulai", "img_token": ...}
+      {"jenis": "kelompok", "index": i, "kelompok": {...}, "checks": [...]}
+      {"jenis": "selesai", ...field yang sama dengan /api/extract}
+      {"jenis": "error", "error": ..., "status": 429 / 503 / 500}
+    Error sebelum stream dimulai (file tidak valid, preprocess) → JSON biasa.
+    """
+    if 'file' not in request.files:
+        return jsonify({'error': 'Tidak ada file yang dikirim'}), 400
+
+    file = request.files['file']
+    if not file.filename:
+        return jsonify({'error': 'File tidak dipilih'}), 400
+
+    ext = file.filename.rsplit('.', 1)[-1].lower()
+    if ext not in EKSTENSI_DIDUKUNG:
+        return jsonify({'error': f'Format .{ext} tidak didukung'}), 400
+
+    try:
+        path_upload            = simpan_upload_sementara(file)
+        processed_bytes, sidik = preprocess_upload(path_upload, upload_klien())
+        img_token              = image_store.simpan(processed_bytes)
+    except Exception as e:
+        catat_error(e)
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+    def baris(obj: dict) -> str:
+        return app.json.dumps(obj) + '\n'
+
+    def generate():
+        yield baris({'jenis': 'mulai', 'img_token': img_token})
+        try:
+            for event in ocr_gambar_stream(processed_bytes, sidik):
+                if event[0] == 'kelompok':
+                    _, i, grp = event
+                    with tahap('validate'):
+                        checks = checks_kelompok(grp)
+                    yield baris({'jenis': 'kelompok', 'index': i, 'kelompok': grp, 'checks': checks})
+                    continue
+
+                _, raw_data, cache_hit, duplikat = event
+                yield baris({
+                    'jenis':           'selesai',
+                    'success':         True,
+                    'raw_data':        raw_data,
+                    'ada_bruto_terra': any(grp_pakai_bruto_terra(g) for g in raw_data.get('kelompok', [])),
+                    'baris_ragu':      cari_baris_ragu(raw_data),
+                    'retry_dilakukan': False,
+                    'cache_hit':       cache_hit,
+                    'duplikat':        duplikat,
+                    'img_token':       img_token,
+                })
+        except KuotaHabis as e:
+            catat_error(e)
+            yield baris({'jenis': 'error', 'status': 429, 'error': str(e), 'kuota': kuota_gemini.status()})
+        except BersamaGagal as e:
+            catat_error(e)
+            yield baris({'jenis': 'error', 'status': 503, 'error': f'State bersama tidak bisa dihubungi: {e}'})
+        except json.JSONDecodeError as e:
+            catat_error(e)
+            yield baris({'jenis': 'error', 'status': 500, 'error': f'Gagal parsing respons Gemini: {str(e)}'})
+        except Exception as e:
+            catat_error(e)
+            yield baris({'jenis': 'error', 'status': 500, 'error': f'Terjadi kesalahan: {str(e)}'})
+
+    # Matikan buffering proxy (nginx) agar tiap baris langsung sampai ke browser
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'})
+
+
+@app.route('/api/extract_batch', methods=['POST'])
+def api_extract_batch():
+    """
+    Batch: banyak foto DO dalam satu request (field 'files', boleh berulang).
+    Preprocess + OCR tiap dokumen berjalan paralel (dibatasi BATCH_MAX_PARALEL
+    dan GEMINI_MAX_PARALEL). Dokumen Format A langsung divalidasi.
+
+    Respons berupa NDJSON (satu objek JSON per baris), dikirim per dokumen
+    SEGERA setelah selesai — urutan mengikuti waktu selesai, bukan urutan upload
+    (pakai field 'index' untuk mencocokkan). Baris terakhir: {"selesai": true, ...}.
+    """
+    request.max_content_length = BATCH_MAX_CONTENT_LENGTH
+
+    files = [f for f in request.files.getlist('files') if f.filename]
+    if not files:
+        return jsonify({'error': 'Tidak ada file yang dikirim'}), 400
+    if len(files) > BATCH_MAX_FILE:
+        return jsonify({'error': f'Maksimal {BATCH_MAX_FILE} file per batch'}), 400
+
+    for f in files:
+        ext = f.filename.rsplit('.', 1)[-1].lower()
+        if ext not in EKSTENSI_DIDUKUNG:
+            return jsonify({'error': f'Format .{ext} tidak didukung ({f.filename})'}), 400
+
+    # Spool semua file ke disk selagi request context masih aktif
+    dokumen = []
+    klien   = upload_klien()
+    try:
+        for i, f in enumerate(files):
+            dokumen.append((i, f.filename, simpan_upload_sementara(f), klien))
+    except Exception as e:
+        catat_error(e)
+        for _, _, path, _ in dokumen:
+            hapus_upload_sementara(path)
+        return jsonify({'error': f'Gagal menyimpan upload: {str(e)}'}), 500
+
+    def generate():
+        t0     = time.perf_counter()
+        sukses = 0
+        pool    = ThreadPoolExecutor(max_workers=BATCH_MAX_PARALEL)
+        futures = [pool.submit(proses_dokumen_batch, *d) for d in dokumen]
+        try:
+            for fut in as_completed(futures):
+                hasil = fut.result()
+                sukses += hasil['success']
+                yield app.json.dumps(hasil) + '\n'
+        except GeneratorExit:
+            # Klien memutus stream: dokumen yang belum mulai tidak dikirim ke Gemini
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            pool.shutdown(wait=False)
+        yield app.json.dumps({
+            'selesai':      True,
+            'jumlah':       len(futures),
+            'sukses':       sukses,
+            'durasi_detik': round(time.perf_counter() - t0, 3),
+        }) + '\n'
+
+    def bersihkan():
+        # Jika stream diputus sebelum semua dokumen diproses, file sisa tetap dihapus
+        for _, _, path, _ in dokumen:
+            hapus_upload_sementara(path)
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.call_on_close(bersihkan)
+    return response
+
+
 @app.route('/api/retry', methods=['POST'])
 def api_retry():
     """
@@ -625,28 +1334,58 @@ def api_retry():
 
     raw_data_lama = body.get('raw_data')
     checks_gagal  = body.get('checks_gagal', [])
-    img_b64       = body.get('img_b64')
-
-    if not raw_data_lama or not img_b64:
-        return jsonify({'error': 'raw_data dan img_b64 wajib diisi'}), 400
+    img_token     = body.get('img_token')
+    mode          = body.get('mode') or RETRY_MODE
+
+    if not raw_data_lama or not img_token:
+        return jsonify({'error': 'raw_data dan img_token wajib diisi'}), 400
+
+    processed_bytes = image_store.ambil(img_token)
+    if processed_bytes is None:
+        return jsonify({'error': 'Sesi gambar sudah kadaluarsa, silakan upload ulang foto DO'}), 410
+
+    if mode == 'terarah':
+        try:
+            hasil = retry_terarah(processed_bytes, raw_data_lama, body.get('bandul'))
+        except KuotaHabis as e:
+            catat_error(e)
+            return jsonify({'error': str(e), 'kuota': kuota_gemini.status()}), 429
+        except BersamaGagal as e:
+            catat_error(e)
+            return bersama_gagal(e)
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            catat_error(e)   # jawaban sel tidak terbaca → retry penuh
+            hasil = None
+        if hasil is not None:
+            metrik.inc('retry_total', mode='terarah')
+            raw_data2 = hasil['raw_data']
+            return jsonify({
+                'success':         True,
+                'raw_data':        raw_data2,
+                'ada_bruto_terra': any(grp_pakai_bruto_terra(g) for g in raw_data2.get('kelompok', [])),
+                'baris_ragu':      cari_baris_ragu(raw_data2),
+                'retry_dilakukan': True,
+                'mode':            'terarah',
+                'sel_dibaca':      hasil['sel_dibaca'],
+                'sel_diubah':      hasil['sel_diubah'],
+                'img_token':       img_token,
+            })
 
     try:
-        model    = genai.GenerativeModel('gemini-2.5-flash')
-        img_part = {'inline_data': {'mime_type': 'image/jpeg', 'data': img_b64}}
+        model    = model_ocr()
+        img_b64  = base64.b64encode(processed_bytes).decode()
+        img_part = {'inline_data': {'mime_type': mime_gambar(processed_bytes), 'data': img_b64}}
+
+        metrik.inc('retry_total', mode='penuh')
+        with tahap('gemini'):
+            response  = gemini_executor.generate(
+                model, [img_part, PROMPT_OCR.retry(checks_gagal)], timeout=GEMINI_TIMEOUT,
+            )
+        catat_token('retry', PROMPT_OCR.versi, response)
+        with tahap('parse'):
+            raw_data2 = extract_json(response.text)
 
-        response  = model.generate_content(
-            [img_part, buat_retry_prompt(checks_gagal, raw_data_lama)],
-            request_options={'timeout': 50},
-        )
-        raw_data2 = extract_json(response.text)
-
-        baris_ragu = [
-            {'kelompok': grp.get('nama',''), 'posisi': grp.get('posisi',''),
-             'no': r.get('no'), 'ekor': r.get('ekor'), 'kg': r.get('kg')}
-            for grp in raw_data2.get('kelompok', [])
-            for r   in grp.get('baris', [])
-            if r.get('ragu')
-        ]
+        baris_ragu = cari_baris_ragu(raw_data2)
         ada_bt = any(grp_pakai_bruto_terra(g) for g in raw_data2.get('kelompok', []))
 
         return jsonify({
@@ -655,20 +1394,56 @@ def api_retry():
             'ada_bruto_terra': ada_bt,
             'baris_ragu':      baris_ragu,
             'retry_dilakukan': True,
-            'img_b64':         img_b64,
+            'mode':            'penuh',
+            'img_token':       img_token,
         })
 
+    except KuotaHabis as e:
+        catat_error(e)
+        return jsonify({'error': str(e), 'kuota': kuota_gemini.status()}), 429
+    except BersamaGagal as e:
+        catat_error(e)
+        return bersama_gagal(e)
     except json.JSONDecodeError as e:
+        catat_error(e)
         return jsonify({'error': f'Gagal parsing respons Gemini retry: {str(e)}'}), 500
     except Exception as e:
+        catat_error(e)
         return jsonify({'error': f'Terjadi kesalahan retry: {str(e)}'}), 500
 
 
+@app.route('/api/kuota', methods=['GET'])
+def api_kuota():
+    """Status kuota Gemini: token tersedia, panjang antrian, estimasi tunggu, sisa harian."""
+    try:
+        return jsonify(kuota_gemini.status())
+    except BersamaGagal as e:
+        return bersama_gagal(e)
+
+
+@app.route('/api/cache', methods=['GET'])
+def api_cache():
+    """Statistik cache OCR (hit/miss/eviction)."""
+    return jsonify(ocr_cache.stats())
+
+
+def kunci_riwayat(img_token: str | None, sesi: str | None) -> str | None:
+    """
+    Kunci baris riwayat satu dokumen: img_token jika ada, selain itu token sesi
+    validasi — patch berikutnya memperbarui baris yang sama, bukan menambah baris.
+    """
+    return img_token or (f'sesi:{sesi}' if sesi else None)
+
+
 @app.route('/api/validate', methods=['POST'])
 def api_validate():
     """
     Step 2: Terima raw_data + bandul (jika ada Bruto/Terra),
     jalankan semua validasi, kembalikan hasil lengkap.
+    Sekaligus membuka sesi validasi: koreksi manual berikutnya cukup
+    dikirim ke /api/validate/patch dengan token `sesi`.
+    "ringkas": true → hasil tanpa gema raw_data & check tanpa teks
+    penjelasan (ambil per check lewat /api/validate/rincian).
     """
     body = request.get_json()
     if not body or 'raw_data' not in body:
@@ -676,6 +1451,7 @@ def api_validate():
 
     raw_data = body['raw_data']
     bandul   = body.get('bandul')  # None jika tidak dikirim
+    ringkas  = bool(body.get('ringkas', RESPONS_RINGKAS))
 
     # Cek kebutuhan bandul dari nilai nyata di data
     ada_bt = any(grp_pakai_bruto_terra(g) for g in raw_data.get('kelompok', []))
@@ -684,12 +1460,211 @@ def api_validate():
 
     try:
         bandul_float = float(bandul) if bandul is not None else None
-        result = validate_do(raw_data, bandul=bandul_float)
-        return jsonify({'success': True, 'result': result})
+        with tahap('validate'):
+            sesi, result = sesi_validasi.buat(raw_data, bandul_float, body.get('img_token'))
+        if riwayat is not None:
+            # img_token = satu dokumen: validasi ulang memperbarui baris riwayat yang sama
+            riwayat.simpan(raw_data, result, bandul_float, sesi=kunci_riwayat(body.get('img_token'), sesi))
+
+        respons = {'success': True, 'saran_koreksi': saran_koreksi(raw_data, result, bandul_float)}
+        if sesi is None:
+            # State bersama mati: tanpa sesi rincian tidak bisa diambil belakangan → hasil lengkap
+            respons['result'] = bentuk_hasil(result, False)
+        else:
+            respons.update(result=bentuk_hasil(result, ringkas), sesi=sesi, versi=1)
+        return jsonify(respons)
+    except Exception as e:
+        catat_error(e)
+        return jsonify({'error': f'Terjadi kesalahan validasi: {str(e)}'}), 500
+
+
+@app.route('/api/validate/patch', methods=['POST'])
+def api_validate_patch():
+    """
+    Koreksi manual inkremental dalam sesi dari /api/validate:
+      {"sesi": ..., "versi": n, "patch": [{"kelompok": i, "baris": j, "field": "kg", "nilai": 66.2}],
+       "bandul": ... (opsional, hanya jika berganti), "ringkas": true (opsional)}
+    kelompok = null → field ringkasan atas; baris = null → nilai tertulis kelompok.
+    Hanya kelompok yang tersentuh + ringkasan atas yang dihitung ulang; respons
+    berisi check yang berubah saja ({"indeks", "check"}), atau "checks" lengkap
+    jika daftar check berubah bentuk (kelompok pindah mode Bruto/Terra).
+    Saran koreksi digit TIDAK dihitung di sini (jauh lebih lama dari patch-nya) —
+    ambil terpisah lewat /api/validate/saran.
+    404 → sesi hilang (kadaluarsa / worker lain tanpa STATE_BERSAMA): frontend kirim ulang ke /api/validate.
+    409 → versi bentrok.
+    503 → state bersama tidak bisa dihubungi (juga sesi_hilang: validasi penuh tetap jalan).
+    """
+    body = request.get_json(silent=True)
+    if not body or 'sesi' not in body or 'patch' not in body:
+        return jsonify({'error': 'sesi / patch tidak ditemukan'}), 400
+
+    try:
+        ganti_bandul = 'bandul' in body
+        bandul_float = float(body['bandul']) if body.get('bandul') is not None else None
+        ringkas      = bool(body.get('ringkas', RESPONS_RINGKAS))
+        with tahap('validate'):
+            respons, result = sesi_validasi.patch(
+                body['sesi'], body['patch'], versi=body.get('versi'),
+                bandul=bandul_float, ganti_bandul=ganti_bandul,
+            )
+        if riwayat is not None:
+            # Antrian riwayat ditulis belakangan; salin agar patch berikutnya tidak ikut terbawa
+            info = sesi_validasi.info(body['sesi'])
+            riwayat.simpan(copy.deepcopy(info['raw_data']), result, info['bandul'],
+                           sesi=kunci_riwayat(info['img_token'], body['sesi']))
+
+        respons['berubah'] = [{'indeks': b['indeks'], 'check': bentuk_checks([b['check']], ringkas)[0]}
+                              for b in respons['berubah']]
+        if 'checks' in respons:
+            respons['checks'] = bentuk_checks(respons['checks'], ringkas)
+        return jsonify({'success': True, 'sesi': body['sesi'], **respons})
+    except SesiTidakAda:
+        return jsonify({'error': 'Sesi validasi tidak ditemukan', 'sesi_hilang': True}), 404
+    except BersamaGagal as e:
+        catat_error(e)
+        return bersama_gagal(e, sesi_hilang=True)
+    except VersiBentrok as e:
+        return jsonify({'error': f'Sesi validasi sudah berubah ({e})'}), 409
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        catat_error(e)
         return jsonify({'error': f'Terjadi kesalahan validasi: {str(e)}'}), 500
 
 
+@app.route('/api/validate/rincian', methods=['GET'])
+def api_validate_rincian():
+    """
+    Check lengkap (nilai_list, formula_extra, rincian, kesimpulan) dari sesi
+    validasi untuk respons ringkas: ?sesi=...&indeks=0,3 (tanpa indeks = semua).
+    Return {"success", "versi", "rincian": [{"indeks", "check"}]}.
+    """
+    try:
+        versi, checks = sesi_validasi.checks(request.args.get('sesi'))
+    except SesiTidakAda:
+        return jsonify({'error': 'Sesi validasi tidak ditemukan', 'sesi_hilang': True}), 404
+    except BersamaGagal as e:
+        return bersama_gagal(e, sesi_hilang=True)
+    try:
+        teks   = request.args.get('indeks')
+        indeks = [int(i) for i in teks.split(',')] if teks else range(len(checks))
+        if any(not 0 <= i < len(checks) for i in indeks):
+            raise ValueError(f'indeks check di luar 0–{len(checks) - 1}')
+    except ValueError as e:
+        return jsonify({'error': f'indeks tidak valid: {e}'}), 400
+    return jsonify({'success': True, 'versi': versi,
+                    'rincian': [{'indeks': i, 'check': rinci_check(checks[i])} for i in indeks]})
+
+
+@app.route('/api/validate/saran', methods=['GET'])
+def api_validate_saran():
+    """Saran koreksi digit lokal untuk isi sesi validasi saat ini (?sesi=...)."""
+    try:
+        info = sesi_validasi.info(request.args.get('sesi'))
+    except SesiTidakAda:
+        return jsonify({'error': 'Sesi validasi tidak ditemukan', 'sesi_hilang': True}), 404
+    except BersamaGagal as e:
+        return bersama_gagal(e, sesi_hilang=True)
+    try:
+        return jsonify({'success': True, 'versi': info['versi'],
+                        'saran_koreksi': saran_koreksi(info['raw_data'], info, info['bandul'])})
+    except Exception as e:
+        catat_error(e)
+        return jsonify({'error': f'Terjadi kesalahan koreksi: {str(e)}'}), 500
+
+
+def saran_koreksi(raw_data: dict, result: dict, bandul: float | None) -> list:
+    """
+    Validasi gagal → cari koreksi digit yang membuat semua check lolos;
+    kosong = tidak ada perbaikan konsisten, perlu baca ulang oleh AI.
+    """
+    if not KOREKSI_LOKAL or result['semua_benar']:
+        return []
+    with tahap('koreksi'):
+        saran = cari_koreksi(raw_data, partial(validate_do, rinci=False), bandul=bandul, toleransi=TOLERANSI,
+                             maks_ubah=KOREKSI_MAKS_UBAH, maks_saran=KOREKSI_MAKS_SARAN)
+    metrik.inc('koreksi_lokal_total', hasil='ada' if saran else 'tidak')
+    return saran
+
+
+def _epoch_tanggal(teks: str | None) -> float | None:
+    """'YYYY-MM-DD' (zona RIWAYAT_TZ) → epoch awal hari itu."""
+    if not teks:
+        return None
+    return datetime.strptime(teks, '%Y-%m-%d').replace(tzinfo=RIWAYAT_TZ).timestamp()
+
+
+@app.route('/api/history', methods=['GET'])
+def api_history():
+    """
+    Riwayat DO tervalidasi, terbaru dulu, dengan paginasi cursor.
+    Query: dari / sampai (YYYY-MM-DD, inklusif), status (benar | salah),
+    kategori (kategori check yang gagal, mis. "Baris Netto"), kelompok (nama
+    kelompok), limit (maks 200), cursor (dari respons sebelumnya).
+    """
+    if riwayat is None:
+        return jsonify({'error': 'Riwayat tidak aktif (RIWAYAT_PATH kosong)'}), 404
+
+    q = request.args
+    try:
+        dari   = _epoch_tanggal(q.get('dari'))
+        sampai = _epoch_tanggal(q.get('sampai'))
+        cursor = int(q['cursor']) if q.get('cursor') else None
+        limit  = min(max(int(q.get('limit', 50)), 1), 200)
+    except ValueError as e:
+        return jsonify({'error': f'Parameter tidak valid: {str(e)}'}), 400
+    status = q.get('status')
+    if status not in (None, '', 'benar', 'salah'):
+        return jsonify({'error': 'status harus "benar" atau "salah"'}), 400
+
+    try:
+        with tahap('riwayat'):
+            hasil = riwayat.cari(
+                dari        = dari,
+                sampai      = sampai + 24 * 3600 if sampai is not None else None,
+                semua_benar = {'benar': True, 'salah': False}.get(status),
+                kategori    = q.get('kategori') or None,
+                kelompok    = q.get('kelompok') or None,
+                cursor      = cursor,
+                limit       = limit,
+            )
+    except Exception as e:
+        catat_error(e)
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+    for item in hasil['items']:
+        item['waktu'] = datetime.fromtimestamp(item['waktu'], RIWAYAT_TZ).isoformat(timespec='seconds')
+    return jsonify({'success': True, 'items': hasil['items'],
+                    'cursor': str(hasil['cursor']) if hasil['cursor'] is not None else None})
+
+
+@app.route('/api/history/<int:dok_id>', methods=['GET'])
+def api_history_detail(dok_id: int):
+    """Satu DO dari riwayat: raw_data + check (ringkas) saat divalidasi."""
+    if riwayat is None:
+        return jsonify({'error': 'Riwayat tidak aktif (RIWAYAT_PATH kosong)'}), 404
+    dok = riwayat.ambil(dok_id)
+    if dok is None:
+        return jsonify({'error': 'Dokumen tidak ditemukan'}), 404
+    dok['waktu'] = datetime.fromtimestamp(dok['waktu'], RIWAYAT_TZ).isoformat(timespec='seconds')
+    return jsonify({'success': True, **dok})
+
+
+def panaskan_gemini():
+    """
+    Pemanasan koneksi Gemini di latar belakang — dipanggil sekali saat worker
+    start (gunicorn.conf.py: post_worker_init) atau saat `python app.py`.
+    Dijalankan lewat gemini_executor agar tidak memblokir hub gevent.
+    """
+    if not GEMINI_API_KEY or os.getenv('GEMINI_PEMANASAN', '1') == '0':
+        return
+    threading.Thread(
+        target=gemini_executor.jalankan, args=(registri_model.pemanasan,),
+        name='gemini-pemanasan', daemon=True,
+    ).start()
+
+
 if __name__ == '__main__':
+    panaskan_gemini()
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,205 @@
+"""
+A/B varian prompt OCR (prompts.py) terhadap korpus foto DO yang direkam.
+
+Korpus = satu folder berisi foto DO (*.jpg/*.png/*.webp), opsional
+<nama>.benar.json (raw_data yang benar, untuk akurasi per angka).
+Respons Gemini direkam sekali ke <korpus>/rekaman.jsonl, lalu dibandingkan
+offline berkali-kali tanpa network & tanpa kuota:
+
+    python bench/ab_prompt.py KORPUS --rekam            # panggil Gemini asli (butuh GEMINI_API_KEY)
+    python bench/ab_prompt.py KORPUS --rekam --stub     # rekaman stub: token diperkirakan, isi = benar.json
+    python bench/ab_prompt.py KORPUS                    # laporan offline dari rekaman.jsonl
+
+Laporan per varian: token input/output rata-rata, latensi p50/p95,
+JSON valid, lolos validasi (validate_do semua_benar), akurasi angka vs benar.json.
+"""
+import os
+import sys
+import json
+import glob
+import base64
+import time
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+for _k, _v in (('OCR_CACHE_PATH', ''), ('IMAGE_STORE_DIR', ''), ('KUOTA_PATH', ''), ('RIWAYAT_PATH', ''),
+               ('MIRIP_PATH', ''), ('PREPROCESS_PROSES', '0'), ('GEMINI_PEMANASAN', '0')):
+    os.environ.setdefault(_k, _v)
+
+from prompts import PROMPT
+from image_proc import preprocess_image
+from stub_gemini import StubModel, CONTOH_RAW_DATA
+
+EKSTENSI = ('*.jpg', '*.jpeg', '*.png', '*.webp')
+
+
+def persentil(data: list, p: float) -> float:
+    data = sorted(data)
+    k = (len(data) - 1) * p / 100
+    i = int(k)
+    j = min(i + 1, len(data) - 1)
+    return data[i] + (data[j] - data[i]) * (k - i)
+
+
+def daftar_gambar(korpus: str) -> list:
+    return sorted(f for pola in EKSTENSI for f in glob.glob(os.path.join(korpus, pola)))
+
+
+def muat_benar(path_gambar: str) -> dict | None:
+    path = os.path.splitext(path_gambar)[0] + '.benar.json'
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def muat_rekaman(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(b) for b in f if b.strip()]
+
+
+# ══════════════════════════════════════════════════════════════════
+# REKAM
+# ══════════════════════════════════════════════════════════════════
+def rekam(korpus: str, varian: list, stub: bool):
+    import app as do_app
+    from quota import KuotaGemini
+
+    path_rekaman = os.path.join(korpus, 'rekaman.jsonl')
+    sudah = {(r['gambar'], r['varian']) for r in muat_rekaman(path_rekaman)}
+    kuota = KuotaGemini(rpm=int(os.getenv('GEMINI_RPM', 15)), max_tunggu=3600)
+
+    with open(path_rekaman, 'a') as out:
+        for path in daftar_gambar(korpus):
+            nama = os.path.basename(path)
+            img  = base64.b64encode(preprocess_image(path)).decode()
+            part = {'inline_data': {'mime_type': 'image/jpeg', 'data': img}}
+            for v in varian:
+                if (nama, v) in sudah:
+                    continue
+                prompt = PROMPT[v]
+                if stub:
+                    # Stub tidak tahu system instruction: kirim ikut konten agar
+                    # perkiraan token input tetap memperhitungkannya (Gemini juga
+                    # menagih system instruction sebagai token input).
+                    model  = StubModel(latensi=0, raw_data=muat_benar(path) or CONTOH_RAW_DATA)
+                    konten = [part, prompt.sistem, prompt.tugas]
+                else:
+                    kuota.ambil()
+                    model  = do_app.registri_model.model(system_instruction=prompt.sistem)
+                    konten = [part, prompt.tugas]
+
+                t0 = time.perf_counter()
+                try:
+                    resp  = model.generate_content(
+                        konten, request_options={'timeout': do_app.GEMINI_TIMEOUT},
+                    )
+                    teks  = resp.text
+                    usage = resp.usage_metadata
+                    baris = {
+                        'token_input':  usage.prompt_token_count,
+                        'token_output': usage.candidates_token_count,
+                    }
+                except Exception as e:
+                    teks, baris = '', {'error': f'{type(e).__name__}: {e}'}
+                baris.update(gambar=nama, varian=v, teks=teks, stub=stub,
+                             latensi_detik=round(time.perf_counter() - t0, 3))
+                out.write(json.dumps(baris) + '\n')
+                out.flush()
+                print(f'{nama:<30} {v:<12} {baris.get("token_input", "-")!s:>6} in '
+                      f'{baris.get("token_output", "-")!s:>6} out {baris["latensi_detik"]:6.2f}s')
+
+
+# ══════════════════════════════════════════════════════════════════
+# LAPORAN
+# ══════════════════════════════════════════════════════════════════
+def _ratakan(raw_data: dict) -> dict:
+    """Semua angka di raw_data → {path: nilai} untuk dibandingkan per angka."""
+    hasil = {}
+    for k, v in (raw_data.get('ringkasan_atas') or {}).items():
+        hasil[f'atas.{k}'] = v
+    for gi, grp in enumerate(raw_data.get('kelompok', [])):
+        for k, v in grp.items():
+            if k.startswith('tertulis_'):
+                hasil[f'{gi}.{k}'] = v
+        for r in grp.get('baris', []):
+            hasil[f'{gi}.{r.get("no")}.ekor'] = r.get('ekor')
+            hasil[f'{gi}.{r.get("no")}.kg']   = r.get('kg')
+    return hasil
+
+
+def akurasi(raw_data: dict, benar: dict) -> float:
+    b, h = _ratakan(benar), _ratakan(raw_data)
+    if not b:
+        return 1.0
+    return sum(1 for k, v in b.items() if h.get(k) == v) / len(b)
+
+
+def laporan(korpus: str, bandul: float):
+    from app import extract_json, validate_do
+
+    rekaman = muat_rekaman(os.path.join(korpus, 'rekaman.jsonl'))
+    if not rekaman:
+        sys.exit('rekaman.jsonl kosong — jalankan dulu dengan --rekam')
+    benar = {os.path.basename(p): muat_benar(p) for p in daftar_gambar(korpus)}
+
+    per_varian = {}
+    for r in rekaman:
+        per_varian.setdefault(r['varian'], []).append(r)
+
+    print(f'{"varian":<12} {"n":>4} {"in":>7} {"out":>6} {"p50":>7} {"p95":>7} '
+          f'{"json":>6} {"lolos":>6} {"akurasi":>8}')
+    for v, daftar in sorted(per_varian.items()):
+        valid, lolos, akur = 0, 0, []
+        for r in daftar:
+            try:
+                raw = extract_json(r['teks'])
+            except Exception:
+                continue
+            valid += 1
+            try:
+                lolos += validate_do(raw, bandul=bandul)['semua_benar']
+            except Exception:
+                pass
+            if benar.get(r['gambar']):
+                akur.append(akurasi(raw, benar[r['gambar']]))
+
+        n      = len(daftar)
+        t_in   = [r['token_input'] for r in daftar if 'token_input' in r]
+        t_out  = [r['token_output'] for r in daftar if 'token_output' in r]
+        lat    = [r['latensi_detik'] for r in daftar]
+        stub   = ' (stub)' if any(r.get('stub') for r in daftar) else ''
+        print(f'{v:<12} {n:>4} {statistics.mean(t_in) if t_in else 0:7.0f} '
+              f'{statistics.mean(t_out) if t_out else 0:6.0f} '
+              f'{persentil(lat, 50):6.2f}s {persentil(lat, 95):6.2f}s '
+              f'{valid / n:6.0%} {lolos / n:6.0%} '
+              f'{(f"{statistics.mean(akur):8.1%}" if akur else "       —")}{stub}')
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('korpus')
+    ap.add_argument('--rekam', action='store_true')
+    ap.add_argument('--stub', action='store_true', help='rekam dengan stub (tanpa network)')
+    ap.add_argument('--varian', action='append', default=None,
+                    help=f'versi prompt (default semua: {", ".join(PROMPT)})')
+    ap.add_argument('--bandul', type=float, default=2.0)
+    args = ap.parse_args()
+
+    varian = args.varian or list(PROMPT)
+    for v in varian:
+        if v not in PROMPT:
+            sys.exit(f'Versi prompt tidak dikenal: {v}')
+    if args.rekam:
+        rekam(args.korpus, varian, args.stub)
+    laporan(args.korpus, args.bandul)
+
+
+if __name__ == '__main__':
+    main()
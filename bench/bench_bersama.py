@@ -0,0 +1,168 @@
+"""
+State bersama (bersama.py) untuk N worker: tiap worker = satu proses, seperti
+gunicorn --workers N. Dibandingkan: per worker (tanpa STATE_BERSAMA), sqlite,
+dan redis (bench/stub_redis.py, atau Redis asli lewat --redis).
+
+1. Kuota per menit: semua worker berebut coba_ambil() selama --detik. Batas
+   yang benar = rpm + rpm/60 × detik (token bucket); per worker → N× lipat.
+2. Kuota harian (rpd kecil): total yang diberikan harus tepat rpd.
+3. Cache OCR: worker 0 mengisi, worker lain membaca → hit lintas worker;
+   stats() yang dibaca semua worker di akhir harus sama (satu pandangan).
+4. Sesi validasi: semua worker mem-patch sesi yang sama → versi akhir harus
+   1 + jumlah patch (tidak ada patch yang hilang).
+5. Latensi p50 per operasi (ambil / simpan / tambah / ubah) dari satu worker.
+
+    python bench/bench_bersama.py
+    python bench/bench_bersama.py --worker 8 --detik 5 --redis redis://127.0.0.1:6379/15
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing as mp
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+for _k, _v in (('OCR_CACHE_PATH', ''), ('IMAGE_STORE_DIR', ''), ('KUOTA_PATH', ''), ('RIWAYAT_PATH', ''),
+               ('MIRIP_PATH', ''), ('PREPROCESS_PROSES', '0'), ('GEMINI_PEMANASAN', '0')):
+    os.environ.setdefault(_k, _v)
+
+from bersama import buat_bersama
+from suite import persentil
+
+
+def _kuota(url, prefiks, rpm, rpd, detik, mulai):
+    from quota import KuotaGemini
+    kuota = KuotaGemini(rpm=rpm, rpd=rpd, bersama=buat_bersama(url, prefiks))
+    while time.time() < mulai:
+        time.sleep(0.001)
+    dapat = 0
+    while time.time() < mulai + detik:
+        if kuota.coba_ambil(cadangan_token=0):
+            dapat += 1
+        else:
+            time.sleep(0.002)
+    return dapat, kuota.status()['harian_terpakai']
+
+
+def _cache(url, prefiks, indeks, n, mulai):
+    from ocr_cache import OcrCache
+    cache = OcrCache(None, bersama=buat_bersama(url, prefiks), setor_interval=0)
+    while time.time() < mulai:
+        time.sleep(0.001)
+    if indeks == 0:
+        for i in range(n):
+            cache.put(f'k{i}', {'kelompok': [{'nama': 'PESANAN', 'baris': [{'no': i, 'kg': 1.5}]}]})
+    else:
+        time.sleep(0.5)
+        for i in range(n):
+            cache.get(f'k{i}')
+    while time.time() < mulai + 3:   # semua worker membaca stats() setelah semuanya selesai
+        time.sleep(0.01)
+    return cache.stats()
+
+
+def _sesi(url, prefiks, token, n, mulai):
+    import app
+    from sesi_validasi import SesiTidakAda
+    # Proses pool dipakai ulang antar backend → pasang backend-nya langsung
+    app.sesi_validasi.bersama = buat_bersama(url, prefiks)
+    rng = random.Random(os.getpid())
+    while time.time() < mulai:
+        time.sleep(0.001)
+    ok = 0
+    for _ in range(n):
+        try:
+            app.sesi_validasi.patch(token, [{'kelompok': 0, 'baris': 0, 'field': 'kg',
+                                             'nilai': round(rng.uniform(50, 90), 1)}])
+            ok += 1
+        except SesiTidakAda:   # sesi ada di memori worker lain
+            pass
+    return ok
+
+
+def latensi(url, prefiks, ulang: int) -> dict:
+    b     = buat_bersama(url, prefiks)
+    nilai = os.urandom(2048)
+    ukur  = {
+        'ambil':  lambda: b.ambil('lat:a'),
+        'simpan': lambda: b.simpan('lat:a', nilai, ttl=60),
+        'tambah': lambda: b.tambah('lat:n'),
+        'ubah':   lambda: b.ubah('lat:u', lambda lama: (str(int(lama or 0) + 1).encode(), None)),
+    }
+    hasil = {}
+    for nama, fn in ukur.items():
+        ms = []
+        for _ in range(ulang):
+            t0 = time.perf_counter()
+            fn()
+            ms.append((time.perf_counter() - t0) * 1000)
+        hasil[nama] = persentil(sorted(ms), 50)
+    return hasil
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--worker', type=int, default=4)
+    ap.add_argument('--detik', type=float, default=3)
+    ap.add_argument('--rpm', type=int, default=600)
+    ap.add_argument('--rpd', type=int, default=150)
+    ap.add_argument('--cache', type=int, default=200)
+    ap.add_argument('--patch', type=int, default=50)
+    ap.add_argument('--ulang', type=int, default=500)
+    ap.add_argument('--redis', default=None, help='URL Redis asli (default: stub_redis lokal)')
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    if args.redis:
+        url_redis = args.redis
+    else:
+        import stub_redis
+        url_redis = f'redis://127.0.0.1:{stub_redis.jalankan().server_address[1]}/0'
+    backend = {'per worker': None, 'sqlite': f'sqlite:///{tmp}/bersama.sqlite3', 'redis': url_redis}
+
+    n     = args.worker
+    batas = args.rpm + args.rpm / 60 * args.detik
+    ctx   = mp.get_context('spawn')
+    print(f'{n} worker, kuota {args.rpm}/menit selama {args.detik:g} s → batas {batas:.0f}; '
+          f'rpd {args.rpd}; cache {args.cache} entri; {args.patch} patch/worker\n')
+    print(f'{"backend":<11} {"per menit":>10} {"harian":>14} {"hit lintas":>11} {"stats() beda":>13} '
+          f'{"versi sesi":>14}   p50 ms ambil/simpan/tambah/ubah')
+    with ctx.Pool(n) as pool:
+        for nama, url in backend.items():
+            prefiks = f'bench{random.randrange(1 << 30)}:'
+
+            mulai = time.time() + 1
+            dapat = pool.starmap(_kuota, [(url, prefiks + 'm', args.rpm, 10 ** 6, args.detik, mulai)] * n)
+            menit = sum(d for d, _ in dapat)
+
+            mulai  = time.time() + 1
+            harian = pool.starmap(_kuota, [(url, prefiks + 'h', 10 ** 6, args.rpd, 1, mulai)] * n)
+            harian = sum(d for d, _ in harian)
+
+            mulai = time.time() + 1
+            stats = pool.starmap(_cache, [(url, prefiks, i, args.cache, mulai) for i in range(n)])
+            # stats() dengan state bersama = total semua worker (tanpa: hit_bersama selalu 0)
+            lintas = stats[0]['hit_bersama'] / (args.cache * (n - 1)) if n > 1 else 0
+            rate   = {(s['hit_rate'], s['miss']) for s in stats}
+
+            from dokumen_sintetis import buat_dokumen
+            import app
+            app.sesi_validasi.bersama = buat_bersama(url, prefiks)
+            token, _ = app.sesi_validasi.buat(buat_dokumen(random.Random(0), 2, 10, p_salah=0), 2.0)
+            mulai    = time.time() + 1
+            ok       = sum(pool.starmap(_sesi, [(url, prefiks, token, args.patch, mulai)] * n))
+            versi    = app.sesi_validasi.checks(token)[0] if url else 1 + ok
+
+            lat = latensi(url or 'memori://', prefiks, args.ulang)
+            print(f'{nama:<11} {menit:>10} {f"{harian}/{args.rpd}":>14} {lintas:>10.0%} '
+                  f'{len(rate):>13} {f"{versi}/{1 + n * args.patch}":>14}   '
+                  + '/'.join(f'{v:.3f}' for v in lat.values()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Bandingkan preprocess_image sekarang (draft/DCT scaling + reduce) dengan
+jalur lama (decode penuh → LANCZOS) — waktu & peak RSS per foto.
+
+Setiap pengukuran berjalan di subprocess baru agar peak RSS tidak tercampur.
+
+    python bench/bench_decode.py                     # foto sintetis 12/24/48 MP
+    python bench/bench_decode.py --fixtures foto_do/ # foto asli
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+
+def preprocess_lama(image_bytes: bytes) -> bytes:
+    """Salinan jalur lama (sebelum draft/reduce) sebagai pembanding."""
+    from PIL import Image, ImageEnhance
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    MAX_WIDTH = 1600
+    w, h = img.size
+    if w > MAX_WIDTH:
+        scale = MAX_WIDTH / w
+        img = img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
+    img = ImageEnhance.Contrast(img).enhance(1.5)
+    img = ImageEnhance.Sharpness(img).enhance(1.8)
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG', quality=80, optimize=True)
+    return buf.getvalue()
+
+
+def _peak_rss_mb() -> float:
+    # Linux: VmHWM direset saat exec; ru_maxrss justru mewarisi puncak proses induk
+    try:
+        with open('/proc/self/status') as f:
+            for baris in f:
+                if baris.startswith('VmHWM:'):
+                    return int(baris.split()[1]) / 1024
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _anak(varian: str, path: str, ulang: int):
+    """Dijalankan di subprocess: ukur satu varian pada satu foto."""
+    from image_proc import preprocess_image
+    fn = preprocess_image if varian == 'baru' else preprocess_lama
+    with open(path, 'rb') as f:
+        data = f.read()
+    rss_awal = _peak_rss_mb()
+    waktu = []
+    for _ in range(ulang):
+        t0 = time.perf_counter()
+        out = fn(data)
+        waktu.append(time.perf_counter() - t0)
+    print(json.dumps({
+        'ms':         min(waktu) * 1000,
+        'peak_rss':   _peak_rss_mb(),
+        'delta_rss':  _peak_rss_mb() - rss_awal,
+        'bytes_out':  len(out),
+    }))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--fixtures', default=None)
+    ap.add_argument('--ulang', type=int, default=3)
+    ap.add_argument('--_anak', nargs=2, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._anak:
+        _anak(args._anak[0], args._anak[1], args.ulang)
+        return
+
+    from fixtures import muat_fixtures
+    fixtures = muat_fixtures(args.fixtures)
+
+    print(f'{"foto":<24} {"varian":<6} {"waktu":>9} {"peak RSS":>10} {"Δ RSS":>9} {"output":>9}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for nama, data in fixtures.items():
+            path = os.path.join(tmp, nama)
+            with open(path, 'wb') as f:
+                f.write(data)
+            hasil = {}
+            for varian in ('lama', 'baru'):
+                out = subprocess.run(
+                    [sys.executable, __file__, '--ulang', str(args.ulang), '--_anak', varian, path],
+                    capture_output=True, text=True, check=True,
+                )
+                r = hasil[varian] = json.loads(out.stdout)
+                print(f'{nama:<24} {varian:<6} {r["ms"]:7.0f}ms {r["peak_rss"]:8.0f}MB '
+                      f'{r["delta_rss"]:7.0f}MB {r["bytes_out"] / 1024:7.0f}KB')
+            print(f'{"":<24} {"rasio":<6} {hasil["lama"]["ms"] / hasil["baru"]["ms"]:8.1f}x '
+                  f'{hasil["lama"]["delta_rss"] / max(1.0, hasil["baru"]["delta_rss"]):9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
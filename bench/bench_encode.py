@@ -0,0 +1,221 @@
+"""
+Encode gambar ke Gemini (image_proc.encode_gambar): ukuran vs akurasi per
+varian — JPEG berwarna q80 (default), grayscale, WebP, dan anggaran byte
+(binary search quality/resolusi). Tujuannya memilih encoding TERKECIL yang
+tidak menurunkan tingkat lolos validate_do.
+
+Korpus foto DO asli (format sama dengan bench/ab_prompt.py: foto + opsional
+<nama>.benar.json). Respons Gemini per (foto, varian) direkam sekali ke
+<korpus>/rekaman_encode.jsonl, laporan berikutnya offline:
+
+    python bench/bench_encode.py KORPUS --rekam          # panggil Gemini asli (pakai kuota)
+    python bench/bench_encode.py KORPUS                  # laporan: bytes, token, lolos, akurasi
+
+Tanpa korpus: foto DO sintetis (fixtures.buat_foto_do), tanpa Gemini. Akurasi
+diganti proksi "fidelitas tinta": IoU peta tinta (Otsu) hasil decode vs
+referensi JPEG q95 berwarna di resolusi yang sama.
+
+    python bench/bench_encode.py
+    python bench/bench_encode.py --n 10 --target-kb 40 --target-kb 25
+"""
+import io
+import os
+import sys
+import json
+import base64
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+for _k, _v in (('OCR_CACHE_PATH', ''), ('IMAGE_STORE_DIR', ''), ('KUOTA_PATH', ''), ('RIWAYAT_PATH', ''),
+               ('MIRIP_PATH', ''), ('PREPROCESS_PROSES', '0'), ('GEMINI_PEMANASAN', '0')):
+    os.environ.setdefault(_k, _v)
+
+import numpy as np
+from PIL import Image
+
+from image_proc import preprocess_image_terukur, mime_gambar, _otsu
+from fixtures import buat_foto_do
+from bench_potong_tabel import token_gambar
+from ab_prompt import daftar_gambar, muat_benar, muat_rekaman, akurasi
+
+VARIAN = {
+    'jpeg-q80':      {},
+    'abu-q80':       {'abu': True},
+    'abu-q60':       {'abu': True, 'kualitas': 60},
+    'webp-q70':      {'format': 'webp', 'kualitas': 70},
+    'abu-webp-q60':  {'abu': True, 'format': 'webp', 'kualitas': 60},
+    'abu-60kb':      {'abu': True, 'target_bytes': 60 * 1024},
+    'abu-webp-40kb': {'abu': True, 'format': 'webp', 'target_bytes': 40 * 1024},
+}
+BASELINE = 'jpeg-q80'
+
+
+def daftar_varian(target_kb: list) -> dict:
+    varian = dict(VARIAN)
+    for kb in target_kb or []:
+        varian[f'abu-{kb:g}kb'] = {'abu': True, 'target_bytes': int(kb * 1024)}
+    return varian
+
+
+def encode(sumber, opsi: dict, potong: bool = True) -> tuple[bytes, dict, float]:
+    data, waktu, info = preprocess_image_terukur(sumber, potong, encode=opsi)
+    return data, info['encode'], waktu['encode'] * 1000
+
+
+def peta_tinta(data: bytes, ukuran: tuple | None = None) -> np.ndarray:
+    img = Image.open(io.BytesIO(data)).convert('L')
+    if ukuran and img.size != ukuran:
+        img = img.resize(ukuran, Image.BILINEAR)
+    a = np.asarray(img, dtype=np.uint8)
+    return a < _otsu(a)
+
+
+def pilih(ringkas: dict, kunci: str, ambang: float) -> str | None:
+    """Varian terkecil yang metrik `kunci`-nya tidak lebih buruk dari baseline − ambang."""
+    batas = ringkas[BASELINE][kunci] - ambang
+    cocok = [v for v, r in ringkas.items() if r[kunci] is not None and r[kunci] >= batas]
+    return min(cocok, key=lambda v: ringkas[v]['bytes']) if cocok else None
+
+
+# ══════════════════════════════════════════════════════════════════
+# SINTETIS — ukuran + fidelitas tinta, tanpa Gemini
+# ══════════════════════════════════════════════════════════════════
+def sintetis(args, varian: dict):
+    foto  = [buat_foto_do(args.mp, seed=s, n_baris=args.baris)[0] for s in range(args.n)]
+    hasil = {v: {'bytes': [], 'token': [], 'ms': [], 'fidelitas': [], 'kualitas': []} for v in varian}
+    for f in foto:
+        ref, _, _ = encode(f, {'kualitas': 95})
+        ref_tinta = peta_tinta(ref)
+        ukuran    = Image.open(io.BytesIO(ref)).size
+        for v, opsi in varian.items():
+            data, info, ms = encode(f, opsi)
+            tinta = peta_tinta(data, ukuran)
+            h = hasil[v]
+            h['bytes'].append(len(data))
+            h['token'].append(token_gambar(data))
+            h['ms'].append(ms)
+            h['fidelitas'].append((tinta & ref_tinta).sum() / max(1, (tinta | ref_tinta).sum()))
+            h['kualitas'].append(f'q{info["kualitas"]}/{info["lebar"]}px')
+
+    ringkas = {}
+    print(f'{"varian":<16} {"KB":>7} {"vs base":>8} {"token":>6} {"ms enc":>7} {"fidelitas":>10}  contoh')
+    for v, h in hasil.items():
+        r = ringkas[v] = {'bytes': statistics.mean(h['bytes']), 'fidelitas': statistics.mean(h['fidelitas'])}
+        base = statistics.mean(hasil[BASELINE]['bytes'])
+        print(f'{v:<16} {r["bytes"] / 1024:7.1f} {r["bytes"] / base - 1:+8.0%} '
+              f'{statistics.mean(h["token"]):6.0f} {statistics.median(h["ms"]):7.1f} '
+              f'{r["fidelitas"]:10.3f}  {h["kualitas"][0]}')
+    terpilih = pilih(ringkas, 'fidelitas', args.ambang)
+    print(f'\nterkecil dengan fidelitas ≥ baseline − {args.ambang}: {terpilih}  '
+          f'(proksi — konfirmasi dengan korpus asli + --rekam)')
+
+
+# ══════════════════════════════════════════════════════════════════
+# KORPUS — rekam respons Gemini per varian, laporan offline
+# ══════════════════════════════════════════════════════════════════
+def rekam(korpus: str, varian: dict, stub: bool):
+    import app as do_app
+    from quota import KuotaGemini
+    from stub_gemini import StubModel, CONTOH_RAW_DATA
+
+    path_rekaman = os.path.join(korpus, 'rekaman_encode.jsonl')
+    sudah = {(r['gambar'], r['varian']) for r in muat_rekaman(path_rekaman)}
+    kuota = KuotaGemini(rpm=int(os.getenv('GEMINI_RPM', 15)), max_tunggu=3600)
+
+    with open(path_rekaman, 'a') as out:
+        for path in daftar_gambar(korpus):
+            nama = os.path.basename(path)
+            for v, opsi in varian.items():
+                if (nama, v) in sudah:
+                    continue
+                data, _, _ = encode(path, opsi)
+                part = {'inline_data': {'mime_type': mime_gambar(data),
+                                        'data': base64.b64encode(data).decode()}}
+                if stub:
+                    model = StubModel(latensi=0, raw_data=muat_benar(path) or CONTOH_RAW_DATA)
+                else:
+                    kuota.ambil()
+                    model = do_app.model_ocr()
+                try:
+                    resp  = model.generate_content([part, do_app.PROMPT_OCR.tugas],
+                                                   request_options={'timeout': do_app.GEMINI_TIMEOUT})
+                    baris = {'teks': resp.text, 'token_input': resp.usage_metadata.prompt_token_count}
+                except Exception as e:
+                    baris = {'teks': '', 'error': f'{type(e).__name__}: {e}'}
+                baris.update(gambar=nama, varian=v, bytes=len(data), stub=stub)
+                out.write(json.dumps(baris) + '\n')
+                out.flush()
+                print(f'{nama:<30} {v:<16} {len(data) / 1024:7.1f} KB {baris.get("token_input", "-")!s:>6} in')
+
+
+def laporan(korpus: str, bandul: float, ambang: float):
+    from app import extract_json, validate_do
+
+    rekaman = muat_rekaman(os.path.join(korpus, 'rekaman_encode.jsonl'))
+    if not rekaman:
+        sys.exit('rekaman_encode.jsonl kosong — jalankan dulu dengan --rekam')
+    benar = {os.path.basename(p): muat_benar(p) for p in daftar_gambar(korpus)}
+
+    per_varian = {}
+    for r in rekaman:
+        per_varian.setdefault(r['varian'], []).append(r)
+    if BASELINE not in per_varian:
+        sys.exit(f'rekaman tidak memuat baseline {BASELINE}')
+
+    ringkas = {}
+    print(f'{"varian":<16} {"n":>4} {"KB":>7} {"token":>6} {"json":>6} {"lolos":>6} {"akurasi":>8}')
+    for v, daftar in per_varian.items():
+        valid, lolos, akur = 0, 0, []
+        for r in daftar:
+            try:
+                raw = extract_json(r['teks'])
+            except Exception:
+                continue
+            valid += 1
+            try:
+                lolos += validate_do(raw, bandul=bandul)['semua_benar']
+            except Exception:
+                pass
+            if benar.get(r['gambar']):
+                akur.append(akurasi(raw, benar[r['gambar']]))
+        n     = len(daftar)
+        token = [r['token_input'] for r in daftar if 'token_input' in r]
+        r = ringkas[v] = {'bytes': statistics.mean(r['bytes'] for r in daftar), 'lolos': lolos / n}
+        stub = ' (stub)' if any(x.get('stub') for x in daftar) else ''
+        print(f'{v:<16} {n:>4} {r["bytes"] / 1024:7.1f} {statistics.mean(token) if token else 0:6.0f} '
+              f'{valid / n:6.0%} {r["lolos"]:6.0%} '
+              f'{(f"{statistics.mean(akur):8.1%}" if akur else "       —")}{stub}')
+    print(f'\nterkecil dengan lolos validasi ≥ baseline − {ambang:.0%}: {pilih(ringkas, "lolos", ambang)}')
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('korpus', nargs='?', default=None)
+    ap.add_argument('--rekam', action='store_true')
+    ap.add_argument('--stub', action='store_true', help='rekam dengan stub (tanpa network)')
+    ap.add_argument('--target-kb', type=float, action='append', help='tambah varian grayscale + anggaran KB')
+    ap.add_argument('--ambang', type=float, default=0.0,
+                    help='penurunan lolos validasi / fidelitas yang masih diterima vs baseline')
+    ap.add_argument('--bandul', type=float, default=2.0)
+    ap.add_argument('--n', type=int, default=5, help='jumlah foto sintetis')
+    ap.add_argument('--mp', type=float, default=12)
+    ap.add_argument('--baris', type=int, default=15)
+    args = ap.parse_args()
+
+    varian = daftar_varian(args.target_kb)
+    if not args.korpus:
+        if args.ambang == 0.0:
+            args.ambang = 0.02
+        sintetis(args, varian)
+    elif args.rekam:
+        rekam(args.korpus, varian, args.stub)
+    else:
+        laporan(args.korpus, args.bandul, args.ambang)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Load test eksekusi Gemini paralel di bawah gevent, seperti worker produksi
+(gunicorn --worker-class gevent → monkey.patch_all).
+
+Stub model memblokir hub gevent selama latensinya (time.sleep ASLI, bukan
+versi gevent) — meniru panggilan gRPC/HTTP native google-generativeai yang
+tidak bisa di-yield. N greenlet memanggil model bersamaan, lewat tiga jalur:
+
+  langsung : generate_content dipanggil di greenlet (tanpa GeminiExecutor)
+             → hub beku, panggilan berjalan satu per satu, greenlet lain
+             (request lain, healthcheck) ikut berhenti.
+  executor : GeminiExecutor (threadpool hub, thread OS asli) dengan
+             max_paralel=1 dan max_paralel=N.
+
+Selain waktu total diukur "jeda hub maks": selisih terlama antara detak
+greenlet penanda (tiap 10 ms) — ≈ latensi × N jika hub terblokir.
+
+    python bench/bench_konkurensi.py --n 5 --latensi 1.0
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import os
+import sys
+import time
+import argparse
+
+import gevent
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gemini_exec import GeminiExecutor
+from stub_gemini import StubModel
+
+DETAK = 0.01
+
+
+def jalankan(n: int, latensi: float, max_paralel: int | None) -> tuple[float, float]:
+    """max_paralel None → jalur langsung. Return (detik total, jeda hub maks)."""
+    model = StubModel(latensi=latensi, tidur=monkey.get_original('time', 'sleep'))
+    if max_paralel is None:
+        panggil = lambda: model.generate_content(['gambar', 'prompt'])
+    else:
+        executor = GeminiExecutor(max_paralel=max_paralel)
+        panggil  = lambda: executor.generate(model, ['gambar', 'prompt'])
+
+    jeda, selesai = [0.0], [False]
+
+    def penanda():
+        t = time.perf_counter()
+        while not selesai[0]:
+            gevent.sleep(DETAK)
+            now     = time.perf_counter()
+            jeda[0] = max(jeda[0], now - t - DETAK)
+            t       = now
+
+    detak = gevent.spawn(penanda)
+    gevent.sleep(DETAK * 2)
+    t0 = time.perf_counter()
+    gevent.joinall([gevent.spawn(panggil) for _ in range(n)], raise_error=True)
+    total = time.perf_counter() - t0
+    selesai[0] = True
+    detak.join()
+    return total, jeda[0]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--n', type=int, default=5)
+    ap.add_argument('--latensi', type=float, default=1.0)
+    ap.add_argument('--max-paralel', type=int, default=None)
+    args = ap.parse_args()
+
+    max_paralel = args.max_paralel or args.n
+    hasil = {
+        'langsung (tanpa executor)':           jalankan(args.n, args.latensi, None),
+        'executor max_paralel=1':              jalankan(args.n, args.latensi, 1),
+        f'executor max_paralel={max_paralel}': jalankan(args.n, args.latensi, max_paralel),
+    }
+
+    print(f'{args.n} greenlet, latensi stub {args.latensi:.2f}s (memblokir hub), gevent monkey-patched')
+    print(f'  {"jalur":<32} {"total":>8} {"jeda hub maks":>14}')
+    for nama, (total, jeda) in hasil.items():
+        print(f'  {nama:<32} {total:7.2f}s {jeda:13.3f}s')
+
+    paralel, jeda = hasil[f'executor max_paralel={max_paralel}']
+    if paralel > args.latensi * 1.5 and max_paralel >= args.n:
+        sys.exit('GAGAL: request paralel tidak tumpang tindih')
+    if jeda > max(0.1, args.latensi / 4):
+        sys.exit('GAGAL: hub gevent terblokir selama panggilan Gemini')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Koreksi digit lokal (koreksi.py): seberapa sering salah baca digit yang
+disuntikkan ke dokumen sintetis bisa dipulihkan tanpa panggilan Gemini,
+dan berapa lama pencariannya.
+
+    python bench/bench_koreksi.py
+    python bench/bench_koreksi.py --n 500 --salah 2 --baris 30 --bruto-terra
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+for _k, _v in (('OCR_CACHE_PATH', ''), ('IMAGE_STORE_DIR', ''), ('KUOTA_PATH', ''), ('RIWAYAT_PATH', ''),
+               ('MIRIP_PATH', ''), ('PREPROCESS_PROSES', '0'), ('GEMINI_PEMANASAN', '0')):
+    os.environ.setdefault(_k, _v)
+
+from koreksi import alternatif, cari_koreksi
+from dokumen_sintetis import buat_dokumen
+from suite import persentil
+
+
+def suntik_salah(rng: random.Random, data: dict, n: int, p_ragu: float) -> set:
+    """Ganti n sel baris dengan alternatif salah baca. Return {(gi, ri, field, nilai_benar)}."""
+    sel = [(gi, ri, f) for gi, g in enumerate(data['kelompok'])
+           for ri in range(len(g['baris'])) for f in ('ekor', 'kg')]
+    hasil = set()
+    for gi, ri, f in rng.sample(sel, n):
+        r    = data['kelompok'][gi]['baris'][ri]
+        alts = alternatif(r[f], maks_digit=1)
+        if not alts:
+            continue
+        hasil.add((gi, ri, f, r[f]))
+        r[f] = rng.choice(alts)[0]
+        if rng.random() < p_ragu:
+            r['ragu'] = True
+    return hasil
+
+
+def main():
+    from app import validate_do
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--n', type=int, default=200)
+    ap.add_argument('--salah', type=int, default=1, help='jumlah sel salah baca per dokumen')
+    ap.add_argument('--kelompok', type=int, default=2)
+    ap.add_argument('--baris', type=int, default=15)
+    ap.add_argument('--bruto-terra', action='store_true')
+    ap.add_argument('--p-ragu', type=float, default=0.7, help='peluang sel salah ditandai ragu')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    ada, top1, top3, gagal_val, waktu = 0, 0, 0, 0, []
+    for _ in range(args.n):
+        data  = buat_dokumen(rng, args.kelompok, args.baris, args.bruto_terra, p_salah=0)
+        benar = suntik_salah(rng, data, args.salah, args.p_ragu)
+        if validate_do(data, bandul=2.0)['semua_benar']:
+            continue   # salah baca saling menutupi — tidak terdeteksi validasi
+        gagal_val += 1
+
+        t0    = time.perf_counter()
+        saran = cari_koreksi(data, validate_do, bandul=2.0)
+        waktu.append((time.perf_counter() - t0) * 1000)
+
+        target = {(gi, ri, f, v) for gi, ri, f, v in benar}
+        cocok  = [{(p['kelompok'], p['indeks_baris'], p['field'], p['ke']) for p in s['perubahan']} == target
+                  for s in saran]
+        ada  += bool(saran)
+        top1 += any(cocok[:1])
+        top3 += any(cocok[:3])
+
+    waktu.sort()
+    print(f'dokumen gagal validasi : {gagal_val}')
+    print(f'ada saran koreksi      : {ada / gagal_val:.1%}')
+    print(f'nilai benar di top-1   : {top1 / gagal_val:.1%}')
+    print(f'nilai benar di top-3   : {top3 / gagal_val:.1%}')
+    print(f'waktu p50 / p95 / maks : {persentil(waktu, 50):.1f} / {persentil(waktu, 95):.1f} / '
+          f'{waktu[-1]:.1f} ms   (rata-rata {statistics.mean(waktu):.1f} ms)')
+
+
+if __name__ == '__main__':
+    main()
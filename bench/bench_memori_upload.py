@@ -0,0 +1,96 @@
+"""
+Peak RSS saat banyak upload foto besar bersamaan ke /api/extract.
+
+Gemini diganti StubModel (tanpa network, tanpa kuota). Jalankan dua kali
+dengan anggaran berbeda untuk melihat efek UPLOAD_ANGGARAN_MEMORI_MB:
+
+    python bench/bench_memori_upload.py --n 8 --mp 24 --anggaran-mb 96
+    python bench/bench_memori_upload.py --n 8 --mp 24 --anggaran-mb 2048
+
+--batas-mb: keluar dengan status gagal jika peak RSS worker melebihi batas.
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+import threading
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+
+def _rss_mb(who) -> float:
+    rss = resource.getrusage(who).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--n', type=int, default=8, help='upload bersamaan')
+    ap.add_argument('--mp', type=float, default=24.0, help='megapiksel per foto')
+    ap.add_argument('--anggaran-mb', type=int, default=192)
+    ap.add_argument('--proses', type=int, default=2)
+    ap.add_argument('--batas-mb', type=float, default=None)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_upload_')
+    os.environ.update({
+        'GEMINI_API_KEY':            'stub',
+        'OCR_CACHE_PATH':            '',
+        'IMAGE_STORE_DIR':           '',
+        'KUOTA_PATH':                '',
+        'RIWAYAT_PATH':              '',
+        'MIRIP_PATH':                '',
+        'GEMINI_RPM':                '100000',
+        'GEMINI_MAX_PARALEL':        str(args.n),
+        'PREPROCESS_PROSES':         str(args.proses),
+        'UPLOAD_ANGGARAN_MEMORI_MB': str(args.anggaran_mb),
+        'UPLOAD_TMP_DIR':            tmp,
+    })
+
+    import app as do_app
+    from fixtures import buat_foto
+    from stub_gemini import StubModel
+
+    do_app.registri_model.model = lambda *a, **kw: StubModel(latensi=0.2)
+
+    foto = [buat_foto(args.mp, seed=i) for i in range(args.n)]
+    rss_awal = _rss_mb(resource.RUSAGE_SELF)
+    client   = do_app.app.test_client()
+    status   = []
+
+    def upload(data: bytes):
+        import io
+        r = client.post('/api/extract', data={'file': (io.BytesIO(data), 'do.jpg')},
+                        content_type='multipart/form-data')
+        status.append(r.status_code)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=upload, args=(f,)) for f in foto]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    durasi = time.perf_counter() - t0
+    do_app.preprocess_pool.tutup()
+
+    peak_self  = _rss_mb(resource.RUSAGE_SELF)
+    print(f'{args.n} upload × {args.mp:g} MP, anggaran {args.anggaran_mb} MB, '
+          f'{args.proses} proses preprocess')
+    print(f'  status           : {sorted(status)}')
+    print(f'  durasi           : {durasi:.2f}s')
+    print(f'  peak RSS worker  : {peak_self:.0f} MB (awal {rss_awal:.0f} MB, '
+          f'termasuk {sum(map(len, foto)) / 2**20:.0f} MB fixture di memori)')
+    print(f'  sisa file upload : {len(os.listdir(tmp))}')
+
+    if args.batas_mb and peak_self > args.batas_mb:
+        sys.exit(f'GAGAL: peak RSS worker {peak_self:.0f} MB > batas {args.batas_mb:.0f} MB')
+    if os.listdir(tmp):
+        sys.exit('GAGAL: file upload sementara tidak dibersihkan')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Indeks foto mirip (indeks_mirip.py + image_proc.sidik_gambar):
+
+1. Pemisahan: jarak phash & proporsi bit sel untuk foto ulang DO yang sama
+   (cahaya, geser, kompresi beda) vs DO lain berformat sama — dasar
+   MIRIP_SEL_MAKS (phash ditampilkan untuk perbandingan: tumpang tindih,
+   jadi tidak dipakai untuk mencocokkan). Biaya sidik_gambar per foto ikut diukur.
+2. Latensi cari() di indeks berisi N entri lewat bit sel (foto bergrid) vs
+   pindai linear; foto tanpa grid harus selalu 'baru'.
+
+    python bench/bench_mirip.py
+    python bench/bench_mirip.py --n 1000000 --foto 8
+"""
+import io
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from PIL import Image, ImageEnhance
+
+from image_proc import preprocess_image_terukur
+from indeks_mirip import IndeksMirip, jarak_sel
+from fixtures import buat_foto_do
+from suite import persentil
+
+
+def foto_ulang(data: bytes, rng: random.Random) -> bytes:
+    """Simulasi memotret ulang: cahaya, bingkai & kompresi sedikit berbeda."""
+    img = Image.open(io.BytesIO(data)).convert('RGB')
+    img = ImageEnhance.Brightness(img).enhance(rng.uniform(0.9, 1.1))
+    w, h = img.size
+    g = [rng.randint(0, int(w * 0.015)) for _ in range(4)]
+    img = img.crop((g[0], g[1], w - g[2], h - g[3]))
+    out = io.BytesIO()
+    img.save(out, 'JPEG', quality=rng.randint(70, 92))
+    return out.getvalue()
+
+
+def sidik(data: bytes) -> tuple[dict, float]:
+    _, waktu, info = preprocess_image_terukur(data, True, sidik=True)
+    return info['sidik'], waktu['sidik'] * 1000
+
+
+def pemisahan(args):
+    rng = random.Random(args.seed)
+    asli, ulang, ms = [], [], []
+    for s in range(args.foto):
+        data, _ = buat_foto_do(args.mp, seed=s)
+        a, t = sidik(data)
+        asli.append(a)
+        ms.append(t)
+        ulang.append([sidik(foto_ulang(data, rng))[0] for _ in range(args.ulang)])
+
+    def baris(nama, pasangan):
+        ph  = [(a['phash'] ^ b['phash']).bit_count() for a, b in pasangan]
+        sel = [d for d in (jarak_sel(a['sel'], b['sel']) for a, b in pasangan) if d is not None]
+        print(f'{nama:<18} {len(pasangan):>5} {min(ph):>5} {statistics.median(ph):>5.0f} {max(ph):>5}   '
+              + (f'{min(sel):.2f} {statistics.median(sel):.2f} {max(sel):.2f}  ({len(sel)} tergrid)'
+                 if sel else '—'))
+
+    print(f'sidik_gambar: {statistics.median(ms):.1f} ms/foto (median)\n')
+    print(f'{"pasangan":<18} {"n":>5} {"ph min":>6}{"med":>5} {"max":>5}   sel min / med / max')
+    baris('DO sama (foto ulang)', [(a, u) for a, us in zip(asli, ulang) for u in us])
+    baris('DO beda', [(asli[i], asli[j]) for i in range(len(asli)) for j in range(i + 1, len(asli))])
+
+
+def latensi(args):
+    """
+    Entri realistis: phash mengumpul di beberapa format DO (±6 bit dari
+    templat), bit sel 10×10 acak per DO. Kueri separuh foto ulang entri yang
+    ada (≤ 8 bit sel dibalik), separuh DO baru.
+    """
+    rng     = random.Random(args.seed)
+    indeks  = IndeksMirip(None)
+    templat = [rng.getrandbits(64) for _ in range(5)]
+
+    def acak_bit(kode: int, nbit: int, k: int) -> int:
+        for b in rng.sample(range(nbit), k):
+            kode ^= 1 << b
+        return kode
+
+    def sidik_acak() -> dict:
+        return {'phash': acak_bit(rng.choice(templat), 64, rng.randint(0, 6)),
+                'sel': {'baris': 10, 'kolom': 10, 'bit': rng.getrandbits(100)}}
+
+    entri = [sidik_acak() for _ in range(args.n)]
+    t0 = time.perf_counter()
+    for e in entri:
+        indeks.tambah(e, '')
+    isi = time.perf_counter() - t0
+
+    kueri = []
+    for _ in range(args.kueri):
+        if rng.random() < 0.5:
+            e = rng.choice(entri)
+            kueri.append({'phash': acak_bit(e['phash'], 64, rng.randint(0, 6)),
+                          'sel': dict(e['sel'], bit=acak_bit(e['sel']['bit'], 100, rng.randint(0, 8)))})
+        else:
+            kueri.append(sidik_acak())
+
+    def ukur(daftar: list) -> tuple[list, dict]:
+        ms, status = [], {}
+        for q in daftar:
+            t0 = time.perf_counter()
+            hasil = indeks.cari(q)
+            ms.append((time.perf_counter() - t0) * 1000)
+            k = hasil['status'] if hasil else 'baru'
+            status[k] = status.get(k, 0) + 1
+        return sorted(ms), status
+
+    linear = []
+    for q in kueri[:max(1, args.kueri // 20)]:
+        t0 = time.perf_counter()
+        min(jarak_sel(q['sel'], e['sel']) for e in entri)
+        linear.append((time.perf_counter() - t0) * 1000)
+    linear.sort()
+
+    print(f'\nindeks {args.n:,} entri (isi {isi:.1f} s), {args.kueri} kueri, '
+          f'separuh foto ulang / separuh DO baru')
+    for nama, daftar in (('dengan grid (sel)', kueri),
+                         ('tanpa grid', [{'phash': q['phash'], 'sel': None} for q in kueri])):
+        ms, status = ukur(daftar)
+        print(f'{nama:<20} p50 {persentil(ms, 50):7.3f} ms  p99 {persentil(ms, 99):7.3f} ms  {status}')
+    print(f'{"pindai linear (sel)":<20} p50 {persentil(linear, 50):7.3f} ms')
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--n', type=int, default=300000, help='jumlah entri indeks')
+    ap.add_argument('--kueri', type=int, default=2000)
+    ap.add_argument('--foto', type=int, default=6, help='jumlah DO sintetis untuk uji pemisahan')
+    ap.add_argument('--ulang', type=int, default=3, help='foto ulang per DO')
+    ap.add_argument('--mp', type=float, default=8)
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    pemisahan(args)
+    latensi(args)
+
+
+if __name__ == '__main__':
+    main()
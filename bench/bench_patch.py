@@ -0,0 +1,103 @@
+"""
+Koreksi manual: validasi ulang penuh (/api/validate, seluruh raw_data bolak-
+balik) vs patch dalam sesi validasi (/api/validate/patch, satu sel). Diukur
+ukuran request/respons, waktu endpoint, dan waktu hitung saja
+(validate_do vs SesiValidasi.patch) untuk dokumen kecil sampai besar.
+
+Edit bergantian membuat check gagal lalu lolos lagi: jalur penuh ikut
+menghitung saran koreksi lokal di respons yang sama, jalur patch tidak
+(diambil terpisah lewat /api/validate/saran). --tanpa-koreksi mematikannya.
+
+    python bench/bench_patch.py
+    python bench/bench_patch.py --kelompok 12 --baris 60 --ulang 200
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+for _k, _v in (('OCR_CACHE_PATH', ''), ('IMAGE_STORE_DIR', ''), ('KUOTA_PATH', ''), ('RIWAYAT_PATH', ''),
+               ('MIRIP_PATH', ''), ('PREPROCESS_PROSES', '0'), ('GEMINI_PEMANASAN', '0')):
+    os.environ.setdefault(_k, _v)
+
+from dokumen_sintetis import buat_dokumen
+from suite import persentil
+
+
+def ukur(args, n_kelompok: int, n_baris: int) -> dict:
+    import app
+
+    rng    = random.Random(args.seed)
+    data   = buat_dokumen(rng, n_kelompok, n_baris, p_salah=0)
+    bandul = 2.0
+    klien  = app.app.test_client()
+
+    res  = klien.post('/api/validate', json={'raw_data': data, 'bandul': bandul}).get_json()
+    sesi, versi = res['sesi'], res['versi']
+
+    hasil = {k: [] for k in ('penuh_ms', 'patch_ms', 'validate_do_ms', 'sesi_patch_ms')}
+    byte  = {k: [] for k in ('penuh_req', 'penuh_res', 'patch_req', 'patch_res')}
+    for u in range(args.ulang):
+        gi  = rng.randrange(n_kelompok)
+        bi  = rng.randrange(len(data['kelompok'][gi]['baris']))
+        row = data['kelompok'][gi]['baris'][bi]
+        row['kg'] = round(row['kg'] + (0.5 if u % 2 == 0 else -0.5), 1)
+
+        body = json.dumps({'raw_data': data, 'bandul': bandul})
+        t0   = time.perf_counter()
+        r    = klien.post('/api/validate', data=body, content_type='application/json')
+        hasil['penuh_ms'].append((time.perf_counter() - t0) * 1000)
+        byte['penuh_req'].append(len(body))
+        byte['penuh_res'].append(len(r.data))
+
+        body = json.dumps({'sesi': sesi, 'versi': versi,
+                           'patch': [{'kelompok': gi, 'baris': bi, 'field': 'kg', 'nilai': row['kg']}]})
+        t0   = time.perf_counter()
+        r    = klien.post('/api/validate/patch', data=body, content_type='application/json')
+        hasil['patch_ms'].append((time.perf_counter() - t0) * 1000)
+        versi = r.get_json()['versi']
+        byte['patch_req'].append(len(body))
+        byte['patch_res'].append(len(r.data))
+
+        # Hitung saja, tanpa HTTP / JSON / koreksi
+        t0 = time.perf_counter()
+        app.validate_do(data, bandul)
+        hasil['validate_do_ms'].append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        app.sesi_validasi.patch(sesi, [{'kelompok': gi, 'baris': bi, 'field': 'kg', 'nilai': row['kg']}])
+        hasil['sesi_patch_ms'].append((time.perf_counter() - t0) * 1000)
+        versi += 1
+
+    ringkas = {k: persentil(sorted(v), 50) for k, v in hasil.items()}
+    ringkas.update({k: sum(v) / len(v) for k, v in byte.items()})
+    return ringkas
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--kelompok', type=int, action='append', help='default: 2, 6, 12')
+    ap.add_argument('--baris', type=int, default=40)
+    ap.add_argument('--ulang', type=int, default=100)
+    ap.add_argument('--tanpa-koreksi', action='store_true')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+    if args.tanpa_koreksi:
+        os.environ['KOREKSI_LOKAL'] = '0'
+
+    print(f'{"dokumen":<16} {"req penuh":>10} {"req patch":>10} {"res penuh":>10} {"res patch":>10}'
+          f' {"ms penuh":>9} {"ms patch":>9} {"hitung penuh":>13} {"hitung patch":>13}')
+    for n in args.kelompok or [2, 6, 12]:
+        r = ukur(args, n, args.baris)
+        print(f'{f"{n} × {args.baris} baris":<16} {r["penuh_req"] / 1024:8.1f}KB {r["patch_req"]:9.0f}B '
+              f'{r["penuh_res"] / 1024:8.1f}KB {r["patch_res"] / 1024:8.1f}KB '
+              f'{r["penuh_ms"]:8.2f}  {r["patch_ms"]:8.2f}  {r["validate_do_ms"]:11.3f}ms {r["sesi_patch_ms"]:11.3f}ms')
+
+
+if __name__ == '__main__':
+    main()
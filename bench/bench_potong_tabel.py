@@ -0,0 +1,91 @@
+"""
+Potong area tabel sebelum OCR vs kirim foto utuh: ukuran payload, perkiraan
+token gambar Gemini, waktu preprocess, dan (foto sintetis) apakah area hasil
+deteksi menutup seluruh area yang benar.
+
+    python bench/bench_potong_tabel.py                     # foto DO sintetis 12 MP
+    python bench/bench_potong_tabel.py --fixtures foto_do/ # foto asli (tanpa cek cakupan)
+"""
+import io
+import os
+import sys
+import math
+import time
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from PIL import Image
+
+from image_proc import preprocess_image_terukur, deteksi_area_tabel
+from fixtures import buat_foto_do, muat_fixtures
+
+
+def token_gambar(jpeg: bytes) -> int:
+    """Perkiraan token gambar Gemini: 258 per ubin 768×768 (≤ 384px → 1 ubin)."""
+    w, h = Image.open(io.BytesIO(jpeg)).size
+    if w <= 384 and h <= 384:
+        return 258
+    return 258 * math.ceil(w / 768) * math.ceil(h / 768)
+
+
+def menutup(area: list, benar: tuple) -> bool:
+    x0, y0, x1, y1 = benar
+    return (min(a[0] for a in area) <= x0 and min(a[1] for a in area) <= y0
+            and max(a[2] for a in area) >= x1 and max(a[3] for a in area) >= y1)
+
+
+def ukur(data: bytes, potong: bool, ulang: int) -> tuple:
+    waktu = []
+    for _ in range(ulang):
+        t0 = time.perf_counter()
+        hasil, _, info = preprocess_image_terukur(data, potong)
+        waktu.append(time.perf_counter() - t0)
+    return hasil, info, statistics.median(waktu)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--fixtures', default=None)
+    ap.add_argument('--n', type=int, default=6, help='jumlah foto sintetis')
+    ap.add_argument('--mp', type=float, default=12)
+    ap.add_argument('--ulang', type=int, default=3)
+    args = ap.parse_args()
+
+    if args.fixtures:
+        foto = {nama: (d, None) for nama, d in muat_fixtures(args.fixtures).items()}
+    else:
+        foto = {f'do_sintetis_{i}': buat_foto_do(args.mp, seed=i, n_baris=5 + i * 3)
+                for i in range(args.n)}
+
+    print(f'{"foto":<20} {"utuh":>9} {"potong":>9} {"token":>11} {"ms utuh":>8} '
+          f'{"ms potong":>9} {"yakin":>6} {"cakup":>6}')
+    rasio_bytes, rasio_token = [], []
+    for nama, (data, benar) in foto.items():
+        utuh, _, t_utuh     = ukur(data, False, args.ulang)
+        kecil, info, t_kcl  = ukur(data, True, args.ulang)
+        tok_u, tok_p        = token_gambar(utuh), token_gambar(kecil)
+        cakup = '—'
+        if benar is not None:
+            img = Image.open(io.BytesIO(data))
+            if img.size[0] > 1600:
+                img.draft('RGB', (1600, int(img.size[1] * 1600 / img.size[0])))
+            img.load()
+            area, _ = deteksi_area_tabel(img)
+            s = img.size[0] / Image.open(io.BytesIO(data)).size[0]
+            cakup = 'ya' if area and menutup(area, tuple(int(v * s) for v in benar)) else 'TIDAK'
+        rasio_bytes.append(len(kecil) / len(utuh))
+        rasio_token.append(tok_p / tok_u)
+        print(f'{nama:<20} {len(utuh) / 1024:7.0f}KB {len(kecil) / 1024:7.0f}KB '
+              f'{tok_u:>5}→{tok_p:<5} {t_utuh * 1000:8.1f} {t_kcl * 1000:9.1f} '
+              f'{info["keyakinan"] or 0:6.2f} {cakup:>6}')
+
+    print(f'\nrata-rata payload potong/utuh : {statistics.mean(rasio_bytes):.0%}')
+    print(f'rata-rata token gambar       : {statistics.mean(rasio_token):.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Praproses foto di browser (templates/index.html, Web Worker) vs upload foto
+asli. Browser disimulasikan dengan PIL mengikuti langkah worker: kecilkan ke
+MAX_WIDTH, Contrast + Sharpness, encode format & quality server.
+
+Per foto diukur: ukuran upload, perkiraan waktu upload di jaringan lambat,
+waktu preprocess server (jalur penuh vs upload bertanda VERSI_KLIEN), byte
+yang dikirim ke Gemini, dan fidelitas tinta (F-score peta tinta Otsu,
+toleransi 1 px, pada pergeseran terbaik ±GESER px — potongan tabel kedua
+jalur bisa bergeser beberapa piksel) hasil jalur browser terhadap jalur
+server penuh.
+
+Foto HP asli: folder berisi *.jpg (--foto). Tanpa folder: foto DO sintetis
++ derau sensor, disimpan q95 seperti kamera HP.
+
+    python bench/bench_praproses_klien.py
+    python bench/bench_praproses_klien.py --foto korpus/ --mbps 0.5 --mbps 2
+"""
+import io
+import os
+import sys
+import glob
+import time
+import argparse
+import statistics
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageOps
+
+from image_proc import preprocess_image_terukur, MAX_WIDTH, KONTRAS, KETAJAMAN
+from bench_encode import peta_tinta
+from fixtures import buat_foto_do
+
+GESER = 4
+
+
+def foto_hp(mp: float, seed: int, derau: float) -> bytes:
+    """Foto DO sintetis + derau sensor, JPEG q95 (ukuran mendekati foto HP)."""
+    data, _ = buat_foto_do(mp, seed=seed)
+    a = np.asarray(Image.open(io.BytesIO(data)).convert('RGB'), dtype=np.float32)
+    a += np.random.default_rng(seed).normal(0, derau, a.shape).astype(np.float32)
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(a, 0, 255).astype(np.uint8)).save(buf, 'JPEG', quality=95)
+    return buf.getvalue()
+
+
+def normalisasi_browser(data: bytes, kualitas: int) -> bytes:
+    """Langkah yang sama dengan worker praproses di index.html."""
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(data))).convert('RGB')   # imageOrientation: from-image
+    if img.size[0] > MAX_WIDTH:
+        img = img.resize((MAX_WIDTH, round(img.size[1] * MAX_WIDTH / img.size[0])), Image.LANCZOS)
+    img = ImageEnhance.Sharpness(ImageEnhance.Contrast(img).enhance(KONTRAS)).enhance(KETAJAMAN)
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=kualitas)
+    return buf.getvalue()
+
+
+def _lebarkan(m: np.ndarray) -> np.ndarray:
+    """Dilasi 3×3."""
+    p = np.pad(m, 1)
+    return np.logical_or.reduce([p[1 + dy:p.shape[0] - 1 + dy, 1 + dx:p.shape[1] - 1 + dx]
+                                 for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+
+
+def fidelitas(ref: np.ndarray, uji: np.ndarray) -> float:
+    def f(a, b):
+        cocok = (a & _lebarkan(b)).sum() + (b & _lebarkan(a)).sum()
+        return cocok / max(1, a.sum() + b.sum())
+
+    h, w = ref.shape
+    return max(f(ref[max(0, dy):h + min(0, dy), max(0, dx):w + min(0, dx)],
+                 uji[max(0, -dy):h + min(0, -dy), max(0, -dx):w + min(0, -dx)])
+               for dy in range(-GESER, GESER + 1) for dx in range(-GESER, GESER + 1))
+
+
+def ukur(data: bytes, args) -> dict:
+    t0 = time.perf_counter()
+    server, _, _ = preprocess_image_terukur(data, args.potong)
+    ms_server = (time.perf_counter() - t0) * 1000
+
+    t0     = time.perf_counter()
+    unggah = normalisasi_browser(data, args.kualitas)
+    ms_klien = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    hasil, _, info = preprocess_image_terukur(unggah, args.potong, klien=True)
+    ms_server_klien = (time.perf_counter() - t0) * 1000
+
+    ref = peta_tinta(server)
+    uji = peta_tinta(hasil, ref.shape[::-1])
+    return {
+        'asli':            len(data),
+        'unggah':          len(unggah),
+        'gemini_asli':     len(server),
+        'gemini_klien':    len(hasil),
+        'ms_server':       ms_server,
+        'ms_server_klien': ms_server_klien,
+        'ms_klien_pil':    ms_klien,
+        'klien':           info['klien'],
+        'fidelitas':       fidelitas(ref, uji),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--foto', default=None, help='folder foto HP asli (*.jpg)')
+    ap.add_argument('--mp', type=float, action='append', help='megapiksel foto sintetis (default: 8, 12, 16)')
+    ap.add_argument('--derau', type=float, default=6.0)
+    ap.add_argument('--kualitas', type=int, default=80)
+    ap.add_argument('--mbps', type=float, action='append', help='bandwidth upload (default: 0.5, 2)')
+    ap.add_argument('--tanpa-potong', dest='potong', action='store_false')
+    args = ap.parse_args()
+
+    if args.foto:
+        foto = {os.path.basename(p): open(p, 'rb').read()
+                for p in sorted(glob.glob(os.path.join(args.foto, '*.jp*g')))}
+    else:
+        foto = {f'sintetis_{mp:g}mp': foto_hp(mp, i, args.derau) for i, mp in enumerate(args.mp or [8, 12, 16])}
+    mbps = args.mbps or [0.5, 2]
+
+    print(f'{"foto":<16} {"asli":>8} {"unggah":>8} {"rasio":>6} {"gemini asli/klien":>18} '
+          f'{"server ms penuh/klien":>22} {"pil ms":>7} {"fidelitas":>9}  server')
+    semua = []
+    for nama, data in foto.items():
+        r = ukur(data, args)
+        semua.append(r)
+        print(f'{nama:<16} {r["asli"] / 1024:6.0f}KB {r["unggah"] / 1024:6.0f}KB {r["asli"] / r["unggah"]:5.1f}x '
+              f'{r["gemini_asli"] / 1024:8.0f}/{r["gemini_klien"] / 1024:.0f} KB '
+              f'{r["ms_server"]:14.0f}/{r["ms_server_klien"]:<7.0f} {r["ms_klien_pil"]:7.0f} '
+              f'{r["fidelitas"]:9.3f}  {r["klien"]}')
+
+    asli   = statistics.mean(r['asli'] for r in semua)
+    unggah = statistics.mean(r['unggah'] for r in semua)
+    print()
+    for m in mbps:
+        print(f'upload di {m:g} Mbps: {asli * 8 / (m * 1e6):6.1f} s → {unggah * 8 / (m * 1e6):5.1f} s per foto')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Latensi request "user lain" selama beberapa foto besar sedang dipreprocess,
+di bawah gevent seperti worker produksi (gunicorn --worker-class gevent →
+monkey.patch_all).
+
+K greenlet menjalankan preprocess foto besar (path file sementara, seperti
+preprocess_upload), sementara greenlet penanda berdetak tiap 10 ms dan
+greenlet lain mengukur latensi tugas ringan (mewakili request user lain).
+Dibandingkan: preprocess inline (di worker → hub beku selama Pillow bekerja)
+vs lewat PreprocessPool. "jeda hub maks" = selisih terlama antar detak.
+
+    python bench/bench_preprocess_pool.py --foto 4 --mp 24
+"""
+from gevent import monkey
+monkey.patch_all()
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+import gevent
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from image_proc import PreprocessPool
+from fixtures import buat_foto
+
+DETAK = 0.01
+
+
+def skenario(nama: str, pool: PreprocessPool, foto: list[str]) -> float:
+    """Return jeda hub maks (detik)."""
+    selesai, jeda, latensi = [False], [0.0], []
+
+    def penanda():
+        t = time.perf_counter()
+        while not selesai[0]:
+            gevent.sleep(DETAK)
+            now     = time.perf_counter()
+            jeda[0] = max(jeda[0], now - t - DETAK)
+            t       = now
+
+    def user_lain():
+        """Tugas ringan (~1 ms CPU) berulang; catat latensinya termasuk menunggu hub."""
+        while not selesai[0]:
+            t0 = time.perf_counter()
+            gevent.sleep(0.005)
+            sum(i * i for i in range(20000))
+            latensi.append((time.perf_counter() - t0 - 0.005) * 1000)
+
+    latar = [gevent.spawn(penanda), gevent.spawn(user_lain)]
+    gevent.sleep(DETAK * 2)
+    t0 = time.perf_counter()
+    gevent.joinall([gevent.spawn(pool.preprocess, f) for f in foto], raise_error=True)
+    total = time.perf_counter() - t0
+    selesai[0] = True
+    gevent.joinall(latar)
+
+    q = statistics.quantiles(latensi, n=100, method='inclusive') if len(latensi) > 1 else [latensi[0]] * 99
+    print(f'{nama:<10} preprocess {len(foto)} foto: {total:6.2f}s | jeda hub maks {jeda[0]:6.3f}s | '
+          f'latensi user lain p50={q[49]:6.1f}ms p95={q[94]:6.1f}ms max={max(latensi):6.1f}ms '
+          f'(n={len(latensi)})')
+    return jeda[0]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--foto', type=int, default=4)
+    ap.add_argument('--mp', type=float, default=24.0, help='megapiksel per foto')
+    ap.add_argument('--proses', type=int, default=2)
+    args = ap.parse_args()
+
+    # Seperti upload di app: foto di-spool ke file, pool hanya menerima path
+    tmp  = tempfile.mkdtemp()
+    foto = []
+    for i in range(args.foto):
+        path = os.path.join(tmp, f'foto{i}.jpg')
+        with open(path, 'wb') as f:
+            f.write(buat_foto(args.mp, seed=i))
+        foto.append(path)
+
+    try:
+        inline = skenario('inline', PreprocessPool(max_proses=0), foto)
+        pool = PreprocessPool(max_proses=args.proses)
+        pool.preprocess(foto[0])   # pemanasan: spawn proses anak
+        lewat_pool = skenario('pool', pool, foto)
+        pool.tutup()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if lewat_pool >= inline:
+        sys.exit(f'GAGAL: pool tidak mengurangi jeda hub ({lewat_pool:.3f}s vs inline {inline:.3f}s)')
+
+
+if __name__ == '__main__':
+    main()
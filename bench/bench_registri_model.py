@@ -0,0 +1,95 @@
+"""
+Biaya menyiapkan model Gemini per request vs registri model per worker.
+
+Offline (default): mengukur bagian yang terjadi di jalur request sebelum
+byte pertama dikirim — konstruksi GenerativeModel dan pembuatan client
+(channel) pertama setelah configure/fork. Tanpa network.
+
+    python bench/bench_registri_model.py --ulang 2000
+
+--live (butuh GEMINI_API_KEY asli, memakai kuota count_tokens, bukan
+generate): TTFB count_tokens pertama tanpa pemanasan vs setelah pemanasan.
+
+    python bench/bench_registri_model.py --live
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+from gemini_exec import RegistriModel
+
+MODEL = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash')
+
+
+def ms(detik: float) -> str:
+    return f'{detik * 1000:8.3f} ms'
+
+
+def offline(ulang: int):
+    genai.configure(api_key='bench')
+
+    # Client pertama: channel dibuat saat panggilan pertama di proses ini
+    t0 = time.perf_counter()
+    genai_client.get_default_generative_client()
+    t_client = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(ulang):
+        genai.GenerativeModel(MODEL)
+    t_per_request = (time.perf_counter() - t0) / ulang
+
+    registri = RegistriModel('bench', MODEL)
+    registri.model()
+    t0 = time.perf_counter()
+    for _ in range(ulang):
+        registri.model()
+    t_registri = (time.perf_counter() - t0) / ulang
+
+    print(f'client pertama (sekali per worker)       : {ms(t_client)}')
+    print(f'GenerativeModel() per request            : {ms(t_per_request)}')
+    print(f'registri.model() per request             : {ms(t_registri)}')
+    print('→ konstruksi model murah; yang mahal adalah client/koneksi pertama '
+          '(+ TLS saat online), dan itu kini dibayar pemanasan, bukan OCR pertama')
+
+
+def live():
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        sys.exit('--live butuh GEMINI_API_KEY')
+
+    def ttfb(registri: RegistriModel) -> float:
+        t0 = time.perf_counter()
+        registri.model().count_tokens('ping', request_options={'timeout': 30})
+        return time.perf_counter() - t0
+
+    dingin = RegistriModel(api_key, MODEL)
+    t_dingin = ttfb(dingin)
+    t_kedua  = ttfb(dingin)
+
+    # RegistriModel baru → genai.configure ulang → client & koneksi baru (seperti worker baru)
+    panas = RegistriModel(api_key, MODEL)
+    hasil = panas.pemanasan()
+    t_panas = ttfb(panas)
+
+    print(f'panggilan pertama tanpa pemanasan        : {ms(t_dingin)}')
+    print(f'panggilan kedua (koneksi sudah terbuka)  : {ms(t_kedua)}')
+    print(f'pemanasan (di luar jalur request)        : {ms(hasil["detik"])}  ok={hasil["ok"]}')
+    print(f'panggilan pertama setelah pemanasan      : {ms(t_panas)}')
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--ulang', type=int, default=2000)
+    ap.add_argument('--live', action='store_true')
+    args = ap.parse_args()
+    live() if args.live else offline(args.ulang)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Respons /api/validate (respons.py + mode ringkas):
+
+1. Ukuran payload: respons lengkap (gema kelompok/ringkasan_atas + teks
+   rincian/kesimpulan + nilai_list) vs ringkas, tanpa kompresi / gzip / br.
+2. Waktu serialisasi: json bawaan Flask (sort_keys) vs orjson, dan biaya
+   kompresi gzip / brotli untuk payload yang sama.
+3. Waktu endpoint end-to-end lewat test client untuk kombinasi di atas.
+
+brotli dilewati jika modulnya tidak terpasang.
+
+    python bench/bench_respons.py
+    python bench/bench_respons.py --kelompok 12 --baris 100 --ulang 300
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import random
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+for _k, _v in (('OCR_CACHE_PATH', ''), ('IMAGE_STORE_DIR', ''), ('KUOTA_PATH', ''), ('RIWAYAT_PATH', ''),
+               ('MIRIP_PATH', ''), ('PREPROCESS_PROSES', '0'), ('GEMINI_PEMANASAN', '0')):
+    os.environ.setdefault(_k, _v)
+
+from flask.json.provider import DefaultJSONProvider
+
+from dokumen_sintetis import buat_dokumen
+from suite import persentil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def waktu(fn, ulang: int) -> float:
+    """p50 dalam ms."""
+    ms = []
+    for _ in range(ulang):
+        t0 = time.perf_counter()
+        fn()
+        ms.append((time.perf_counter() - t0) * 1000)
+    return persentil(sorted(ms), 50)
+
+
+def ukur(args, n_kelompok: int) -> dict:
+    import app
+    from respons import PenyediaJSONCepat
+
+    rng    = random.Random(args.seed)
+    data   = buat_dokumen(rng, n_kelompok, args.baris, p_salah=0.2)
+    result = app.validate_do(data, 2.0, rinci=False)
+    bawaan = DefaultJSONProvider(app.app)
+    cepat  = PenyediaJSONCepat(app.app)
+
+    r = {}
+    for mode, ringkas in (('lengkap', False), ('ringkas', True)):
+        obj  = {'success': True, 'result': app.bentuk_hasil(result, ringkas), 'sesi': 'x' * 16, 'versi': 1}
+        teks = bawaan.dumps(obj).encode()
+        r[f'{mode}_byte']      = len(teks)
+        r[f'{mode}_gzip_byte'] = len(zlib.compress(teks, 6))
+        r[f'{mode}_bentuk_ms'] = waktu(lambda: app.bentuk_hasil(result, ringkas), args.ulang)
+        r[f'{mode}_json_ms']   = waktu(lambda: bawaan.dumps(obj), args.ulang)
+        r[f'{mode}_orjson_ms'] = waktu(lambda: cepat._bytes(obj), args.ulang)
+        r[f'{mode}_gzip_ms']   = waktu(lambda: zlib.compress(teks, 6), args.ulang)
+        if brotli:
+            r[f'{mode}_br_byte'] = len(brotli.compress(teks, quality=5))
+            r[f'{mode}_br_ms']   = waktu(lambda: brotli.compress(teks, quality=5), args.ulang)
+
+    # End-to-end: body request sama, Accept-Encoding & "ringkas" berbeda
+    klien = app.app.test_client()
+    for mode, ringkas, enc in (('lengkap', False, 'identity'), ('ringkas', True, 'identity'),
+                               ('ringkas', True, 'gzip'), ('ringkas', True, 'br')):
+        if enc == 'br' and not brotli:
+            continue
+        body = json.dumps({'raw_data': data, 'bandul': 2.0, 'ringkas': ringkas})
+        r[f'e2e_{mode}_{enc}_ms'] = waktu(
+            lambda: klien.post('/api/validate', data=body, content_type='application/json',
+                               headers={'Accept-Encoding': enc}),
+            max(1, args.ulang // 5),
+        )
+    return r
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--kelompok', type=int, action='append', help='default: 2, 6, 12')
+    ap.add_argument('--baris', type=int, default=40)
+    ap.add_argument('--ulang', type=int, default=200)
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+    os.environ['KOREKSI_LOKAL'] = '0'   # saran koreksi tidak diukur di sini
+
+    encs = ['gzip'] + (['br'] if brotli else [])
+    for n in args.kelompok or [2, 6, 12]:
+        r = ukur(args, n)
+        print(f'\n── {n} kelompok × {args.baris} baris ──')
+        print(f'{"":<9} {"mentah":>9}' + ''.join(f' {e:>9}' for e in encs)
+              + f' {"bentuk":>8} {"json":>8} {"orjson":>8}' + ''.join(f' {e + " ms":>8}' for e in encs))
+        for mode in ('lengkap', 'ringkas'):
+            print(f'{mode:<9} {r[f"{mode}_byte"] / 1024:7.1f}KB'
+                  + ''.join(f' {r[f"{mode}_{e}_byte"] / 1024:7.1f}KB' for e in encs)
+                  + f' {r[f"{mode}_bentuk_ms"]:8.3f} {r[f"{mode}_json_ms"]:8.3f} {r[f"{mode}_orjson_ms"]:8.3f}'
+                  + ''.join(f' {r[f"{mode}_{e}_ms"]:8.3f}' for e in encs))
+        print('endpoint : ' + ', '.join(f'{k[4:-3].replace("_", "/")} {v:.2f} ms'
+                                        for k, v in r.items() if k.startswith('e2e_')))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Retry terarah (potongan sel) vs retry penuh (foto utuh + prompt lengkap):
+ukuran gambar, perkiraan token input Gemini, dan waktu potong, untuk beberapa
+skenario check gagal pada foto DO sintetis.
+
+    python bench/bench_retry_terarah.py
+    python bench/bench_retry_terarah.py --baris 25 --mp 12
+"""
+import os
+import sys
+import time
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+for _k, _v in (('OCR_CACHE_PATH', ''), ('IMAGE_STORE_DIR', ''), ('KUOTA_PATH', ''), ('RIWAYAT_PATH', ''),
+               ('MIRIP_PATH', ''), ('PREPROCESS_PROSES', '0'), ('GEMINI_PEMANASAN', '0')):
+    os.environ.setdefault(_k, _v)
+
+from image_proc import preprocess_image, potong_sel
+from prompts import prompt_sel
+from fixtures import buat_foto_do
+from stub_gemini import estimasi_token
+from bench_potong_tabel import token_gambar
+
+
+def dokumen(n_baris: int) -> dict:
+    """raw_data yang konsisten (semua check lolos) untuk tabel PESANAN | REALISASI."""
+    kelompok = []
+    for nama, posisi in (('PESANAN', 'kiri'), ('REALISASI', 'kanan')):
+        baris = [{'no': i, 'ekor': 30, 'kg': 80.0 + i} for i in range(1, n_baris + 1)]
+        kelompok.append({
+            'nama': nama, 'posisi': posisi, 'baris': baris,
+            'tertulis_total_ekor': 30 * n_baris, 'tertulis_bruto_kg': None, 'tertulis_terra_kg': None,
+            'tertulis_netto_kg': round(sum(r['kg'] for r in baris), 2),
+        })
+    ekor = sum(g['tertulis_total_ekor'] for g in kelompok)
+    kg   = round(sum(g['tertulis_netto_kg'] for g in kelompok), 2)
+    return {'kelompok': kelompok, 'ringkasan_atas': {
+        'tertulis_realisasi_ekor': ekor, 'tertulis_realisasi_kg': kg,
+        'tertulis_rata_rata': round(kg / ekor, 2),
+    }}
+
+
+def skenario(n_baris: int) -> dict:
+    hasil = {}
+
+    d = dokumen(n_baris)
+    d['kelompok'][1]['baris'][2]['kg'] += 10
+    hasil['netto_realisasi'] = d
+
+    d = dokumen(n_baris)
+    d['kelompok'][0]['baris'][1]['ragu'] = True
+    d['kelompok'][1]['baris'][4 % n_baris]['ragu'] = True
+    hasil['2_baris_ragu'] = d
+
+    d = dokumen(n_baris)
+    d['ringkasan_atas']['tertulis_realisasi_ekor'] += 1
+    hasil['realisasi_ekor'] = d
+    return hasil
+
+
+def main():
+    import app as do_app
+    from prompts import ambil_prompt
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--baris', type=int, default=15)
+    ap.add_argument('--mp', type=float, default=12)
+    args = ap.parse_args()
+
+    foto, _ = buat_foto_do(args.mp, n_baris=args.baris)
+    utuh    = preprocess_image(foto)
+    prompt  = ambil_prompt(None)
+    n_grp   = 2
+
+    print(f'{"skenario":<18} {"sel":>4} {"gambar":>15} {"token input":>15} {"ms potong":>10}')
+    for nama, raw in skenario(args.baris).items():
+        gagal = [c for c in do_app.validate_do(raw, bandul=2.0)['checks'] if not c['ok']]
+        sel   = do_app.sel_retry(raw, gagal)
+        t0    = time.perf_counter()
+        kecil = potong_sel(utuh, *do_app.potongan_retry(sel, n_grp))
+        kecil = kecil if kecil and len(kecil) < len(utuh) else utuh
+        ms    = (time.perf_counter() - t0) * 1000
+
+        tok_penuh = (token_gambar(utuh) + estimasi_token(prompt.sistem)
+                     + estimasi_token(prompt.retry(gagal)))
+        tok_sel   = (token_gambar(kecil) + estimasi_token(prompt.sistem)
+                     + estimasi_token(prompt_sel(sel, gagal)))
+        print(f'{nama:<18} {len(sel):>4} {len(utuh) / 1024:6.0f}→{len(kecil) / 1024:<5.0f}KB '
+              f'{tok_penuh:>7}→{tok_sel:<7} {ms:10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Riwayat DO (riwayat.py): biaya simpan() di jalur request, throughput tulis
+batch, ukuran per dokumen vs JSON hasil validate_do apa adanya, dan latensi
+/api/history (halaman pertama & halaman jauh lewat cursor) per filter.
+
+    python bench/bench_riwayat.py
+    python bench/bench_riwayat.py --n 2000000 --db /tmp/riwayat.sqlite3 --pakai-ulang
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+for _k, _v in (('OCR_CACHE_PATH', ''), ('IMAGE_STORE_DIR', ''), ('KUOTA_PATH', ''), ('RIWAYAT_PATH', ''),
+               ('MIRIP_PATH', ''), ('PREPROCESS_PROSES', '0'), ('GEMINI_PEMANASAN', '0')):
+    os.environ.setdefault(_k, _v)
+
+from riwayat import RiwayatDO
+from dokumen_sintetis import buat_arsip
+from suite import persentil
+
+
+def isi(riwayat: RiwayatDO, n: int, seed: int) -> dict:
+    from app import validate_do
+
+    contoh = [(d, validate_do(d, bandul=2.0)) for d in buat_arsip(500, seed=seed)]
+    verbose = sum(len(json.dumps({'raw_data': d, 'result': h})) for d, h in contoh) / len(contoh)
+
+    rng, simpan = random.Random(seed), []
+    t0 = time.perf_counter()
+    for _ in range(n):
+        d, h = contoh[rng.randrange(len(contoh))]
+        s0 = time.perf_counter()
+        riwayat.simpan(d, h, 2.0)
+        simpan.append((time.perf_counter() - s0) * 1e6)
+    riwayat.flush()
+    total = time.perf_counter() - t0
+
+    # Sebar waktu ±1 tahun ke belakang agar filter tanggal bermakna (id tetap searah waktu)
+    conn = riwayat._conn()
+    akhir = time.time()
+    conn.execute('UPDATE dokumen SET waktu = ? - (? - id) * ?', (akhir, n, 365 * 86400 / max(1, n)))
+    conn.close()
+
+    simpan.sort()
+    return {'verbose': verbose, 'total': total, 'simpan_p50': persentil(simpan, 50),
+            'simpan_p99': persentil(simpan, 99)}
+
+
+def ukur(riwayat: RiwayatDO, ulang: int, **filter_) -> tuple:
+    pertama, jauh = [], []
+    for _ in range(ulang):
+        t0  = time.perf_counter()
+        hal = riwayat.cari(limit=50, **filter_)
+        pertama.append((time.perf_counter() - t0) * 1000)
+    # Halaman jauh: lompat 20 halaman lewat cursor, ukur halaman terakhir
+    cursor = None
+    for _ in range(20):
+        hal = riwayat.cari(limit=50, cursor=cursor, **filter_)
+        cursor = hal['cursor']
+        if cursor is None:
+            break
+    for _ in range(ulang):
+        t0 = time.perf_counter()
+        riwayat.cari(limit=50, cursor=cursor, **filter_)
+        jauh.append((time.perf_counter() - t0) * 1000)
+    return persentil(sorted(pertama), 50), persentil(sorted(jauh), 50), len(hal['items'])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--n', type=int, default=200000)
+    ap.add_argument('--db', default=None, help='path SQLite (default: file sementara)')
+    ap.add_argument('--pakai-ulang', action='store_true', help='db sudah terisi: lewati pengisian')
+    ap.add_argument('--batch', type=int, default=500)
+    ap.add_argument('--ulang', type=int, default=20)
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    path    = args.db or os.path.join(tempfile.mkdtemp(), 'riwayat.sqlite3')
+    riwayat = RiwayatDO(path, ukuran_batch=args.batch, max_antrian=args.n + 1)
+    n       = riwayat._conn().execute('SELECT COUNT(*) FROM dokumen').fetchone()[0]
+
+    if not (args.pakai_ulang and n):
+        r = isi(riwayat, args.n, args.seed)
+        n = args.n
+        ukuran = os.path.getsize(path) / n
+        print(f'dokumen               : {n:,}')
+        print(f'simpan() p50 / p99    : {r["simpan_p50"]:.1f} / {r["simpan_p99"]:.1f} µs (jalur request)')
+        print(f'tulis batch           : {n / r["total"]:,.0f} dokumen/detik')
+        print(f'ukuran per dokumen    : {ukuran:,.0f} B di SQLite vs {r["verbose"]:,.0f} B JSON verbose '
+              f'({ukuran / r["verbose"]:.0%})')
+
+    sekarang = time.time()
+    kasus = {
+        'tanpa filter':            {},
+        'status salah':            {'semua_benar': False},
+        'kategori Baris Netto':    {'kategori': 'Baris Netto'},
+        'kelompok + status':       {'kelompok': 'KELOMPOK3', 'semua_benar': False},
+        'tanggal (1 minggu lalu)': {'dari': sekarang - 14 * 86400, 'sampai': sekarang - 7 * 86400},
+        'tanggal + kategori':      {'dari': sekarang - 200 * 86400, 'sampai': sekarang - 100 * 86400,
+                                    'kategori': 'Baris Netto'},
+    }
+    print(f'\n{"filter":<26} {"hal. 1":>9} {"hal. 21":>9}  baris')
+    for nama, f in kasus.items():
+        a, b, k = ukur(riwayat, args.ulang, **f)
+        print(f'{nama:<26} {a:7.2f}ms {b:7.2f}ms  {k}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Streaming OCR (GeminiExecutor.generate_stream + json_stream.PenguraiKelompok)
+vs panggilan biasa: kapan kelompok pertama bisa ditampilkan dibanding kapan
+dokumen utuh selesai, plus biaya CPU penguraian bertahap vs json.loads sekali.
+
+    python bench/bench_stream.py
+    python bench/bench_stream.py --latensi 8 --kelompok 3 --baris 20 --potongan 30
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+for _k, _v in (('OCR_CACHE_PATH', ''), ('IMAGE_STORE_DIR', ''), ('KUOTA_PATH', ''), ('RIWAYAT_PATH', ''),
+               ('MIRIP_PATH', ''), ('PREPROCESS_PROSES', '0'), ('GEMINI_PEMANASAN', '0')):
+    os.environ.setdefault(_k, _v)
+
+from gemini_exec import GeminiExecutor
+from json_stream import PenguraiKelompok
+from stub_gemini import StubModel
+from dokumen_sintetis import buat_dokumen
+from suite import persentil
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--n', type=int, default=10)
+    ap.add_argument('--latensi', type=float, default=1.0, help='durasi total jawaban stub (detik)')
+    ap.add_argument('--kelompok', type=int, default=2)
+    ap.add_argument('--baris', type=int, default=15)
+    ap.add_argument('--potongan', type=int, default=20, help='jumlah chunk per jawaban')
+    ap.add_argument('--seed', type=int, default=0)
+    args = ap.parse_args()
+
+    rng    = random.Random(args.seed)
+    exe    = GeminiExecutor(max_paralel=2)
+    konten = [{'inline_data': {'mime_type': 'image/jpeg', 'data': ''}}, 'tugas']
+    biasa, pertama, utuh, cpu_urai, cpu_loads = [], [], [], [], []
+
+    for _ in range(args.n):
+        data = buat_dokumen(rng, args.kelompok, args.baris, p_salah=0)
+        stub = StubModel(latensi=args.latensi, raw_data=data, n_potongan=args.potongan)
+
+        t0 = time.perf_counter()
+        json.loads(exe.generate(stub, konten).text)
+        biasa.append(time.perf_counter() - t0)
+
+        urai, t_pertama, cpu = PenguraiKelompok(), None, 0.0
+        t0 = time.perf_counter()
+        _, potongan = exe.generate_stream(stub, konten)
+        for teks in potongan:
+            c0 = time.perf_counter()
+            keluar = urai.tambah(teks)
+            cpu += time.perf_counter() - c0
+            if keluar and t_pertama is None:
+                t_pertama = time.perf_counter() - t0
+        utuh.append(time.perf_counter() - t0)
+        pertama.append(t_pertama)
+        cpu_urai.append(cpu * 1000)
+
+        c0 = time.perf_counter()
+        json.loads(urai.teks)
+        cpu_loads.append((time.perf_counter() - c0) * 1000)
+
+    print(f'{"":<26} {"p50":>8} {"p95":>8}')
+    for nama, data, satuan in (('biasa: dokumen utuh', biasa, 's'),
+                               ('stream: kelompok pertama', pertama, 's'),
+                               ('stream: dokumen utuh', utuh, 's'),
+                               ('CPU urai bertahap', cpu_urai, 'ms'),
+                               ('CPU json.loads sekali', cpu_loads, 'ms')):
+        data = sorted(data)
+        print(f'{nama:<26} {persentil(data, 50):7.3f}{satuan} {persentil(data, 95):7.3f}{satuan}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Re-validasi arsip DO: validate_do per dokumen vs validasi_massal (NumPy).
+
+Memverifikasi hasilnya setara (urutan id check, hitung, selisih, ok)
+lalu membandingkan throughput.
+
+    python bench/bench_validasi_massal.py --n 20000
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault('GEMINI_API_KEY', 'stub')
+os.environ.setdefault('RIWAYAT_PATH', '')
+os.environ.setdefault('MIRIP_PATH', '')
+
+from app import validate_do, TOLERANSI
+from validasi_vektor import KolomDO, validasi_massal, id_check
+from dokumen_sintetis import buat_arsip
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--n', type=int, default=20000)
+    ap.add_argument('--bandul', type=float, default=2.0)
+    ap.add_argument('--ulang', type=int, default=5)
+    args = ap.parse_args()
+
+    arsip = buat_arsip(args.n, bandul=args.bandul)
+
+    t0 = time.perf_counter()
+    lama = [validate_do(d, bandul=args.bandul) for d in arsip]
+    t_lama = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    kolom = KolomDO.dari_dokumen(arsip)
+    t_ratakan = time.perf_counter() - t0
+
+    waktu = []
+    for _ in range(args.ulang):
+        t0 = time.perf_counter()
+        baru = validasi_massal(kolom, bandul=args.bandul, toleransi=TOLERANSI)
+        waktu.append(time.perf_counter() - t0)
+    t_baru = min(waktu)
+
+    # ── Verifikasi kesetaraan ─────────────────────────────────────
+    checks_lama = [c for hasil in lama for c in hasil['checks']]
+    assert len(checks_lama) == len(baru['ok']), 'jumlah check berbeda'
+    assert all(c['id'] == id_check(kolom, baru, i) for i, c in enumerate(checks_lama)), 'urutan/id berbeda'
+    for kolom_cek in ('hitung', 'tertulis', 'selisih'):
+        ref = np.array([c[kolom_cek] for c in checks_lama])
+        assert np.allclose(ref, baru[kolom_cek], atol=1e-9), f'{kolom_cek} berbeda'
+    assert np.array_equal([c['ok'] for c in checks_lama], baru['ok']), 'status ok berbeda'
+    assert np.array_equal([h['semua_benar'] for h in lama], baru['semua_benar'])
+
+    n_check = len(checks_lama)
+    print(f'{args.n} dokumen, {kolom.n_kelompok} kelompok, {len(kolom.ekor)} baris, {n_check} check — hasil SETARA')
+    print(f'  validate_do per dokumen : {t_lama * 1000:9.1f} ms  ({args.n / t_lama:12,.0f} dok/s)')
+    print(f'  ratakan ke kolom (1x)   : {t_ratakan * 1000:9.1f} ms')
+    print(f'  validasi_massal         : {t_baru * 1000:9.1f} ms  ({args.n / t_baru:12,.0f} dok/s)')
+    print(f'  speedup validasi        : {t_lama / t_baru:9.1f}x')
+    print(f'  speedup termasuk ratakan: {t_lama / (t_baru + t_ratakan):9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
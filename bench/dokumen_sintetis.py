@@ -0,0 +1,60 @@
+import random
+
+
+# ══════════════════════════════════════════════════════════════════
+# DOKUMEN DO SINTETIS untuk benchmark validasi
+# ══════════════════════════════════════════════════════════════════
+def buat_dokumen(rng: random.Random, n_kelompok: int = 2, n_baris: int = 10,
+                 bruto_terra: bool = False, bandul: float = 2.0,
+                 p_salah: float = 0.2) -> dict:
+    """
+    Satu raw_data DO. Dengan peluang p_salah, satu angka tertulis
+    dibuat meleset (seperti salah baca digit) agar ada check yang gagal.
+    """
+    kelompok = []
+    for g in range(n_kelompok):
+        baris = [
+            {'no': i + 1, 'ekor': rng.randint(10, 50), 'kg': round(rng.uniform(50, 100), 1)}
+            for i in range(n_baris)
+        ]
+        total_ekor = sum(r['ekor'] for r in baris)
+        total_kg   = round(sum(r['kg'] for r in baris), 2)
+        grp = {
+            'nama': f'KELOMPOK{g + 1}', 'posisi': 'kiri' if g % 2 == 0 else 'kanan',
+            'baris': baris, 'tertulis_total_ekor': total_ekor,
+        }
+        if bruto_terra:
+            terra = round(bandul * n_baris, 2)
+            grp.update(tertulis_bruto_kg=total_kg, tertulis_terra_kg=terra,
+                       tertulis_netto_kg=round(total_kg - terra, 2))
+        else:
+            grp.update(tertulis_bruto_kg=None, tertulis_terra_kg=None,
+                       tertulis_netto_kg=total_kg)
+        kelompok.append(grp)
+
+    real_ekor = sum(g['tertulis_total_ekor'] for g in kelompok)
+    real_kg   = round(sum(g['tertulis_netto_kg'] for g in kelompok), 2)
+    data = {
+        'kelompok': kelompok,
+        'ringkasan_atas': {
+            'tertulis_realisasi_ekor': real_ekor,
+            'tertulis_realisasi_kg':   real_kg,
+            'tertulis_rata_rata':      round(real_kg / real_ekor, 2),
+        },
+    }
+
+    if rng.random() < p_salah:
+        grp = rng.choice(kelompok)
+        r   = rng.choice(grp['baris'])
+        r['kg'] = round(r['kg'] + rng.choice([-5, 5, 0.5, -0.5]), 1)
+    return data
+
+
+def buat_arsip(n: int, seed: int = 0, max_kelompok: int = 4, max_baris: int = 20,
+               p_bruto_terra: float = 0.3, bandul: float = 2.0) -> list:
+    rng = random.Random(seed)
+    return [
+        buat_dokumen(rng, rng.randint(1, max_kelompok), rng.randint(1, max_baris),
+                     rng.random() < p_bruto_terra, bandul)
+        for _ in range(n)
+    ]
@@ -0,0 +1,132 @@
+import io
+import os
+import glob
+import random
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+# ══════════════════════════════════════════════════════════════════
+# FIXTURE GAMBAR untuk benchmark
+# Pakai foto asli dari folder (--fixtures DIR) jika ada; jika tidak,
+# buat foto sintetis berukuran kamera HP (kertas + garis tabel + angka).
+# ══════════════════════════════════════════════════════════════════
+def buat_foto(megapiksel: float, seed: int = 0, format: str = 'JPEG') -> bytes:
+    """Foto sintetis mirip DO: kertas terang + garis tabel + angka acak."""
+    w = int((megapiksel * 1e6 * 4 / 3) ** 0.5)
+    h = int(w * 3 / 4)
+    img  = Image.new('RGB', (w, h), (235, 232, 220))
+    draw = ImageDraw.Draw(img)
+    step = max(20, h // 40)
+    for y in range(0, h, step):
+        draw.line([(0, y), (w, y)], fill=(40, 40, 40), width=3)
+    for i in range(2000):
+        x = (i * 7919 + seed * 104729) % w
+        y = (i * 104729 + seed * 7919) % h
+        draw.text((x, y), str(i % 97), fill=(20, 20, 90))
+    buf = io.BytesIO()
+    if format == 'JPEG':
+        img.save(buf, format='JPEG', quality=92)
+    else:
+        img.save(buf, format=format)
+    return buf.getvalue()
+
+
+def buat_foto_do(megapiksel: float = 12, seed: int = 0, n_baris: int = 15) -> tuple[bytes, tuple]:
+    """
+    Foto sintetis DO di atas meja: kertas (tidak memenuhi frame), kop surat,
+    blok ringkasan atas, tabel rincian + baris Ekor/Bruto/Terra/Netto, tanda
+    tangan, dan "tangan" di tepi foto. Return (jpeg, kotak_benar) dengan
+    kotak_benar = (x0, y0, x1, y1) area ringkasan atas s.d. baris Netto.
+    """
+    rng  = random.Random(seed)
+    w    = int((megapiksel * 1e6 * 3 / 4) ** 0.5)     # potret, seperti foto HP
+    h    = int(w * 4 / 3)
+    img  = Image.new('RGB', (w, h), (92, 64, 44))      # meja kayu
+    draw = ImageDraw.Draw(img)
+    for _ in range(300):
+        y = rng.randrange(h)
+        draw.line([(0, y), (w, y + rng.randint(-40, 40))], fill=(80 + rng.randint(0, 25), 55, 38), width=2)
+
+    # Kertas
+    px0, py0 = int(w * rng.uniform(0.06, 0.12)), int(h * rng.uniform(0.04, 0.08))
+    px1, py1 = int(w * rng.uniform(0.88, 0.94)), int(h * rng.uniform(0.92, 0.96))
+    draw.rectangle([px0, py0, px1, py1], fill=(238, 236, 228))
+    pw       = px1 - px0
+    huruf    = ImageFont.load_default(size=max(12, pw // 45))
+    huruf_bs = ImageFont.load_default(size=max(16, pw // 22))
+    tinta    = (30, 30, 40)
+    pena     = (25, 35, 110)
+    tebal    = max(2, pw // 500)
+
+    # Kop surat
+    y = py0 + int(pw * 0.05)
+    draw.text((px0 + pw * 0.08, y), 'PT. DMC - DELIVERY ORDER', font=huruf_bs, fill=tinta)
+    y += int(pw * 0.07)
+    for teks in ('Jl. Raya Peternakan No. 12, Kab. Contoh', 'Telp. (021) 555-0101  No. DO: 000123'):
+        draw.text((px0 + pw * 0.08, y), teks, font=huruf, fill=tinta)
+        y += int(pw * 0.035)
+
+    # Ringkasan atas: Ekor / Kg / Rata-rata
+    y    += int(pw * 0.06)
+    bx0   = px0 + int(pw * 0.08)
+    bx1   = px1 - int(pw * 0.08)
+    tinggi = int(pw * 0.05)
+    atas_y0 = y
+    for i, label in enumerate(('Ekor', 'Kg', 'Rata-rata')):
+        cx0 = bx0 + (bx1 - bx0) * i // 3
+        cx1 = bx0 + (bx1 - bx0) * (i + 1) // 3
+        draw.rectangle([cx0, y, cx1, y + 2 * tinggi], outline=tinta, width=tebal)
+        draw.text((cx0 + tinggi // 3, y + tinggi // 5), label, font=huruf, fill=tinta)
+        draw.text((cx0 + tinggi // 3, y + tinggi), str(rng.randint(100, 999)), font=huruf, fill=pena)
+    y += 2 * tinggi + int(pw * 0.05)
+
+    # Tabel rincian: No | PESANAN Ekor | Kg | REALISASI Ekor | Kg
+    kolom = [bx0 + (bx1 - bx0) * k // 5 for k in range(6)]
+    tinggi_baris = int(pw * 0.04)
+    label_bawah  = ('Ekor', 'Bruto', 'Terra', 'Netto')
+    n_total      = 1 + n_baris + len(label_bawah)
+    ty0 = y
+    for r in range(n_total + 1):
+        yy = ty0 + r * tinggi_baris
+        draw.line([(bx0, yy), (bx1, yy)], fill=tinta, width=tebal)
+    ty1 = ty0 + n_total * tinggi_baris
+    for x in kolom:
+        draw.line([(x, ty0), (x, ty1)], fill=tinta, width=tebal)
+    for k, judul in enumerate(('No', 'Ekor', 'Kg', 'Ekor', 'Kg')):
+        draw.text((kolom[k] + tebal * 4, ty0 + tebal * 2), judul, font=huruf, fill=tinta)
+    for r in range(n_baris + len(label_bawah)):
+        yy = ty0 + (r + 1) * tinggi_baris + tebal * 2
+        kiri = str(r + 1) if r < n_baris else label_bawah[r - n_baris]
+        draw.text((kolom[0] + tebal * 4, yy), kiri, font=huruf, fill=tinta)
+        for k in range(1, 5):
+            nilai = rng.randint(10, 50) if k % 2 else round(rng.uniform(50, 100), 1)
+            draw.text((kolom[k] + tebal * 4, yy), str(nilai), font=huruf, fill=pena)
+
+    # Tanda tangan di bawah
+    y = ty1 + int(pw * 0.08)
+    for i, teks in enumerate(('Pengirim', 'Penerima')):
+        x = bx0 + (bx1 - bx0) * i // 2
+        draw.text((x, y), teks, font=huruf, fill=tinta)
+        draw.line([(x, y + pw * 0.06), (x + pw * 0.25, y + pw * 0.06)], fill=tinta, width=tebal)
+
+    # Tangan memegang kertas di tepi kanan bawah
+    hx, hy = px1 - pw * 0.05, py1 - pw * 0.25
+    draw.ellipse([hx, hy, hx + pw * 0.3, hy + pw * 0.45], fill=(214, 170, 140))
+
+    buf = io.BytesIO()
+    img.save(buf, format='JPEG', quality=90)
+    return buf.getvalue(), (bx0, atas_y0, bx1, ty1)
+
+
+def muat_fixtures(folder: str | None, megapiksel=(12, 24, 48)) -> dict[str, bytes]:
+    """{nama: bytes} dari folder foto asli, atau foto sintetis jika folder kosong."""
+    if folder:
+        hasil = {}
+        for pola in ('*.jpg', '*.jpeg', '*.png', '*.webp'):
+            for path in sorted(glob.glob(os.path.join(folder, pola))):
+                with open(path, 'rb') as f:
+                    hasil[os.path.basename(path)] = f.read()
+        if hasil:
+            return hasil
+    return {f'sintetis_{mp}mp.jpg': buat_foto(mp, seed=i) for i, mp in enumerate(megapiksel)}
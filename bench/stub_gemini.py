@@ -0,0 +1,111 @@
+import time
+import json
+import random
+
+
+# ══════════════════════════════════════════════════════════════════
+# STUB genai.GenerativeModel — deterministik, latensi bisa diatur
+# ══════════════════════════════════════════════════════════════════
+CONTOH_RAW_DATA = {
+    'kelompok': [
+        {
+            'nama': 'PESANAN', 'posisi': 'kiri',
+            'baris': [{'no': 1, 'ekor': 30, 'kg': 81.0}, {'no': 2, 'ekor': 30, 'kg': 80.5}],
+            'tertulis_total_ekor': 60, 'tertulis_bruto_kg': None,
+            'tertulis_terra_kg': None, 'tertulis_netto_kg': 161.5,
+        },
+    ],
+    'ringkasan_atas': {
+        'tertulis_realisasi_ekor': 60,
+        'tertulis_realisasi_kg': 161.5,
+        'tertulis_rata_rata': 2.69,
+    },
+}
+
+
+TOKEN_GAMBAR = 258   # Gemini menghitung gambar kecil (≤ 384px per tile) sebagai 258 token
+
+
+def estimasi_token(teks: str) -> int:
+    """Perkiraan kasar ± 4 karakter per token (cukup untuk membandingkan varian)."""
+    return max(1, len(teks) // 4)
+
+
+class StubUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count     = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count      = prompt_token_count + candidates_token_count
+
+
+class StubResponse:
+    def __init__(self, text: str, usage: StubUsage | None = None):
+        self.text           = text
+        self.usage_metadata = usage
+
+
+class StubStream:
+    """
+    Respons stream=True: iterasi menghasilkan potongan StubResponse (teks
+    dibagi rata sepanjang latensi), usage_metadata terisi setelah habis.
+    """
+
+    def __init__(self, teks: str, usage: StubUsage, delay: float, n_potongan: int, tidur=None):
+        self.text           = teks
+        self.usage_metadata = None
+        self._usage         = usage
+        self._delay         = delay
+        self._n             = max(1, n_potongan)
+        self._tidur         = tidur
+
+    def __iter__(self):
+        ukuran = -(-len(self.text) // self._n)
+        for i in range(0, len(self.text), ukuran):
+            (self._tidur or time.sleep)(self._delay / self._n)
+            yield StubResponse(self.text[i:i + ukuran])
+        self.usage_metadata = self._usage
+
+
+class StubModel:
+    """
+    Pengganti genai.GenerativeModel untuk benchmark.
+    latensi: detik per panggilan; jitter: simpangan acak (seed tetap).
+    p_ekor / latensi_ekor: peluang panggilan masuk "ekor panjang" dan latensinya;
+    melewati request_options['timeout'] → TimeoutError setelah timeout.
+    stream=True: latensi tersebar ke n_potongan potongan teks (StubStream).
+    tidur: fungsi tunggu (default time.sleep — di bawah monkey.patch_all jadi
+    gevent.sleep yang kooperatif). Untuk meniru panggilan gRPC native yang
+    memblokir hub gevent, beri time.sleep asli (monkey.get_original).
+    """
+
+    def __init__(self, latensi: float = 1.0, jitter: float = 0.0,
+                 raw_data: dict | None = None, seed: int = 42,
+                 p_ekor: float = 0.0, latensi_ekor: float = 0.0, n_potongan: int = 8,
+                 tidur=None):
+        self.latensi      = latensi
+        self.jitter       = jitter
+        self.raw_data     = raw_data or CONTOH_RAW_DATA
+        self.p_ekor       = p_ekor
+        self.latensi_ekor = latensi_ekor
+        self.n_potongan   = n_potongan
+        self.tidur        = tidur
+        self._rng         = random.Random(seed)
+        self.jumlah_panggilan = 0
+
+    def generate_content(self, konten, request_options=None, stream=False, **kwargs):
+        self.jumlah_panggilan += 1
+        delay = self.latensi + (self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+        if self.p_ekor and self._rng.random() < self.p_ekor:
+            delay = self.latensi_ekor
+        batas = (request_options or {}).get('timeout')
+        tidur = self.tidur or time.sleep
+        if batas is not None and delay > batas:
+            tidur(batas)
+            raise TimeoutError(f'stub: melewati timeout {batas}s')
+        teks  = json.dumps(self.raw_data)
+        masuk = sum(estimasi_token(k) if isinstance(k, str) else TOKEN_GAMBAR for k in konten)
+        usage = StubUsage(masuk, estimasi_token(teks))
+        if stream:
+            return StubStream(teks, usage, max(0.0, delay), self.n_potongan, self.tidur)
+        tidur(max(0.0, delay))
+        return StubResponse(teks, usage)
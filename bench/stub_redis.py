@@ -0,0 +1,225 @@
+"""
+Pengganti Redis lokal untuk bench & uji backend redis:// di bersama.py:
+server RESP2 satu proses (thread per koneksi, satu lock global) dengan
+perintah yang dipakai BersamaRedis — PING, AUTH, SELECT, GET, SET (EX/PX/NX),
+DEL, INCR/INCRBY, PEXPIRE, PTTL, WATCH/UNWATCH/MULTI/EXEC/DISCARD, DBSIZE,
+FLUSHDB. Tidak persisten, bukan untuk produksi.
+
+    python bench/stub_redis.py --port 6390
+    STATE_BERSAMA=redis://127.0.0.1:6390/0 gunicorn app:app --workers 4 ...
+"""
+import time
+import argparse
+import threading
+import socketserver
+
+
+class _Galat(Exception):
+    pass
+
+
+class DataRedis:
+    """Keyspace + versi per kunci (untuk WATCH)."""
+
+    def __init__(self):
+        self.data  = {}   # kunci → (bytes, kadaluarsa | None)
+        self.versi = {}   # kunci → counter perubahan
+        self.lock  = threading.Lock()
+
+    def _hidup(self, k):
+        item = self.data.get(k)
+        if item and item[1] is not None and item[1] <= time.time():
+            del self.data[k]
+            self._ubah(k)
+            return None
+        return item
+
+    def _ubah(self, k):
+        self.versi[k] = self.versi.get(k, 0) + 1
+
+    def jalankan(self, args: list):
+        nama = args[0].upper().decode()
+        fn   = getattr(self, f'c_{nama.lower()}', None)
+        if fn is None:
+            raise _Galat(f"ERR unknown command '{nama}'")
+        return fn(*args[1:])
+
+    # ── Perintah ──────────────────────────────────────────────────
+    def c_ping(self, *a):
+        return 'PONG'
+
+    def c_auth(self, *a):
+        return 'OK'
+
+    def c_select(self, db):
+        return 'OK'
+
+    def c_get(self, k):
+        item = self._hidup(k)
+        return item[0] if item else None
+
+    def c_set(self, k, v, *opsi):
+        exp, nx, i = None, False, 0
+        while i < len(opsi):
+            o = opsi[i].upper()
+            if o == b'PX':
+                exp, i = time.time() + int(opsi[i + 1]) / 1000, i + 2
+            elif o == b'EX':
+                exp, i = time.time() + int(opsi[i + 1]), i + 2
+            elif o == b'NX':
+                nx, i = True, i + 1
+            else:
+                raise _Galat('ERR syntax error')
+        if nx and self._hidup(k):
+            return None
+        self.data[k] = (v, exp)
+        self._ubah(k)
+        return 'OK'
+
+    def c_del(self, *ks):
+        n = 0
+        for k in ks:
+            if self._hidup(k):
+                del self.data[k]
+                self._ubah(k)
+                n += 1
+        return n
+
+    def c_incrby(self, k, n):
+        item = self._hidup(k)
+        try:
+            nilai = (int(item[0]) if item else 0) + int(n)
+        except ValueError:
+            raise _Galat('ERR value is not an integer or out of range')
+        self.data[k] = (str(nilai).encode(), item[1] if item else None)
+        self._ubah(k)
+        return nilai
+
+    def c_incr(self, k):
+        return self.c_incrby(k, b'1')
+
+    def c_pexpire(self, k, ms):
+        item = self._hidup(k)
+        if not item:
+            return 0
+        self.data[k] = (item[0], time.time() + int(ms) / 1000)
+        self._ubah(k)
+        return 1
+
+    def c_pttl(self, k):
+        item = self._hidup(k)
+        if not item:
+            return -2
+        return -1 if item[1] is None else int((item[1] - time.time()) * 1000)
+
+    def c_dbsize(self):
+        return sum(1 for k in list(self.data) if self._hidup(k))
+
+    def c_flushdb(self, *a):
+        for k in list(self.data):
+            self._ubah(k)
+        self.data.clear()
+        return 'OK'
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True   # balasan pipeline tidak tertahan delayed-ACK (seperti Redis asli)
+
+    def _baca(self):
+        baris = self.rfile.readline()
+        if not baris:
+            return None
+        if not baris.startswith(b'*'):
+            return baris.split()   # inline command (redis-cli / telnet)
+        args = []
+        for _ in range(int(baris[1:-2])):
+            n = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    def _tulis(self, v):
+        if isinstance(v, _Galat):
+            return b'-%s\r\n' % str(v).encode()
+        if v is None:
+            return b'$-1\r\n'
+        if isinstance(v, str):
+            return b'+%s\r\n' % v.encode()
+        if isinstance(v, int):
+            return b':%d\r\n' % v
+        if isinstance(v, bytes):
+            return b'$%d\r\n%s\r\n' % (len(v), v)
+        if isinstance(v, list):
+            return b'*%d\r\n' % len(v) + b''.join(self._tulis(x) for x in v)
+        raise TypeError(v)
+
+    def handle(self):
+        db      = self.server.db
+        diawasi = {}     # kunci → versi saat WATCH
+        antre   = None   # list perintah di dalam MULTI
+        while True:
+            args = self._baca()
+            if args is None:
+                return
+            if not args:
+                continue
+            nama = args[0].upper()
+            with db.lock:
+                if nama == b'WATCH':
+                    diawasi.update({k: db.versi.get(k, 0) for k in args[1:]})
+                    balas = 'OK'
+                elif nama == b'UNWATCH':
+                    diawasi.clear()
+                    balas = 'OK'
+                elif nama == b'MULTI':
+                    antre, balas = [], 'OK'
+                elif nama == b'DISCARD':
+                    antre, balas = None, 'OK'
+                    diawasi.clear()
+                elif nama == b'EXEC':
+                    if antre is None:
+                        balas = _Galat('ERR EXEC without MULTI')
+                    elif any(db.versi.get(k, 0) != v for k, v in diawasi.items()):
+                        balas = None   # transaksi batal
+                    else:
+                        balas = []
+                        for a in antre:
+                            try:
+                                balas.append(db.jalankan(a))
+                            except _Galat as e:
+                                balas.append(e)
+                    antre = None
+                    diawasi.clear()
+                elif antre is not None:
+                    antre.append(args)
+                    balas = 'QUEUED'
+                else:
+                    try:
+                        balas = db.jalankan(args)
+                    except _Galat as e:
+                        balas = e
+            self.wfile.write(self._tulis(balas))
+
+
+class ServerRedis(socketserver.ThreadingTCPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__(self, alamat):
+        super().__init__(alamat, _Handler)
+        self.db = DataRedis()
+
+
+def jalankan(port: int = 0, host: str = '127.0.0.1') -> ServerRedis:
+    """Jalankan di thread latar; port 0 → port bebas (lihat server.server_address)."""
+    server = ServerRedis((host, port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=6390)
+    args = ap.parse_args()
+    print(f'stub redis di {args.host}:{args.port}')
+    ServerRedis((args.host, args.port)).serve_forever()
@@ -0,0 +1,381 @@
+"""
+Benchmark suite pipeline extract → validate.
+
+Kasus:
+  preprocess/*   preprocess_image untuk beberapa ukuran & format gambar
+  extract_json/* respons model bersih, ber-fence ```json, dan berisik
+  validasi/*     buat_check & validate_do, 2–20 kelompok, ratusan baris
+  endpoint/*     Flask end-to-end dengan stub model Gemini
+
+Laporan per kasus: p25/p50/p95/p99 (ms), throughput (op/s), peak memori
+(heap Python via tracemalloc, dan peak RSS jika /proc tersedia).
+
+    python bench/suite.py                         # semua kasus
+    python bench/suite.py -k validasi -k extract  # filter nama kasus
+    python bench/suite.py --simpan-baseline       # tulis bench/baseline.json
+    python bench/suite.py --bandingkan            # gagal jika p25 regresi > --ambang
+
+Di VM kecil kecepatan mesin berubah sampai ~2x dalam hitungan detik, jadi
+waktu mentah (ms) tidak bisa dibandingkan antar run. Setiap sampel diikuti
+satu sampel beban acuan tetap (_acuan); p25_rel = p25 kasus / p25 acuan
+sehingga perubahan kecepatan mesin saling membatalkan (sisa simpangan antar
+putaran ~1,2–1,5x). --simpan-baseline dan --bandingkan menjalankan semua kasus
+beberapa putaran (--putaran, default 3, kasus diselang-seling) dan melaporkan
+median per statistik; regresi = p25_rel putaran TERCEPAT sekarang > median
+p25_rel baseline × (1 + --ambang, default 0,35).
+
+Baseline bergantung pada mesin — simpan & bandingkan di mesin yang sama.
+bench/baseline.json mencatat mesin perekamnya (kunci "_mesin"); --bandingkan
+memperingatkan jika mesinnya beda, dan menyimpan hasil pertama sebagai
+baseline jika file belum ada.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import statistics
+import platform
+import argparse
+import tempfile
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+
+
+# ══════════════════════════════════════════════════════════════════
+# PENGUKURAN
+# ══════════════════════════════════════════════════════════════════
+def persentil(data: list, p: float) -> float:
+    """Persentil dengan interpolasi linear (data sudah terurut)."""
+    if len(data) == 1:
+        return data[0]
+    k = (len(data) - 1) * p / 100
+    i = int(k)
+    j = min(i + 1, len(data) - 1)
+    return data[i] + (data[j] - data[i]) * (k - i)
+
+
+def _reset_peak_rss() -> bool:
+    # Linux: tulis "5" ke clear_refs untuk mereset VmHWM
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float | None:
+    try:
+        with open('/proc/self/status') as f:
+            for baris in f:
+                if baris.startswith('VmHWM:'):
+                    return int(baris.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _acuan() -> int:
+    """Beban acuan tetap (Python murni, ± 1–2 ms) untuk menormalkan kecepatan mesin saat itu."""
+    x = 0
+    for i in range(20000):
+        x += i * i % 7
+    return x
+
+
+def ukur(fn, ulang: int, pemanasan: int = 1) -> dict:
+    for _ in range(pemanasan):
+        fn()
+
+    # Tiap sampel diikuti satu sampel beban acuan: kecepatan VM yang berubah-ubah
+    # (sampai ~2x dalam hitungan detik) ikut terukur di acuan dan batal di p25_rel
+    waktu, acuan = [], []
+    for _ in range(ulang):
+        t0 = time.perf_counter()
+        fn()
+        t1 = time.perf_counter()
+        _acuan()
+        acuan.append(time.perf_counter() - t1)
+        waktu.append((t1 - t0) * 1000)
+    t_total = sum(waktu) / 1000
+    waktu.sort()
+    acuan.sort()
+
+    # Memori diukur terpisah agar overhead tracemalloc tidak mencemari waktu
+    ada_rss = _reset_peak_rss()
+    tracemalloc.start()
+    fn()
+    _, peak_py = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_rss = _peak_rss_mb() if ada_rss else None
+
+    return {
+        'n':           len(waktu),
+        'p25_ms':      round(persentil(waktu, 25), 3),
+        'p25_rel':     round(persentil(waktu, 25) / 1000 / persentil(acuan, 25), 4),
+        'p50_ms':      round(persentil(waktu, 50), 3),
+        'p95_ms':      round(persentil(waktu, 95), 3),
+        'p99_ms':      round(persentil(waktu, 99), 3),
+        'op_per_s':    round(len(waktu) / t_total, 1),
+        'peak_py_kb':  round(peak_py / 1024, 1),
+        'peak_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+
+# ══════════════════════════════════════════════════════════════════
+# KASUS
+# Setiap kasus: fungsi (args) → dict {nama: (siapkan, ulang)}
+# siapkan() → callable yang diukur (fixture berat baru dibuat jika lolos filter -k)
+# ══════════════════════════════════════════════════════════════════
+def kasus_preprocess(args) -> dict:
+    from image_proc import preprocess_image
+    from fixtures import buat_foto
+
+    hasil = {}
+    for mp in (2, 12, 24):
+        for fmt in ('JPEG', 'PNG', 'WEBP'):
+            if fmt != 'JPEG' and mp > 12:
+                continue   # PNG/WEBP besar jarang dari kamera HP & sangat lambat dibuat
+            hasil[f'preprocess/{fmt.lower()}_{mp}mp'] = (
+                lambda mp=mp, fmt=fmt: (lambda d=buat_foto(mp, format=fmt): preprocess_image(d)),
+                max(5, args.ulang // 5),
+            )
+    return hasil
+
+
+def kasus_extract_json(args) -> dict:
+    from app import extract_json
+    from dokumen_sintetis import buat_dokumen
+
+    raw   = json.dumps(buat_dokumen(random.Random(1), n_kelompok=4, n_baris=20), indent=2)
+    teks  = {
+        'bersih':  raw,
+        'fence':   f'```json\n{raw}\n```',
+        'berisik': f'Berikut hasil pembacaan dokumen:\n\n```json\n{raw}\n```\n\n'
+                   f'Catatan: baris 3 agak buram, mohon dicek ulang.',
+    }
+    return {
+        f'extract_json/{nama}': (lambda t=t: lambda: extract_json(t), args.ulang * 10)
+        for nama, t in teks.items()
+    }
+
+
+def kasus_validasi(args) -> dict:
+    from app import buat_check, validate_do
+    from dokumen_sintetis import buat_dokumen
+
+    rng   = random.Random(2)
+    hasil = {
+        'validasi/buat_check_200': (
+            lambda v=[round(rng.uniform(50, 100), 1) for _ in range(200)]: lambda:
+                buat_check('netto_x', 'Baris NETTO', 'Baris Netto', v, '', sum(v), sum(v), 'kg'),
+            args.ulang * 10,
+        ),
+    }
+    for n_grp, n_baris in ((2, 50), (8, 100), (20, 200)):
+        for bt in (False, True):
+            doc = buat_dokumen(rng, n_kelompok=n_grp, n_baris=n_baris, bruto_terra=bt)
+            hasil[f'validasi/validate_do_{n_grp}grp_{n_baris}baris{"_bt" if bt else ""}'] = (
+                lambda d=doc: lambda: validate_do(d, bandul=2.0), args.ulang,
+            )
+    return hasil
+
+
+def kasus_endpoint(args) -> dict:
+    import app as do_app
+    from ocr_cache import OcrCache
+    from fixtures import buat_foto
+    from stub_gemini import StubModel
+    from dokumen_sintetis import buat_dokumen
+
+    stub = StubModel(latensi=args.latensi_stub,
+                     raw_data=buat_dokumen(random.Random(3), n_kelompok=2, n_baris=15))
+    do_app.registri_model.model = lambda *a, **kw: stub
+    client = do_app.app.test_client()
+    foto   = buat_foto(12)
+
+    def extract(cache: OcrCache, harus_hit: bool = False):
+        # Tiap kasus memasang cache-nya sendiri: miss = cache nonaktif, hit = cache yang sudah terisi
+        do_app.ocr_cache = cache
+        r = client.post('/api/extract', data={'file': (io.BytesIO(foto), 'do.jpg')},
+                        content_type='multipart/form-data')
+        assert r.status_code == 200, r.get_data(as_text=True)
+        hasil = r.get_json()
+        assert hasil['cache_hit'] or not harus_hit, 'extract_hit tidak kena cache'
+        return hasil
+
+    cache_hit  = OcrCache(None)
+    hasil_awal = extract(cache_hit)   # sekaligus mengisi cache untuk extract_hit
+
+    def retry():
+        r = client.post('/api/retry', json={
+            'raw_data': hasil_awal['raw_data'], 'checks_gagal': [],
+            'img_token': hasil_awal['img_token'],
+        })
+        assert r.status_code == 200, r.get_data(as_text=True)
+
+    def validate():
+        r = client.post('/api/validate', json={'raw_data': hasil_awal['raw_data'], 'bandul': 2.0})
+        assert r.status_code == 200, r.get_data(as_text=True)
+
+    n = max(5, args.ulang // 5)
+    return {
+        'endpoint/extract_miss': (lambda: lambda: extract(OcrCache(None, max_mem=0)), n),
+        'endpoint/extract_hit':  (lambda: lambda: extract(cache_hit, harus_hit=True), n),
+        'endpoint/retry':        (lambda: retry, n),
+        'endpoint/validate':     (lambda: validate, args.ulang),
+    }
+
+
+SEMUA_KASUS = (kasus_preprocess, kasus_extract_json, kasus_validasi, kasus_endpoint)
+
+
+# ══════════════════════════════════════════════════════════════════
+# MAIN
+# ══════════════════════════════════════════════════════════════════
+def siapkan_env():
+    tmp = tempfile.mkdtemp(prefix='bench_suite_')
+    os.environ.update({
+        'GEMINI_API_KEY':    'stub',
+        'OCR_CACHE_PATH':    '',
+        'IMAGE_STORE_DIR':   '',
+        'KUOTA_PATH':        '',
+        'RIWAYAT_PATH':      '',
+        'MIRIP_PATH':        '',
+        'GEMINI_RPM':        '1000000',
+        'GEMINI_RPD':        '1000000000',
+        'PREPROCESS_PROSES': '0',
+        'UPLOAD_TMP_DIR':    tmp,
+    })
+
+
+def info_mesin() -> dict:
+    return {
+        'platform': platform.platform(),
+        'cpu':      platform.processor() or platform.machine(),
+        'n_cpu':    os.cpu_count(),
+        'python':   platform.python_version(),
+    }
+
+
+def simpan_baseline(hasil: dict):
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+    baseline.update(hasil)
+    baseline['_mesin'] = {**info_mesin(), 'direkam': time.strftime('%Y-%m-%d')}
+    with open(BASELINE_PATH, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    print(f'\nBaseline disimpan: {BASELINE_PATH}')
+
+
+def gabung(per_putaran: list) -> dict:
+    """
+    Hasil beberapa putaran satu kasus → median tiap statistik, plus p25_rel
+    putaran tercepat (p25_rel_min, yang dibandingkan dengan baseline).
+    """
+    hasil = {}
+    for k, v in per_putaran[0].items():
+        nilai = [r[k] for r in per_putaran if r[k] is not None]
+        hasil[k] = round(statistics.median(nilai), 4) if v is not None and nilai else v
+    hasil['p25_rel_min'] = min(r['p25_rel'] for r in per_putaran)
+    hasil['putaran']     = len(per_putaran)
+    return hasil
+
+
+def bandingkan(hasil: dict, baseline: dict, ambang: float) -> list:
+    regresi = []
+    for nama, r in hasil.items():
+        b = baseline.get(nama)
+        if not b:
+            continue
+        if 'p25_rel' in b:
+            # Putaran tercepat sekarang vs median baseline, keduanya relatif terhadap beban acuan
+            rasio = r['p25_rel_min'] / b['p25_rel'] if b['p25_rel'] else 1.0
+            teks  = f'p25_rel {b["p25_rel"]:.4f} → {r["p25_rel_min"]:.4f}'
+        else:
+            # Baseline lama: hanya p50 dalam ms
+            rasio = r['p50_ms'] / b['p50_ms'] if b['p50_ms'] else 1.0
+            teks  = f'p50 {b["p50_ms"]:.3f} → {r["p50_ms"]:.3f} ms'
+        if rasio > 1 + ambang:
+            regresi.append(f'{nama}: {teks} ({rasio:.2f}x)')
+    return regresi
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('-k', action='append', default=[], help='filter substring nama kasus')
+    ap.add_argument('--ulang', type=int, default=50)
+    ap.add_argument('--latensi-stub', type=float, default=0.0, help='detik per panggilan stub Gemini')
+    ap.add_argument('--json', default=None, help='tulis hasil mentah ke file JSON')
+    ap.add_argument('--simpan-baseline', action='store_true')
+    ap.add_argument('--bandingkan', action='store_true')
+    ap.add_argument('--ambang', type=float, default=0.35, help='toleransi regresi p25_rel (0.35 = 35%%)')
+    ap.add_argument('--putaran', type=int, default=None,
+                    help='ulangi semua kasus N kali, ambil median (default 3 dengan '
+                         '--simpan-baseline / --bandingkan, selain itu 1)')
+    args = ap.parse_args()
+    putaran = args.putaran or (3 if args.simpan_baseline or args.bandingkan else 1)
+
+    siapkan_env()
+
+    kasus = {}
+    for buat in SEMUA_KASUS:
+        for nama, (siapkan, ulang) in buat(args).items():
+            if not args.k or any(k in nama for k in args.k):
+                kasus[nama] = (siapkan, ulang)
+
+    # Putaran diselang-seling (semua kasus, lalu ulangi) agar gangguan mesin sesaat
+    # tidak menimpa satu kasus saja; fixture dibuat ulang tiap putaran
+    per_putaran = {nama: [] for nama in kasus}
+    for p in range(putaran):
+        if putaran > 1:
+            print(f'putaran {p + 1}/{putaran}...', file=sys.stderr)
+        for nama, (siapkan, ulang) in kasus.items():
+            per_putaran[nama].append(ukur(siapkan(), ulang))
+    hasil = {nama: gabung(rs) for nama, rs in per_putaran.items()}
+
+    print(f'{"kasus":<42} {"p25_rel":>8} {"p25":>9} {"p50":>9} {"p95":>9} {"p99":>9} {"op/s":>10} {"heap":>9} {"RSS":>8}')
+    for nama, r in hasil.items():
+        rss = f'{r["peak_rss_mb"]:6.0f}MB' if r['peak_rss_mb'] is not None else '       —'
+        print(f'{nama:<42} {r["p25_rel"]:8.3f} {r["p25_ms"]:7.2f}ms {r["p50_ms"]:7.2f}ms {r["p95_ms"]:7.2f}ms {r["p99_ms"]:7.2f}ms '
+              f'{r["op_per_s"]:10.1f} {r["peak_py_kb"]:7.0f}KB {rss}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(hasil, f, indent=2)
+
+    if args.bandingkan and not os.path.exists(BASELINE_PATH):
+        print('\nBaseline belum ada — hasil ini menjadi baseline untuk perbandingan berikutnya.')
+        args.simpan_baseline, args.bandingkan = True, False
+
+    if args.simpan_baseline:
+        simpan_baseline(hasil)
+
+    if args.bandingkan:
+        with open(BASELINE_PATH) as f:
+            baseline = json.load(f)
+        mesin, sekarang = baseline.get('_mesin', {}), info_mesin()
+        beda = [k for k in ('platform', 'cpu', 'n_cpu', 'python') if mesin.get(k) != sekarang[k]]
+        if beda:
+            print(f'\nPERINGATAN: baseline direkam di mesin lain ({", ".join(f"{k}={mesin.get(k)}" for k in beda)}) '
+                  f'— angka tidak sebanding; rekam ulang dengan --simpan-baseline')
+        regresi = bandingkan(hasil, baseline, args.ambang)
+        if regresi:
+            print('\nREGRESI:')
+            for r in regresi:
+                print(f'  {r}')
+            sys.exit(1)
+        print('\nTidak ada regresi terhadap baseline.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,444 @@
+import os
+import time
+import socket
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse, unquote
+
+
+# ══════════════════════════════════════════════════════════════════
+# STATE BERSAMA — kuota, cache & sesi yang sama untuk semua worker
+#
+# Tanpa ini setiap worker gunicorn punya kuota Gemini, cache OCR, sesi
+# gambar & sesi validasi sendiri (Procfile dulu dikunci --workers 1).
+# Backend dipilih lewat URL (STATE_BERSAMA):
+#   memori://                 → per proses (uji / pembanding)
+#   sqlite:///path/file.db    → satu mesin, banyak worker (WAL)
+#   redis://[:pw@]host:port/0 → banyak worker / mesin; klien RESP bawaan,
+#                               tanpa dependensi tambahan
+#
+# Semua nilai berupa bytes. Operasi atomik:
+#   tambah(kunci, n, ttl)  → counter (INCRBY)
+#   ubah(kunci, fn, ttl)   → baca-ubah-tulis; fn(lama) → (baru, hasil).
+#                            SQLite: BEGIN IMMEDIATE, Redis: WATCH/MULTI/EXEC
+#                            (diulang jika kunci diubah worker lain).
+# ══════════════════════════════════════════════════════════════════
+class BersamaGagal(Exception):
+    """Backend state bersama tidak bisa dihubungi / membalas error."""
+
+
+class _Bersama(ABC):
+    """Antarmuka bersama + counter operasi (untuk /metrics)."""
+
+    nama = ''
+
+    def __init__(self, prefiks: str = ''):
+        self.prefiks = prefiks
+        self._stats  = {'operasi': 0, 'konflik': 0, 'gagal': 0}
+
+    def _k(self, kunci: str) -> str:
+        return self.prefiks + kunci
+
+    @abstractmethod
+    def ambil(self, kunci: str) -> bytes | None:
+        """Nilai kunci, None jika tidak ada / kedaluwarsa."""
+
+    @abstractmethod
+    def simpan(self, kunci: str, nilai: bytes, ttl: float | None = None):
+        """Tulis nilai (ttl detik, None = tanpa batas)."""
+
+    @abstractmethod
+    def hapus(self, kunci: str):
+        """Hapus kunci (tidak error jika tidak ada)."""
+
+    @abstractmethod
+    def ubah(self, kunci: str, fn, ttl: float | None = None):
+        """
+        Baca-ubah-tulis atomik. fn(lama: bytes | None) → (baru, hasil):
+        baru None → kunci dihapus, baru `is` lama → tidak ditulis. Exception
+        dari fn dilempar ulang tanpa menulis apa pun. fn bisa dipanggil lebih
+        dari sekali (konflik) — jangan ada efek samping selain hasil.
+        """
+
+    def tambah(self, kunci: str, n: int = 1, ttl: float | None = None) -> int:
+        def fn(lama):
+            nilai = int(lama or 0) + n
+            return str(nilai).encode(), nilai
+        return self.ubah(kunci, fn, ttl)
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+
+def _terapkan(fn, lama):
+    baru, hasil = fn(lama)
+    return baru, hasil, baru is not lama
+
+
+# ── Memori (per proses) ───────────────────────────────────────────
+class BersamaMemori(_Bersama):
+    """Dict + lock. Hanya bersama antar thread/greenlet satu proses."""
+
+    nama = 'memori'
+
+    def __init__(self, prefiks: str = ''):
+        super().__init__(prefiks)
+        self._data = {}   # kunci → (kadaluarsa | None, bytes)
+        self._lock = threading.Lock()
+
+    def _baca(self, k: str) -> bytes | None:
+        item = self._data.get(k)
+        if item is None:
+            return None
+        if item[0] is not None and item[0] <= time.time():
+            del self._data[k]
+            return None
+        return item[1]
+
+    def _tulis(self, k: str, nilai: bytes | None, ttl: float | None):
+        if nilai is None:
+            self._data.pop(k, None)
+        else:
+            self._data[k] = (time.time() + ttl if ttl else None, nilai)
+
+    def ambil(self, kunci):
+        with self._lock:
+            self._stats['operasi'] += 1
+            return self._baca(self._k(kunci))
+
+    def simpan(self, kunci, nilai, ttl=None):
+        with self._lock:
+            self._stats['operasi'] += 1
+            self._tulis(self._k(kunci), nilai, ttl)
+
+    def hapus(self, kunci):
+        with self._lock:
+            self._stats['operasi'] += 1
+            self._data.pop(self._k(kunci), None)
+
+    def ubah(self, kunci, fn, ttl=None):
+        k = self._k(kunci)
+        with self._lock:
+            self._stats['operasi'] += 1
+            baru, hasil, tulis = _terapkan(fn, self._baca(k))
+            if tulis:
+                self._tulis(k, baru, ttl)
+            return hasil
+
+
+# ── SQLite (satu mesin) ───────────────────────────────────────────
+class BersamaSQLite(_Bersama):
+    """
+    Tabel kunci-nilai di satu file SQLite (WAL), koneksi baru per operasi →
+    aman lintas thread/greenlet/fork/proses. Entri kadaluarsa disaring saat
+    dibaca dan disapu tiap `sapu_setiap` penulisan.
+    """
+
+    nama = 'sqlite'
+
+    def __init__(self, path: str, prefiks: str = '', sapu_setiap: int = 500):
+        super().__init__(prefiks)
+        self.path        = path
+        self.sapu_setiap = sapu_setiap
+        self._tulisan    = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS bersama ('
+                ' kunci TEXT PRIMARY KEY,'
+                ' nilai BLOB NOT NULL,'
+                ' kadaluarsa REAL)'
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    @staticmethod
+    def _baca(conn, k: str, now: float) -> bytes | None:
+        row = conn.execute(
+            'SELECT nilai FROM bersama WHERE kunci = ? AND (kadaluarsa IS NULL OR kadaluarsa > ?)',
+            (k, now),
+        ).fetchone()
+        if row is None:
+            return None
+        # Counter dari tambah() tersimpan sebagai INTEGER
+        return row[0] if isinstance(row[0], bytes) else str(row[0]).encode()
+
+    def _tulis(self, conn, k: str, nilai: bytes | None, ttl: float | None, now: float):
+        if nilai is None:
+            conn.execute('DELETE FROM bersama WHERE kunci = ?', (k,))
+        else:
+            conn.execute(
+                'INSERT OR REPLACE INTO bersama (kunci, nilai, kadaluarsa) VALUES (?, ?, ?)',
+                (k, sqlite3.Binary(nilai), now + ttl if ttl else None),
+            )
+        self._tulisan += 1
+        if self._tulisan % self.sapu_setiap == 0:
+            conn.execute('DELETE FROM bersama WHERE kadaluarsa <= ?', (now,))
+
+    def _jalankan(self, fungsi):
+        self._stats['operasi'] += 1
+        try:
+            conn = self._conn()
+        except sqlite3.Error as e:
+            self._stats['gagal'] += 1
+            raise BersamaGagal(str(e)) from e
+        try:
+            return fungsi(conn)
+        except sqlite3.Error as e:
+            self._stats['gagal'] += 1
+            raise BersamaGagal(str(e)) from e
+        finally:
+            conn.close()
+
+    def ambil(self, kunci):
+        return self._jalankan(lambda conn: self._baca(conn, self._k(kunci), time.time()))
+
+    def simpan(self, kunci, nilai, ttl=None):
+        self._jalankan(lambda conn: self._tulis(conn, self._k(kunci), nilai, ttl, time.time()))
+
+    def hapus(self, kunci):
+        self._jalankan(lambda conn: self._tulis(conn, self._k(kunci), None, None, time.time()))
+
+    def ubah(self, kunci, fn, ttl=None):
+        k = self._k(kunci)
+
+        def transaksi(conn):
+            # IMMEDIATE: kunci tulis diambil sebelum membaca → tidak ada worker
+            # lain yang bisa menyelip di antara baca & tulis
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                baru, hasil, tulis = _terapkan(fn, self._baca(conn, k, now))
+                if tulis:
+                    self._tulis(conn, k, baru, ttl, now)
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+            return hasil
+
+        return self._jalankan(transaksi)
+
+    def tambah(self, kunci, n=1, ttl=None):
+        k = self._k(kunci)
+
+        def upsert(conn):
+            now = time.time()
+            # Counter kadaluarsa dianggap 0; TTL hanya dipasang saat counter dibuat
+            return conn.execute(
+                'INSERT INTO bersama (kunci, nilai, kadaluarsa) VALUES (?, ?, ?) '
+                'ON CONFLICT(kunci) DO UPDATE SET'
+                ' nilai = CASE WHEN kadaluarsa <= ? THEN excluded.nilai'
+                '         ELSE CAST(CAST(nilai AS TEXT) AS INTEGER) + ? END,'
+                ' kadaluarsa = CASE WHEN kadaluarsa <= ? THEN excluded.kadaluarsa ELSE kadaluarsa END '
+                'RETURNING CAST(nilai AS INTEGER)',
+                (k, n, now + ttl if ttl else None, now, n, now),
+            ).fetchone()[0]
+
+        return self._jalankan(upsert)
+
+
+# ── Redis (protokol RESP2) ────────────────────────────────────────
+class _Balasan(Exception):
+    """Balasan error (-ERR ...) dari server."""
+
+
+class _KoneksiRESP:
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile('rb')
+
+    @staticmethod
+    def _kode(*args) -> bytes:
+        bagian = [b'*%d\r\n' % len(args)]
+        for a in args:
+            if not isinstance(a, bytes):
+                a = str(a).encode()
+            bagian.append(b'$%d\r\n%s\r\n' % (len(a), a))
+        return b''.join(bagian)
+
+    def _baca(self):
+        baris = self.file.readline()
+        if not baris.endswith(b'\r\n'):
+            raise ConnectionError('koneksi Redis terputus')
+        jenis, isi = baris[:1], baris[1:-2]
+        if jenis == b'+':
+            return isi.decode()
+        if jenis == b'-':
+            raise _Balasan(isi.decode())
+        if jenis == b':':
+            return int(isi)
+        if jenis == b'$':
+            n = int(isi)
+            if n < 0:
+                return None
+            data = self.file.read(n + 2)
+            if len(data) != n + 2:
+                raise ConnectionError('koneksi Redis terputus')
+            return data[:-2]
+        if jenis == b'*':
+            n = int(isi)
+            return None if n < 0 else [self._baca() for _ in range(n)]
+        raise ConnectionError(f'balasan RESP tidak dikenal: {baris[:20]!r}')
+
+    def perintah(self, *args):
+        self.sock.sendall(self._kode(*args))
+        return self._baca()
+
+    def pipa(self, *perintah) -> list:
+        """Kirim beberapa perintah sekaligus, baca semua balasan (error dikembalikan, bukan dilempar)."""
+        self.sock.sendall(b''.join(self._kode(*p) for p in perintah))
+        hasil = []
+        for _ in perintah:
+            try:
+                hasil.append(self._baca())
+            except _Balasan as e:
+                hasil.append(e)
+        return hasil
+
+    def tutup(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class BersamaRedis(_Bersama):
+    """
+    Klien Redis minimal (GET/SET/DEL/INCRBY/PEXPIRE/WATCH/MULTI/EXEC) di atas
+    socket biasa — ikut kooperatif di bawah gevent. Koneksi dipakai ulang
+    lewat pool; koneksi yang error dibuang.
+    """
+
+    nama = 'redis'
+
+    def __init__(self, url: str, prefiks: str = '', timeout: float = 5.0,
+                 max_idle: int = 16, max_ulang: int = 50):
+        super().__init__(prefiks)
+        u = urlparse(url)
+        self.host      = u.hostname or 'localhost'
+        self.port      = u.port or 6379
+        self.db        = int(u.path.lstrip('/') or 0)
+        self.password  = unquote(u.password) if u.password else None
+        self.username  = unquote(u.username) if u.username else None
+        self.timeout   = timeout
+        self.max_idle  = max_idle
+        self.max_ulang = max_ulang
+        self._idle     = []
+        self._lock     = threading.Lock()
+
+    # ── Pool koneksi ──────────────────────────────────────────────
+    def _buka(self) -> _KoneksiRESP:
+        kon = _KoneksiRESP(self.host, self.port, self.timeout)
+        try:
+            if self.password:
+                auth = (self.username, self.password) if self.username else (self.password,)
+                kon.perintah('AUTH', *auth)
+            if self.db:
+                kon.perintah('SELECT', self.db)
+        except BaseException:
+            kon.tutup()
+            raise
+        return kon
+
+    def _pakai(self, fungsi):
+        self._stats['operasi'] += 1
+        with self._lock:
+            kon = self._idle.pop() if self._idle else None
+        try:
+            if kon is None:
+                kon = self._buka()
+            hasil = fungsi(kon)
+        except (OSError, ConnectionError, _Balasan) as e:
+            if kon is not None:
+                kon.tutup()
+            self._stats['gagal'] += 1
+            raise BersamaGagal(f'Redis {self.host}:{self.port}: {e}') from e
+        except BaseException:
+            # Exception dari fn di dalam ubah(): koneksi bersih (sudah UNWATCH)
+            self._kembalikan(kon)
+            raise
+        self._kembalikan(kon)
+        return hasil
+
+    def _kembalikan(self, kon: _KoneksiRESP):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(kon)
+                return
+        kon.tutup()
+
+    @staticmethod
+    def _set(k: str, nilai: bytes | None, ttl: float | None) -> tuple:
+        if nilai is None:
+            return ('DEL', k)
+        if ttl:
+            return ('SET', k, nilai, 'PX', max(1, int(ttl * 1000)))
+        return ('SET', k, nilai)
+
+    # ── API ───────────────────────────────────────────────────────
+    def ambil(self, kunci):
+        return self._pakai(lambda kon: kon.perintah('GET', self._k(kunci)))
+
+    def simpan(self, kunci, nilai, ttl=None):
+        self._pakai(lambda kon: kon.perintah(*self._set(self._k(kunci), nilai, ttl)))
+
+    def hapus(self, kunci):
+        self._pakai(lambda kon: kon.perintah('DEL', self._k(kunci)))
+
+    def tambah(self, kunci, n=1, ttl=None):
+        k = self._k(kunci)
+
+        def incr(kon):
+            nilai = kon.perintah('INCRBY', k, n)
+            if ttl and nilai == n:
+                kon.perintah('PEXPIRE', k, max(1, int(ttl * 1000)))
+            return nilai
+
+        return self._pakai(incr)
+
+    def ubah(self, kunci, fn, ttl=None):
+        k = self._k(kunci)
+
+        def transaksi(kon):
+            for _ in range(self.max_ulang):
+                kon.perintah('WATCH', k)
+                try:
+                    baru, hasil, tulis = _terapkan(fn, kon.perintah('GET', k))
+                except BaseException:
+                    kon.perintah('UNWATCH')
+                    raise
+                if not tulis:
+                    kon.perintah('UNWATCH')
+                    return hasil
+                balasan = kon.pipa(('MULTI',), self._set(k, baru, ttl), ('EXEC',))
+                for b in balasan:
+                    if isinstance(b, _Balasan):
+                        raise b
+                if balasan[-1] is not None:
+                    return hasil
+                self._stats['konflik'] += 1   # kunci diubah worker lain → ulangi
+            raise BersamaGagal(f'ubah {kunci}: konflik terus-menerus ({self.max_ulang}x)')
+
+        return self._pakai(transaksi)
+
+
+def buat_bersama(url: str | None, prefiks: str = '') -> _Bersama | None:
+    """Backend dari URL STATE_BERSAMA; None jika kosong (state per worker)."""
+    if not url:
+        return None
+    skema = urlparse(url).scheme
+    if skema == 'memori':
+        return BersamaMemori(prefiks)
+    if skema == 'sqlite':
+        # sqlite:///relatif.db → 'relatif.db', sqlite:////abs/path.db → '/abs/path.db'
+        return BersamaSQLite(url.split('://', 1)[1][1:], prefiks)
+    if skema in ('redis', 'tcp'):
+        return BersamaRedis(url, prefiks)
+    raise ValueError(f'STATE_BERSAMA tidak dikenal: {url} (memori:// | sqlite:///path | redis://host:port/db)')
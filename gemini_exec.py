@@ -0,0 +1,424 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as tunggu_future, FIRST_COMPLETED
+
+
+# ══════════════════════════════════════════════════════════════════
+# EKSEKUSI GEMINI NON-BLOCKING
+# Panggilan generate_content bersifat blocking (gRPC/HTTP) dan belum tentu
+# bisa di-yield oleh gevent. Jalankan di OS thread sungguhan, dibatasi
+# semaphore, supaya satu OCR lambat tidak membekukan user lain.
+# ══════════════════════════════════════════════════════════════════
+def gevent_aktif() -> bool:
+    """True jika proses ini berjalan di worker gevent (threading sudah di-patch)."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+class PelacakLatensi:
+    """
+    Latensi panggilan Gemini terakhir (jendela geser), untuk menentukan kapan
+    permintaan cadangan (hedging) dikirim: persentil ke-p dari latensi terbaru.
+    """
+
+    def __init__(self, jendela: int = 200, min_sampel: int = 20):
+        self.min_sampel = min_sampel
+        self._data      = deque(maxlen=jendela)
+        self._lock      = threading.Lock()
+
+    def catat(self, detik: float):
+        with self._lock:
+            self._data.append(detik)
+
+    def persentil(self, p: float) -> float | None:
+        """None jika sampel belum cukup."""
+        with self._lock:
+            data = sorted(self._data)
+        if len(data) < self.min_sampel:
+            return None
+        k = (len(data) - 1) * p / 100
+        i = int(k)
+        j = min(i + 1, len(data) - 1)
+        return data[i] + (data[j] - data[i]) * (k - i)
+
+
+class _AliranGemini:
+    """
+    Iterator potongan teks generate_stream. `lepas` (slot executor) dipanggil
+    tepat sekali: saat potongan habis / error, close(), atau objeknya dibuang
+    tanpa pernah diiterasi (generator yang belum mulai tidak menjalankan finally).
+    """
+
+    def __init__(self, lepas):
+        self.gen    = None
+        self._lepas = lepas
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self.gen)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        lepas, self._lepas = self._lepas, None
+        if lepas is None:
+            return
+        try:
+            if self.gen is not None:
+                self.gen.close()
+        finally:
+            lepas()
+
+    __del__ = close
+
+
+class GeminiExecutor:
+    """
+    Menjalankan fungsi blocking di thread pool native dengan batas paralel.
+
+    → Di worker gevent: pakai threadpool milik hub gevent (thread OS asli),
+      greenlet pemanggil menunggu secara kooperatif.
+    → Di luar gevent (python app.py, sync worker): ThreadPoolExecutor biasa.
+
+    Pool & semaphore dibuat lazy dan dibuat ulang setelah fork, sehingga aman
+    dengan gunicorn --preload.
+
+    Jika `kuota` diberikan (KuotaGemini), setiap generate() mengantri dulu
+    di penjadwal kuota sebelum masuk thread pool.
+
+    `catat(nama, detik)` (opsional) menerima lama menunggu: 'antri_kuota'
+    dan 'antri_gemini' (menunggu slot thread pool).
+
+    Latensi generate_content yang berhasil dicatat di `self.latensi`
+    (PelacakLatensi) — dasar tunda untuk generate_lindung().
+    """
+
+    def __init__(self, max_paralel: int = 4, kuota=None, catat=None):
+        self.max_paralel = max(1, max_paralel)
+        self.kuota       = kuota
+        self.catat       = catat
+        self._pid        = None
+        self._sem        = None
+        self._pool       = None
+        self._lock       = threading.Lock()
+        self._aktif      = 0
+        self._menunggu   = 0
+        self._dibuang    = 0
+        self.latensi     = PelacakLatensi()
+
+    def _siapkan(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if gevent_aktif():
+                import gevent
+                from gevent.lock import BoundedSemaphore
+                hub_pool = gevent.get_hub().threadpool
+                hub_pool.maxsize = max(hub_pool.maxsize, self.max_paralel)
+                self._pool = None
+                self._sem  = BoundedSemaphore(self.max_paralel)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_paralel, thread_name_prefix='gemini'
+                )
+                self._sem  = threading.BoundedSemaphore(self.max_paralel)
+            self._pid = os.getpid()
+
+    def _antri_slot(self):
+        """Tunggu (kooperatif) sampai ada slot semaphore kosong, lalu ambil."""
+        self._siapkan()
+        with self._lock:
+            self._menunggu += 1
+        t0 = time.perf_counter()
+        self._sem.acquire()
+        if self.catat is not None:
+            self.catat('antri_gemini', time.perf_counter() - t0)
+        with self._lock:
+            self._menunggu -= 1
+            self._aktif   += 1
+
+    def _lepas_slot(self, _=None):
+        with self._lock:
+            self._aktif -= 1
+        self._sem.release()
+
+    def _kirim(self, fn, *args, _selesai=None, **kwargs):
+        """Submit fn ke thread pool TANPA menyentuh semaphore. _selesai(hasil) dipanggil saat fn selesai."""
+        if self._pool is None:
+            import gevent
+            hasil = gevent.get_hub().threadpool.spawn(fn, *args, **kwargs)
+            if _selesai is not None:
+                hasil.rawlink(_selesai)
+        else:
+            hasil = self._pool.submit(fn, *args, **kwargs)
+            if _selesai is not None:
+                hasil.add_done_callback(_selesai)
+        return hasil
+
+    def _mulai(self, fn, *args, _punya_slot: bool = False, **kwargs):
+        """
+        Mulai fn di thread pool tanpa menunggu hasilnya. Return Future
+        (gevent: AsyncResult). Slot semaphore baru dilepas saat fn selesai,
+        juga jika hasilnya tidak ditunggu lagi (panggilan yang dibuang).
+        _punya_slot=True → slot sudah diambil pemanggil (_ambil_slot).
+        """
+        if _punya_slot:
+            with self._lock:
+                self._aktif += 1
+        else:
+            self._antri_slot()
+        try:
+            return self._kirim(fn, *args, _selesai=self._lepas_slot, **kwargs)
+        except BaseException:
+            self._lepas_slot()
+            raise
+
+    def _ambil_slot(self) -> bool:
+        """Ambil slot thread pool hanya jika kosong saat ini (tidak menunggu)."""
+        self._siapkan()
+        return self._sem.acquire(blocking=False)
+
+    def _hasil(self, hasil):
+        return hasil.get() if self._pool is None else hasil.result()
+
+    def _tunggu_satu(self, daftar: list, timeout: float | None = None) -> list:
+        """Tunggu sampai minimal satu selesai (atau timeout). Return yang sudah selesai."""
+        if self._pool is None:
+            import gevent
+            return gevent.wait(daftar, timeout=timeout, count=1)
+        return list(tunggu_future(daftar, timeout=timeout, return_when=FIRST_COMPLETED).done)
+
+    def jalankan(self, fn, *args, **kwargs):
+        """Jalankan fn(*args, **kwargs) di thread pool, tunggu hasilnya."""
+        return self._hasil(self._mulai(fn, *args, **kwargs))
+
+    def _generate_terukur(self, model, konten: list, timeout: float):
+        t0 = time.perf_counter()
+        response = model.generate_content(konten, request_options={'timeout': timeout})
+        self.latensi.catat(time.perf_counter() - t0)
+        return response
+
+    def _ambil_kuota(self):
+        if self.kuota is not None:
+            tunggu = self.kuota.ambil()
+            if self.catat is not None:
+                self.catat('antri_kuota', tunggu)
+
+    def generate(self, model, konten: list, timeout: float = 50):
+        """model.generate_content(...) versi non-blocking untuk worker."""
+        self._ambil_kuota()
+        return self.jalankan(self._generate_terukur, model, konten, timeout)
+
+    def generate_stream(self, model, konten: list, timeout: float = 50) -> tuple:
+        """
+        generate_content(stream=True): return (response, potongan) dengan
+        `potongan` iterator teks per chunk. Tiap langkah iterasi (yang
+        blocking menunggu jaringan) dijalankan di thread pool, sehingga
+        greenlet lain tetap jalan di antara chunk. Kuota & satu slot
+        semaphore diambil sekali di awal; slot ditahan sampai potongan habis,
+        ditutup, atau dibuang — stream yang sudah jalan tidak mengantri lagi
+        di belakang request baru di antara chunk.
+        response.usage_metadata baru lengkap setelah potongan habis.
+        """
+        self._ambil_kuota()
+        t0 = time.perf_counter()
+        self._antri_slot()
+        aliran = _AliranGemini(self._lepas_slot)
+        try:
+            response = self._hasil(self._kirim(model.generate_content, konten, stream=True,
+                                               request_options={'timeout': timeout}))
+        except BaseException:
+            aliran.close()
+            raise
+
+        def potongan():
+            it = self._hasil(self._kirim(iter, response))
+            while True:
+                chunk = self._hasil(self._kirim(next, it, None))
+                if chunk is None:
+                    break
+                try:
+                    teks = chunk.text
+                except ValueError:
+                    continue   # chunk tanpa part teks (mis. hanya finish_reason)
+                if teks:
+                    yield teks
+            self.latensi.catat(time.perf_counter() - t0)
+
+        aliran.gen = potongan()
+        return response, aliran
+
+    def generate_lindung(self, model, konten: list, terima, timeout: float = 50,
+                         tunda: float | None = None, konten_lindung=None,
+                         cadangan_token: float = 1.0) -> tuple:
+        """
+        Hedged request: jika panggilan utama belum menjawab setelah `tunda`
+        detik, kirim panggilan kedua (isi `konten_lindung()` jika diberikan,
+        mis. varian preprocess lain). Jawaban pertama yang lolos `terima` menang.
+
+        terima(response) → (nilai, lolos): raise jika jawaban tidak terbaca.
+        Panggilan kedua hanya dikirim jika ada slot thread pool kosong dan kuota
+        per menit masih punya token tanpa mengantri (kuota.coba_ambil) —
+        hedging tidak pernah menunggu dan tidak pernah melewati limit.
+        Yang kalah dibatalkan jika belum jalan; jika sudah jalan hasilnya
+        dibuang (selesai sendiri paling lama `timeout`).
+
+        Return (response, nilai, info) dengan info = {'lindung': terkirim /
+        'kuota' / 'slot' / 'gagal' (konten_lindung() error; slot & kuota
+        dikembalikan) / 'tidak', 'pemenang': 'utama' / 'lindung', 'lolos': bool}.
+        Jika tidak ada yang lolos → jawaban terbaca pertama; tidak ada yang
+        terbaca → error panggilan pertama di-raise.
+        """
+        self._ambil_kuota()
+        utama = self._mulai(self._generate_terukur, model, konten, timeout)
+        jalan = {utama: 'utama'}
+        info  = {'lindung': 'tidak', 'pemenang': 'utama', 'lolos': False}
+
+        if tunda is not None and not self._tunggu_satu([utama], timeout=tunda):
+            info['lindung'] = self._kirim_lindung(jalan, model, konten, konten_lindung,
+                                                  timeout, cadangan_token)
+
+        cadangan, error = None, None
+        while jalan:
+            for hasil in self._tunggu_satu(list(jalan)):
+                nama = jalan.pop(hasil)
+                try:
+                    response = self._hasil(hasil)
+                    nilai, lolos = terima(response)
+                except Exception as e:
+                    error = error or e
+                    continue
+                if lolos:
+                    self._buang(jalan)
+                    info.update(pemenang=nama, lolos=True)
+                    return response, nilai, info
+                if cadangan is None:
+                    cadangan = (response, nilai, nama)
+        if cadangan is not None:
+            info['pemenang'] = cadangan[2]
+            return cadangan[0], cadangan[1], info
+        raise error
+
+    def _kirim_lindung(self, jalan: dict, model, konten, konten_lindung,
+                       timeout: float, cadangan_token: float) -> str:
+        if not self._ambil_slot():
+            return 'slot'
+        if self.kuota is not None and not self.kuota.coba_ambil(cadangan_token):
+            self._sem.release()
+            return 'kuota'
+        try:
+            isi = konten_lindung() if konten_lindung is not None else konten
+        except Exception:
+            # Varian cadangan gagal disiapkan: panggilan utama tetap ditunggu
+            self._sem.release()
+            if self.kuota is not None:
+                self.kuota.kembalikan()
+            return 'gagal'
+        jalan[self._mulai(self._generate_terukur, model, isi, timeout, _punya_slot=True)] = 'lindung'
+        return 'terkirim'
+
+    def _buang(self, jalan: dict):
+        for hasil in jalan:
+            if self._pool is not None:
+                hasil.cancel()
+            with self._lock:
+                self._dibuang += 1
+
+    def stats(self) -> dict:
+        return {
+            'max_paralel': self.max_paralel,
+            'aktif':       self._aktif,
+            'menunggu':    self._menunggu,
+            'dibuang':     self._dibuang,
+        }
+
+
+# ══════════════════════════════════════════════════════════════════
+# REGISTRI MODEL — GenerativeModel & koneksi Gemini hidup selama worker
+# Dibuat sekali per proses (bukan per request), dan dipanaskan saat
+# worker start agar OCR pertama tidak membayar setup koneksi + TLS.
+# ══════════════════════════════════════════════════════════════════
+class RegistriModel:
+    """
+    Menyimpan GenerativeModel per (nama model, opsi) untuk dipakai ulang.
+
+    → Client genai (channel gRPC / sesi HTTP keep-alive) dibuat ulang lazy
+      per proses: genai.configure() dipanggil lagi setelah fork, sehingga
+      worker tidak mewarisi koneksi milik master (gunicorn --preload).
+    → pemanasan(): count_tokens kecil lewat client yang sama dengan
+      generate_content — membuka koneksi tanpa memakai kuota generate.
+    """
+
+    def __init__(self, api_key: str | None, nama_model: str, timeout: float = 50,
+                 transport: str | None = None, timeout_pemanasan: float = 10):
+        self.api_key           = api_key
+        self.nama_model        = nama_model
+        self.timeout           = timeout
+        self.transport         = transport or None
+        self.timeout_pemanasan = timeout_pemanasan
+        self._pid              = None
+        self._model            = {}
+        self._lock             = threading.Lock()
+        self._pemanasan        = None   # None = belum; dict hasil pemanasan terakhir
+
+    def _siapkan(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key, transport=self.transport)
+            self._model     = {}
+            self._pemanasan = None
+            self._pid       = os.getpid()
+
+    def model(self, nama: str | None = None, **opsi):
+        """
+        GenerativeModel siap pakai. `opsi` diteruskan ke konstruktor
+        (mis. system_instruction); kombinasi yang sama → objek yang sama.
+        """
+        self._siapkan()
+        kunci = (nama or self.nama_model, repr(sorted(opsi.items())))
+        m = self._model.get(kunci)
+        if m is None:
+            with self._lock:
+                m = self._model.get(kunci)
+                if m is None:
+                    import google.generativeai as genai
+                    m = self._model[kunci] = genai.GenerativeModel(kunci[0], **opsi)
+        return m
+
+    def pemanasan(self) -> dict:
+        """Buka koneksi ke Gemini lebih awal. Gagal pemanasan tidak fatal."""
+        t0 = time.perf_counter()
+        try:
+            self.model().count_tokens('ping', request_options={
+                'timeout': self.timeout_pemanasan, 'retry': None,
+            })
+            hasil = {'ok': True}
+        except Exception as e:
+            hasil = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+        hasil['detik'] = round(time.perf_counter() - t0, 3)
+        self._pemanasan = hasil
+        return hasil
+
+    def stats(self) -> dict:
+        return {
+            'model':     self.nama_model,
+            'timeout':   self.timeout,
+            'transport': self.transport or 'default',
+            'instance':  len(self._model) if self._pid == os.getpid() else 0,
+            'pemanasan': self._pemanasan,
+        }
@@ -0,0 +1,24 @@
+# Dibaca otomatis oleh gunicorn dari direktori kerja (lihat Procfile).
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Lebih dari satu worker hanya benar dengan STATE_BERSAMA (kuota, cache & sesi bersama)
+workers = int(os.getenv('WEB_CONCURRENCY', 1))
+
+
+def on_starting(server):
+    if server.cfg.workers > 1 and not os.getenv('STATE_BERSAMA'):
+        server.log.warning(
+            '%d worker tanpa STATE_BERSAMA: kuota Gemini, cache OCR & sesi terpisah per worker',
+            server.cfg.workers,
+        )
+
+
+def post_worker_init(worker):
+    # App sudah dimuat di worker ini (juga dengan --preload):
+    # buka koneksi Gemini sekarang, bukan saat OCR pertama.
+    from app import panaskan_gemini
+    panaskan_gemini()
@@ -0,0 +1,703 @@
+import os
+import io
+import time
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageOps
+
+
+MAX_WIDTH = 1600
+KONTRAS   = 1.5
+KETAJAMAN = 1.8
+
+# Upload yang sudah dinormalisasi browser (templates/index.html, Web Worker):
+# lebar ≤ MAX_WIDTH, Contrast KONTRAS + Sharpness KETAJAMAN sudah diterapkan,
+# di-encode dengan format & quality server. Naikkan versi jika langkahnya berubah.
+VERSI_KLIEN = 'klien-1'
+
+
+def _buka(sumber: bytes | str) -> Image.Image:
+    """Buka gambar dari bytes atau path file (upload yang di-spool ke disk)."""
+    if isinstance(sumber, (bytes, bytearray)):
+        return Image.open(io.BytesIO(sumber))
+    return Image.open(sumber)
+
+
+# ══════════════════════════════════════════════════════════════════
+# PREPROCESSING GAMBAR — tingkatkan kualitas sebelum dikirim ke Gemini
+# ══════════════════════════════════════════════════════════════════
+def preprocess_image(sumber: bytes | str, potong: bool = False,
+                     encode: dict | None = None) -> bytes:
+    """
+    Preprocess gambar untuk Gemini.
+    Railway-safe: hanya DOWNSCALE (tidak upscale), JPEG quality rendah,
+    agar payload kecil dan pemrosesan cepat.
+    `sumber` boleh bytes atau path file; path lebih hemat memori karena
+    file tidak perlu dibaca utuh dulu.
+    `potong` = True → hanya area tabel + ringkasan yang dikirim (lihat
+    deteksi_area_tabel); gambar utuh dipakai jika keyakinan < `min_keyakinan`.
+    `encode` = opsi encode_gambar (format, abu, kualitas, target_bytes, ...);
+    None → JPEG berwarna quality 80.
+    """
+    return preprocess_image_terukur(sumber, potong, encode=encode)[0]
+
+
+def preprocess_image_terukur(sumber: bytes | str, potong: bool = False,
+                             min_keyakinan: float = 0.6, encode: dict | None = None,
+                             sidik: bool = False, klien: bool = False) -> tuple[bytes, dict, dict]:
+    """
+    Sama dengan preprocess_image, plus durasi per tahap (detik):
+    {'decode', 'deteksi' (jika potong), 'resize', 'enhance', 'sidik' (jika sidik),
+    'encode'} dan info {'dipotong', 'keyakinan', 'rasio_area', 'encode': {...},
+    'sidik': {...} (jika sidik), 'klien'} (lihat encode_gambar, sidik_gambar).
+    Dipakai untuk metrik; nilai dikembalikan (bukan dicatat) karena fungsi ini
+    bisa berjalan di proses lain.
+
+    `klien` = True → upload mengaku sudah dinormalisasi browser (VERSI_KLIEN).
+    Diterima hanya jika lebarnya ≤ MAX_WIDTH: enhance dilewati, dan jika tidak
+    dipotong & format sama, bytes upload dikirim apa adanya (tanpa re-encode).
+    info['klien']: None (tidak mengaku), 'utuh', 'dienkode' atau 'ditolak'.
+    """
+    encode = dict(encode or {})
+    abu    = encode.pop('abu', False)
+    waktu = {}
+    t0    = time.perf_counter()
+    img   = _buka(sumber)
+    status_klien = None
+    if klien:
+        # Lebih lebar dari MAX_WIDTH → bukan hasil normalisasi browser, proses penuh
+        status_klien = 'dienkode' if img.size[0] <= MAX_WIDTH else 'ditolak'
+        klien        = status_klien == 'dienkode'
+
+    # Downscale saja jika lebih besar dari 1600px — JANGAN upscale
+    # (upscale hanya memperbesar file tanpa menambah informasi)
+    w, h = img.size
+    target = (MAX_WIDTH, int(h * MAX_WIDTH / w)) if w > MAX_WIDTH else None
+
+    # JPEG: decode langsung di skala 1/2, 1/4 atau 1/8 (DCT scaling).
+    # draft() memilih skala terkecil yang hasilnya masih >= target,
+    # jadi foto 12–50 MP tidak pernah di-decode penuh ke memori.
+    if target and img.format == 'JPEG':
+        img.draft('RGB', target)
+    img.load()
+    t1 = time.perf_counter()
+    waktu['decode'] = t1 - t0
+
+    # Potong ke area tabel (di resolusi hasil draft, sebelum resize)
+    info = {'dipotong': False, 'keyakinan': None, 'rasio_area': 1.0}
+    format_asal = img.format
+    if potong:
+        try:
+            area, keyakinan = deteksi_area_tabel(img)
+        except Exception:
+            area, keyakinan = [], 0.0
+        info['keyakinan'] = keyakinan
+        if area and keyakinan >= min_keyakinan:
+            # Skala sama seperti foto utuh → resolusi digit tidak berubah, piksel berkurang
+            skala     = target[0] / img.size[0] if target else 1.0
+            luas_awal = img.size[0] * img.size[1]
+            img = susun_area(img, area)
+            info.update(dipotong=True, rasio_area=round(img.size[0] * img.size[1] / luas_awal, 3))
+            target = (max(1, round(img.size[0] * skala)),
+                      max(1, round(img.size[1] * skala))) if skala < 1 else None
+        waktu['deteksi'] = time.perf_counter() - t1
+        t1 += waktu['deteksi']
+
+    # Konversi ke RGB, atau grayscale: DO = tinta di atas kertas, warna
+    # tidak membawa informasi dan 1 channel jauh lebih kecil setelah encode
+    mode = 'L' if abu else 'RGB'
+    if img.mode != mode:
+        img = img.convert(mode)
+
+    if target:
+        # Sisa pengecilan besar → reduce() (box, murah) dulu, sisakan
+        # minimal 2x target untuk pass LANCZOS terakhir agar digit tetap tajam
+        faktor = img.size[0] // (MAX_WIDTH * 2)
+        if faktor >= 2:
+            img = img.reduce(faktor)
+        img = img.resize(target, Image.LANCZOS)
+    t2 = time.perf_counter()
+    waktu['resize'] = t2 - t1
+
+    # Enhance ringan — hindari operasi berat (upload dari browser: sudah di sana)
+    # (salinan lama langsung dilepas dengan menimpa variabel yang sama)
+    if not klien:
+        img = ImageEnhance.Contrast(img).enhance(KONTRAS)
+        img = ImageEnhance.Sharpness(img).enhance(KETAJAMAN)
+    t3 = time.perf_counter()
+    waktu['enhance'] = t3 - t2
+
+    if sidik:
+        info['sidik']  = sidik_gambar(img)
+        waktu['sidik'] = time.perf_counter() - t3
+        t3 += waktu['sidik']
+
+    # Default quality 80 — cukup untuk OCR, jauh lebih kecil dari 95
+    format_ = encode.get('format', 'jpeg')
+    utuh    = (klien and not info['dipotong'] and not abu
+               and format_asal == {'jpeg': 'JPEG', 'webp': 'WEBP'}.get(format_))
+    if utuh and not isinstance(sumber, (bytes, bytearray)):
+        with open(sumber, 'rb') as f:
+            sumber = f.read()
+    if utuh and (not encode.get('target_bytes') or len(sumber) <= encode['target_bytes']):
+        # Sudah dikecilkan, di-enhance & di-encode browser → dipakai apa adanya
+        data, status_klien = bytes(sumber), 'utuh'
+        info['encode']     = {'format': format_, 'kualitas': None, 'lebar': img.size[0],
+                              'percobaan': 0, 'muat': True}
+    else:
+        data, info['encode'] = encode_gambar(img, **encode)
+    info['klien'] = status_klien
+    img.close()
+    waktu['encode'] = time.perf_counter() - t3
+    return data, waktu, info
+
+
+# ══════════════════════════════════════════════════════════════════
+# SIDIK GAMBAR — deteksi foto ulang dokumen yang sama (lihat indeks_mirip.py)
+#
+# phash : 64 bit, DCT 8×8 frekuensi terendah dari thumbnail 32×32 — tahan
+#         kompresi, cahaya & geser kecil; mewakili TATA LETAK foto.
+# sel   : satu bit per sel tabel (tinta sel > median kolomnya) dari grid
+#         tabel — mewakili ISI tulisan. Dua DO berformat sama punya phash
+#         mirip, tapi bit sel-nya berbeda ± separuh.
+# ══════════════════════════════════════════════════════════════════
+_K = np.arange(32)
+_DCT32 = np.cos(np.pi * (2 * _K[None, :] + 1) * _K[:, None] / 64)
+
+
+def _bit_ke_int(bit: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bit.astype(np.uint8)).tobytes(), 'big') >> (-len(bit) % 8)
+
+
+def sidik_gambar(img: Image.Image) -> dict:
+    """{'phash': int 64 bit, 'sel': {'baris', 'kolom', 'bit'} atau None jika grid tidak terdeteksi}."""
+    abu   = img.convert('L')
+    kecil = np.asarray(abu.resize((32, 32), Image.BILINEAR), dtype=np.float64)
+    blok  = (_DCT32 @ kecil @ _DCT32.T)[:8, :8].flatten()
+    hasil = {'phash': _bit_ke_int(blok > np.median(blok[1:])), 'sel': None}
+
+    grid = deteksi_grid(abu)
+    if grid is not None:
+        tinta  = 255 - np.asarray(abu, dtype=np.float32)
+        gy, gx = grid['baris'], grid['kolom']
+        isi    = np.zeros((len(gy) - 1, len(gx) - 1), dtype=np.float32)
+        for i in range(len(gy) - 1):
+            my = (gy[i + 1] - gy[i]) * 0.2   # abaikan garis tabel di tepi sel
+            for j in range(len(gx) - 1):
+                mx = (gx[j + 1] - gx[j]) * 0.1
+                isi[i, j] = tinta[int(gy[i] + my):int(gy[i + 1] - my),
+                                  int(gx[j] + mx):int(gx[j + 1] - mx)].mean()
+        hasil['sel'] = {'baris': isi.shape[0], 'kolom': isi.shape[1],
+                        'bit': _bit_ke_int((isi > np.median(isi, axis=0)).flatten())}
+    return hasil
+
+
+# ══════════════════════════════════════════════════════════════════
+# ENCODE — format, quality & resolusi menyesuaikan anggaran byte
+# ══════════════════════════════════════════════════════════════════
+FORMAT_ENCODE = {'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+
+
+def mime_gambar(data: bytes) -> str:
+    """MIME dari magic bytes hasil preprocess (JPEG atau WebP)."""
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+def _simpan(img: Image.Image, format: str, kualitas: int) -> bytes:
+    buf = io.BytesIO()
+    if format == 'webp':
+        img.save(buf, format='WEBP', quality=kualitas, method=4)
+    else:
+        img.save(buf, format='JPEG', quality=kualitas, optimize=True)
+    return buf.getvalue()
+
+
+def encode_gambar(img: Image.Image, format: str = 'jpeg', kualitas: int = 80,
+                  target_bytes: int | None = None, min_kualitas: int = 40,
+                  min_lebar: int = 800, langkah_skala: float = 0.85) -> tuple[bytes, dict]:
+    """
+    Encode ke JPEG / WebP. Tanpa `target_bytes` → satu kali encode di `kualitas`.
+
+    Dengan `target_bytes`: jika hasil di `kualitas` terlalu besar, cari
+    (binary search) quality TERTINGGI di [min_kualitas, kualitas) yang muat.
+    Masih terlalu besar di min_kualitas → perkecil resolusi (× langkah_skala)
+    dan cari lagi, sampai lebar < min_lebar (hasil terkecil dipakai,
+    info['muat'] = False). Quality diturunkan dulu karena digit tulisan tangan
+    lebih tahan artefak kompresi daripada kehilangan piksel.
+    Return (bytes, info {'format', 'kualitas', 'lebar', 'percobaan', 'muat'}).
+    """
+    if format not in FORMAT_ENCODE:
+        raise ValueError(f'Format encode tidak dikenal: {format}')
+    data = _simpan(img, format, kualitas)
+    info = {'format': format, 'kualitas': kualitas, 'lebar': img.size[0],
+            'percobaan': 1, 'muat': not target_bytes or len(data) <= target_bytes}
+    if info['muat']:
+        return data, info
+
+    atas = kualitas - 1
+    while True:
+        lo, hi, terbaik = min_kualitas, atas, None
+        while lo <= hi:
+            q = (lo + hi) // 2
+            d = _simpan(img, format, q)
+            info['percobaan'] += 1
+            if len(d) <= target_bytes:
+                terbaik, lo = (d, q), q + 1
+            else:
+                hi = q - 1
+            if len(d) < len(data):
+                data, info['kualitas'], info['lebar'] = d, q, img.size[0]
+        if terbaik is not None:
+            info.update(kualitas=terbaik[1], lebar=img.size[0], muat=True)
+            return terbaik[0], info
+
+        lebar = int(img.size[0] * langkah_skala)
+        if lebar < min_lebar:
+            return data, info
+        img  = img.resize((lebar, max(1, round(img.size[1] * lebar / img.size[0]))), Image.LANCZOS)
+        atas = kualitas
+
+
+def varian_lindung(sumber: bytes | str) -> bytes:
+    """
+    Varian lain dari gambar hasil preprocess untuk permintaan cadangan
+    (hedging): grayscale + autocontrast, sehingga jika satu versi sulit
+    dibaca model, versi lain punya peluang berbeda. Ukuran tetap.
+    """
+    with _buka(sumber) as img:
+        img = ImageOps.autocontrast(img.convert('L'), cutoff=1)
+        buf = io.BytesIO()
+        img.save(buf, format='JPEG', quality=80, optimize=True)
+    return buf.getvalue()
+
+
+# ══════════════════════════════════════════════════════════════════
+# DETEKSI AREA TABEL — potong latar (meja, tangan, kop surat) sebelum OCR
+# Lokal & murah: projection profile garis horizontal/vertikal di versi
+# grayscale kecil. Keyakinan rendah → gambar utuh tetap dipakai.
+# ══════════════════════════════════════════════════════════════════
+LEBAR_DETEKSI = 800
+
+
+def _otsu(a: np.ndarray) -> float:
+    hist  = np.bincount(a.astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+    p     = hist / hist.sum()
+    omega = np.cumsum(p)
+    mu    = np.cumsum(p * np.arange(256))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = (mu[-1] * omega - mu) ** 2 / (omega * (1 - omega))
+    if np.isnan(sigma).all():   # gambar satu warna
+        return float(a.mean())
+    return float(np.nanargmax(sigma))
+
+
+def _runs(mask: np.ndarray) -> list:
+    """Rentang [awal, akhir) dari nilai True berurutan."""
+    d = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(d == 1), np.flatnonzero(d == -1)))
+
+
+def _terpanjang(mask: np.ndarray, celah: int = 0) -> tuple:
+    """Rentang True terpanjang; celah False ≤ `celah` piksel (mis. garis tabel) dianggap True."""
+    if celah:
+        mask = mask.copy()
+        for a, b in _runs(~mask):
+            if b - a <= celah and a > 0 and b < len(mask):
+                mask[a:b] = True
+    runs = _runs(mask)
+    return max(runs, key=lambda r: r[1] - r[0]) if runs else (0, len(mask))
+
+
+def _analisis_tabel(img: Image.Image) -> dict | None:
+    """
+    Analisis bersama deteksi_area_tabel & deteksi_grid, di versi grayscale
+    kecil `img`: area kertas, peta tinta, garis horizontal, dan rantai garis
+    tabel. None jika tabel tidak ditemukan.
+    """
+    faktor = max(1, img.size[0] // LEBAR_DETEKSI)
+    abu    = img.convert('L')
+    if faktor > 1:
+        abu = abu.reduce(faktor)
+    a = np.asarray(abu, dtype=np.float32)
+    H, W = a.shape
+
+    # 1. Kertas: area terang terbesar (meja & tangan lebih gelap)
+    terang = a > _otsu(a)
+    celah    = max(2, min(H, W) // 50)
+    ky0, ky1 = _terpanjang(terang.mean(axis=1) > 0.3, celah)
+    kx0, kx1 = _terpanjang(terang[ky0:ky1].mean(axis=0) > 0.3, celah)
+    kertas   = a[ky0:ky1, kx0:kx1]
+    if kertas.size == 0:
+        return None
+
+    # 2. Garis tabel: baris piksel yang sebagian besar bertinta
+    tinta  = kertas < np.median(kertas) * 0.75
+    garis  = [(y0 + y1) / 2 for y0, y1 in _runs(tinta.mean(axis=1) > 0.45)]
+    if len(garis) < 4:
+        return None
+
+    # Rantai garis berjarak teratur terpanjang = tabel rincian (+ baris ringkasan)
+    jarak = np.diff(garis)
+    pitch = float(np.median(jarak))
+    rantai, awal = (0, 0), 0
+    for i, d in enumerate(jarak, start=1):
+        if d > pitch * 1.6:
+            awal = i
+        if i - awal > rantai[1] - rantai[0]:
+            rantai = (awal, i)
+    if rantai[1] - rantai[0] < 3:
+        return None
+
+    t_atas, t_bawah = garis[rantai[0]], garis[rantai[1]]
+    kolom = tinta[int(t_atas):int(t_bawah) + 1].mean(axis=0)
+    return {
+        'skala': img.size[0] / W, 'W': W, 'H': H, 'kx0': kx0, 'ky0': ky0,
+        'tinta': tinta, 'garis': garis, 'rantai': rantai, 'pitch': pitch,
+        'jarak': jarak, 'kolom': kolom,
+    }
+
+
+def deteksi_area_tabel(img: Image.Image) -> tuple[list, float]:
+    """
+    Cari area yang perlu dibaca Gemini: blok ringkasan atas, tabel rincian,
+    dan baris Ekor/Bruto/Terra/Netto di bawahnya.
+
+    Return (area, keyakinan): area = daftar kotak (x0, y0, x1, y1) dalam
+    koordinat `img`, berurutan dari atas; keyakinan 0–1.
+    Asumsi: foto kurang lebih lurus (tabel tidak miring jauh).
+    """
+    t = _analisis_tabel(img)
+    if t is None:
+        return [], 0.0
+    W, H, kx0, ky0 = t['W'], t['H'], t['kx0'], t['ky0']
+    tinta, garis, rantai, pitch = t['tinta'], t['garis'], t['rantai'], t['pitch']
+    t_atas, t_bawah = garis[rantai[0]], garis[rantai[1]]
+    j_rantai = t['jarak'][rantai[0]:rantai[1]]
+    kolom    = t['kolom']
+
+    # Batas kiri-kanan: garis vertikal di rentang tabel, atau sebaran tinta
+    tegak = np.flatnonzero(kolom > 0.5)
+    if len(tegak) < 2:
+        tegak = np.flatnonzero(kolom > 0.02)
+    x0, x1 = tegak[0] - pitch / 2, tegak[-1] + pitch / 2
+
+    # 3. Ringkasan atas: garis di atas tabel (maks 8 pitch), atau 3 pitch di atasnya
+    di_atas = [y for y in garis[:rantai[0]] if y >= t_atas - 8 * pitch]
+    atas    = ((min(di_atas) - pitch / 2, max(di_atas) + pitch / 2) if di_atas
+               else (t_atas - 3 * pitch, t_atas))
+
+    # 4. Baris ringkasan di bawah garis terakhir (jika tidak bergaris): pita tinta bersambung
+    bawah = t_bawah + pitch / 2
+    isi   = tinta[:, max(0, int(x0)):int(x1) + 1].mean(axis=1) > 0.01
+    y, batas = int(t_bawah) + 1, t_bawah + 4.5 * pitch
+    kosong   = 0
+    while y < len(isi) and y < batas:
+        kosong = 0 if isi[y] else kosong + 1
+        if kosong > pitch:
+            break
+        if isi[y]:
+            bawah = max(bawah, y + pitch / 2)
+        y += 1
+
+    # Gabungkan pita yang berdekatan; sisanya disusun bertumpuk
+    pita = [[max(0.0, atas[0]), atas[1]], [t_atas - pitch / 2, bawah]]
+    if pita[1][0] - pita[0][1] < 2 * pitch:
+        pita = [[pita[0][0], pita[1][1]]]
+
+    # Keyakinan: banyak garis, jarak teratur, potongan tidak (hampir) seluruh kertas
+    n_garis   = rantai[1] - rantai[0] + 1
+    teratur   = 1 - min(1.0, float(np.std(j_rantai) / (np.mean(j_rantai) or 1)))
+    luas      = sum(p[1] - p[0] for p in pita) * (x1 - x0) / (W * H)
+    keyakinan = min(1.0, (n_garis - 2) / 6) * teratur * (1.0 if 0.05 < luas < 0.9 else 0.5)
+
+    skala = t['skala']
+    area  = []
+    for y0, y1 in pita:
+        area.append((
+            int(max(0, (kx0 + x0) * skala)), int(max(0, (ky0 + y0) * skala)),
+            int(min(img.size[0], (kx0 + x1) * skala)), int(min(img.size[1], (ky0 + y1) * skala)),
+        ))
+    return area, round(keyakinan, 3)
+
+
+def susun_area(img: Image.Image, area: list) -> Image.Image:
+    """Potong setiap area lalu tumpuk vertikal (latar putih, jarak kecil)."""
+    if len(area) == 1:
+        return img.crop(area[0])
+    potongan = [img.crop(k) for k in area]
+    celah    = max(8, img.size[1] // 200)
+    kanvas   = Image.new(img.mode, (max(p.size[0] for p in potongan),
+                                    sum(p.size[1] for p in potongan) + celah * (len(potongan) - 1)),
+                         'white')
+    y = 0
+    for p in potongan:
+        kanvas.paste(p, (0, y))
+        y += p.size[1] + celah
+    return kanvas
+
+
+def deteksi_grid(img: Image.Image) -> dict | None:
+    """
+    Garis tabel dalam koordinat `img`: 'baris' = y garis horizontal tabel
+    (atas → bawah), 'kolom' = x garis vertikal (kiri → kanan). Dipakai
+    retry terarah untuk memotong sel tertentu. None jika tidak terdeteksi.
+    """
+    t = _analisis_tabel(img)
+    if t is None:
+        return None
+    skala, tinta = t['skala'], t['tinta']
+    tegak = [(x0 + x1) // 2 for x0, x1 in _runs(t['kolom'] > 0.5)]
+    if len(tegak) < 2:
+        return None
+
+    # Pita sel tabel dilintasi (hampir) semua garis vertikal. Pita lain yang
+    # ikut terangkai (celah kosong, kotak ringkasan atas) dibuang.
+    garis = t['garis'][t['rantai'][0]:t['rantai'][1] + 1]
+    sel   = []
+    for ya, yb in zip(garis, garis[1:]):
+        tengah = tinta[int((ya + yb) / 2)]
+        kena   = sum(bool(tengah[max(0, x - 1):x + 2].any()) for x in tegak)
+        sel.append(kena >= 0.8 * len(tegak))
+    a, b = _terpanjang(np.array(sel))
+    if b - a < 2:
+        return None
+    return {
+        'baris': [(t['ky0'] + y) * skala for y in garis[a:b + 1]],
+        'kolom': [(t['kx0'] + x) * skala for x in tegak],
+    }
+
+
+def _gabung_rentang(rentang: list, celah: float = 0) -> list:
+    hasil = []
+    for a, b in sorted(rentang):
+        if hasil and a <= hasil[-1][1] + celah:
+            hasil[-1][1] = max(hasil[-1][1], b)
+        else:
+            hasil.append([a, b])
+    return hasil
+
+
+def potong_sel(sumber: bytes | str, baris: list | None, kolom: list | None,
+               atas: bool = False, n_kolom: int | None = None) -> bytes | None:
+    """
+    Potong gambar hasil preprocess ke sel tertentu dari grid tabel.
+
+    baris   : indeks pita baris tabel (0 = header, negatif = dari bawah); None = semua,
+              [] = hanya area atas (butuh atas=True)
+    kolom   : indeks pita kolom (0 = kolom No) yang diambil; None = semua
+    atas    : sertakan area di atas tabel (ringkasan atas)
+    n_kolom : `kolom` hanya dipakai jika grid punya tepat n_kolom kolom
+              (tata letak sesuai dugaan); selain itu semua kolom diambil
+
+    Pita-pita yang terpilih disusun rapat (baris bertumpuk, kolom berdampingan).
+    Return JPEG, atau None jika grid tidak terdeteksi / indeks di luar grid.
+    """
+    with _buka(sumber) as img:
+        img.load()
+        mode = 'L' if img.mode == 'L' else 'RGB'   # hasil preprocess grayscale tetap grayscale
+        img  = img.convert(mode)
+        grid = deteksi_grid(img)
+        if grid is None:
+            return None
+        gy, gx = grid['baris'], grid['kolom']
+        ny, nx = len(gy) - 1, len(gx) - 1
+        if kolom is None or (n_kolom is not None and n_kolom != nx):
+            kolom = range(nx)
+        if baris is None:
+            baris = range(ny)
+        if any(not -ny <= i < ny for i in baris) or any(not 0 <= i < nx for i in kolom):
+            return None
+        baris = {i % ny for i in baris}
+        if not baris and not (atas and gy[0] > 1):
+            return None
+
+        m  = 3   # sisakan garis tabel sebagai pembatas visual
+        ys = _gabung_rentang([(gy[i] - m, gy[i + 1] + m) for i in baris])
+        xs = _gabung_rentang([(gx[i] - m, gx[i + 1] + m) for i in kolom])
+        if atas and gy[0] > 1:
+            ys.insert(0, [0, gy[0]])
+            xs_atas = [[0, img.size[0]]]
+        else:
+            xs_atas = None
+
+        potongan = []
+        for j, (y0, y1) in enumerate(ys):
+            xr = xs_atas if (j == 0 and xs_atas) else xs
+            bagian = [img.crop((int(max(0, x0)), int(max(0, y0)),
+                                int(min(img.size[0], x1)), int(min(img.size[1], y1)))) for x0, x1 in xr]
+            baris_img = Image.new(mode, (sum(b.size[0] for b in bagian), bagian[0].size[1]), 'white')
+            x = 0
+            for b in bagian:
+                baris_img.paste(b, (x, 0))
+                x += b.size[0]
+            potongan.append(baris_img)
+
+        kanvas = Image.new(mode, (max(p.size[0] for p in potongan), sum(p.size[1] for p in potongan)),
+                           'white')
+        y = 0
+        for p in potongan:
+            kanvas.paste(p, (0, y))
+            y += p.size[1]
+
+    buf = io.BytesIO()
+    kanvas.save(buf, format='JPEG', quality=80, optimize=True)
+    return buf.getvalue()
+
+
+def estimasi_memori(sumber: bytes | str) -> int:
+    """
+    Perkiraan puncak memori (bytes) untuk preprocess satu gambar.
+    Hanya membaca header (murah). Memperhitungkan skala decode draft() JPEG:
+    ± 3 salinan RGB (decode, convert/resize, enhance) + ukuran file.
+    """
+    ukuran_file = len(sumber) if isinstance(sumber, (bytes, bytearray)) else os.path.getsize(sumber)
+    try:
+        with _buka(sumber) as img:
+            w, h = img.size
+            skala = 1
+            if img.format == 'JPEG':
+                while skala < 8 and w // (skala * 2) >= MAX_WIDTH:
+                    skala *= 2
+    except Exception:
+        return ukuran_file
+    return ukuran_file + (w // skala) * (h // skala) * 3 * 3
+
+
+# ══════════════════════════════════════════════════════════════════
+# ANGGARAN MEMORI — batasi total memori upload yang sedang diproses
+# agar container kecil (Railway) tidak OOM saat banyak upload bersamaan
+# ══════════════════════════════════════════════════════════════════
+class AnggaranMemori:
+    """
+    Semaphore berbobot bytes. pakai(n) menunggu sampai total in-flight + n
+    muat di `max_bytes`. Satu job yang lebih besar dari anggaran tetap boleh
+    jalan jika tidak ada job lain (agar tidak macet selamanya).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._terpakai = 0
+        self._menunggu = 0
+        self._pid      = None
+        self._cond     = None
+
+    def _siapkan(self):
+        if self._pid != os.getpid():
+            self._cond = threading.Condition()
+            self._pid  = os.getpid()
+
+    @contextmanager
+    def pakai(self, n_bytes: int):
+        self._siapkan()
+        with self._cond:
+            self._menunggu += 1
+            try:
+                while self._terpakai and self._terpakai + n_bytes > self.max_bytes:
+                    self._cond.wait()
+            finally:
+                self._menunggu -= 1
+            self._terpakai += n_bytes
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._terpakai -= n_bytes
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            'max_bytes':      self.max_bytes,
+            'terpakai_bytes': self._terpakai,
+            'menunggu':       self._menunggu,
+        }
+
+
+# ══════════════════════════════════════════════════════════════════
+# PROCESS POOL — preprocess (CPU-bound, memegang GIL) di proses terpisah
+# agar greenlet/thread lain di worker tetap responsif
+# ══════════════════════════════════════════════════════════════════
+class PreprocessPool:
+    """
+    Menjalankan preprocess_image di ProcessPoolExecutor.
+
+    → `max_proses` = 0 → preprocess dijalankan langsung di worker (tanpa pool).
+    → Back-pressure: maksimal `max_antrian` job in-flight; request berikutnya
+      menunggu (kooperatif di gevent) alih-alih menumpuk job di pool.
+    → Pool memakai start method 'spawn': proses anak hanya mengimpor modul
+      ini (ringan), tidak mewarisi state hub gevent / koneksi dari worker.
+    → Jika `anggaran` (AnggaranMemori) diberikan, setiap job juga menunggu
+      sampai perkiraan memorinya muat di anggaran global.
+    → `potong_tabel` / `min_keyakinan`: lihat preprocess_image_terukur.
+    → `encode`: opsi encode_gambar (+ 'abu' untuk grayscale); None = JPEG q80.
+    → `sidik` = True → info['sidik'] berisi sidik_gambar (deteksi foto ulang).
+    """
+
+    def __init__(self, max_proses: int = 2, max_antrian: int | None = None,
+                 anggaran: AnggaranMemori | None = None,
+                 potong_tabel: bool = False, min_keyakinan: float = 0.6,
+                 encode: dict | None = None, sidik: bool = False):
+        self.max_proses    = max(0, max_proses)
+        self.max_antrian   = max_antrian or max(1, self.max_proses * 2)
+        self.anggaran      = anggaran
+        self.potong_tabel  = potong_tabel
+        self.min_keyakinan = min_keyakinan
+        self.encode        = encode
+        self.sidik         = sidik
+        self._pid        = None
+        self._pool       = None
+        self._sem        = None
+        self._lock       = threading.Lock()
+
+    def _siapkan(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pool = ProcessPoolExecutor(
+                max_workers = self.max_proses,
+                mp_context  = multiprocessing.get_context('spawn'),
+            )
+            self._sem = threading.BoundedSemaphore(self.max_antrian)
+            self._pid = os.getpid()
+
+    def jalankan(self, fn, *args):
+        """Jalankan fn(*args) di proses pool (fn harus bisa di-pickle)."""
+        if self.max_proses == 0:
+            return fn(*args)
+        self._siapkan()
+        with self._sem:
+            return self._pool.submit(fn, *args).result()
+
+    def preprocess(self, path: str) -> bytes:
+        """path: file upload (lihat preprocess_terukur)."""
+        return self.preprocess_terukur(path)[0]
+
+    def preprocess_terukur(self, path: str, klien: bool = False) -> tuple[bytes, dict, dict]:
+        """
+        Seperti preprocess(), plus durasi per tahap & info potong (lihat preprocess_image_terukur).
+        klien = True → upload sudah dinormalisasi browser (VERSI_KLIEN).
+        Hanya path: foto mentah ber-MB sebagai bytes harus di-pickle ke pipe pool,
+        dan di bawah gevent beberapa greenlet yang melakukannya bersamaan bisa
+        macet sampai timeout. Payload kecil (potong_sel, varian_lindung) cukup
+        lewat jalankan().
+        """
+        if not isinstance(path, str):
+            raise TypeError('PreprocessPool.preprocess_terukur: kirim path file upload, bukan bytes')
+        args = (path, self.potong_tabel, self.min_keyakinan, self.encode, self.sidik, klien)
+        if self.anggaran is None:
+            return self.jalankan(preprocess_image_terukur, *args)
+        with self.anggaran.pakai(estimasi_memori(path)):
+            return self.jalankan(preprocess_image_terukur, *args)
+
+    def tutup(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self._pid  = None
@@ -0,0 +1,189 @@
+import os
+import time
+import shutil
+import secrets
+import threading
+from collections import OrderedDict
+
+from bersama import BersamaGagal
+
+
+# ══════════════════════════════════════════════════════════════════
+# SESI GAMBAR — simpan gambar hasil preprocess di server,
+# frontend cukup memegang token (bukan base64 ratusan KB)
+# ══════════════════════════════════════════════════════════════════
+class ImageStore:
+    """
+    Penyimpanan gambar hasil preprocess_image, dialamatkan dengan token acak.
+
+    → Entri kadaluarsa setelah `ttl` detik.
+    → Memori dibatasi `max_mem_bytes`; jika penuh, entri tertua dipindah
+      (spill) ke `disk_dir` bila dikonfigurasi, atau dibuang jika tidak.
+    → Disk dibatasi `max_disk_bytes` per proses; entri tertua di disk dibuang
+      lebih dulu. Tiap proses (worker gunicorn) menulis ke subdirektori
+      `disk_dir/<pid>` yang dikosongkan saat pertama dipakai; file sisa proses
+      lain yang lebih tua dari `ttl` disapu saat itu dan sekali tiap `ttl`.
+    → `bersama` (bersama.py, opsional): gambar juga disimpan di state bersama
+      dengan TTL yang sama, jadi /api/retry tetap jalan walau request-nya
+      mendarat di worker lain.
+    """
+
+    def __init__(self, disk_dir: str | None = None, ttl: float = 30 * 60,
+                 max_mem_bytes: int = 64 * 1024 * 1024,
+                 max_disk_bytes: int = 512 * 1024 * 1024, bersama=None):
+        self.disk_dir       = disk_dir
+        self.ttl            = ttl
+        self.max_mem_bytes  = max_mem_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.bersama        = bersama
+        self._mem           = OrderedDict()   # token → (kadaluarsa, bytes)
+        self._disk          = OrderedDict()   # token → (kadaluarsa, ukuran)
+        self._mem_bytes     = 0
+        self._disk_bytes    = 0
+        self._lock          = threading.Lock()
+        self._stats         = {'hit_bersama': 0, 'gagal_bersama': 0}
+        self._pid           = None            # pemilik subdirektori disk saat ini
+        self._sapu_dir_lagi = 0.0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _path(self, token: str) -> str:
+        # Tanpa ekstensi: isinya JPEG atau WebP tergantung encoder
+        return os.path.join(self.disk_dir, str(self._pid), token)
+
+    # ── Direktori disk ────────────────────────────────────────────
+    def _siapkan_disk(self, now: float):
+        """
+        Proses baru (juga worker hasil fork dengan --preload) → subdirektori
+        sendiri yang dikosongkan dulu; sapu sisa proses lain tiap `ttl` detik.
+        """
+        if not self.disk_dir:
+            return
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._disk.clear()
+            self._disk_bytes = 0
+            sendiri = os.path.join(self.disk_dir, str(pid))
+            shutil.rmtree(sendiri, ignore_errors=True)
+            os.makedirs(sendiri, exist_ok=True)
+            self._sapu_dir_lagi = 0.0
+        if now >= self._sapu_dir_lagi:
+            self._sapu_dir_lagi = now + self.ttl
+            self._sapu_dir(now - self.ttl)
+
+    def _sapu_dir(self, batas: float):
+        """Hapus file di disk_dir milik proses lain (atau versi lama) dengan mtime < batas."""
+        sendiri = str(self._pid)
+        try:
+            isi = list(os.scandir(self.disk_dir))
+        except OSError:
+            return
+        for e in isi:
+            if e.name == sendiri:
+                continue
+            try:
+                if not e.is_dir(follow_symlinks=False):
+                    if e.stat().st_mtime < batas:
+                        os.remove(e.path)
+                    continue
+                file_dir = list(os.scandir(e.path))
+            except OSError:
+                continue
+            for f in file_dir:
+                try:
+                    if f.stat().st_mtime < batas:
+                        os.remove(f.path)
+                except OSError:
+                    continue   # mis. baru saja dihapus worker pemiliknya
+            try:
+                os.rmdir(e.path)   # gagal jika masih ada file muda — dicoba lagi di sapuan berikutnya
+            except OSError:
+                pass
+
+    # ── Eviction ──────────────────────────────────────────────────
+    def _hapus_disk(self, token: str):
+        _, ukuran = self._disk.pop(token)
+        self._disk_bytes -= ukuran
+        try:
+            os.remove(self._path(token))
+        except OSError:
+            pass
+
+    def _sapu_kadaluarsa(self, now: float):
+        for token in [t for t, (exp, _) in self._mem.items() if exp <= now]:
+            _, data = self._mem.pop(token)
+            self._mem_bytes -= len(data)
+        for token in [t for t, (exp, _) in self._disk.items() if exp <= now]:
+            self._hapus_disk(token)
+
+    def _tegakkan_budget(self):
+        while self._mem_bytes > self.max_mem_bytes and self._mem:
+            token, (exp, data) = self._mem.popitem(last=False)
+            self._mem_bytes -= len(data)
+            if self.disk_dir and len(data) <= self.max_disk_bytes:
+                with open(self._path(token), 'wb') as f:
+                    f.write(data)
+                self._disk[token] = (exp, len(data))
+                self._disk_bytes += len(data)
+
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            self._hapus_disk(next(iter(self._disk)))
+
+    # ── API publik ────────────────────────────────────────────────
+    def simpan(self, data: bytes) -> str:
+        """Simpan gambar, kembalikan token opaque."""
+        token = secrets.token_urlsafe(18)
+        now   = time.time()
+        with self._lock:
+            self._siapkan_disk(now)
+            self._sapu_kadaluarsa(now)
+            self._mem[token] = (now + self.ttl, data)
+            self._mem_bytes += len(data)
+            self._tegakkan_budget()
+        if self.bersama is not None:
+            try:
+                self.bersama.simpan(f'gambar:{token}', data, ttl=self.ttl)
+            except BersamaGagal:
+                self._stats['gagal_bersama'] += 1   # tetap ada di worker ini
+        return token
+
+    def ambil(self, token: str) -> bytes | None:
+        """Ambil gambar berdasarkan token. None jika tidak ada / kadaluarsa."""
+        if not token or not isinstance(token, str):
+            return None
+        now = time.time()
+        with self._lock:
+            self._siapkan_disk(now)
+            self._sapu_kadaluarsa(now)
+            item = self._mem.get(token)
+            if item is not None:
+                return item[1]
+            if token in self._disk:
+                try:
+                    with open(self._path(token), 'rb') as f:
+                        return f.read()
+                except OSError:
+                    self._hapus_disk(token)
+
+        if self.bersama is None:
+            return None
+        try:
+            data = self.bersama.ambil(f'gambar:{token}')
+        except BersamaGagal:
+            self._stats['gagal_bersama'] += 1
+            return None
+        if data is not None:
+            self._stats['hit_bersama'] += 1
+        return data
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entri_memori': len(self._mem),
+                'bytes_memori': self._mem_bytes,
+                'entri_disk':   len(self._disk),
+                'bytes_disk':   self._disk_bytes,
+                **(self._stats if self.bersama is not None else {}),
+            }
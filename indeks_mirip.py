@@ -0,0 +1,223 @@
+import os
+import time
+import sqlite3
+import itertools
+import threading
+
+
+# ══════════════════════════════════════════════════════════════════
+# INDEKS FOTO MIRIP — DO yang sama difoto ulang dari sudut sedikit beda
+#
+# Cache OCR (ocr_cache) hanya kena jika byte gambar identik. Indeks ini
+# mencari foto lama lewat sidik image_proc.sidik_gambar:
+#
+#   sel   : bit isi sel tabel, per bentuk grid. DO lain berformat sama
+#           berbeda ±40% bit, foto ulang DO yang sama ≤ ±10% → cocok di
+#           sini = 'sama', raw_data lama boleh dipakai ulang.
+#   phash : tata letak foto, hanya disimpan untuk informasi ('jarak'). Semua
+#           DO berformat sama punya phash mirip (DO beda: 0–8 bit, foto ulang:
+#           0–16 bit di bench_mirip), jadi phash saja BUKAN bukti duplikat —
+#           foto tanpa grid tidak dicocokkan.
+#
+# Bit sel dicari dengan multi-index hashing: kode n bit dibagi m potongan
+# ±16 bit, masing-masing punya tabel hash. Dua kode berjarak Hamming ≤ r
+# PASTI punya minimal satu potongan berjarak ≤ r // m (pigeonhole), jadi
+# cukup memeriksa tetangga kecil tiap potongan — bukan memindai semua entri.
+# ══════════════════════════════════════════════════════════════════
+BIT_HASH    = 64
+BIT_POTONG  = 16
+MIN_BIT_SEL = 24    # grid lebih kecil dari ini terlalu mudah kebetulan sama
+
+
+def _tetangga(lebar: int, radius: int) -> list:
+    """Semua XOR-mask `lebar` bit dengan popcount ≤ radius."""
+    return [sum(1 << b for b in bit)
+            for r in range(radius + 1) for bit in itertools.combinations(range(lebar), r)]
+
+
+def jarak_sel(a: dict | None, b: dict | None) -> float | None:
+    """Proporsi bit sel yang berbeda; None jika salah satu tanpa grid / bentuk grid beda."""
+    if not a or not b or (a['baris'], a['kolom']) != (b['baris'], b['kolom']):
+        return None
+    return (a['bit'] ^ b['bit']).bit_count() / (a['baris'] * a['kolom'])
+
+
+class _IndeksHamming:
+    """Multi-index hashing untuk kode `nbit` bit, radius pencarian tetap."""
+
+    def __init__(self, nbit: int, radius: int):
+        self.radius = radius
+        self.m      = max(1, nbit // BIT_POTONG)
+        self.lebar  = -(-nbit // self.m)
+        self.mask   = (1 << self.lebar) - 1
+        self.masks  = _tetangga(self.lebar, radius // self.m)
+        self.tabel  = [dict() for _ in range(self.m)]   # potongan → [posisi]
+        self.kode   = []                                # posisi → kode
+        self.entri  = []                                # posisi → indeks entri IndeksMirip
+
+    def tambah(self, kode: int, entri: int):
+        j = len(self.kode)
+        self.kode.append(kode)
+        self.entri.append(entri)
+        for p, tabel in enumerate(self.tabel):
+            tabel.setdefault((kode >> (p * self.lebar)) & self.mask, []).append(j)
+
+    def cari(self, kode: int, maks_kandidat: int) -> list:
+        """[(jarak, indeks entri)] berjarak ≤ radius, terdekat dulu; berhenti setelah `maks_kandidat`."""
+        calon = []
+        for p, tabel in enumerate(self.tabel):
+            ambil  = tabel.get
+            potong = (kode >> (p * self.lebar)) & self.mask
+            for m in self.masks:
+                ada = ambil(potong ^ m)
+                if ada:
+                    calon.extend(ada)
+            if len(calon) >= maks_kandidat:
+                break
+        semua, r = self.kode, self.radius
+        hasil = {(d, self.entri[j]) for j in calon[:maks_kandidat]
+                 if (d := (semua[j] ^ kode).bit_count()) <= r}
+        return sorted(hasil)
+
+
+class IndeksMirip:
+    """
+    Indeks di memori (dimuat dari SQLite), dibagi antar worker lewat SQLite:
+    setiap pencarian memuat dulu entri baru dari worker lain (rowid > terakhir
+    dimuat) — satu query kecil.
+
+    → maks_sel      : proporsi bit sel berbeda maksimum untuk status 'sama'
+    → maks_kandidat : batas kandidat yang diperiksa per pencarian
+    → max_entri     : hanya `max_entri` entri terbaru yang dicocokkan; yang
+                      lebih lama dibuang dari SQLite, dan tabel di memori
+                      dibangun ulang setiap kelebihan ¼ max_entri
+    """
+
+    def __init__(self, path: str | None, maks_sel: float = 0.1,
+                 maks_kandidat: int = 2000, max_entri: int = 500000):
+        self.path          = path
+        self.maks_sel      = maks_sel
+        self.maks_kandidat = maks_kandidat
+        self.max_entri     = max_entri
+        self._entri    = []     # (phash, sel, kunci, waktu)
+        self._sel      = {}     # (baris, kolom) → _IndeksHamming
+        self._terakhir = 0      # rowid terakhir yang dimuat
+        self._lock     = threading.Lock()
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._conn() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS indeks_mirip ('
+                    ' id INTEGER PRIMARY KEY,'
+                    ' phash INTEGER NOT NULL,'
+                    ' sel TEXT,'
+                    ' kunci TEXT NOT NULL,'
+                    ' waktu REAL NOT NULL)'
+                )
+
+    def _conn(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    @staticmethod
+    def _kode_sel(sel: dict | None) -> str | None:
+        return f'{sel["baris"]}x{sel["kolom"]}:{sel["bit"]:x}' if sel else None
+
+    @staticmethod
+    def _urai_sel(teks: str | None) -> dict | None:
+        if not teks:
+            return None
+        bentuk, bit = teks.split(':')
+        baris, kolom = bentuk.split('x')
+        return {'baris': int(baris), 'kolom': int(kolom), 'bit': int(bit, 16)}
+
+    @staticmethod
+    def _bentuk(sel: dict | None) -> tuple | None:
+        if not sel or sel['baris'] * sel['kolom'] < MIN_BIT_SEL:
+            return None
+        return sel['baris'], sel['kolom']
+
+    def _masuk(self, phash: int, sel: dict | None, kunci: str, waktu: float):
+        bentuk = self._bentuk(sel)
+        if not bentuk:
+            return   # tanpa grid tidak pernah cocok (lihat atas)
+        i = len(self._entri)
+        self._entri.append((phash, sel, kunci, waktu))
+        if bentuk not in self._sel:
+            nbit = bentuk[0] * bentuk[1]
+            self._sel[bentuk] = _IndeksHamming(nbit, int(self.maks_sel * nbit))
+        self._sel[bentuk].tambah(sel['bit'], i)
+        if len(self._entri) > self.max_entri + max(1, self.max_entri // 4):
+            self._pangkas()
+
+    def _pangkas(self):
+        """Bangun ulang tabel dari `max_entri` entri terbaru (entri lama tidak bisa dihapus dari tabel hash)."""
+        sisa = self._entri[-self.max_entri:]
+        self._entri, self._sel = [], {}
+        for entri in sisa:
+            self._masuk(*entri)
+
+    def _segarkan(self):
+        if not self.path:
+            return
+        conn = self._conn()
+        try:
+            rows = conn.execute(
+                'SELECT id, phash, sel, kunci, waktu FROM indeks_mirip WHERE id > ? ORDER BY id',
+                (self._terakhir,),
+            ).fetchall()
+        finally:
+            conn.close()
+        with self._lock:
+            for rowid, phash, sel, kunci, waktu in rows:
+                if rowid > self._terakhir:
+                    # SQLite INTEGER bertanda: phash disimpan sebagai int64
+                    self._masuk(phash & ((1 << BIT_HASH) - 1), self._urai_sel(sel), kunci, waktu)
+                    self._terakhir = rowid
+
+    # ── API publik ────────────────────────────────────────────────
+    def tambah(self, sidik: dict, kunci: str):
+        """Catat sidik gambar yang hasil OCR-nya tersimpan di ocr_cache dengan `kunci`."""
+        if not self._bentuk(sidik.get('sel')):
+            return
+        waktu = time.time()
+        if not self.path:
+            with self._lock:
+                self._masuk(sidik['phash'], sidik.get('sel'), kunci, waktu)
+            return
+        phash = sidik['phash'] - (1 << BIT_HASH) if sidik['phash'] >= 1 << (BIT_HASH - 1) else sidik['phash']
+        with self._conn() as conn:
+            conn.execute('INSERT INTO indeks_mirip (phash, sel, kunci, waktu) VALUES (?, ?, ?, ?)',
+                         (phash, self._kode_sel(sidik.get('sel')), kunci, waktu))
+            conn.execute('DELETE FROM indeks_mirip WHERE id <= ('
+                         ' SELECT MAX(id) FROM indeks_mirip) - ?', (self.max_entri,))
+        self._segarkan()
+
+    def cari(self, sidik: dict) -> dict | None:
+        """
+        Foto lama dengan bit sel paling dekat (≤ maks_sel), atau None — juga
+        None jika grid `sidik` tidak terdeteksi.
+        Return {'status': 'sama', 'jarak', 'jarak_sel', 'kunci', 'waktu'}
+        ('jarak' = jarak phash, informasi saja).
+        """
+        sel    = sidik.get('sel')
+        bentuk = self._bentuk(sel)
+        if not bentuk:
+            return None
+        self._segarkan()
+        with self._lock:
+            if bentuk not in self._sel:
+                return None
+            # Entri di luar `max_entri` terbaru dianggap sudah dibuang (menunggu _pangkas)
+            awal  = len(self._entri) - self.max_entri
+            cocok = [i for _, i in self._sel[bentuk].cari(sel['bit'], self.maks_kandidat) if i >= awal]
+            if not cocok:
+                return None
+            phash, sel_lama, kunci, waktu = self._entri[cocok[0]]
+        return {'status': 'sama', 'jarak': (phash ^ sidik['phash']).bit_count(),
+                'jarak_sel': jarak_sel(sel, sel_lama), 'kunci': kunci, 'waktu': waktu}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entri': min(len(self._entri), self.max_entri), 'bentuk_grid': len(self._sel)}
@@ -0,0 +1,100 @@
+import json
+
+
+# ══════════════════════════════════════════════════════════════════
+# PENGURAI JSON BERTAHAP — untuk respons Gemini yang di-stream
+#
+# Teks masuk per potongan (chunk). Setiap elemen array "kelompok" di objek
+# level atas dikeluarkan SEGERA setelah kurung tutupnya diterima, tanpa
+# menunggu sisa dokumen. Setiap karakter hanya dipindai sekali.
+#
+#   urai = PenguraiKelompok()
+#   for teks in stream:
+#       for i, grp in urai.tambah(teks):
+#           ...                      # kelompok ke-i sudah lengkap
+#   raw_data = extract_json(urai.teks)   # dokumen utuh tetap diurai penuh di akhir
+# ══════════════════════════════════════════════════════════════════
+class PenguraiKelompok:
+    def __init__(self, kunci: str = 'kelompok'):
+        self.kunci     = kunci
+        self._teks     = ''       # seluruh teks yang sudah diterima
+        self._pos      = 0        # posisi pindai berikutnya di _teks
+        self._mulai    = False    # sudah ketemu '{' pertama (awal objek level atas)
+        self._depth    = 0
+        self._string   = False
+        self._escape   = False
+        self._str_awal = None     # posisi awal string yang sedang dibaca
+        self._str_terakhir = None  # string terakhir yang selesai di depth 1
+        self._kunci_aktif  = None  # kunci level atas yang nilainya sedang dibaca
+        self._di_array = False    # di dalam array `kunci` (depth 2)
+        self._elem_awal = None    # posisi '{' elemen array yang sedang dibaca
+        self._n        = 0        # elemen array yang sudah lengkap (terurai atau rusak)
+        self._terlewat = []       # indeks elemen yang gagal diurai
+
+    def tambah(self, potongan: str) -> list:
+        """Tambah teks; return [(indeks, dict)] kelompok yang baru lengkap."""
+        self._teks += potongan
+        teks, hasil = self._teks, []
+
+        i = self._pos
+        n = len(teks)
+        if not self._mulai:
+            j = teks.find('{', i)
+            if j < 0:
+                self._pos = n
+                return hasil
+            self._mulai, i = True, j
+
+        while i < n:
+            c = teks[i]
+            if self._string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._string = False
+                    if self._depth == 1:
+                        self._str_terakhir = teks[self._str_awal + 1:i]
+            elif c == '"':
+                self._string, self._str_awal = True, i
+            elif c == ':' and self._depth == 1:
+                self._kunci_aktif = self._str_terakhir
+            elif c == ',' and self._depth == 1:
+                self._kunci_aktif = None
+            elif c in '{[':
+                self._depth += 1
+                if c == '[' and self._depth == 2 and self._kunci_aktif == self.kunci:
+                    self._di_array = True
+                elif c == '{' and self._depth == 3 and self._di_array:
+                    self._elem_awal = i
+            elif c in '}]':
+                self._depth -= 1
+                if self._di_array and self._depth == 2 and c == '}' and self._elem_awal is not None:
+                    try:
+                        hasil.append((self._n, json.loads(teks[self._elem_awal:i + 1])))
+                    except json.JSONDecodeError:
+                        # Elemen rusak: indeksnya tetap terpakai agar elemen berikutnya tidak
+                        # bergeser; dokumen utuh di akhir yang memutuskan isinya
+                        self._terlewat.append(self._n)
+                    self._n += 1
+                    self._elem_awal = None
+                elif self._di_array and self._depth == 1:
+                    self._di_array = False
+            i += 1
+        self._pos = n
+        return hasil
+
+    @property
+    def teks(self) -> str:
+        return self._teks
+
+    @property
+    def jumlah(self) -> int:
+        """Jumlah elemen kelompok yang sudah lengkap (dikeluarkan + terlewat)."""
+        return self._n
+
+    @property
+    def terlewat(self) -> list:
+        """Indeks elemen yang lengkap tetapi gagal diurai (tidak dikeluarkan)."""
+        return list(self._terlewat)
@@ -0,0 +1,297 @@
+import copy
+import math
+import bisect
+import itertools
+
+
+# ══════════════════════════════════════════════════════════════════
+# KOREKSI LOKAL — perbaiki check yang gagal dengan menukar digit yang
+# sering salah baca (4↔9, 6↔0, 1↔7, 3↔8, 5↔6), tanpa panggilan Gemini kedua.
+#
+# Semua nilai dihitung dalam satuan 1/100 (integer) agar penjumlahan eksak.
+# Alur:
+#   1. Tiap sel angka → alternatif (1–2 digit ditukar) + biaya kewajaran
+#   2. Per kelompok: subset-sum atas delta alternatif baris terhadap selisih
+#      check Ekor / Kg (indeks delta terurut + bisect, maks. maks_ubah sel)
+#   3. Antar kelompok: DP atas Σ tertulis_total_ekor / Σ tertulis_netto_kg
+#      terhadap ringkasan atas, lalu cek rata-rata
+#   4. Kandidat diverifikasi ulang dengan validate_do, urut biaya termurah
+# ══════════════════════════════════════════════════════════════════
+SKALA = 100
+
+# Bobot per pasangan digit: makin kecil = makin sering tertukar
+PASANGAN = {('4', '9'): 1.0, ('1', '7'): 1.0, ('3', '8'): 1.2, ('5', '6'): 1.2, ('6', '0'): 1.4}
+TUKAR = {}
+for (_a, _b), _w in PASANGAN.items():
+    TUKAR.setdefault(_a, []).append((_b, _w))
+    TUKAR.setdefault(_b, []).append((_a, _w))
+
+DISKON_RAGU   = 0.5    # baris yang ditandai "ragu" oleh Gemini lebih mungkin salah baca
+MAKS_OPSI     = 12     # opsi termurah yang disimpan per kelompok / per state DP
+MAKS_ALT_TIGA = 300   # batas jumlah alternatif baris untuk pencarian 3 sel
+
+
+def _angka(v) -> float | None:
+    if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v):
+        return None
+    return v
+
+
+def _sen(v) -> int:
+    return round((_angka(v) or 0) * SKALA)
+
+
+def _teks(v) -> str:
+    if isinstance(v, int):
+        return str(v)
+    return str(int(v)) if float(v).is_integer() else format(v, '.10g')
+
+
+def alternatif(v, maks_digit: int = 2) -> list:
+    """
+    Nilai lain yang mungkin tertulis jika 1..maks_digit digit v salah baca.
+    Return [(nilai_baru, biaya)], tanpa nilai 0 / negatif / nol di depan.
+    """
+    v = _angka(v)
+    if v is None or v <= 0:
+        return []
+    s = _teks(v)
+    if 'e' in s:
+        return []
+    posisi = [i for i, c in enumerate(s) if c in TUKAR]
+    hasil  = {}
+    for k in range(1, maks_digit + 1):
+        for pilih in itertools.combinations(posisi, k):
+            for ganti in itertools.product(*(TUKAR[s[i]] for i in pilih)):
+                chars = list(s)
+                for i, (d, _) in zip(pilih, ganti):
+                    chars[i] = d
+                baru = ''.join(chars)
+                if baru[0] == '0' and len(baru.split('.')[0]) > 1:
+                    continue
+                nilai = int(baru) if isinstance(v, int) else float(baru)
+                if nilai <= 0:
+                    continue
+                biaya = sum(w for _, w in ganti)
+                if nilai not in hasil or biaya < hasil[nilai]:
+                    hasil[nilai] = biaya
+    return sorted(hasil.items(), key=lambda x: x[1])
+
+
+class _Alt:
+    """Satu alternatif sel: kunci (gi, ri, field), gi=-1 ringkasan atas, ri=-1 baris tertulis."""
+    __slots__ = ('kunci', 'dari', 'ke', 'delta', 'biaya')
+
+    def __init__(self, kunci, dari, ke, biaya):
+        self.kunci = kunci
+        self.dari  = dari
+        self.ke    = ke
+        self.delta = _sen(ke) - _sen(dari)
+        self.biaya = biaya
+
+
+def _alt_sel(kunci, v, faktor: float = 1.0) -> list:
+    return [_Alt(kunci, v, ke, b * faktor) for ke, b in alternatif(v)]
+
+
+def _subset_sum(alts: list, target: int, batas: int, maks_ubah: int) -> list:
+    """
+    Kombinasi ≤ maks_ubah alternatif (maks. satu per sel) dengan Σ delta
+    dalam target ± batas. Return [(biaya, (alt, ...))] termurah dulu.
+    """
+    hasil = []
+    if abs(target) <= batas:
+        hasil.append((0.0, ()))
+    if maks_ubah <= 0 or not alts:
+        return hasil
+
+    urut   = sorted(alts, key=lambda a: a.delta)
+    deltas = [a.delta for a in urut]
+
+    def cari(sisa):
+        return urut[bisect.bisect_left(deltas, sisa - batas):bisect.bisect_right(deltas, sisa + batas)]
+
+    for a in cari(target):
+        hasil.append((a.biaya, (a,)))
+    if maks_ubah >= 2:
+        for a in alts:
+            for b in cari(target - a.delta):
+                if b.kunci > a.kunci:
+                    hasil.append((a.biaya + b.biaya, (a, b)))
+    # 3 sel hanya jika ≤ 2 sel tidak cukup; di tabel besar 3 tukaran bisa
+    # "menjelaskan" hampir semua selisih sehingga sarannya tidak bermakna
+    if maks_ubah >= 3 and not hasil and len(alts) <= MAKS_ALT_TIGA:
+        for a, b in itertools.combinations(alts, 2):
+            if a.kunci == b.kunci:
+                continue
+            hi = max(a.kunci, b.kunci)
+            for c in cari(target - a.delta - b.delta):
+                if c.kunci > hi:
+                    hasil.append((a.biaya + b.biaya + c.biaya, (a, b, c)))
+    hasil.sort(key=lambda x: (x[0], len(x[1])))
+    return hasil[:MAKS_OPSI]
+
+
+def _opsi_tertulis(kunci, v) -> list:
+    """[(nilai_sen, biaya, (alt,)|())]: nilai asli + alternatifnya."""
+    return [(_sen(v), 0.0, ())] + [(_sen(a.ke), a.biaya, (a,)) for a in _alt_sel(kunci, v)]
+
+
+def _potong(opsi: list, maks_ubah: int) -> list:
+    opsi = [o for o in opsi if len(o[1]) <= maks_ubah]
+    opsi.sort(key=lambda o: (o[0], len(o[1])))
+    return opsi[:MAKS_OPSI]
+
+
+def _opsi_kelompok(gi: int, grp: dict, bandul: float, batas: int, maks_ubah: int) -> tuple:
+    """
+    Cara memperbaiki check di satu kelompok.
+    Return (opsi_ekor, opsi_netto): [(biaya, perubahan, nilai_tertulis_sen)]
+    dengan nilai_tertulis = tertulis_total_ekor / tertulis_netto_kg setelah koreksi.
+    """
+    terisi = [(ri, r) for ri, r in enumerate(grp.get('baris', []))
+              if _sen(r.get('ekor')) != 0 or _sen(r.get('kg')) != 0]
+    alt_ekor, alt_kg = [], []
+    for ri, r in terisi:
+        faktor = DISKON_RAGU if r.get('ragu') else 1.0
+        alt_ekor += _alt_sel((gi, ri, 'ekor'), _angka(r.get('ekor')), faktor)
+        alt_kg   += _alt_sel((gi, ri, 'kg'), _angka(r.get('kg')), faktor)
+    hitung_ekor = sum(_sen(r.get('ekor')) for _, r in terisi)
+    hitung_kg   = sum(_sen(r.get('kg')) for _, r in terisi)
+
+    opsi_ekor = []
+    for t, b0, ch0 in _opsi_tertulis((gi, -1, 'tertulis_total_ekor'), _angka(grp.get('tertulis_total_ekor'))):
+        for b1, ch1 in _subset_sum(alt_ekor, t - hitung_ekor, batas, maks_ubah - len(ch0)):
+            opsi_ekor.append((b0 + b1, ch0 + ch1, t))
+
+    opsi_netto = []
+    netto      = _opsi_tertulis((gi, -1, 'tertulis_netto_kg'), _angka(grp.get('tertulis_netto_kg')))
+    if _sen(grp.get('tertulis_bruto_kg')) and _sen(grp.get('tertulis_terra_kg')):
+        hitung_terra = round(bandul * len(terisi) * SKALA)
+        terra = [o for o in _opsi_tertulis((gi, -1, 'tertulis_terra_kg'), _angka(grp.get('tertulis_terra_kg')))
+                 if abs(hitung_terra - o[0]) <= batas]
+        for tb, b0, ch0 in _opsi_tertulis((gi, -1, 'tertulis_bruto_kg'), _angka(grp.get('tertulis_bruto_kg'))):
+            for b1, ch1 in _subset_sum(alt_kg, tb - hitung_kg, batas, maks_ubah - len(ch0)):
+                bruto = hitung_kg + sum(a.delta for a in ch1)
+                for _, b2, ch2 in terra:
+                    for tn, b3, ch3 in netto:
+                        if abs(bruto - hitung_terra - tn) <= batas:
+                            opsi_netto.append((b0 + b1 + b2 + b3, ch0 + ch1 + ch2 + ch3, tn))
+    else:
+        for tn, b0, ch0 in netto:
+            for b1, ch1 in _subset_sum(alt_kg, tn - hitung_kg, batas, maks_ubah - len(ch0)):
+                opsi_netto.append((b0 + b1, ch0 + ch1, tn))
+
+    return _potong(opsi_ekor, maks_ubah), _potong(opsi_netto, maks_ubah)
+
+
+def _gabung_kelompok(opsi_per_grp: list, maks_ubah: int) -> dict:
+    """DP antar kelompok: Σ nilai_tertulis_sen → [(biaya, perubahan)] termurah."""
+    state = {0: [(0.0, ())]}
+    for opsi in opsi_per_grp:
+        baru = {}
+        for s, daftar in state.items():
+            for b0, ch0 in daftar:
+                for b1, ch1, t in opsi:
+                    if len(ch0) + len(ch1) <= maks_ubah:
+                        baru.setdefault(s + t, []).append((b0 + b1, ch0 + ch1))
+        state = {s: sorted(d, key=lambda x: (x[0], len(x[1])))[:MAKS_OPSI] for s, d in baru.items()}
+    return state
+
+
+def _cocok_atas(state: dict, kunci, v, batas: int, maks_ubah: int) -> list:
+    """Pasangkan Σ kelompok dengan nilai ringkasan atas (asli / alternatif)."""
+    hasil = []
+    for t, b0, ch0 in _opsi_tertulis(kunci, v):
+        for s in range(t - batas, t + batas + 1):
+            for b1, ch1 in state.get(s, ()):
+                if len(ch0) + len(ch1) <= maks_ubah:
+                    hasil.append((b0 + b1, ch0 + ch1, t))
+    return _potong(hasil, maks_ubah)
+
+
+def terapkan(raw_data: dict, perubahan: list) -> dict:
+    """Salinan raw_data dengan perubahan (format keluaran cari_koreksi) diterapkan."""
+    baru = copy.deepcopy(raw_data)
+    for p in perubahan:
+        if p['kelompok'] is None:
+            target = baru.setdefault('ringkasan_atas', {})
+        elif p['indeks_baris'] is None:
+            target = baru['kelompok'][p['kelompok']]
+        else:
+            target = baru['kelompok'][p['kelompok']]['baris'][p['indeks_baris']]
+        target[p['field']] = p['ke']
+    return baru
+
+
+def _keluaran(raw_data: dict, ch: tuple) -> list:
+    hasil = []
+    for a in sorted(ch, key=lambda a: a.kunci):
+        gi, ri, field = a.kunci
+        p = {'kelompok': None if gi < 0 else gi, 'indeks_baris': None if ri < 0 else ri,
+             'no': None, 'field': field, 'dari': a.dari, 'ke': a.ke}
+        if gi < 0:
+            p['id'] = f'atas.{field}'
+        elif ri < 0:
+            p['id'] = f'k{gi}.{field}'
+        else:
+            p['no'] = raw_data['kelompok'][gi]['baris'][ri].get('no')
+            p['id'] = f'k{gi}.b{p["no"]}.{field}'
+        hasil.append(p)
+    return hasil
+
+
+def cari_koreksi(raw_data: dict, validasi, bandul: float | None = None,
+                 toleransi: float = 0.15, maks_ubah: int = 3, maks_saran: int = 3) -> list:
+    """
+    Saran koreksi digit yang membuat SEMUA check lolos.
+
+    validasi : fungsi (raw_data, bandul=...) → hasil validate_do, untuk verifikasi akhir
+    maks_ubah: maksimum sel yang diubah per saran
+
+    Return [{'biaya', 'perubahan': [{'id', 'kelompok', 'indeks_baris', 'no',
+    'field', 'dari', 'ke'}]}], biaya termurah dulu; [] jika tidak ada
+    koreksi konsisten (→ perlu baca ulang oleh AI).
+    """
+    bandul   = float(bandul or 0)
+    batas    = math.ceil(toleransi * SKALA) - 1
+    kelompok = raw_data.get('kelompok', [])
+    atas     = raw_data.get('ringkasan_atas') or {}
+
+    opsi = [_opsi_kelompok(gi, grp, bandul, batas, maks_ubah) for gi, grp in enumerate(kelompok)]
+    if any(not e or not n for e, n in opsi):
+        return []
+    sisi_ekor = _cocok_atas(_gabung_kelompok([e for e, _ in opsi], maks_ubah),
+                            (-1, -1, 'tertulis_realisasi_ekor'),
+                            _angka(atas.get('tertulis_realisasi_ekor')), batas, maks_ubah)
+    sisi_kg   = _cocok_atas(_gabung_kelompok([n for _, n in opsi], maks_ubah),
+                            (-1, -1, 'tertulis_realisasi_kg'),
+                            _angka(atas.get('tertulis_realisasi_kg')), batas, maks_ubah)
+    rata      = _opsi_tertulis((-1, -1, 'tertulis_rata_rata'), _angka(atas.get('tertulis_rata_rata')))
+
+    kandidat = []
+    for be, che, te in sisi_ekor:
+        for bk, chk, tk in sisi_kg:
+            if len(che) + len(chk) > maks_ubah:
+                continue
+            hitung_rata = round(tk / te, 2) if te else 0.0
+            for tr, br, chra in rata:
+                if (abs(hitung_rata - tr / SKALA) < toleransi
+                        and 0 < len(che) + len(chk) + len(chra) <= maks_ubah):
+                    kandidat.append((be + bk + br, che + chk + chra))
+    kandidat.sort(key=lambda x: (x[0], len(x[1])))
+
+    saran, sudah, diterima = [], set(), []
+    for biaya, ch in kandidat:
+        kunci = frozenset((a.kunci, a.ke) for a in ch)
+        # lewati duplikat dan saran yang hanya menambah perubahan ke saran lain (tidak minimal)
+        if kunci in sudah or any(d < kunci for d in diterima):
+            continue
+        sudah.add(kunci)
+        perubahan = _keluaran(raw_data, ch)
+        if validasi(terapkan(raw_data, perubahan), bandul=bandul)['semua_benar']:
+            diterima.append(kunci)
+            saran.append({'biaya': round(biaya, 2), 'perubahan': perubahan})
+            if len(saran) >= maks_saran:
+                break
+    return saran
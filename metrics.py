@@ -0,0 +1,192 @@
+import time
+import threading
+from contextlib import contextmanager
+
+from flask import g, request, has_request_context
+
+
+# ══════════════════════════════════════════════════════════════════
+# METRIK — waktu per tahap (Server-Timing) + endpoint /metrics (Prometheus)
+# Tanpa dependensi tambahan: format teks Prometheus ditulis langsung.
+# ══════════════════════════════════════════════════════════════════
+BUCKET_DETIK = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50)
+BUCKET_BYTES = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7, 2e7)
+BUCKET_TOKEN = (100, 250, 500, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 16000, 32000)
+
+PREFIX = 'do_checker'
+
+
+def _esc(v) -> str:
+    return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _num(v: float) -> str:
+    v = float(v)
+    return str(int(v)) if v.is_integer() else repr(v)
+
+
+def _label_str(labels: tuple) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_esc(v)}"' for k, v in labels) + '}'
+
+
+class Registry:
+    """Counter, gauge, dan histogram sederhana (thread-safe) + render format Prometheus."""
+
+    def __init__(self):
+        self._lock      = threading.Lock()
+        self._bantuan   = {}   # nama → (tipe, help)
+        self._counter   = {}   # (nama, labels) → nilai
+        self._gauge     = {}   # (nama, labels) → nilai
+        self._histogram = {}   # (nama, labels) → [bucket_counts, sum, count]
+        self._bucket    = {}   # nama → tuple batas
+        self._kolektor  = []   # fungsi yang dipanggil saat render (gauge dari modul lain)
+
+    def daftar(self, nama: str, tipe: str, bantuan: str, bucket: tuple | None = None):
+        self._bantuan[nama] = (tipe, bantuan)
+        if bucket:
+            self._bucket[nama] = bucket
+
+    def inc(self, nama: str, n: float = 1, **labels):
+        key = (nama, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counter[key] = self._counter.get(key, 0) + n
+
+    def set(self, nama: str, nilai: float, **labels):
+        key = (nama, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauge[key] = nilai
+
+    def observe(self, nama: str, nilai: float, **labels):
+        key    = (nama, tuple(sorted(labels.items())))
+        bucket = self._bucket.get(nama, BUCKET_DETIK)
+        with self._lock:
+            h = self._histogram.get(key)
+            if h is None:
+                h = self._histogram[key] = [[0] * len(bucket), 0.0, 0]
+            for i, batas in enumerate(bucket):
+                if nilai <= batas:
+                    h[0][i] += 1
+            h[1] += nilai
+            h[2] += 1
+
+    def kolektor(self, fn):
+        """fn(registry) dipanggil setiap render — untuk gauge yang dibaca saat scrape."""
+        self._kolektor.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for fn in self._kolektor:
+            try:
+                fn(self)
+            except Exception:
+                pass
+
+        baris = []
+        with self._lock:
+            per_nama = {}
+            for (nama, labels), v in self._counter.items():
+                per_nama.setdefault(nama, []).append(f'{PREFIX}_{nama}{_label_str(labels)} {_num(v)}')
+            for (nama, labels), v in self._gauge.items():
+                per_nama.setdefault(nama, []).append(f'{PREFIX}_{nama}{_label_str(labels)} {_num(v)}')
+            for (nama, labels), (counts, total, n) in self._histogram.items():
+                isi = per_nama.setdefault(nama, [])
+                for batas, c in zip(self._bucket.get(nama, BUCKET_DETIK), counts):
+                    isi.append(f'{PREFIX}_{nama}_bucket{_label_str(labels + (("le", f"{batas:g}"),))} {c}')
+                isi.append(f'{PREFIX}_{nama}_bucket{_label_str(labels + (("le", "+Inf"),))} {n}')
+                isi.append(f'{PREFIX}_{nama}_sum{_label_str(labels)} {_num(total)}')
+                isi.append(f'{PREFIX}_{nama}_count{_label_str(labels)} {n}')
+
+        for nama in sorted(per_nama):
+            tipe, bantuan = self._bantuan.get(nama, ('untyped', nama))
+            baris.append(f'# HELP {PREFIX}_{nama} {bantuan}')
+            baris.append(f'# TYPE {PREFIX}_{nama} {tipe}')
+            baris.extend(sorted(per_nama[nama]))
+        return '\n'.join(baris) + '\n'
+
+
+metrik = Registry()
+metrik.daftar('tahap_detik', 'histogram', 'Durasi per tahap pipeline (detik)')
+metrik.daftar('request_detik', 'histogram', 'Durasi total request per endpoint (detik)')
+metrik.daftar('payload_bytes', 'histogram', 'Ukuran payload per jenis (bytes)', bucket=BUCKET_BYTES)
+metrik.daftar('payload_terakhir_bytes', 'gauge', 'Ukuran payload terakhir per jenis (bytes)')
+metrik.daftar('request_total', 'counter', 'Jumlah request per endpoint dan status HTTP')
+metrik.daftar('error_total', 'counter', 'Jumlah error per endpoint dan tipe exception')
+metrik.daftar('retry_total', 'counter', 'Jumlah OCR retry (/api/retry) per mode (terarah/penuh)')
+metrik.daftar('token_total', 'counter', 'Token Gemini per arah (input/output), jenis panggilan, versi prompt')
+metrik.daftar('token_panggilan', 'histogram', 'Token Gemini per panggilan', bucket=BUCKET_TOKEN)
+
+
+# ══════════════════════════════════════════════════════════════════
+# PENCATATAN TAHAP
+# ══════════════════════════════════════════════════════════════════
+def _endpoint() -> str:
+    return (request.endpoint or 'lainnya') if has_request_context() else 'batch'
+
+
+def catat_tahap(nama: str, detik: float):
+    """Catat durasi satu tahap: ke histogram, dan ke Server-Timing jika ada request."""
+    metrik.observe('tahap_detik', detik, tahap=nama, endpoint=_endpoint())
+    if has_request_context():
+        g.setdefault('waktu_tahap', []).append((nama, detik))
+
+
+@contextmanager
+def tahap(nama: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        catat_tahap(nama, time.perf_counter() - t0)
+
+
+def catat_payload(jenis: str, n_bytes: int):
+    metrik.observe('payload_bytes', n_bytes, jenis=jenis)
+    metrik.set('payload_terakhir_bytes', n_bytes, jenis=jenis)
+
+
+def catat_token(jenis: str, versi_prompt: str, response):
+    """Catat usage_metadata respons Gemini (input = prompt + gambar, output = kandidat)."""
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return
+    for arah, n in (('input', getattr(usage, 'prompt_token_count', 0)),
+                    ('output', getattr(usage, 'candidates_token_count', 0))):
+        metrik.inc('token_total', n or 0, arah=arah, jenis=jenis, prompt=versi_prompt)
+        metrik.observe('token_panggilan', n or 0, arah=arah, jenis=jenis, prompt=versi_prompt)
+
+
+def catat_error(e: Exception):
+    metrik.inc('error_total', endpoint=_endpoint(), tipe=type(e).__name__)
+
+
+# ══════════════════════════════════════════════════════════════════
+# INTEGRASI FLASK
+# ══════════════════════════════════════════════════════════════════
+def pasang(app):
+    """Pasang hook Server-Timing + endpoint GET /metrics ke app Flask."""
+
+    @app.before_request
+    def _mulai():
+        g.t_mulai = time.perf_counter()
+
+    @app.after_request
+    def _selesai(response):
+        if request.endpoint == 'metrics':
+            return response
+        endpoint = request.endpoint or 'lainnya'
+        total    = time.perf_counter() - g.get('t_mulai', time.perf_counter())
+        metrik.observe('request_detik', total, endpoint=endpoint)
+        metrik.inc('request_total', endpoint=endpoint, status=response.status_code)
+        if not response.is_streamed:
+            catat_payload(f'respons_{endpoint}', response.calculate_content_length() or 0)
+
+        bagian = [f'{nama};dur={detik * 1000:.1f}' for nama, detik in g.get('waktu_tahap', [])]
+        bagian.append(f'total;dur={total * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(bagian)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return metrik.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from bersama import BersamaGagal
+
+
+# ══════════════════════════════════════════════════════════════════
+# CACHE HASIL OCR — kunci = hash gambar hasil preprocess + versi prompt
+# ══════════════════════════════════════════════════════════════════
+def buat_kunci(image_bytes: bytes, versi_prompt: str) -> str:
+    """
+    Kunci cache berbasis isi (content-addressed).
+    Gambar yang sama persis setelah preprocess_image → kunci sama,
+    selama prompt dan model tidak berubah.
+    """
+    h = hashlib.sha256()
+    h.update(versi_prompt.encode())
+    h.update(b'\0')
+    h.update(image_bytes)
+    return h.hexdigest()
+
+
+def versi_prompt(model_name: str, prompt: str) -> str:
+    """Sidik jari pendek dari nama model + isi prompt."""
+    return hashlib.sha256(f'{model_name}\0{prompt}'.encode()).hexdigest()[:16]
+
+
+class OcrCache:
+    """
+    Cache tiga tingkat untuk raw_data hasil OCR Gemini.
+
+    Tingkat 1: LRU di memori (cepat, hilang saat worker restart).
+    Tingkat 2: state bersama (bersama.py, opsional) — hit dari worker lain /
+               mesin lain; statistik hit/miss juga dijumlahkan di sana.
+    Tingkat 3: SQLite di disk (bertahan antar restart).
+
+    Eviction:
+      → Entri lebih tua dari `ttl` detik dianggap kadaluarsa.
+      → Memori dibatasi `max_mem` entri (LRU).
+      → Disk dibatasi `max_disk` entri (yang paling lama tidak diakses dibuang).
+    """
+
+    STAT = ('hit_memori', 'hit_bersama', 'hit_disk', 'miss', 'simpan', 'buang')
+
+    def __init__(self, path: str | None, max_mem: int = 256,
+                 max_disk: int = 5000, ttl: float = 7 * 24 * 3600,
+                 bersama=None, setor_interval: float = 5.0):
+        self.path           = path
+        self.max_mem        = max_mem
+        self.max_disk       = max_disk
+        self.ttl            = ttl
+        self.bersama        = bersama
+        self.setor_interval = setor_interval
+        self._mem           = OrderedDict()   # kunci → (kadaluarsa, nilai)
+        self._lock          = threading.Lock()
+        self._stats         = dict.fromkeys(self.STAT, 0)
+        self._disetor       = dict.fromkeys(self.STAT, 0)   # bagian _stats yang sudah masuk state bersama
+        self._t_setor       = 0.0
+        self._gagal_bersama = 0
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._conn() as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS ocr_cache ('
+                    ' kunci TEXT PRIMARY KEY,'
+                    ' nilai TEXT NOT NULL,'
+                    ' kadaluarsa REAL NOT NULL,'
+                    ' diakses REAL NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_ocr_cache_diakses ON ocr_cache(diakses)')
+
+    def _conn(self) -> sqlite3.Connection:
+        # Koneksi baru per operasi → aman dipakai lintas thread/greenlet/fork
+        return sqlite3.connect(self.path, timeout=5)
+
+    # ── Memori ────────────────────────────────────────────────────
+    def _mem_put(self, kunci: str, kadaluarsa: float, nilai: dict):
+        self._mem[kunci] = (kadaluarsa, nilai)
+        self._mem.move_to_end(kunci)
+        while len(self._mem) > self.max_mem:
+            self._mem.popitem(last=False)
+            self._stats['buang'] += 1
+
+    # ── State bersama ─────────────────────────────────────────────
+    def _bersama_get(self, kunci: str, now: float) -> tuple[float, dict] | None:
+        try:
+            data = self.bersama.ambil(f'ocr:{kunci}')
+        except BersamaGagal:
+            self._gagal_bersama += 1   # backend mati → cukup jadi miss di tingkat ini
+            return None
+        if data is None:
+            return None
+        item = json.loads(data)
+        return (item['kadaluarsa'], item['nilai']) if item['kadaluarsa'] > now else None
+
+    def _bersama_put(self, kunci: str, kadaluarsa: float, nilai: dict):
+        try:
+            self.bersama.simpan(
+                f'ocr:{kunci}',
+                json.dumps({'kadaluarsa': kadaluarsa, 'nilai': nilai}, separators=(',', ':')).encode(),
+                ttl=self.ttl,
+            )
+        except BersamaGagal:
+            self._gagal_bersama += 1
+
+    def _setor(self, paksa: bool = False) -> dict | None:
+        """
+        Tambahkan selisih counter worker ini ke counter bersama — paling sering
+        tiap `setor_interval` detik (kecuali paksa), bukan per get(). Return
+        total semua worker (hanya saat paksa), None jika tidak disetor / gagal.
+        """
+        now = time.monotonic()
+        if self.bersama is None or (not paksa and now - self._t_setor < self.setor_interval):
+            return None
+        with self._lock:
+            self._t_setor = now
+            selisih       = {k: self._stats[k] - self._disetor[k] for k in self.STAT}
+            self._disetor = dict(self._stats)
+        total = {}
+        try:
+            for k in self.STAT:
+                if selisih[k]:
+                    total[k] = self.bersama.tambah(f'ocr:stat:{k}', selisih[k])
+                elif paksa:
+                    total[k] = int(self.bersama.ambil(f'ocr:stat:{k}') or 0)
+        except BersamaGagal:
+            self._gagal_bersama += 1
+            with self._lock:
+                for k in self.STAT:
+                    if k not in total:
+                        self._disetor[k] -= selisih[k]   # disetor lagi lain kali
+            return None
+        return total if paksa else None
+
+    # ── API publik ────────────────────────────────────────────────
+    def get(self, kunci: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            item = self._mem.get(kunci)
+            if item is not None:
+                kadaluarsa, nilai = item
+                if kadaluarsa > now:
+                    self._mem.move_to_end(kunci)
+                    self._stats['hit_memori'] += 1
+                    return nilai
+                del self._mem[kunci]
+
+        if self.bersama is not None:
+            item = self._bersama_get(kunci, now)
+            if item is not None:
+                with self._lock:
+                    self._mem_put(kunci, *item)
+                    self._stats['hit_bersama'] += 1
+                self._setor()
+                return item[1]
+
+        if self.path:
+            with self._conn() as conn:
+                row = conn.execute(
+                    'SELECT nilai, kadaluarsa FROM ocr_cache WHERE kunci = ?', (kunci,)
+                ).fetchone()
+                if row and row[1] > now:
+                    conn.execute('UPDATE ocr_cache SET diakses = ? WHERE kunci = ?', (now, kunci))
+                    nilai = json.loads(row[0])
+                    with self._lock:
+                        self._mem_put(kunci, row[1], nilai)
+                        self._stats['hit_disk'] += 1
+                    if self.bersama is not None:
+                        self._bersama_put(kunci, row[1], nilai)
+                    return nilai
+                if row:
+                    conn.execute('DELETE FROM ocr_cache WHERE kunci = ?', (kunci,))
+
+        with self._lock:
+            self._stats['miss'] += 1
+        self._setor()
+        return None
+
+    def put(self, kunci: str, nilai: dict):
+        now        = time.time()
+        kadaluarsa = now + self.ttl
+        with self._lock:
+            self._mem_put(kunci, kadaluarsa, nilai)
+            self._stats['simpan'] += 1
+
+        if self.bersama is not None:
+            self._bersama_put(kunci, kadaluarsa, nilai)
+            self._setor()
+
+        if self.path:
+            with self._conn() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO ocr_cache (kunci, nilai, kadaluarsa, diakses) '
+                    'VALUES (?, ?, ?, ?)',
+                    (kunci, json.dumps(nilai, separators=(',', ':')), kadaluarsa, now),
+                )
+                self._evict_disk(conn, now)
+
+    def _evict_disk(self, conn: sqlite3.Connection, now: float):
+        cur = conn.execute('DELETE FROM ocr_cache WHERE kadaluarsa <= ?', (now,))
+        dibuang = cur.rowcount
+        cur = conn.execute(
+            'DELETE FROM ocr_cache WHERE kunci IN ('
+            ' SELECT kunci FROM ocr_cache ORDER BY diakses DESC LIMIT -1 OFFSET ?)',
+            (self.max_disk,),
+        )
+        dibuang += cur.rowcount
+        if dibuang > 0:
+            with self._lock:
+                self._stats['buang'] += dibuang
+
+    def stats(self) -> dict:
+        """Counter hit/miss/simpan/buang: semua worker jika ada state bersama, worker ini jika tidak."""
+        total = self._setor(paksa=True)
+        with self._lock:
+            s = dict(total or self._stats)
+            s['entri_memori'] = len(self._mem)
+        if self.bersama is not None:
+            s['gagal_bersama'] = self._gagal_bersama
+        hit = s['hit_memori'] + s['hit_bersama'] + s['hit_disk']
+        s['hit_rate'] = round(hit / (hit + s['miss']), 4) if hit + s['miss'] else 0.0
+        return s
@@ -0,0 +1,250 @@
+# ══════════════════════════════════════════════════════════════════
+# REGISTRI PROMPT — versi prompt OCR yang bisa dipilih (PROMPT_VERSI)
+# Instruksi statis dipasang sebagai system instruction pada model
+# persisten; tiap request hanya mengirim gambar + teks tugas pendek.
+# ══════════════════════════════════════════════════════════════════
+
+# ── v1-lengkap: instruksi asli, lengkap dengan panduan tulisan tangan ──
+SISTEM_LENGKAP = """
+Kamu adalah sistem OCR khusus untuk dokumen Delivery Order (DO) ternak milik DMC.
+TUGASMU HANYA MEMBACA & MENGAMBIL ANGKA PERSIS SEPERTI TERTULIS. JANGAN hitung apapun.
+
+════════════════════════════════════════
+STRUKTUR DOKUMEN DO
+════════════════════════════════════════
+
+BAGIAN ATAS DOKUMEN (ringkasan global):
+  - Kolom "Ekor"     → total ekor realisasi keseluruhan (baca persis)
+  - Kolom "Kg"       → total kg realisasi keseluruhan (baca persis)
+  - Kolom "Rata-rata"→ nilai rata-rata (baca persis, bisa desimal seperti 2.17 atau 2,17)
+
+TABEL RINCIAN:
+  Terdapat beberapa KELOMPOK kolom (biasanya 2: PESANAN di kiri, REALISASI di kanan).
+  Masing-masing kelompok punya sub-kolom: "Ekor" dan "Kg".
+  Setiap baris bernomor (1, 2, 3, ...) berisi angka ekor dan berat per kandang/pengiriman.
+
+BARIS RINGKASAN DI BAWAH TABEL (baca persis, JANGAN hitung):
+  Baris yang perlu dibaca per kelompok:
+  - "Ekor"  → total ekor tertulis
+  - "Bruto" → berat kotor tertulis (jika ada angka; jika kosong/tidak ada → null)
+  - "Terra" → tara/potongan tertulis (jika ada angka; jika kosong/tidak ada → null)
+  - "Netto" → berat bersih tertulis
+
+════════════════════════════════════════
+PANDUAN KHUSUS: MEMBACA ANGKA TULISAN TANGAN
+════════════════════════════════════════
+
+Tulisan tangan manusia sering menimbulkan ambiguitas. Perhatikan petunjuk berikut:
+
+ANGKA 4 vs 9:
+  → Angka 4: bagian atas TERBUKA atau berbentuk huruf V terbalik, bagian bawah LURUS ke bawah tanpa lengkungan.
+  → Angka 9: bagian atas berbentuk LINGKARAN/oval tertutup, bagian bawah ada ekor yang MELENGKUNG atau menggantung.
+  → Jika ragu antara 4 dan 9 → lihat konteks nilainya:
+      Kolom Ekor per baris biasanya antara 10–50 ekor.
+      Kolom Kg per baris biasanya antara 50–100 kg.
+      Nilai Netto/Total biasanya kelipatan logis dari baris-baris di atasnya.
+
+ANGKA 6 vs 0:
+  → Angka 6: ada ekor melengkung di bagian atas, lingkaran di bawah.
+  → Angka 0: oval penuh, tidak ada ekor.
+
+ANGKA 1 vs 7:
+  → Angka 7: ada garis serong di bagian atas.
+  → Angka 1: lurus ke bawah, tidak ada garis serong.
+
+ANGKA 3 vs 8:
+  → Angka 8: dua lingkaran tertutup bertumpuk.
+  → Angka 3: sisi kiri TERBUKA (tidak ada garis menutup ke kiri).
+
+ANGKA 5 vs 6:
+  → Angka 5: bagian atas lurus dengan sudut ke kiri.
+  → Angka 6: ekor melengkung di atas tanpa sudut tajam.
+
+ATURAN RAGU:
+  Jika setelah menerapkan semua panduan di atas kamu MASIH TIDAK YAKIN pada satu angka
+  di suatu baris, tambahkan field "ragu": true pada baris tersebut.
+  Contoh: {"no": 3, "ekor": 30, "kg": 64.9, "ragu": true}
+  Jika yakin → JANGAN tambahkan field "ragu" (atau isi false).
+
+════════════════════════════════════════
+FORMAT JSON YANG HARUS DIKEMBALIKAN
+════════════════════════════════════════
+
+Kembalikan HANYA JSON murni (tanpa markdown, tanpa ```, tanpa penjelasan apapun):
+
+{
+  "kelompok": [
+    {
+      "nama": "PESANAN",
+      "posisi": "kiri",
+      "baris": [
+        {"no": 1, "ekor": 30, "kg": 81.0},
+        {"no": 2, "ekor": 30, "kg": 80.5, "ragu": true}
+      ],
+      "tertulis_total_ekor": 300,
+      "tertulis_bruto_kg": 809.5,
+      "tertulis_terra_kg": 170.0,
+      "tertulis_netto_kg": 639.5
+    },
+    {
+      "nama": "REALISASI",
+      "posisi": "kanan",
+      "baris": [
+        {"no": 1, "ekor": 30, "kg": 80.0}
+      ],
+      "tertulis_total_ekor": 175,
+      "tertulis_bruto_kg": 471.0,
+      "tertulis_terra_kg": 102.0,
+      "tertulis_netto_kg": 369.0
+    }
+  ],
+  "ringkasan_atas": {
+    "tertulis_realisasi_ekor": 475,
+    "tertulis_realisasi_kg": 1008.5,
+    "tertulis_rata_rata": 2.12
+  }
+}
+
+════════════════════════════════════════
+ATURAN WAJIB
+════════════════════════════════════════
+1. "baris" hanya diisi baris yang ADA ANGKANYA (ada nilai di Ekor atau Kg). Baris kosong → ABAIKAN.
+2. Jika kolom ekor/kg suatu baris hanya terisi salah satu → yang kosong = 0.
+3. "tertulis_bruto_kg" dan "tertulis_terra_kg":
+   - Jika di dokumen ADA ANGKA di baris Bruto/Terra → isi dengan angkanya
+   - Jika di dokumen TIDAK ADA angka (kosong/tidak ada baris itu) → isi dengan null
+4. "tertulis_netto_kg" → SELALU baca dari baris Netto yang tertulis di dokumen.
+5. "tertulis_total_ekor" → baca dari baris Ekor di bawah tabel.
+6. Semua nilai "tertulis_*" diambil PERSIS dari tulisan di dokumen, bukan hasil hitungan.
+7. Jika ada lebih dari 2 kelompok di tabel, masukkan semuanya.
+8. Nilai desimal dengan koma (misal 2,17) → ubah ke titik (2.17) dalam JSON.
+9. Setelah selesai membaca, tinjau kembali setiap angka yang mengandung digit 4 atau 9.
+   Pastikan sudah sesuai dengan panduan di atas sebelum mengembalikan JSON.
+"""
+
+
+# ── v2-ringkas: aturan sama, kalimat dipadatkan (± sepertiga token v1) ──
+SISTEM_RINGKAS = """
+OCR dokumen Delivery Order (DO) ternak DMC. SALIN angka persis seperti tertulis; JANGAN menghitung.
+
+Dokumen:
+- Atas: Ekor, Kg, Rata-rata realisasi keseluruhan.
+- Tabel: beberapa kelompok kolom (biasanya PESANAN kiri, REALISASI kanan), tiap kelompok punya
+  sub-kolom Ekor & Kg, baris bernomor 1, 2, 3, ...
+- Di bawah tabel per kelompok: Ekor, Bruto, Terra, Netto (tertulis).
+
+Tulisan tangan — digit yang sering tertukar:
+4 (atas terbuka, kaki lurus) vs 9 (atas lingkaran tertutup, ekor melengkung);
+6 (ekor di atas) vs 0 (oval polos); 1 (lurus) vs 7 (garis serong di atas);
+3 (kiri terbuka) vs 8 (dua lingkaran); 5 (atas bersudut) vs 6 (atas melengkung).
+Kisaran wajar per baris: ekor 10–50, kg 50–100. Masih ragu → tambahkan "ragu": true di baris itu.
+
+Kembalikan HANYA JSON murni (tanpa markdown/penjelasan):
+{"kelompok":[{"nama":"PESANAN","posisi":"kiri","baris":[{"no":1,"ekor":30,"kg":81.0},{"no":2,"ekor":30,"kg":80.5,"ragu":true}],"tertulis_total_ekor":300,"tertulis_bruto_kg":809.5,"tertulis_terra_kg":170.0,"tertulis_netto_kg":639.5}],"ringkasan_atas":{"tertulis_realisasi_ekor":475,"tertulis_realisasi_kg":1008.5,"tertulis_rata_rata":2.12}}
+
+Aturan:
+1. Hanya baris yang ada angkanya; baris kosong diabaikan. Salah satu kolom kosong → 0.
+2. Bruto/Terra tanpa angka → null. Netto & Ekor selalu dibaca dari baris ringkasan di bawah tabel.
+3. Semua "tertulis_*" persis dari dokumen. Semua kelompok dimasukkan. Koma desimal → titik.
+4. Sebelum menjawab, periksa ulang setiap angka yang mengandung 4 atau 9.
+"""
+
+TUGAS_EKSTRAK = 'Baca dokumen DO pada gambar ini dan kembalikan JSON sesuai instruksi.'
+
+
+def _daftar_gagal(checks_gagal: list) -> str:
+    return '\n'.join(
+        f"  - {c['label']}: hasil hitungan = {c['hitung']} {c['satuan']}, "
+        f"tertulis di dokumen = {c['tertulis']} {c['satuan']}, "
+        f"selisih = {c['selisih']:+.3g} {c['satuan']}"
+        for c in checks_gagal
+    )
+
+
+def _retry_lengkap(checks_gagal: list) -> str:
+    return f"""
+PERHATIAN: Ini adalah PEMBACAAN ULANG karena ada ketidaksesuaian pada pembacaan sebelumnya.
+
+Pada pembacaan sebelumnya ditemukan perbedaan berikut:
+{_daftar_gagal(checks_gagal)}
+
+Perbedaan ini kemungkinan besar disebabkan oleh kesalahan baca satu atau beberapa digit,
+terutama pasangan yang sering mirip dalam tulisan tangan:
+  → 4 vs 9  (paling sering salah!)
+  → 6 vs 0
+  → 1 vs 7
+  → 3 vs 8
+
+Cara membedakan 4 vs 9:
+  → 4: bagian atas TERBUKA, bawah LURUS (tidak ada ekor melengkung).
+  → 9: bagian atas LINGKARAN TERTUTUP, bawah ada EKOR yang menggantung.
+
+TUGASMU: Baca ulang dokumen ini dengan sangat teliti.
+Fokus khusus pada digit yang ada di baris-baris tabel rincian.
+Tandai baris yang kamu RAGU dengan menambahkan "ragu": true.
+
+Kembalikan HANYA JSON murni dengan format yang SAMA persis seperti di instruksi.
+"""
+
+
+def _retry_ringkas(checks_gagal: list) -> str:
+    return f"""
+BACA ULANG — pembacaan sebelumnya tidak cocok:
+{_daftar_gagal(checks_gagal)}
+Kemungkinan salah baca digit mirip (4/9, 6/0, 1/7, 3/8, 5/6) di baris tabel rincian.
+Baca ulang dengan teliti, tandai baris yang masih ragu. Format JSON sama seperti instruksi.
+"""
+
+
+def prompt_sel(sel: list, checks_gagal: list) -> str:
+    """
+    Teks tugas retry terarah: minta nilai sel tertentu saja (gambar berisi
+    potongan tabel yang memuat sel-sel itu), bukan seluruh dokumen.
+    """
+    daftar = '\n'.join(f"  - {s['id']}: {s['deskripsi']}" for s in sel)
+    petunjuk = (f'Pembacaan sebelumnya tidak cocok:\n{_daftar_gagal(checks_gagal)}\n'
+                if checks_gagal else '')
+    return f"""
+BACA ULANG SEBAGIAN. Gambar ini potongan dokumen DO yang sama: header kolom, kolom No /
+label baris, dan sel yang diminta.
+{petunjuk}
+Baca HANYA sel berikut, persis seperti tertulis (perhatikan digit mirip 4/9, 6/0, 1/7, 3/8, 5/6):
+{daftar}
+
+Untuk permintaan ini ABAIKAN format JSON dokumen lengkap. Kembalikan HANYA JSON:
+{{"sel": [{{"id": "<id sel>", "nilai": <angka atau null jika kosong>, "ragu": <true/false>}}]}}
+""".strip()
+
+
+class VarianPrompt:
+    """
+    Satu versi prompt OCR.
+    → sistem : instruksi statis, dipasang sebagai system instruction model
+    → tugas  : teks pendek yang dikirim bersama gambar di setiap request
+    → retry(checks_gagal) : teks tugas untuk /api/retry (tanpa salinan format JSON)
+    """
+
+    def __init__(self, versi: str, sistem: str, tugas: str, retry):
+        self.versi  = versi
+        self.sistem = sistem.strip()
+        self.tugas  = tugas
+        self._retry = retry
+
+    def retry(self, checks_gagal: list) -> str:
+        return self._retry(checks_gagal).strip()
+
+
+PROMPT = {
+    v.versi: v for v in (
+        VarianPrompt('v1-lengkap', SISTEM_LENGKAP, TUGAS_EKSTRAK, _retry_lengkap),
+        VarianPrompt('v2-ringkas', SISTEM_RINGKAS, TUGAS_EKSTRAK, _retry_ringkas),
+    )
+}
+PROMPT_DEFAULT = 'v1-lengkap'
+
+
+def ambil_prompt(versi: str | None = None) -> VarianPrompt:
+    versi = versi or PROMPT_DEFAULT
+    if versi not in PROMPT:
+        raise ValueError(f'Versi prompt tidak dikenal: {versi} (tersedia: {", ".join(PROMPT)})')
+    return PROMPT[versi]
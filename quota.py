@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import itertools
+from collections import deque
+from datetime import datetime, timezone
+
+
+# ══════════════════════════════════════════════════════════════════
+# KUOTA GEMINI — token bucket per menit + budget harian persisten
+# Free tier: 15 request/menit, 1500 request/hari.
+# Request di atas limit per menit MENGANTRI (FIFO), bukan gagal.
+# ══════════════════════════════════════════════════════════════════
+class KuotaHabis(Exception):
+    """Budget harian habis, atau antrian terlalu panjang untuk ditunggu."""
+
+
+def zona_waktu(nama: str | None):
+    if not nama:
+        return timezone.utc
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(nama)
+    except Exception:
+        return timezone.utc
+
+
+class KuotaGemini:
+    """
+    Penjadwal terpusat di depan setiap panggilan Gemini.
+
+    → Per menit : token bucket kapasitas `rpm`, terisi ulang rpm/60 token per detik.
+    → Per hari  : counter per tanggal (zona `tz`), disimpan di SQLite agar
+                  tetap benar walau worker restart.
+    → Antrian   : FIFO. Posisi & estimasi waktu tunggu bisa dilihat via status().
+    → Bersama   : jika `bersama` (bersama.py) diisi, token bucket + counter
+                  harian disimpan di sana (satu kunci, diubah atomik) sehingga
+                  N worker berbagi satu kuota; `path` tidak dipakai. Antrian FIFO
+                  tetap per worker — antar worker, yang pertama mencoba setelah
+                  token terisi ulang yang mendapatkannya.
+    """
+
+    KUNCI = 'kuota:gemini'
+
+    def __init__(self, rpm: int = 15, rpd: int = 1500, path: str | None = None,
+                 tz: str | None = None, max_tunggu: float = 90.0, bersama=None):
+        self.rpm        = max(1, rpm)
+        self.rpd        = max(1, rpd)
+        self.path       = path if bersama is None else None
+        self.tz         = zona_waktu(tz)
+        self.max_tunggu = max_tunggu
+        self.bersama    = bersama
+        self._rate      = self.rpm / 60.0
+        self._token     = float(self.rpm)
+        self._t_isi     = time.monotonic()
+        self._antrian   = deque()
+        self._nomor     = itertools.count()
+        self._pid       = None
+        self._cond      = None
+        self._tanggal   = None
+        self._terpakai  = 0
+
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with self._conn() as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS kuota_harian ('
+                    ' tanggal TEXT PRIMARY KEY, terpakai INTEGER NOT NULL)'
+                )
+
+    def _conn(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _siapkan(self):
+        # Condition dibuat lazy per-proses: setelah fork/monkey-patch gevent
+        # primitive sinkronisasinya harus milik proses (dan hub) yang benar.
+        if self._pid != os.getpid():
+            self._cond = threading.Condition()
+            self._pid  = os.getpid()
+
+    # ── Budget harian ─────────────────────────────────────────────
+    def _hari_ini(self) -> str:
+        return datetime.now(self.tz).strftime('%Y-%m-%d')
+
+    def _muat_harian(self):
+        tanggal = self._hari_ini()
+        if tanggal == self._tanggal:
+            return
+        self._tanggal  = tanggal
+        self._terpakai = 0
+        if self.path:
+            with self._conn() as conn:
+                row = conn.execute(
+                    'SELECT terpakai FROM kuota_harian WHERE tanggal = ?', (tanggal,)
+                ).fetchone()
+            self._terpakai = row[0] if row else 0
+
+    def _catat_harian(self):
+        self._terpakai += 1
+        if self.path:
+            with self._conn() as conn:
+                conn.execute(
+                    'INSERT INTO kuota_harian (tanggal, terpakai) VALUES (?, 1) '
+                    'ON CONFLICT(tanggal) DO UPDATE SET terpakai = terpakai + 1',
+                    (self._tanggal,),
+                )
+
+    # ── Token bucket ──────────────────────────────────────────────
+    def _isi_ulang(self):
+        now = time.monotonic()
+        self._token = min(float(self.rpm), self._token + (now - self._t_isi) * self._rate)
+        self._t_isi = now
+
+    def _estimasi(self, posisi: int) -> float:
+        """Estimasi detik sampai request di posisi antrian ke-`posisi` (0 = terdepan) jalan."""
+        kurang = (posisi + 1) - self._token
+        return max(0.0, kurang / self._rate)
+
+    # ── State bersama ─────────────────────────────────────────────
+    def _keadaan(self, lama: bytes | None) -> dict:
+        """State bersama saat ini: token sudah diisi ulang, counter harian milik tanggal hari ini."""
+        now     = time.time()   # jam dinding: monotonic tidak sebanding antar proses
+        tanggal = self._hari_ini()
+        st      = json.loads(lama) if lama else {'token': float(self.rpm), 't': now,
+                                                  'tanggal': tanggal, 'terpakai': 0}
+        st['token'] = min(float(self.rpm), st['token'] + max(0.0, now - st['t']) * self._rate)
+        st['t']     = now
+        if st['tanggal'] != tanggal:
+            st['tanggal'], st['terpakai'] = tanggal, 0
+        return st
+
+    def _salin(self, st: dict):
+        # Snapshot lokal; di antara pembacaan, estimasi tunggu diekstrapolasi dari sini
+        self._token, self._t_isi      = st['token'], time.monotonic()
+        self._tanggal, self._terpakai = st['tanggal'], st['terpakai']
+
+    def _segarkan(self):
+        """Perbarui _token & _terpakai: isi ulang lokal, atau baca dari state bersama."""
+        if self.bersama is None:
+            self._muat_harian()
+            self._isi_ulang()
+        else:
+            self._salin(self._keadaan(self.bersama.ambil(self.KUNCI)))
+
+    def _ambil_unit(self, min_token: float) -> bool:
+        """Atomik: ambil 1 token + 1 jatah harian jika jatah harian masih ada & token ≥ min_token."""
+        if self.bersama is None:
+            self._segarkan()
+            if self._terpakai >= self.rpd or self._token < min_token:
+                return False
+            self._token -= 1.0
+            self._catat_harian()
+            return True
+
+        def fn(lama):
+            st = self._keadaan(lama)
+            ok = st['terpakai'] < self.rpd and st['token'] >= min_token
+            if not ok:
+                return lama, (False, st)
+            st['token']    -= 1.0
+            st['terpakai'] += 1
+            return json.dumps(st).encode(), (True, st)
+
+        ok, st = self.bersama.ubah(self.KUNCI, fn)
+        self._salin(st)
+        return ok
+
+    # ── API publik ────────────────────────────────────────────────
+    def ambil(self) -> float:
+        """
+        Tunggu giliran & ambil 1 unit kuota. Return lama menunggu (detik).
+        Raise KuotaHabis jika budget harian habis atau estimasi tunggu > max_tunggu.
+        """
+        self._siapkan()
+        t0    = time.monotonic()
+        tiket = next(self._nomor)
+        with self._cond:
+            self._segarkan()
+            if self._terpakai + len(self._antrian) >= self.rpd:
+                raise KuotaHabis(
+                    f'Kuota harian Gemini ({self.rpd} request) sudah habis, coba lagi besok'
+                )
+            if self._estimasi(len(self._antrian)) > self.max_tunggu:
+                raise KuotaHabis(
+                    'Antrian Gemini terlalu panjang, coba lagi dalam beberapa menit'
+                )
+
+            self._antrian.append(tiket)
+            try:
+                while True:
+                    if self._antrian[0] == tiket:
+                        if self._ambil_unit(1.0):
+                            return time.monotonic() - t0
+                        if self._terpakai >= self.rpd:
+                            raise KuotaHabis(
+                                f'Kuota harian Gemini ({self.rpd} request) sudah habis, coba lagi besok'
+                            )
+                    else:
+                        self._isi_ulang()
+                    posisi = self._antrian.index(tiket)
+                    self._cond.wait(timeout=max(0.05, self._estimasi(posisi)))
+            finally:
+                self._antrian.remove(tiket)
+                self._cond.notify_all()
+
+    def coba_ambil(self, cadangan_token: float = 1.0) -> bool:
+        """
+        Ambil 1 unit kuota HANYA jika tersedia saat ini tanpa mengantri, dan
+        setelahnya masih tersisa `cadangan_token` token untuk request lain.
+        Dipakai untuk permintaan opsional (hedging) — tidak pernah menunggu.
+        """
+        self._siapkan()
+        with self._cond:
+            if self._antrian:
+                return False
+            return self._ambil_unit(1.0 + cadangan_token)
+
+    def kembalikan(self):
+        """
+        Batalkan 1 unit yang sudah diambil tapi tidak jadi dipakai untuk
+        panggilan Gemini (mis. menyiapkan permintaan cadangan gagal).
+        """
+        self._siapkan()
+        with self._cond:
+            if self.bersama is None:
+                self._segarkan()
+                self._token    = min(float(self.rpm), self._token + 1.0)
+                self._terpakai = max(0, self._terpakai - 1)
+                if self.path:
+                    with self._conn() as conn:
+                        conn.execute(
+                            'UPDATE kuota_harian SET terpakai = MAX(0, terpakai - 1) WHERE tanggal = ?',
+                            (self._tanggal,),
+                        )
+            else:
+                def fn(lama):
+                    st = self._keadaan(lama)
+                    st['token']    = min(float(self.rpm), st['token'] + 1.0)
+                    st['terpakai'] = max(0, st['terpakai'] - 1)
+                    return json.dumps(st).encode(), st
+
+                self._salin(self.bersama.ubah(self.KUNCI, fn))
+            self._cond.notify_all()
+
+    def status(self) -> dict:
+        """Kondisi kuota saat ini + estimasi tunggu untuk request baru (antrian = worker ini)."""
+        self._siapkan()
+        with self._cond:
+            self._segarkan()
+            antrian = len(self._antrian)
+            return {
+                'rpm':                   self.rpm,
+                'rpd':                   self.rpd,
+                'token_tersedia':        round(self._token, 2),
+                'antrian':               antrian,
+                'estimasi_tunggu_detik': round(self._estimasi(antrian), 1),
+                'harian_terpakai':       self._terpakai,
+                'harian_sisa':           max(0, self.rpd - self._terpakai),
+                'tanggal':               self._tanggal,
+                'bersama':               self.bersama.nama if self.bersama else None,
+            }
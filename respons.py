@@ -0,0 +1,149 @@
+import zlib
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# ══════════════════════════════════════════════════════════════════
+# RESPONS — JSON cepat (orjson) + kompresi gzip/brotli
+#
+# JSON    : provider Flask berbasis orjson (jika terpasang) untuk jsonify,
+#           request.get_json dan baris NDJSON stream. Gagal (mis. int > 64
+#           bit, NaN di request) → jatuh ke json bawaan, hasil tetap sama.
+# Kompresi: dinegosiasikan lewat Accept-Encoding — br (jika modul brotli
+#           terpasang) lalu gzip. Respons stream (NDJSON) dikompresi per
+#           potongan dengan flush, jadi tiap event tetap sampai seketika.
+# ══════════════════════════════════════════════════════════════════
+MIME_KOMPRESI = {
+    'application/json', 'application/x-ndjson', 'text/html', 'text/plain',
+    'text/css', 'text/javascript', 'application/javascript',
+}
+
+
+class PenyediaJSONCepat(DefaultJSONProvider):
+    """DefaultJSONProvider dengan orjson. Kunci TIDAK diurutkan (urutan dict dipertahankan)."""
+
+    # datetime / date lewat _default Flask (format HTTP date) agar sama dengan json bawaan
+    OPSI = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+            if orjson else 0)
+
+    def _bytes(self, obj, indent: bool = False) -> bytes:
+        opsi = self.OPSI | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, default=self.default, option=opsi)
+        except TypeError:
+            # orjson.JSONEncodeError: int > 64 bit, kunci tak didukung, dst.
+            return super().dumps(obj).encode()
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # NaN / Infinity / int raksasa diterima json bawaan; selain itu error aslinya
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        obj    = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self._bytes(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+def pilih_encoding(accept_encoding, ada_brotli: bool = brotli is not None) -> str | None:
+    """'br' | 'gzip' | None dari header Accept-Encoding (q tertinggi; seri → br)."""
+    calon = (['br'] if ada_brotli else []) + ['gzip']
+    q     = {enc: accept_encoding.quality(enc) for enc in calon}
+    enc   = max(calon, key=lambda e: q[e])   # max() stabil: urutan calon = preferensi
+    return enc if q[enc] > 0 else None
+
+
+class _Kompresor:
+    """Satu antarmuka untuk gzip (zlib) & brotli: tekan(potongan, flush) lalu selesai()."""
+
+    def __init__(self, encoding: str, level_gzip: int, level_br: int):
+        self.br = encoding == 'br'
+        if self.br:
+            self._c = brotli.Compressor(quality=level_br)
+        else:
+            self._c = zlib.compressobj(level_gzip, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def tekan(self, data: bytes, flush: bool = False) -> bytes:
+        if self.br:
+            return self._c.process(data) + (self._c.flush() if flush else b'')
+        return self._c.compress(data) + (self._c.flush(zlib.Z_SYNC_FLUSH) if flush else b'')
+
+    def selesai(self) -> bytes:
+        return self._c.finish() if self.br else self._c.flush()
+
+
+def _aliran(potongan, kompresor: _Kompresor):
+    try:
+        for data in potongan:
+            if isinstance(data, str):
+                data = data.encode()
+            if data:
+                yield kompresor.tekan(data, flush=True)
+        yield kompresor.selesai()
+    finally:
+        # Klien putus → tutup generator asli (stream_with_context, pembersihan file)
+        if hasattr(potongan, 'close'):
+            potongan.close()
+
+
+def pasang(app, json_cepat: bool = True, kompresi: bool = True, min_bytes: int = 1024,
+           level_gzip: int = 6, level_br: int = 5, catat=None):
+    """
+    Pasang provider JSON orjson (json_cepat, jika orjson terpasang) dan hook
+    kompresi respons ke app Flask. Dipanggil SETELAH metrics.pasang agar
+    ukuran payload yang dicatat = byte terkirim (hook after_request berjalan
+    terbalik). catat(encoding) dipanggil untuk tiap respons yang dikompresi.
+    """
+    if json_cepat and orjson is not None:
+        app.json = PenyediaJSONCepat(app)
+
+    if not kompresi:
+        return
+
+    @app.after_request
+    def _kompres(response):
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in MIME_KOMPRESI
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+        response.vary.add('Accept-Encoding')
+
+        encoding = pilih_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        kompresor = _Kompresor(encoding, level_gzip, level_br)
+        if response.is_streamed:
+            response.response = _aliran(response.response, kompresor)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < min_bytes:
+                return response
+            response.set_data(kompresor.tekan(data) + kompresor.selesai())
+        response.headers['Content-Encoding'] = encoding
+        if catat:
+            catat(encoding)
+        return response
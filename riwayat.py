@@ -0,0 +1,323 @@
+import os
+import json
+import time
+import zlib
+import atexit
+import sqlite3
+import threading
+from collections import deque
+
+from gemini_exec import gevent_aktif
+
+
+# ══════════════════════════════════════════════════════════════════
+# RIWAYAT DO — hasil validate_do yang bertahan setelah halaman ditutup
+#
+# SQLite mode WAL. Tulis di-batch oleh thread latar: request hanya menaruh
+# item ke antrian memori (O(1)), satu transaksi per batch menyimpan semuanya.
+#
+# Skema:
+#   dokumen   : satu baris per DO — kolom terindeks (waktu, semua_benar) +
+#               blob zlib berisi raw_data & check RINGKAS ([id, ok, hitung,
+#               tertulis]; label/rincian/kesimpulan bisa dibangun ulang).
+#   label     : kamus nama kategori check & nama kelompok → id kecil.
+#   dok_label : (label_id, dokumen_id) — kategori yang GAGAL dan kelompok
+#               yang ada di dokumen; PK terurut → filter + paginasi = range scan.
+#
+# Paginasi memakai cursor id (id naik searah waktu: waktu diisi di dalam
+# transaksi tulis), jadi halaman ke-N sama cepatnya dengan halaman pertama.
+# ══════════════════════════════════════════════════════════════════
+JENIS_KATEGORI = 'kategori'
+JENIS_KELOMPOK = 'kelompok'
+
+
+def ringkas_checks(checks: list) -> list:
+    return [[c['id'], int(c['ok']), c['hitung'], c['tertulis']] for c in checks]
+
+
+def bentang_checks(ringkas: list) -> list:
+    return [{'id': i, 'ok': bool(ok), 'hitung': h, 'tertulis': t, 'selisih': round(h - t, 4)}
+            for i, ok, h, t in ringkas]
+
+
+class RiwayatDO:
+    """
+    Penyimpanan riwayat validasi DO.
+
+    → simpan(): non-blocking, masuk antrian; ditulis per `ukuran_batch` item
+      atau paling lambat `interval` detik. Antrian penuh (`max_antrian`) →
+      item dibuang & dihitung di stats (request tidak pernah menunggu disk).
+    → `sesi` (img_token) sama → baris yang sama diperbarui (validasi ulang
+      setelah koreksi tidak menggandakan riwayat).
+    → Thread penulis dibuat lazy per proses (aman setelah fork). Di worker
+      gevent thread itu menjadi greenlet, jadi transaksi SQLite-nya
+      dijalankan di thread OS asli (threadpool hub) agar hub tidak tertahan.
+    """
+
+    def __init__(self, path: str, ukuran_batch: int = 100, interval: float = 1.0,
+                 max_antrian: int = 10000):
+        self.path         = path
+        self.ukuran_batch = ukuran_batch
+        self.interval     = interval
+        self.max_antrian  = max_antrian
+        self._antrian     = deque()
+        self._label       = {}      # (jenis, nama) → id
+        self._nama_label  = {}      # id → (jenis, nama)
+        self._lock        = threading.Lock()
+        self._ada         = None    # threading.Event, dibuat lazy per proses
+        self._pid         = None
+        self._stats       = {'disimpan': 0, 'dibuang': 0, 'batch': 0, 'gagal_tulis': 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(
+                'CREATE TABLE IF NOT EXISTS dokumen ('
+                ' id INTEGER PRIMARY KEY,'
+                ' waktu REAL NOT NULL,'
+                ' sesi TEXT UNIQUE,'
+                ' semua_benar INTEGER NOT NULL,'
+                ' jumlah_salah INTEGER NOT NULL,'
+                ' bandul REAL,'
+                ' data BLOB NOT NULL);'
+                'CREATE INDEX IF NOT EXISTS idx_dokumen_waktu ON dokumen(waktu);'
+                'CREATE INDEX IF NOT EXISTS idx_dokumen_status ON dokumen(semua_benar, id);'
+                'CREATE TABLE IF NOT EXISTS label ('
+                ' id INTEGER PRIMARY KEY,'
+                ' jenis TEXT NOT NULL,'
+                ' nama TEXT NOT NULL,'
+                ' UNIQUE (jenis, nama));'
+                'CREATE TABLE IF NOT EXISTS dok_label ('
+                ' label_id INTEGER NOT NULL,'
+                ' dokumen_id INTEGER NOT NULL,'
+                ' PRIMARY KEY (label_id, dokumen_id)) WITHOUT ROWID;'
+                'CREATE INDEX IF NOT EXISTS idx_dok_label_dokumen ON dok_label(dokumen_id);'
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute('PRAGMA synchronous=NORMAL')   # aman di WAL, fsync hanya saat checkpoint
+        return conn
+
+    def _siapkan(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._ada = threading.Event()
+            threading.Thread(target=self._penulis, name='riwayat-penulis', daemon=True).start()
+            atexit.register(self.flush)
+            self._pid = os.getpid()
+
+    # ── Tulis ─────────────────────────────────────────────────────
+    def simpan(self, raw_data: dict, hasil: dict, bandul: float | None = None,
+               sesi: str | None = None):
+        """Antrikan satu hasil validate_do untuk disimpan."""
+        self._siapkan()
+        item = (sesi, raw_data, hasil['checks'], hasil['semua_benar'], hasil['jumlah_salah'], bandul)
+        with self._lock:
+            if len(self._antrian) >= self.max_antrian:
+                self._stats['dibuang'] += 1
+                return
+            self._antrian.append(item)
+            penuh = len(self._antrian) >= self.ukuran_batch
+        if penuh:
+            self._ada.set()
+
+    def _penulis(self):
+        tulis = self._tulis
+        if gevent_aktif():
+            import gevent
+            pool  = gevent.get_hub().threadpool
+            tulis = lambda batch: pool.apply(self._tulis, (batch,))
+        while True:
+            self._ada.wait(self.interval)
+            self._ada.clear()
+            try:
+                self.flush(tulis)
+            except Exception:
+                with self._lock:
+                    self._stats['gagal_tulis'] += 1
+
+    def flush(self, tulis=None):
+        """Tulis semua item di antrian sekarang (juga dipanggil saat proses keluar)."""
+        tulis = tulis or self._tulis
+        while True:
+            with self._lock:
+                batch = [self._antrian.popleft() for _ in range(min(self.ukuran_batch, len(self._antrian)))]
+            if not batch:
+                return
+            tulis(batch)
+            # Stats di sini, bukan di _tulis: _tulis bisa jalan di thread OS lain (lock gevent)
+            with self._lock:
+                self._stats['disimpan'] += len(batch)
+                self._stats['batch']    += 1
+
+    def _id_label(self, conn: sqlite3.Connection, jenis: str, nama: str) -> int:
+        kunci = (jenis, nama)
+        i = self._label.get(kunci)
+        if i is None:
+            conn.execute('INSERT OR IGNORE INTO label (jenis, nama) VALUES (?, ?)', kunci)
+            i = conn.execute('SELECT id FROM label WHERE jenis = ? AND nama = ?', kunci).fetchone()[0]
+            self._label[kunci] = i
+            self._nama_label[i] = kunci
+        return i
+
+    def _tulis(self, batch: list):
+        conn = self._conn()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            # Waktu diambil setelah kunci tulis didapat → urutan id = urutan waktu
+            # lintas worker; selisih dengan waktu validasi ≤ `interval`
+            waktu = time.time()
+            for sesi, raw_data, checks, semua_benar, jumlah_salah, bandul in batch:
+                data = zlib.compress(json.dumps(
+                    {'raw_data': raw_data, 'checks': ringkas_checks(checks)},
+                    separators=(',', ':'),
+                ).encode(), 6)
+                row = conn.execute('SELECT id FROM dokumen WHERE sesi = ?', (sesi,)).fetchone() if sesi else None
+                if row:
+                    dok_id = row[0]
+                    conn.execute(
+                        'UPDATE dokumen SET semua_benar = ?, jumlah_salah = ?, bandul = ?, data = ? '
+                        'WHERE id = ?', (int(semua_benar), jumlah_salah, bandul, data, dok_id),
+                    )
+                    conn.execute('DELETE FROM dok_label WHERE dokumen_id = ?', (dok_id,))
+                else:
+                    dok_id = conn.execute(
+                        'INSERT INTO dokumen (waktu, sesi, semua_benar, jumlah_salah, bandul, data) '
+                        'VALUES (?, ?, ?, ?, ?, ?)', (waktu, sesi, int(semua_benar), jumlah_salah, bandul, data),
+                    ).lastrowid
+
+                label = {self._id_label(conn, JENIS_KATEGORI, c['kategori']) for c in checks if not c['ok']}
+                label |= {self._id_label(conn, JENIS_KELOMPOK, str(g.get('nama', 'KELOMPOK')))
+                          for g in raw_data.get('kelompok', [])}
+                conn.executemany('INSERT OR IGNORE INTO dok_label (label_id, dokumen_id) VALUES (?, ?)',
+                                 [(i, dok_id) for i in label])
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            # Kamus label di memori mungkin berisi id yang ikut di-rollback
+            self._label.clear()
+            self._nama_label.clear()
+            raise
+        finally:
+            conn.close()
+
+    # ── Baca ──────────────────────────────────────────────────────
+    def _muat_label(self, conn: sqlite3.Connection):
+        for i, jenis, nama in conn.execute('SELECT id, jenis, nama FROM label'):
+            self._label[(jenis, nama)] = i
+            self._nama_label[i] = (jenis, nama)
+
+    def _batas_id(self, conn: sqlite3.Connection, waktu: float | None) -> int | None:
+        """id pertama dengan waktu ≥ `waktu` (lewat idx_dokumen_waktu, O(log n))."""
+        if waktu is None:
+            return None
+        row = conn.execute('SELECT id FROM dokumen WHERE waktu >= ? ORDER BY waktu LIMIT 1',
+                           (waktu,)).fetchone()
+        return row[0] if row else (conn.execute('SELECT MAX(id) FROM dokumen').fetchone()[0] or 0) + 1
+
+    def cari(self, dari: float | None = None, sampai: float | None = None,
+             semua_benar: bool | None = None, kategori: str | None = None,
+             kelompok: str | None = None, cursor: int | None = None, limit: int = 50) -> dict:
+        """
+        Riwayat terbaru dulu. dari/sampai = epoch detik [dari, sampai).
+        kategori = kategori check yang GAGAL (mis. 'Baris Netto'); kelompok = nama kelompok.
+        Return {'items': [...], 'cursor': id untuk halaman berikutnya atau None}.
+        """
+        conn = self._conn()
+        try:
+            label = []
+            for jenis, nama in ((JENIS_KATEGORI, kategori), (JENIS_KELOMPOK, kelompok)):
+                if nama is None:
+                    continue
+                if (jenis, nama) not in self._label:
+                    self._muat_label(conn)
+                i = self._label.get((jenis, nama))
+                if i is None:
+                    return {'items': [], 'cursor': None}
+                label.append(i)
+
+            # Semua filter diterjemahkan ke rentang id: [id_min, id_maks)
+            id_min  = self._batas_id(conn, dari)
+            id_maks = self._batas_id(conn, sampai)
+            if cursor is not None:
+                id_maks = cursor if id_maks is None else min(id_maks, cursor)
+
+            # Tabel penggerak: dok_label (label pertama) jika ada filter label,
+            # selain itu dokumen — keduanya dibaca urut id menurun dari cursor
+            if label:
+                kolom, sumber = 'p.dokumen_id', 'dok_label p JOIN dokumen d ON d.id = p.dokumen_id'
+                kondisi, arg  = ['p.label_id = ?'], [label[0]]
+                for i in label[1:]:
+                    kondisi.append('EXISTS (SELECT 1 FROM dok_label q WHERE q.label_id = ? AND q.dokumen_id = d.id)')
+                    arg.append(i)
+            else:
+                kolom, sumber, kondisi, arg = 'd.id', 'dokumen d', [], []
+            if semua_benar is not None:
+                kondisi.append('d.semua_benar = ?')
+                arg.append(int(semua_benar))
+            if id_min is not None:
+                kondisi.append(f'{kolom} >= ?')
+                arg.append(id_min)
+            if id_maks is not None:
+                kondisi.append(f'{kolom} < ?')
+                arg.append(id_maks)
+
+            where = f'WHERE {" AND ".join(kondisi)}' if kondisi else ''
+            rows  = conn.execute(
+                f'SELECT d.id, d.waktu, d.semua_benar, d.jumlah_salah, d.bandul,'
+                f' (SELECT group_concat(label_id) FROM dok_label WHERE dokumen_id = d.id)'
+                f' FROM {sumber} {where} ORDER BY {kolom} DESC LIMIT ?',
+                (*arg, limit + 1),
+            ).fetchall()
+
+            items = []
+            for dok_id, waktu, benar, salah, bandul, ids in rows[:limit]:
+                nama = self._nama_labels(conn, ids)
+                items.append({
+                    'id': dok_id, 'waktu': waktu, 'semua_benar': bool(benar),
+                    'jumlah_salah': salah, 'bandul': bandul,
+                    'kelompok':       nama.get(JENIS_KELOMPOK, []),
+                    'kategori_gagal': nama.get(JENIS_KATEGORI, []),
+                })
+            return {'items': items, 'cursor': rows[limit - 1][0] if len(rows) > limit else None}
+        finally:
+            conn.close()
+
+    def _nama_labels(self, conn: sqlite3.Connection, ids: str | None) -> dict:
+        hasil = {}
+        for i in map(int, ids.split(',')) if ids else ():
+            if i not in self._nama_label:
+                self._muat_label(conn)
+            jenis, nama = self._nama_label.get(i, (None, None))
+            if jenis:
+                hasil.setdefault(jenis, []).append(nama)
+        return hasil
+
+    def ambil(self, dok_id: int) -> dict | None:
+        """Satu dokumen lengkap: raw_data + check ringkas."""
+        conn = self._conn()
+        try:
+            row = conn.execute(
+                'SELECT id, waktu, semua_benar, jumlah_salah, bandul, data FROM dokumen WHERE id = ?',
+                (dok_id,),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        data = json.loads(zlib.decompress(row[5]))
+        return {
+            'id': row[0], 'waktu': row[1], 'semua_benar': bool(row[2]), 'jumlah_salah': row[3],
+            'bandul': row[4], 'raw_data': data['raw_data'], 'checks': bentang_checks(data['checks']),
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            s['antrian'] = len(self._antrian)
+        return s
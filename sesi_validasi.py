@@ -0,0 +1,278 @@
+import copy
+import json
+import time
+import secrets
+import threading
+from collections import OrderedDict
+
+from bersama import BersamaGagal
+
+
+# ══════════════════════════════════════════════════════════════════
+# SESI VALIDASI — koreksi manual dikirim sebagai patch kecil
+#
+# /api/validate membuat sesi: raw_data + check per kelompok disimpan di
+# server. Koreksi berikutnya cukup berupa patch (kelompok, baris, field,
+# nilai); hanya kelompok yang tersentuh + check ringkasan atas yang
+# dihitung ulang, dan hanya check yang BERUBAH yang dikirim balik.
+# ══════════════════════════════════════════════════════════════════
+FIELD_BARIS     = {'ekor', 'kg'}
+FIELD_KELOMPOK  = {'tertulis_total_ekor', 'tertulis_bruto_kg', 'tertulis_terra_kg', 'tertulis_netto_kg'}
+FIELD_RINGKASAN = {'tertulis_realisasi_ekor', 'tertulis_realisasi_kg', 'tertulis_rata_rata'}
+
+
+class SesiTidakAda(KeyError):
+    """Sesi kadaluarsa / dibuat di worker lain (tanpa state bersama) → frontend validasi ulang penuh."""
+
+
+class VersiBentrok(Exception):
+    """Patch dibuat dari versi lama (ada patch lain di antaranya)."""
+
+
+class SesiValidasi:
+    """
+    Penyimpanan sesi validasi di memori worker, dialamatkan dengan token acak.
+    Dengan `bersama` (bersama.py) sesi disimpan di state bersama sebagai JSON
+    sehingga patch bisa mendarat di worker mana pun; patch = baca-ubah-tulis
+    atomik, jadi versi tetap urut walau dua worker mem-patch bersamaan.
+
+    → checks_grup(grp, bandul) / checks_ringkasan(kelompok, ringkasan_atas):
+      fungsi check dari app.py (validate_do = gabungan keduanya);
+      pakai_bt(grp): kelompok mode Bruto/Terra (butuh bandul).
+    → Entri kadaluarsa setelah `ttl` detik sejak dipakai terakhir (bersama:
+      sejak dibuat / di-patch terakhir); maksimum `max_sesi` per worker, yang
+      paling lama tidak dipakai dibuang dulu (bersama: hanya TTL).
+    """
+
+    def __init__(self, checks_grup, checks_ringkasan, pakai_bt,
+                 ttl: float = 30 * 60, max_sesi: int = 1000, bersama=None):
+        self.checks_grup      = checks_grup
+        self.checks_ringkasan = checks_ringkasan
+        self.pakai_bt         = pakai_bt
+        self.ttl              = ttl
+        self.max_sesi         = max_sesi
+        self.bersama          = bersama
+        self._sesi            = OrderedDict()   # token → dict sesi
+        self._lock            = threading.Lock()
+
+    def _sapu(self, now: float):
+        while self._sesi:
+            token, sesi = next(iter(self._sesi.items()))
+            if sesi['kadaluarsa'] > now and len(self._sesi) <= self.max_sesi:
+                break
+            del self._sesi[token]
+
+    def _ambil(self, token: str) -> dict:
+        now  = time.time()
+        self._sapu(now)
+        sesi = self._sesi.get(token) if isinstance(token, str) else None
+        if sesi is None:
+            raise SesiTidakAda(token)
+        sesi['kadaluarsa'] = now + self.ttl
+        self._sesi.move_to_end(token)
+        return sesi
+
+    def _baca(self, token: str) -> dict:
+        """Salinan sesi untuk dibaca saja (info / checks); aman dipakai di luar lock."""
+        if self.bersama is None:
+            with self._lock:
+                return copy.deepcopy(self._ambil(token))
+        data = self.bersama.ambil(f'sesi:{token}') if isinstance(token, str) else None
+        if data is None:
+            raise SesiTidakAda(token)
+        return json.loads(data)
+
+    @staticmethod
+    def hasil(sesi: dict) -> dict:
+        """Hasil lengkap berformat validate_do dari check yang tersimpan di sesi."""
+        raw_data = sesi['raw_data']
+        checks   = [c for seg in sesi['segmen'] for c in seg] + sesi['ringkasan']
+        salah    = sum(1 for c in checks if not c['ok'])
+        return {
+            'checks':           checks,
+            'semua_benar':      salah == 0,
+            'jumlah_salah':     salah,
+            'ada_bruto_terra':  sesi['ada_bt'],
+            'bandul_digunakan': sesi['bandul'],
+            'kelompok':         raw_data['kelompok'],
+            'ringkasan_atas':   raw_data['ringkasan_atas'],
+        }
+
+    # ── Patch ─────────────────────────────────────────────────────
+    @staticmethod
+    def _lokasi(raw_data: dict, p: dict) -> tuple[dict, str]:
+        """(objek yang diubah, field) untuk satu patch; ValueError jika tidak valid."""
+        if not isinstance(p, dict):
+            raise ValueError('patch harus berupa objek')
+        field, gi, bi = p.get('field'), p.get('kelompok'), p.get('baris')
+        nilai = p.get('nilai')
+        if nilai is not None and (isinstance(nilai, bool) or not isinstance(nilai, (int, float))):
+            raise ValueError(f'nilai {field} harus angka atau null')
+
+        if gi is None:
+            if field not in FIELD_RINGKASAN:
+                raise ValueError(f'field ringkasan atas tidak dikenal: {field}')
+            return raw_data['ringkasan_atas'], field
+
+        kelompok = raw_data['kelompok']
+        if isinstance(gi, bool) or not isinstance(gi, int) or not 0 <= gi < len(kelompok):
+            raise ValueError(f'indeks kelompok tidak valid: {gi}')
+        grp = kelompok[gi]
+        if bi is None:
+            if field not in FIELD_KELOMPOK:
+                raise ValueError(f'field kelompok tidak dikenal: {field}')
+            return grp, field
+
+        baris = grp.setdefault('baris', [])
+        if isinstance(bi, bool) or not isinstance(bi, int) or not 0 <= bi < len(baris):
+            raise ValueError(f'indeks baris tidak valid: {bi}')
+        if field not in FIELD_BARIS:
+            raise ValueError(f'field baris tidak dikenal: {field}')
+        return baris[bi], field
+
+    # ── API publik ────────────────────────────────────────────────
+    def buat(self, raw_data: dict, bandul: float | None, img_token: str | None = None) -> tuple[str | None, dict]:
+        """
+        Validasi penuh + simpan sesi. Return (token, hasil berformat validate_do);
+        token None jika state bersama tidak bisa dihubungi (hasil tetap dihitung lokal).
+        """
+        raw_data = copy.deepcopy(raw_data)
+        raw_data.setdefault('ringkasan_atas', {})
+        kelompok = raw_data['kelompok']
+        sesi = {
+            'raw_data':  raw_data,
+            'bandul':    bandul,
+            'img_token': img_token,
+            'versi':     1,
+            'ada_bt':    any(self.pakai_bt(g) for g in kelompok),
+            'segmen':    [self.checks_grup(g, bandul) for g in kelompok],
+            'ringkasan': self.checks_ringkasan(kelompok, raw_data['ringkasan_atas']),
+        }
+        token = secrets.token_urlsafe(12)
+        if self.bersama is not None:
+            try:
+                self.bersama.simpan(f'sesi:{token}', self._kode(sesi), ttl=self.ttl)
+            except BersamaGagal:
+                return None, self.hasil(sesi)   # tanpa sesi: koreksi berikutnya = validasi penuh
+            return token, self.hasil(sesi)
+        with self._lock:
+            sesi['kadaluarsa'] = time.time() + self.ttl
+            self._sesi[token] = sesi
+            self._sapu(time.time())
+        return token, self.hasil(sesi)
+
+    @staticmethod
+    def _kode(sesi: dict) -> bytes:
+        return json.dumps(sesi, separators=(',', ':')).encode()
+
+    def patch(self, token: str, perubahan: list, versi: int | None = None,
+              bandul: float | None = None, ganti_bandul: bool = False,
+              wajib_bandul: bool = True) -> tuple[dict, dict]:
+        """
+        Terapkan patch [{'kelompok', 'baris', 'field', 'nilai'}] (kelompok=None →
+        ringkasan atas, baris=None → nilai tertulis kelompok), lalu hitung ulang
+        kelompok yang tersentuh (semua kelompok Bruto/Terra jika bandul berganti)
+        + check ringkasan atas.
+
+        Return (perubahan untuk frontend, hasil lengkap untuk riwayat):
+          {'versi', 'berubah': [{'indeks', 'check'}], 'semua_benar', 'jumlah_salah',
+           'ada_bruto_terra', 'checks' (hanya jika daftar check berubah bentuk,
+           mis. kelompok pindah mode Bruto/Terra)}
+        Raise SesiTidakAda, VersiBentrok, ValueError (patch tidak valid → tidak ada
+        yang diterapkan).
+        """
+        if not isinstance(perubahan, list):
+            raise ValueError('patch harus berupa list')
+        args = (perubahan, versi, bandul, ganti_bandul, wajib_bandul)
+        if self.bersama is None:
+            with self._lock:
+                sesi, berubah, bentuk_ok, hasil = self._terapkan(self._ambil(token), *args)
+        else:
+            def fn(lama):
+                if lama is None:
+                    raise SesiTidakAda(token)
+                terapan = self._terapkan(json.loads(lama), *args)
+                return self._kode(terapan[0]), terapan
+            sesi, berubah, bentuk_ok, hasil = self.bersama.ubah(f'sesi:{token}', fn, ttl=self.ttl)
+
+        respons = {
+            'versi':           sesi['versi'],
+            'berubah':         berubah if bentuk_ok else [],
+            'semua_benar':     hasil['semua_benar'],
+            'jumlah_salah':    hasil['jumlah_salah'],
+            'ada_bruto_terra': hasil['ada_bruto_terra'],
+        }
+        if not bentuk_ok:
+            respons['checks'] = hasil['checks']
+        return respons, hasil
+
+    def _terapkan(self, sesi: dict, perubahan: list, versi: int | None, bandul: float | None,
+                  ganti_bandul: bool, wajib_bandul: bool) -> tuple[dict, list, bool, dict]:
+        """Patch `sesi` di tempat. Return (sesi, check berubah, bentuk sama?, hasil lengkap)."""
+        if versi is not None and versi != sesi['versi']:
+            raise VersiBentrok(f'versi {versi} ≠ {sesi["versi"]}')
+
+        raw_data = sesi['raw_data']
+        lokasi   = [self._lokasi(raw_data, p) for p in perubahan]
+        lama     = [(obj, f, obj.get(f)) for obj, f in lokasi]
+        for (obj, f), p in zip(lokasi, perubahan):
+            obj[f] = p.get('nilai')
+
+        bandul_baru = bandul if ganti_bandul else sesi['bandul']
+        kelompok    = raw_data['kelompok']
+        tersentuh   = {p['kelompok'] for p in perubahan if p.get('kelompok') is not None}
+        if ganti_bandul and bandul_baru != sesi['bandul']:
+            tersentuh |= {i for i, g in enumerate(kelompok) if self.pakai_bt(g)}
+        segmen = {i: self.checks_grup(kelompok[i], bandul_baru) for i in tersentuh}
+        ada_bt = any(self.pakai_bt(g) for g in kelompok)
+        if wajib_bandul and ada_bt and bandul_baru is None:
+            for obj, f, nilai in reversed(lama):
+                obj[f] = nilai
+            raise ValueError('Dokumen memiliki Bruto/Terra — nilai bandul wajib diisi')
+
+        # Simpan & bandingkan per segmen (kelompok..., ringkasan)
+        ringkasan  = self.checks_ringkasan(kelompok, raw_data['ringkasan_atas'])
+        bentuk_ok  = True
+        berubah    = []
+        baru_semua = {**segmen, len(kelompok): ringkasan}
+        offset     = 0
+        for i, lama_seg in enumerate(sesi['segmen'] + [sesi['ringkasan']]):
+            baru_seg = baru_semua.get(i, lama_seg)
+            if baru_seg is not lama_seg:
+                if [c['id'] for c in baru_seg] != [c['id'] for c in lama_seg]:
+                    bentuk_ok = False
+                else:
+                    berubah += [{'indeks': offset + j, 'check': c}
+                                for j, (c, c_lama) in enumerate(zip(baru_seg, lama_seg)) if c != c_lama]
+            offset += len(baru_seg)
+
+        for i, seg in segmen.items():
+            sesi['segmen'][i] = seg
+        sesi['ringkasan'] = ringkasan
+        sesi['bandul']    = bandul_baru
+        sesi['ada_bt']    = ada_bt
+        sesi['versi']    += 1
+        return sesi, berubah, bentuk_ok, self.hasil(sesi)
+
+    def info(self, token: str) -> dict:
+        """raw_data, bandul, img_token, versi & semua_benar sesi (untuk koreksi lokal & riwayat)."""
+        sesi = self._baca(token)
+        return {
+            'raw_data':    sesi['raw_data'],
+            'bandul':      sesi['bandul'],
+            'img_token':   sesi['img_token'],
+            'versi':       sesi['versi'],
+            'semua_benar': all(c['ok'] for seg in sesi['segmen'] + [sesi['ringkasan']] for c in seg),
+        }
+
+    def checks(self, token: str) -> tuple[int, list]:
+        """(versi, semua check sesi saat ini) — untuk rincian per check."""
+        sesi = self._baca(token)
+        return sesi['versi'], [c for seg in sesi['segmen'] + [sesi['ringkasan']] for c in seg]
+
+    def stats(self) -> dict:
+        # Sesi di state bersama tidak dihitung (dibuang lewat TTL backend)
+        if self.bersama is not None:
+            return {}
+        with self._lock:
+            return {'sesi': len(self._sesi)}
@@ -0,0 +1,260 @@
+import json
+
+import numpy as np
+
+
+# ══════════════════════════════════════════════════════════════════
+# VALIDASI MASSAL (KOLOMNAR) — re-check ribuan DO historis sekaligus
+#
+# Hasil setara validate_do() (hitung/tertulis/selisih/ok per check),
+# tapi tanpa membangun string rincian/kesimpulan, dan semua penjumlahan
+# dihitung dengan segment sum NumPy di atas array datar.
+#
+# Alur:
+#   kolom = KolomDO.dari_dokumen(list_raw_data)   # sekali (atau muat dari .npz)
+#   hasil = validasi_massal(kolom, bandul=..., toleransi=TOLERANSI)
+#   → ganti toleransi / bandul → panggil validasi_massal lagi (murah)
+# ══════════════════════════════════════════════════════════════════
+# Selisih |hitung − tertulis| di bawah nilai ini dianggap SAMA. Satu sumber
+# untuk app.validate_do, validasi_massal & CLI di bawah (modul ini ringan).
+TOLERANSI = 0.15
+
+JENIS_CHECK = ('ekor', 'netto', 'bruto', 'terra', 'realisasi_ekor', 'realisasi_kg', 'rata_rata')
+EKOR, NETTO, BRUTO, TERRA, REAL_EKOR, REAL_KG, RATA = range(len(JENIS_CHECK))
+
+
+def _f(v) -> float:
+    """safe_float versi cepat: jalur int/float langsung, sisanya seperti safe_float."""
+    t = type(v)
+    if t is float or t is int:
+        return v
+    if v is None:
+        return 0.0
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _round(x: np.ndarray, n: int) -> np.ndarray:
+    """
+    round() Python untuk array. np.round (x·10ⁿ → rint) bisa beda dengan
+    round() bawaan pada kasus x.xx5 (mis. 2.295 → 2.3 vs 2.29), jadi nilai
+    yang dekat batas .5 dihitung ulang dengan round() agar setara validate_do.
+    """
+    y = np.round(x, n)
+    s = x * 10.0 ** n
+    dekat = np.abs(np.abs(s - np.trunc(s)) - 0.5) < 1e-6
+    if dekat.any():
+        y[dekat] = [round(v, n) for v in x[dekat].tolist()]
+    return y
+
+
+class KolomDO:
+    """
+    Arsip DO dalam bentuk kolom (struct-of-arrays).
+
+    Baris   : ekor[R], kg[R], grp_baris[R]              (hanya baris terisi)
+    Kelompok: dok_grp[G], tertulis_ekor/bruto/terra/netto[G], nama_grp[G]
+    Dokumen : tertulis_real_ekor/real_kg/rata[D]
+    Kelompok milik satu dokumen selalu bersebelahan (offset naik).
+    """
+
+    KOLOM = ('ekor', 'kg', 'grp_baris', 'dok_grp',
+             'tertulis_ekor', 'tertulis_bruto', 'tertulis_terra', 'tertulis_netto',
+             'tertulis_real_ekor', 'tertulis_real_kg', 'tertulis_rata')
+
+    def __init__(self, **arrays):
+        for k in self.KOLOM:
+            setattr(self, k, arrays[k])
+        self.nama_grp = list(arrays['nama_grp'])
+
+    @property
+    def n_dokumen(self) -> int:
+        return len(self.tertulis_real_ekor)
+
+    @property
+    def n_kelompok(self) -> int:
+        return len(self.dok_grp)
+
+    @classmethod
+    def dari_dokumen(cls, dokumen: list) -> 'KolomDO':
+        """Ratakan list raw_data (format JSON hasil OCR) menjadi kolom."""
+        ekor, kg, grp_baris = [], [], []
+        dok_grp, t_ekor, t_bruto, t_terra, t_netto, nama_grp = [], [], [], [], [], []
+        r_ekor, r_kg, r_rata = [], [], []
+
+        g = 0
+        for d, data in enumerate(dokumen):
+            for grp in data['kelompok']:
+                for r in grp.get('baris', []):
+                    e, k = _f(r.get('ekor')), _f(r.get('kg'))
+                    if e != 0 or k != 0:
+                        ekor.append(e)
+                        kg.append(k)
+                        grp_baris.append(g)
+                dok_grp.append(d)
+                t_ekor.append(_f(grp.get('tertulis_total_ekor')))
+                t_bruto.append(_f(grp.get('tertulis_bruto_kg')))
+                t_terra.append(_f(grp.get('tertulis_terra_kg')))
+                t_netto.append(_f(grp.get('tertulis_netto_kg')))
+                nama_grp.append(grp.get('nama', 'KELOMPOK'))
+                g += 1
+            ra = data.get('ringkasan_atas', {})
+            r_ekor.append(_f(ra.get('tertulis_realisasi_ekor')))
+            r_kg.append(_f(ra.get('tertulis_realisasi_kg')))
+            r_rata.append(_f(ra.get('tertulis_rata_rata')))
+
+        f64 = lambda x: np.asarray(x, dtype=np.float64)
+        i64 = lambda x: np.asarray(x, dtype=np.int64)
+        return cls(
+            ekor=f64(ekor), kg=f64(kg), grp_baris=i64(grp_baris), dok_grp=i64(dok_grp),
+            tertulis_ekor=f64(t_ekor), tertulis_bruto=f64(t_bruto),
+            tertulis_terra=f64(t_terra), tertulis_netto=f64(t_netto),
+            tertulis_real_ekor=f64(r_ekor), tertulis_real_kg=f64(r_kg),
+            tertulis_rata=f64(r_rata), nama_grp=nama_grp,
+        )
+
+    def simpan(self, path: str):
+        """Simpan arsip kolom ke .npz (sekali ratakan, validasi berkali-kali)."""
+        np.savez_compressed(
+            path, nama_grp=np.asarray(json.dumps(self.nama_grp)),
+            **{k: getattr(self, k) for k in self.KOLOM},
+        )
+
+    @classmethod
+    def muat(cls, path: str) -> 'KolomDO':
+        with np.load(path) as z:
+            arrays = {k: z[k] for k in cls.KOLOM}
+            arrays['nama_grp'] = json.loads(str(z['nama_grp']))
+        return cls(**arrays)
+
+
+def validasi_massal(kolom: KolomDO, bandul=None, toleransi: float = TOLERANSI) -> dict:
+    """
+    Jalankan ke-7 check validate_do untuk semua dokumen sekaligus.
+
+    bandul   : None, satu angka untuk semua dokumen, atau array per dokumen.
+    toleransi: ambang |selisih| (default TOLERANSI, sama dengan buat_check).
+
+    Return dict array, check diurutkan PERSIS seperti list checks validate_do:
+      'dok', 'jenis' (indeks JENIS_CHECK), 'grp' (-1 untuk check ringkasan),
+      'hitung', 'tertulis', 'selisih', 'ok'             → panjang = jumlah check
+      'semua_benar', 'jumlah_salah', 'ada_bruto_terra'  → panjang = jumlah dokumen
+    """
+    D, G = kolom.n_dokumen, kolom.n_kelompok
+
+    if bandul is None:
+        bandul_dok = np.zeros(D)
+    else:
+        bandul_dok = np.broadcast_to(np.asarray(bandul, dtype=np.float64), (D,))
+        bandul_dok = np.nan_to_num(bandul_dok, nan=0.0)
+
+    # ── Segment sum per kelompok ──────────────────────────────────
+    hitung_ekor  = np.bincount(kolom.grp_baris, weights=kolom.ekor, minlength=G)
+    hitung_bruto = _round(np.bincount(kolom.grp_baris, weights=kolom.kg, minlength=G), 2)
+    n_baris      = np.bincount(kolom.grp_baris, minlength=G)
+
+    mode_bt      = (kolom.tertulis_bruto != 0) & (kolom.tertulis_terra != 0)
+    hitung_terra = _round(bandul_dok[kolom.dok_grp] * n_baris, 2)
+    hitung_netto = np.where(mode_bt, _round(hitung_bruto - hitung_terra, 2), hitung_bruto)
+
+    # ── Check ringkasan per dokumen ───────────────────────────────
+    real_ekor = np.bincount(kolom.dok_grp, weights=kolom.tertulis_ekor, minlength=D)
+    real_kg   = _round(np.bincount(kolom.dok_grp, weights=kolom.tertulis_netto, minlength=D), 2)
+    pembagi   = kolom.tertulis_real_ekor
+    rata      = np.zeros(D)
+    np.divide(kolom.tertulis_real_kg, pembagi, out=rata, where=pembagi != 0)
+    rata      = _round(rata, 2)
+
+    # ── Susun semua check: (dok, urutan, jenis, grp, hitung, tertulis) ──
+    g_idx = np.arange(G)
+    bt    = g_idx[mode_bt]
+    ln    = g_idx[~mode_bt]
+    d_idx = np.arange(D)
+    dasar = 4 * G
+
+    bagian = [
+        (kolom.dok_grp,     g_idx * 4,         EKOR,      g_idx, hitung_ekor,      kolom.tertulis_ekor),
+        (kolom.dok_grp[ln], ln * 4 + 1,        NETTO,     ln,    hitung_bruto[ln], kolom.tertulis_netto[ln]),
+        (kolom.dok_grp[bt], bt * 4 + 1,        BRUTO,     bt,    hitung_bruto[bt], kolom.tertulis_bruto[bt]),
+        (kolom.dok_grp[bt], bt * 4 + 2,        TERRA,     bt,    hitung_terra[bt], kolom.tertulis_terra[bt]),
+        (kolom.dok_grp[bt], bt * 4 + 3,        NETTO,     bt,    hitung_netto[bt], kolom.tertulis_netto[bt]),
+        (d_idx,             dasar + d_idx * 3,     REAL_EKOR, -1, real_ekor, kolom.tertulis_real_ekor),
+        (d_idx,             dasar + d_idx * 3 + 1, REAL_KG,   -1, real_kg,   kolom.tertulis_real_kg),
+        (d_idx,             dasar + d_idx * 3 + 2, RATA,      -1, rata,      kolom.tertulis_rata),
+    ]
+    dok      = np.concatenate([b[0] for b in bagian])
+    urutan   = np.concatenate([b[1] for b in bagian])
+    jenis    = np.concatenate([np.full(len(b[0]), b[2], dtype=np.int8) for b in bagian])
+    grp      = np.concatenate([np.broadcast_to(np.asarray(b[3], dtype=np.int64), (len(b[0]),)) for b in bagian])
+    hitung   = np.concatenate([b[4] for b in bagian])
+    tertulis = np.concatenate([b[5] for b in bagian])
+
+    o        = np.lexsort((urutan, dok))
+    dok, jenis, grp, hitung, tertulis = dok[o], jenis[o], grp[o], hitung[o], tertulis[o]
+
+    selisih = _round(hitung - tertulis, 4)
+    ok      = np.abs(selisih) < toleransi
+
+    jumlah_salah = np.bincount(dok, weights=~ok, minlength=D).astype(np.int64)
+    ada_bt_dok   = np.bincount(kolom.dok_grp, weights=mode_bt, minlength=D) > 0
+
+    return {
+        'dok':             dok,
+        'jenis':           jenis,
+        'grp':             grp,
+        'hitung':          hitung,
+        'tertulis':        tertulis,
+        'selisih':         selisih,
+        'ok':              ok,
+        'semua_benar':     jumlah_salah == 0,
+        'jumlah_salah':    jumlah_salah,
+        'ada_bruto_terra': ada_bt_dok,
+    }
+
+
+def id_check(kolom: KolomDO, hasil: dict, i: int) -> str:
+    """Id check ke-i dalam format validate_do (misal 'netto_pesanan', 'rata_rata')."""
+    jenis = JENIS_CHECK[hasil['jenis'][i]]
+    g     = hasil['grp'][i]
+    return jenis if g < 0 else f'{jenis}_{kolom.nama_grp[g].lower()}'
+
+
+if __name__ == '__main__':
+    # Re-validasi arsip JSONL: satu baris = raw_data, atau {"raw_data": ..., "bandul": ...}.
+    # Arsip .npz (KolomDO.simpan, lewat --simpan) melewati parse JSON + ratakan.
+    import argparse
+
+    ap = argparse.ArgumentParser(description='Re-validasi massal arsip DO (JSONL atau .npz)')
+    ap.add_argument('arsip', help='arsip .jsonl, atau .npz hasil --simpan')
+    ap.add_argument('--bandul', type=float, default=None,
+                    help='bandul untuk semua dokumen (default: field "bandul" per baris JSONL)')
+    ap.add_argument('--toleransi', type=float, default=TOLERANSI,
+                    help=f'ambang |selisih| (default TOLERANSI = {TOLERANSI}, sama dengan app)')
+    ap.add_argument('--simpan', default=None, help='simpan kolom arsip JSONL ke .npz ini untuk run berikutnya')
+    args = ap.parse_args()
+
+    bandul = None
+    if args.arsip.endswith('.npz'):
+        kolom = KolomDO.muat(args.arsip)   # bandul per dokumen tidak disimpan di .npz → --bandul
+    else:
+        dokumen, bandul = [], []
+        with open(args.arsip, encoding='utf-8') as f:
+            for baris in f:
+                if baris.strip():
+                    obj = json.loads(baris)
+                    raw = obj.get('raw_data', obj)
+                    dokumen.append(raw)
+                    bandul.append(_f(obj.get('bandul')) if 'raw_data' in obj else 0.0)
+        kolom  = KolomDO.dari_dokumen(dokumen)
+        bandul = np.array(bandul)
+        if args.simpan:
+            kolom.simpan(args.simpan)
+
+    hasil = validasi_massal(kolom, args.bandul if args.bandul is not None else bandul, args.toleransi)
+    gagal = np.flatnonzero(~hasil['semua_benar'])
+    print(f'{kolom.n_dokumen} dokumen, {len(gagal)} tidak lolos validasi')
+    for d in gagal:
+        ids = [id_check(kolom, hasil, i) for i in np.flatnonzero((hasil['dok'] == d) & ~hasil['ok'])]
+        print(f'  #{d}: {", ".join(ids)}')